@@ -1,6 +1,5 @@
 import streamlit as st
-from datetime import datetime, date
-from archery_app.security_admin import security_logs_admin
+from datetime import datetime, date, timedelta
 
 # Import modules from the archery_app package
 from archery_app.database import (
@@ -9,22 +8,11 @@ from archery_app.database import (
     verify_connection,
 )
 from archery_app.auth import initialize_auth_state, login_page, logout
-from archery_app.archer_pages import (
-    view_personal_scores,
-    record_practice_score,
-    view_round_definitions,
-    view_competition_results,
-)
-from archery_app.recorder_pages import (
-    manage_archers,
-    approve_practice_scores,
-    manage_competitions,
-    generate_competition_results,
-)
-from archery_app.admin_pages import manage_users, manage_permissions, manage_account
-from archery_app.chatbot import sql_chatbot
-from archery_app.live_competition_view import display_live_competition_view
-from archery_app.performance_analytics import show_performance_analytics
+from archery_app.principal_cache import refresh_session_principal
+
+# Page modules are imported on first navigation (see page_registry.py)
+from archery_app.page_registry import register_page, render_page
+from archery_app.page_profiler import display_diagnostics_panel
 
 # Set page configuration
 st.set_page_config(
@@ -48,6 +36,76 @@ def home_dashboard():
     st.subheader(f"Welcome, {st.session_state.archer_name}")
     st.write(f"Today is **{current_date}**")
 
+    # Summary widgets from the precomputed dashboard digests (one lookup)
+    import pandas as pd
+    from archery_app.digests import (
+        NEW_BEST_DAYS, PENDING_FIELDS, PROGRESS_FIELDS, RECENT_FIELDS,
+        UPCOMING_FIELDS, as_records, load_home_digests,
+    )
+
+    digest = club = None
+    if st.session_state.archer_id:
+        try:
+            digest, club = load_home_digests(st.session_state.archer_id)
+        except Exception as e:
+            print(f"Error loading dashboard digest: {e}")
+
+    if digest is not None:
+        today = date.today().isoformat()
+        new_best_since = (date.today() - timedelta(days=NEW_BEST_DAYS)).isoformat()
+        progress = as_records(digest["progress"], PROGRESS_FIELDS)
+        upcoming = [
+            c for c in as_records(club["upcoming"], UPCOMING_FIELDS) if c["Date"] >= today
+        ]
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Awaiting Approval", digest["pending_count"])
+        with col2:
+            st.metric(f"New PBs ({NEW_BEST_DAYS} days)", digest["new_bests"])
+        with col3:
+            st.metric("Upcoming Competitions", len(upcoming))
+
+        for best in progress:
+            if best["BestDate"] >= new_best_since:
+                st.success(
+                    f"🎉 New PB! {best['BestScore']} on {best['RoundName']} "
+                    f"({best['EquipmentType']}) on {best['BestDate']}"
+                )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Recent Scores")
+            recent = as_records(digest["recent"], RECENT_FIELDS)
+            if recent:
+                st.dataframe(pd.DataFrame(recent), use_container_width=True, hide_index=True)
+            else:
+                st.info("No approved scores yet.")
+            if digest["pending"]:
+                st.write("**Awaiting approval:**")
+                st.dataframe(
+                    pd.DataFrame(as_records(digest["pending"], PENDING_FIELDS)),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+        with col2:
+            st.subheader("Personal Best Progress")
+            if progress:
+                df_progress = pd.DataFrame(progress)
+                df_progress["To PB"] = df_progress["BestScore"] - df_progress["LatestScore"]
+                st.dataframe(df_progress, use_container_width=True, hide_index=True)
+            else:
+                st.info("Personal bests appear once scores are approved.")
+            st.subheader("Upcoming Competitions")
+            if upcoming:
+                df_upcoming = pd.DataFrame(upcoming).drop(columns=["CompetitionID"])
+                df_upcoming["IsChampionship"] = df_upcoming["IsChampionship"].map({True: "Yes", False: "No"})
+                st.dataframe(df_upcoming, use_container_width=True, hide_index=True)
+            else:
+                st.info("No competitions scheduled.")
+
+        st.markdown("---")
+
     # Create a 2-column layout for quick access buttons
     col1, col2 = st.columns(2)
 
@@ -68,6 +126,9 @@ def home_dashboard():
         if st.button("ℹ️ Round Definitions", use_container_width=True):
             st.session_state.current_page = "View Round Definitions"
             st.rerun()
+        if st.button("🥇 Personal Bests & Records", use_container_width=True):
+            st.session_state.current_page = "Personal Bests & Records"
+            st.rerun()
 
     # For recorders and admins, show recorder section
     if st.session_state.is_recorder or st.session_state.is_admin:
@@ -76,7 +137,10 @@ def home_dashboard():
 
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("✓ Approve Scores", use_container_width=True):
+            pending_label = (
+                f"✓ Approve Scores ({club['pending_count']} pending)" if club else "✓ Approve Scores"
+            )
+            if st.button(pending_label, key="approve_home", use_container_width=True):
                 st.session_state.current_page = "Approve Practice Scores"
                 st.rerun()
             if st.button("👥 Manage Archers", use_container_width=True):
@@ -122,12 +186,20 @@ def home_dashboard():
     # Add to the display_selected_page part - typically it's in the main_page function
 
 
+register_page("Home", home_dashboard)
+
+
 # Main page to choose procedure
 def main_page():
     # Initialize current_page in session state if not present
     if "current_page" not in st.session_state:
         st.session_state.current_page = "Home"
 
+    # Pick up privilege changes made by an admin since the last rerun
+    if not refresh_session_principal():
+        logout()
+        st.rerun()
+
     # Display user information in sidebar
     with st.sidebar:
         # Display the SVG logo using st.markdown to avoid PIL errors
@@ -180,6 +252,7 @@ def main_page():
             ("📝 Record Score", "Record Practice Score"),
             ("ℹ️ Round Info", "View Round Definitions"),
             ("🏆 Competition Results", "View Competition Results"),
+            ("🥇 Records", "Personal Bests & Records"),
         ]
 
         for label, page in archer_options:
@@ -213,6 +286,7 @@ def main_page():
                 ("👤 User Management", "User Management"),
                 ("🔐 Permissions", "Permission Management"),
                 ("🔒 Security Logs", "Security Logs"),
+                ("⏱️ Performance", "Performance"),
             ]
 
             for label, page in admin_options:
@@ -226,55 +300,18 @@ def main_page():
     st.title("🏹 Archery Club Database")
 
     # Display selected page content
-    if st.session_state.current_page == "Home":
-        home_dashboard()
-    elif st.session_state.current_page == "View Personal Scores":
-        view_personal_scores()
-    elif st.session_state.current_page == "Record Practice Score":
-        record_practice_score()
-    elif st.session_state.current_page == "View Round Definitions":
-        view_round_definitions()
-    elif st.session_state.current_page == "View Competition Results":
-        view_competition_results()
-    elif st.session_state.current_page == "SQL Assistant":
-        sql_chatbot()
-    elif st.session_state.current_page == "Manage Archers" and (
-        st.session_state.is_recorder or st.session_state.is_admin
-    ):
-        manage_archers()
-    elif st.session_state.current_page == "Approve Practice Scores" and (
-        st.session_state.is_recorder or st.session_state.is_admin
+    if not render_page(
+        st.session_state.current_page,
+        is_recorder=st.session_state.is_recorder,
+        is_admin=st.session_state.is_admin,
     ):
-        approve_practice_scores()
-    elif st.session_state.current_page == "Manage Competitions" and (
-        st.session_state.is_recorder or st.session_state.is_admin
-    ):
-        manage_competitions()
-    elif st.session_state.current_page == "Generate Competition Results" and (
-        st.session_state.is_recorder or st.session_state.is_admin
-    ):
-        generate_competition_results()
-    elif (
-        st.session_state.current_page == "User Management" and st.session_state.is_admin
-    ):
-        manage_users()
-    elif (
-        st.session_state.current_page == "Permission Management"
-        and st.session_state.is_admin
-    ):
-        manage_permissions()
-    elif st.session_state.current_page == "Security Logs" and st.session_state.is_admin:
-        security_logs_admin()
-    elif st.session_state.current_page == "Manage Account":
-        manage_account()
-    elif st.session_state.current_page == "Live Competition View":
-        display_live_competition_view()
-    elif st.session_state.current_page == "Performance Analytics":
-        show_performance_analytics()
-    else:
         st.session_state.current_page = "Home"
         st.rerun()
 
+    # Timing of this rerun and cProfile capture, for admins
+    if st.session_state.is_admin:
+        display_diagnostics_panel()
+
 
 # Main function
 if __name__ == "__main__":
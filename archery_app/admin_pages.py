@@ -4,21 +4,26 @@ import pandas as pd
 from datetime import date, datetime
 import hashlib
 from archery_app.database import get_connection
-from archery_app.auth import generate_salt, hash_password
+from archery_app.password_hashing import hash_new_password
+from archery_app.principal_cache import get_cached_user_list, invalidate_principal
 from archery_app.security_logging import log_security_event, SecurityEventType
-def get_all_users():
-    """Retrieve all users from the database"""
-    try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.callproc("uspGetAllUsers")
+def _load_all_users():
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.callproc("uspGetAllUsers")
 
-        results = list(cursor.stored_results())
-        users = results[0].fetchall() if results else []
+    results = list(cursor.stored_results())
+    users = results[0].fetchall() if results else []
 
-        cursor.close()
-        conn.close()
-        return users
+    cursor.close()
+    conn.close()
+    return users
+
+
+def get_all_users():
+    """Retrieve all users, cached until an account is changed"""
+    try:
+        return get_cached_user_list(_load_all_users)
     except mysql.connector.Error as err:
         st.error(f"Database error: {err}")
         return []
@@ -119,8 +124,7 @@ def manage_users():
                 cursor = conn.cursor()
                 
                 # Generate a new salt and hash the password
-                salt = generate_salt()
-                password_hash = hash_password(default_password, salt)
+                password_hash, salt, hash_type = hash_new_password(default_password)
 
                 # Call the stored procedure with updated parameters
                 result_args = cursor.callproc(
@@ -139,8 +143,8 @@ def manage_users():
 
                 # Update the salt and hash type
                 cursor.execute(
-                    "UPDATE AppUser SET Salt = %s, HashType = 'salted_sha256' WHERE UserID = LAST_INSERT_ID()",
-                    (salt,)
+                    "UPDATE AppUser SET Salt = %s, HashType = %s WHERE UserID = LAST_INSERT_ID()",
+                    (salt, hash_type)
                 )
                 
                 conn.commit()
@@ -153,6 +157,7 @@ def manage_users():
                 conn.close()
 
                 if result_id > 0:
+                    invalidate_principal(result_id)
                     st.success(f"{message} (User ID: {result_id})")
                     # Add logging
                     from archery_app.security_logging import log_security_event, SecurityEventType
@@ -213,8 +218,7 @@ def manage_users():
                             cursor = conn.cursor()
 
                             # Generate a new salt and hash the password
-                            salt = generate_salt()
-                            password_hash = hash_password(new_password, salt)
+                            password_hash, salt, hash_type = hash_new_password(new_password)
 
                             # Call the stored procedure
                             result_args = cursor.callproc(
@@ -224,8 +228,8 @@ def manage_users():
                             
                             # Update the salt and hash type
                             cursor.execute(
-                                "UPDATE AppUser SET Salt = %s, HashType = 'salted_sha256' WHERE UserID = %s",
-                                (salt, user_id)
+                                "UPDATE AppUser SET Salt = %s, HashType = %s WHERE UserID = %s",
+                                (salt, hash_type, user_id)
                             )
 
                             conn.commit()
@@ -267,8 +271,7 @@ def manage_users():
 
                         # Default password and salt/hash
                         default_password = f"aAa{archer_id}$%"
-                        salt = generate_salt()
-                        password_hash = hash_password(default_password, salt)
+                        password_hash, salt, hash_type = hash_new_password(default_password)
 
                         # Call the stored procedure
                         result_args = cursor.callproc(
@@ -278,8 +281,8 @@ def manage_users():
                         
                         # Update the salt and hash type
                         cursor.execute(
-                            "UPDATE AppUser SET Salt = %s, HashType = 'salted_sha256' WHERE UserID = %s",
-                            (salt, user_id)
+                            "UPDATE AppUser SET Salt = %s, HashType = %s WHERE UserID = %s",
+                            (salt, hash_type, user_id)
                         )
 
                         conn.commit()
@@ -335,6 +338,8 @@ def manage_users():
                     conn.close()
 
                     if result_id > 0:
+                        # Signs the user out of any live session on their next rerun
+                        invalidate_principal(user_id)
                         st.success(f"{message}")
                         # Add logging
                         from archery_app.security_logging import log_security_event, SecurityEventType
@@ -417,6 +422,8 @@ def manage_permissions():
                     conn.close()
 
                     if success:
+                        # Live sessions pick up the change on their next rerun
+                        invalidate_principal(user_id)
                         st.success(
                             f"Successfully {action_text}ed recorder privileges for {selected_user_info['ArcherName']}"
                         )
@@ -503,8 +510,7 @@ def manage_account():
                     cursor = conn.cursor()
 
                     # Generate a new salt and hash the password
-                    salt = generate_salt()
-                    password_hash = hash_password(new_password, salt)
+                    password_hash, salt, hash_type = hash_new_password(new_password)
 
                     # Call the stored procedure
                     result_args = cursor.callproc(
@@ -514,8 +520,8 @@ def manage_account():
                     
                     # Update the salt and hash type
                     cursor.execute(
-                        "UPDATE AppUser SET Salt = %s, HashType = 'salted_sha256' WHERE UserID = %s",
-                        (salt, current_user_id)
+                        "UPDATE AppUser SET Salt = %s, HashType = %s WHERE UserID = %s",
+                        (salt, hash_type, current_user_id)
                     )
 
                     conn.commit()
@@ -550,8 +556,7 @@ def manage_account():
                 default_password = f"aAa{archer_id}$%"
                 
                 # Generate a new salt and hash the password
-                salt = generate_salt()
-                password_hash = hash_password(default_password, salt)
+                password_hash, salt, hash_type = hash_new_password(default_password)
 
                 # Call the stored procedure
                 result_args = cursor.callproc(
@@ -561,8 +566,8 @@ def manage_account():
                 
                 # Update the salt and hash type
                 cursor.execute(
-                    "UPDATE AppUser SET Salt = %s, HashType = 'salted_sha256' WHERE UserID = %s",
-                    (salt, current_user_id)
+                    "UPDATE AppUser SET Salt = %s, HashType = %s WHERE UserID = %s",
+                    (salt, hash_type, current_user_id)
                 )
 
                 conn.commit()
@@ -15,6 +15,14 @@ from archery_app.validators import (
     display_validation_errors, ValidationError
 )
 from archery_app.security_logging import log_security_event, SecurityEventType
+from archery_app.handicaps import add_handicap_column
+from archery_app.round_catalogue import get_round_catalogue
+from archery_app.score_validation import validate_score
+from archery_app.records import get_personal_bests, get_club_records
+from archery_app.digests import schedule_digest_refresh
+from archery_app.equivalent_rounds import (
+    BASE_FOR, add_round_group_column, get_equivalent_round_index
+)
 def view_personal_scores():
     st.header("View Personal Scores")
 
@@ -80,6 +88,7 @@ def view_personal_scores():
                 if scores:
                     st.subheader(f"Scores for {selected_archer.split(' - ')[1]}")
                     df = pd.DataFrame(scores)
+                    df = add_handicap_column(df)
                     st.dataframe(df)
                 else:
                     st.info("No scores found for the selected criteria.")
@@ -155,8 +164,9 @@ def record_practice_score():
             # Validate score_date
             score_date = validate_date(score_date, "Score Date", max_date=date.today())
             
-            # Validate total_score
+            # Validate total_score, then check the round can produce it
             total_score = validate_integer(total_score, "Total Score", min_value=0)
+            validate_score(round_id, total_score)
             
         except ValidationError as e:
             errors.append(str(e))
@@ -190,6 +200,8 @@ def record_practice_score():
                 st.success(
                     f"Score submitted successfully! Staged Score ID: {staged_score_id}"
                 )
+                # Pending approvals on the archer's and the club's dashboards
+                schedule_digest_refresh([archer_id])
                 # Add logging
                 from archery_app.security_logging import log_security_event, SecurityEventType
                 log_security_event(
@@ -216,118 +228,110 @@ def view_round_definitions():
 
     if st.button("View Round Details"):
         try:
-            conn = get_connection()
-            cursor = conn.cursor(dictionary=True)
-
-            # Call the stored procedure
-            cursor.callproc("uspGetRoundDetails", [round_id])
-
-            # Get all result sets from the stored procedure
-            results = list(cursor.stored_results())
+            # Round definition and equivalent rounds from the in-memory
+            # catalogue and index
+            definition = get_round_catalogue().get(round_id)
+            equivalent_index = get_equivalent_round_index()
             
-            if results:
-                # First result set: Round definition details
-                round_details = results[0].fetchall()
-                if round_details:
-                    st.subheader(f"🎯 Round Definition: {selected_round.split(' - ')[1]}")
+            if definition and definition.ranges:
+                st.subheader(f"🎯 Round Definition: {definition.name}")
+                
+                # Create info cards for basic round information
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Total Arrows", definition.total_arrows)
+                with col2:
+                    st.metric("Possible Score", definition.possible_score)
+                with col3:
+                    st.metric("Number of Ranges", len(definition.ranges))
+                
+                # Display description if available
+                if definition.description:
+                    st.info(f"**Description:** {definition.description}")
+                
+                # Display detailed range information
+                st.subheader("📏 Range Details")
+                
+                # Create a cleaner display for ranges
+                range_data = []
+                for detail in definition.ranges:
+                    range_data.append({
+                        "Range": detail.range_sequence,
+                        "Distance (m)": detail.distance,
+                        "Number of Ends": detail.number_of_ends,
+                        "Arrows per End": detail.arrows_per_end,
+                        "Total Arrows": detail.arrows,
+                        "Max Score": detail.max_score,
+                        "Ends": f"{detail.first_end_index + 1}-{detail.first_end_index + detail.number_of_ends}",
+                        "Target Face": f"{detail.face_size}cm",
+                        "Target Description": detail.face_description
+                    })
+                
+                df_ranges = pd.DataFrame(range_data)
+                st.dataframe(df_ranges, use_container_width=True, hide_index=True)
+                
+                # Equivalent rounds that have not expired, from the in-memory index
+                equivalent_rounds = equivalent_index.round_equivalences(round_id)
+                if equivalent_rounds:
+                    st.markdown("---")  # Add a separator
+                    st.subheader("🔄 Equivalent Rounds")
                     
-                    # Display basic round info from first row
-                    first_row = round_details[0]
+                    # Group equivalent rounds by type
+                    base_rounds = []
+                    equivalent_to_rounds = []
                     
-                    # Create info cards for basic round information
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Total Arrows", first_row['TotalArrows'])
-                    with col2:
-                        st.metric("Possible Score", first_row['PossibleScore'])
-                    with col3:
-                        st.metric("Number of Ranges", len(round_details))
+                    for equiv in equivalent_rounds:
+                        if equiv['EquivalentType'] == BASE_FOR:
+                            base_rounds.append(equiv)
+                        else:
+                            equivalent_to_rounds.append(equiv)
                     
-                    # Display description if available
-                    if first_row.get('Description'):
-                        st.info(f"**Description:** {first_row['Description']}")
+                    # Display base rounds (rounds this round is the base for)
+                    if base_rounds:
+                        st.write("**This round serves as the base round for:**")
+                        base_data = []
+                        for base in base_rounds:
+                            base_data.append({
+                                "Class": base['ClassName'],
+                                "Equipment Type": base['EquipmentType'],
+                                "Equivalent Round": base['EquivalentRoundName'],
+                                "Effective Date": base['EffectiveDate'],
+                                "Expiry Date": base['ExpiryDate'] if base['ExpiryDate'] else "No Expiry"
+                            })
+                        
+                        df_base = pd.DataFrame(base_data)
+                        st.dataframe(df_base, use_container_width=True, hide_index=True)
                     
-                    # Display detailed range information
-                    st.subheader("📏 Range Details")
+                    # Display equivalent rounds (rounds this round is equivalent to)
+                    if equivalent_to_rounds:
+                        st.write("**This round is equivalent to:**")
+                        equiv_data = []
+                        for equiv in equivalent_to_rounds:
+                            equiv_data.append({
+                                "Class": equiv['ClassName'],
+                                "Equipment Type": equiv['EquipmentType'],
+                                "Base Round": equiv['EquivalentRoundName'],
+                                "Effective Date": equiv['EffectiveDate'],
+                                "Expiry Date": equiv['ExpiryDate'] if equiv['ExpiryDate'] else "No Expiry"
+                            })
+                        
+                        df_equiv = pd.DataFrame(equiv_data)
+                        st.dataframe(df_equiv, use_container_width=True, hide_index=True)
                     
-                    # Create a cleaner display for ranges
-                    range_data = []
-                    for detail in round_details:
-                        range_data.append({
-                            "Range": detail['RangeSequence'],
-                            "Distance (m)": detail['Distance'],
-                            "Number of Ends": detail['NumberOfEnds'],
-                            "Arrows per End": detail['ArrowsPerEnd'],
-                            "Total Arrows": detail['NumberOfEnds'] * detail['ArrowsPerEnd'],
-                            "Target Face": f"{detail['TargetFaceSize']}cm",
-                            "Target Description": detail['TargetFaceDescription']
+                    # Rounds linked only through other rounds
+                    chained = equivalent_index.chained_equivalences(round_id)
+                    if chained:
+                        st.write("**Also equivalent through other rounds:**")
+                        df_chained = pd.DataFrame(chained).rename(columns={
+                            "ClassName": "Class",
+                            "EquipmentType": "Equipment Type",
+                            "EquivalentRoundName": "Equivalent Round"
                         })
-                    
-                    df_ranges = pd.DataFrame(range_data)
-                    st.dataframe(df_ranges, use_container_width=True, hide_index=True)
-                    
-                    # Second result set: Equivalent rounds (if available)
-                    if len(results) > 1:
-                        equivalent_rounds = results[1].fetchall()
-                        if equivalent_rounds:
-                            st.markdown("---")  # Add a separator
-                            st.subheader("🔄 Equivalent Rounds")
-                            
-                            # Group equivalent rounds by type
-                            base_rounds = []
-                            equivalent_to_rounds = []
-                            
-                            for equiv in equivalent_rounds:
-                                if equiv['EquivalentType'] == 'This round is base for:':
-                                    base_rounds.append(equiv)
-                                else:
-                                    equivalent_to_rounds.append(equiv)
-                            
-                            # Display base rounds (rounds this round is the base for)
-                            if base_rounds:
-                                st.write("**This round serves as the base round for:**")
-                                base_data = []
-                                for base in base_rounds:
-                                    base_data.append({
-                                        "Class": base['ClassName'],
-                                        "Equipment Type": base['EquipmentType'],
-                                        "Equivalent Round": base['EquivalentRoundName'],
-                                        "Effective Date": base['EffectiveDate'],
-                                        "Expiry Date": base['ExpiryDate'] if base['ExpiryDate'] else "No Expiry"
-                                    })
-                                
-                                df_base = pd.DataFrame(base_data)
-                                st.dataframe(df_base, use_container_width=True, hide_index=True)
-                            
-                            # Display equivalent rounds (rounds this round is equivalent to)
-                            if equivalent_to_rounds:
-                                st.write("**This round is equivalent to:**")
-                                equiv_data = []
-                                for equiv in equivalent_to_rounds:
-                                    equiv_data.append({
-                                        "Class": equiv['ClassName'],
-                                        "Equipment Type": equiv['EquipmentType'],
-                                        "Base Round": equiv['EquivalentRoundName'],
-                                        "Effective Date": equiv['EffectiveDate'],
-                                        "Expiry Date": equiv['ExpiryDate'] if equiv['ExpiryDate'] else "No Expiry"
-                                    })
-                                
-                                df_equiv = pd.DataFrame(equiv_data)
-                                st.dataframe(df_equiv, use_container_width=True, hide_index=True)
-                            
-                            
-                        else:
-                            st.info("ℹ️ No equivalent rounds defined for this round.")
-                    else:
-                        st.info("ℹ️ No equivalent rounds information available.")
-                        
+                        st.dataframe(df_chained, use_container_width=True, hide_index=True)
                 else:
-                    st.info("No details found for the selected round.")
+                    st.info("ℹ️ No equivalent rounds defined for this round.")
             else:
-                st.info("No results returned from the procedure.")
-
-            cursor.close()
-            conn.close()
+                st.info("No details found for the selected round.")
 
         except mysql.connector.Error as err:
             st.error(f"Database error: {err}")
@@ -366,6 +370,7 @@ def view_competition_results():
                 if competition_results:
                     st.subheader(f"Results for {selected_competition.split(' - ')[1]}")
                     df = pd.DataFrame(competition_results)
+                    df = add_round_group_column(add_handicap_column(df))
                     st.dataframe(df)
                 else:
                     st.info("No results found for the selected competition.")
@@ -377,3 +382,58 @@ def view_competition_results():
 
         except mysql.connector.Error as err:
             st.error(f"Database error: {err}")
+
+
+def view_records():
+    st.header("Personal Bests & Club Records")
+
+    archers = get_archers()
+    archer_options = {
+        f"{a['ArcherID']} - {a['ArcherName']}": a["ArcherID"] for a in archers
+    }
+    archer_keys = list(archer_options.keys())
+    # Preselect the signed-in archer
+    own_key = next(
+        (key for key in archer_keys if archer_options[key] == st.session_state.get("archer_id")),
+        archer_keys[0] if archer_keys else None,
+    )
+
+    rounds = get_rounds()
+    round_options = {"All Rounds": None}
+    round_options.update(
+        {f"{r['RoundID']} - {r['RoundName']}": r["RoundID"] for r in rounds}
+    )
+
+    try:
+        # Personal bests and club records are kept up to date as scores are
+        # approved, so these are plain lookups
+        st.subheader("🏅 Personal Bests")
+        if archer_keys:
+            selected_archer = st.selectbox(
+                "Select Archer", options=archer_keys, index=archer_keys.index(own_key)
+            )
+            personal_bests = get_personal_bests(archer_options[selected_archer])
+            if personal_bests:
+                df = add_handicap_column(pd.DataFrame(personal_bests))
+                st.dataframe(
+                    df.drop(columns=["RoundID", "ScoreID"]),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+            else:
+                st.info("No approved scores yet.")
+
+        st.markdown("---")
+        st.subheader("🏆 Club Records")
+        selected_round = st.selectbox(
+            "Filter by Round (Optional)", options=list(round_options.keys())
+        )
+        records = get_club_records(round_options[selected_round])
+        if records:
+            df = add_handicap_column(pd.DataFrame(records))
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        else:
+            st.info("No club records for the selected round.")
+
+    except mysql.connector.Error as err:
+        st.error(f"Database error: {err}")
@@ -0,0 +1,457 @@
+# archery_app/arrow_archive.py
+
+"""
+Cold storage for the End and Arrow rows of completed seasons.
+
+Arrow-level detail is by far the largest part of the database, but once a
+season is over it is only read for occasional deep-dive analysis.
+archive_season() moves a season's End and Arrow rows into one compressed
+columnar file, ARROW_ARCHIVE_DIR/season_<label>.npz, records it in
+ArchivedSeason and deletes the rows in throttled chunks. Score rows (and their
+totals) stay in the database, so every page keeps working while End and Arrow,
+and their indexes, stay small enough to remain in memory.
+
+A season runs for twelve months from SEASON_START_MONTH and can be archived
+once it has been over for ARROW_ARCHIVE_GRACE_DAYS. The file holds one NumPy
+array per column, sorted by score, range, end and arrow:
+
+    ends:   end_id, end_score_id, end_range_sequence, end_sequence, end_total
+    arrows: arrow_id, arrow_end_id, arrow_score_id, arrow_sequence, arrow_score
+
+load_season() opens an archive lazily: a column is decompressed into
+ARROW_ARCHIVE_CACHE_DIR the first time it is used and memory-mapped from
+there, so analysis only pays for the columns it touches and a season does not
+have to fit in memory. get_score_arrows() returns one score's arrows from the
+database or, for an archived season, from its archive.
+
+Usage:
+    python -m archery_app.arrow_archive list
+    python -m archery_app.arrow_archive archive [--season 2024] [--dry-run]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import threading
+import time
+import zipfile
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .settings import get_setting
+
+END_COLUMNS = {
+    "end_id": np.int32,
+    "end_score_id": np.int32,
+    "end_range_sequence": np.int16,
+    "end_sequence": np.int16,
+    "end_total": np.int16,
+}
+ARROW_COLUMNS = {
+    "arrow_id": np.int32,
+    "arrow_end_id": np.int32,
+    "arrow_score_id": np.int32,
+    "arrow_sequence": np.int16,
+    "arrow_score": np.int8,
+}
+FETCH_ROWS = 50000
+DELETE_ROWS = 5000
+
+_END_QUERY = """
+    SELECT e.EndID, e.ScoreID, e.RangeSequence, e.EndSequence, e.TotalEndScore
+    FROM End e
+    JOIN Score s ON e.ScoreID = s.ScoreID
+    WHERE s.Date >= %s AND s.Date < %s
+    ORDER BY e.ScoreID, e.RangeSequence, e.EndSequence
+"""
+
+_ARROW_QUERY = """
+    SELECT a.ArrowID, a.EndID, e.ScoreID, a.ArrowSequence, a.ArrowScore
+    FROM Arrow a
+    JOIN End e ON a.EndID = e.EndID
+    JOIN Score s ON e.ScoreID = s.ScoreID
+    WHERE s.Date >= %s AND s.Date < %s
+    ORDER BY e.ScoreID, e.RangeSequence, e.EndSequence, a.ArrowSequence
+"""
+
+_ARROW_TOTALS_QUERY = """
+    SELECT COUNT(*), COALESCE(SUM(a.ArrowScore), 0)
+    FROM Arrow a
+    JOIN End e ON a.EndID = e.EndID
+    JOIN Score s ON e.ScoreID = s.ScoreID
+    WHERE s.Date >= %s AND s.Date < %s
+"""
+
+_seasons = {}
+_seasons_lock = threading.Lock()
+
+
+def get_archive_dir():
+    return get_setting("ARROW_ARCHIVE_DIR", "arrow_archive")
+
+
+def get_cache_dir():
+    return get_setting("ARROW_ARCHIVE_CACHE_DIR", os.path.join(get_archive_dir(), "cache"))
+
+
+def _season_start_month():
+    return get_setting("SEASON_START_MONTH", 1, cast=int)
+
+
+def season_of(day):
+    """Starting year of the season a date falls in."""
+    return day.year if day.month >= _season_start_month() else day.year - 1
+
+
+def season_bounds(year):
+    """(first day, first day of the next season) of the season starting in year."""
+    month = _season_start_month()
+    return date(year, month, 1), date(year + 1, month, 1)
+
+
+def season_label(year):
+    """'2024' for calendar-year seasons, '2024-25' for seasons that span two years."""
+    if _season_start_month() == 1:
+        return str(year)
+    return f"{year}-{(year + 1) % 100:02d}"
+
+
+def archive_path(label):
+    return os.path.join(get_archive_dir(), f"season_{label}.npz")
+
+
+def _read_columns(sql, bounds, columns):
+    """Stream a query's integer columns into NumPy arrays, FETCH_ROWS at a time."""
+    from .database import get_connection
+
+    parts = {name: [] for name in columns}
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, bounds)
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            block = np.array(rows, dtype=np.int64)
+            for index, (name, dtype) in enumerate(columns.items()):
+                parts[name].append(block[:, index].astype(dtype))
+    finally:
+        cursor.close()
+        conn.close()
+    return {
+        name: np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+        for name, dtype in columns.items()
+    }
+
+
+def _delete_ids(conn, table, column, ids, throttle):
+    """Delete rows by primary key in DELETE_ROWS chunks, pausing between chunks."""
+    cursor = conn.cursor()
+    deleted = 0
+    ids = np.sort(ids)
+    for start in range(0, len(ids), DELETE_ROWS):
+        chunk = ids[start:start + DELETE_ROWS].tolist()
+        began = time.perf_counter()
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(chunk))})", chunk
+        )
+        deleted += max(cursor.rowcount, 0)
+        conn.commit()
+        if throttle and start + DELETE_ROWS < len(ids):
+            time.sleep((time.perf_counter() - began) * throttle)
+    cursor.close()
+    return deleted
+
+
+def _get_archived_row(conn, label):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM ArchivedSeason WHERE Season = %s", (label,))
+    row = cursor.fetchone()
+    cursor.close()
+    return row
+
+
+def archive_season(year, dry_run=False, log=print):
+    """
+    Move one season's End and Arrow rows to its archive file.
+
+    The file is written and checked against the database (row count and
+    arrow total) before anything is deleted. A run interrupted while
+    deleting is resumed by running it again; only rows whose IDs are in the
+    archive are ever deleted.
+
+    Args:
+        year (int): Starting year of the season
+        dry_run (bool): Only report what would be archived
+        log (callable, optional): Progress output, None for silence
+
+    Returns:
+        dict: Season, Ends, Arrows, Bytes and Deleted, or None if the season
+        has no End/Arrow rows
+    """
+    from .database import get_connection
+
+    log = log or (lambda message: None)
+    label = season_label(year)
+    bounds = season_bounds(year)
+    path = archive_path(label)
+    throttle = get_setting("ARROW_ARCHIVE_THROTTLE", 1.0, cast=float)
+
+    conn = get_connection()
+    try:
+        archived = _get_archived_row(conn, label)
+        if archived is None:
+            started = time.perf_counter()
+            ends = _read_columns(_END_QUERY, bounds, END_COLUMNS)
+            if not len(ends["end_id"]):
+                log(f"Season {label}: no End/Arrow rows")
+                return None
+            arrows = _read_columns(_ARROW_QUERY, bounds, ARROW_COLUMNS)
+            log(f"Season {label}: {len(ends['end_id']):,} ends, {len(arrows['arrow_id']):,} arrows "
+                f"read in {time.perf_counter() - started:.1f} s")
+            if dry_run:
+                return {"Season": label, "Ends": len(ends["end_id"]), "Arrows": len(arrows["arrow_id"]),
+                        "Bytes": None, "Deleted": 0}
+
+            os.makedirs(get_archive_dir(), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                np.savez_compressed(f, **ends, **arrows)
+
+            # Nothing is deleted unless the file matches the database
+            cursor = conn.cursor()
+            cursor.execute(_ARROW_TOTALS_QUERY, bounds)
+            count, total = cursor.fetchone()
+            cursor.close()
+            with np.load(path + ".tmp") as check:
+                if len(check["arrow_id"]) != count or int(check["arrow_score"].sum(dtype=np.int64)) != int(total):
+                    os.remove(path + ".tmp")
+                    raise RuntimeError(f"Season {label} changed while it was being archived; try again")
+            os.replace(path + ".tmp", path)
+
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO ArchivedSeason (Season, StartDate, EndDate, Scores, Ends, Arrows, "
+                "ArchiveFile, ArchivedAt) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())",
+                (label, bounds[0], bounds[1], int(len(np.unique(ends["end_score_id"]))),
+                 int(len(ends["end_id"])), int(len(arrows["arrow_id"])), path),
+            )
+            cursor.close()
+            conn.commit()
+        elif dry_run:
+            log(f"Season {label}: already archived")
+            return None
+        else:
+            log(f"Season {label}: already archived, removing any rows left in the database")
+
+        with np.load(path) as archive:
+            arrow_ids, end_ids = archive["arrow_id"], archive["end_id"]
+        started = time.perf_counter()
+        deleted = _delete_ids(conn, "Arrow", "ArrowID", arrow_ids, throttle)
+        deleted += _delete_ids(conn, "End", "EndID", end_ids, throttle)
+        log(f"Season {label}: deleted {deleted:,} rows in {time.perf_counter() - started:.1f} s")
+        return {"Season": label, "Ends": len(end_ids), "Arrows": len(arrow_ids),
+                "Bytes": os.path.getsize(path), "Deleted": deleted}
+    finally:
+        conn.close()
+
+
+def archivable_seasons(today=None):
+    """Starting years of the completed, not yet archived seasons that have scores."""
+    from .database import get_connection
+
+    today = today or date.today()
+    grace = timedelta(days=get_setting("ARROW_ARCHIVE_GRACE_DAYS", 30, cast=int))
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(Date) FROM Score")
+    first = cursor.fetchone()[0]
+    cursor.execute("SELECT Season FROM ArchivedSeason")
+    archived = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    if first is None:
+        return []
+    if isinstance(first, str):
+        first = date.fromisoformat(first)
+
+    years = []
+    for year in range(season_of(first), season_of(today)):
+        if season_bounds(year)[1] + grace <= today and season_label(year) not in archived:
+            years.append(year)
+    return years
+
+
+def list_archived_seasons():
+    """ArchivedSeason rows, newest first, with the archive file size."""
+    from .database import get_connection
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM ArchivedSeason ORDER BY StartDate DESC")
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    for row in rows:
+        path = row["ArchiveFile"]
+        row["Bytes"] = os.path.getsize(path) if os.path.exists(path) else None
+    return rows
+
+
+class SeasonArchive:
+    """
+    One archived season. Indexing by column name returns a read-only
+    memory-mapped array; each column is decompressed on first use.
+    """
+
+    def __init__(self, label, path, cache_dir):
+        self.label = label
+        self.path = path
+        self.cache_dir = cache_dir
+        self._columns = {}
+        self._lock = threading.Lock()
+        with zipfile.ZipFile(path) as archive:
+            self.columns = [name[:-4] for name in archive.namelist() if name.endswith(".npy")]
+
+    def __getitem__(self, column):
+        if column not in self._columns:
+            with self._lock:
+                if column not in self._columns:
+                    self._columns[column] = np.load(self._extract(column), mmap_mode="r")
+        return self._columns[column]
+
+    def _extract(self, column):
+        if column not in self.columns:
+            raise KeyError(column)
+        target = os.path.join(self.cache_dir, f"{column}.npy")
+        if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(self.path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with zipfile.ZipFile(self.path) as archive, archive.open(f"{column}.npy") as source:
+                with open(target + ".tmp", "wb") as out:
+                    shutil.copyfileobj(source, out, 1 << 20)
+            os.replace(target + ".tmp", target)
+        return target
+
+    def __len__(self):
+        return len(self["arrow_id"])
+
+    def score_ids(self):
+        """ScoreIDs with detail in this season, ascending."""
+        return np.unique(self["end_score_id"])
+
+    def _score_slice(self, column, score_id):
+        # Rows are sorted by score, so one score is a contiguous slice
+        start, stop = np.searchsorted(self[column], [score_id, score_id + 1])
+        return slice(int(start), int(stop))
+
+    def ends_for_score(self, score_id):
+        rows = self._score_slice("end_score_id", score_id)
+        return {name: self[name][rows] for name in END_COLUMNS}
+
+    def arrows_for_score(self, score_id):
+        rows = self._score_slice("arrow_score_id", score_id)
+        return {name: self[name][rows] for name in ARROW_COLUMNS}
+
+
+def load_season(label):
+    """
+    Open an archived season (cached per process).
+
+    Args:
+        label (str): Season label, e.g. "2024"
+
+    Returns:
+        SeasonArchive: Lazily memory-mapped columns of the season
+    """
+    with _seasons_lock:
+        if label not in _seasons:
+            path = archive_path(label)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No archive for season {label}: {path}")
+            _seasons[label] = SeasonArchive(label, path, os.path.join(get_cache_dir(), label))
+        return _seasons[label]
+
+
+def get_score_arrows(score_id):
+    """
+    Arrow-by-arrow detail of one score, from the database or its season's archive.
+
+    Args:
+        score_id (int): ID of the score
+
+    Returns:
+        DataFrame: RangeSequence, EndSequence, ArrowSequence and ArrowScore,
+        in shooting order (empty if the score has no arrow detail)
+    """
+    from .database import get_connection
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        """
+        SELECT e.RangeSequence, e.EndSequence, a.ArrowSequence, a.ArrowScore
+        FROM End e
+        JOIN Arrow a ON a.EndID = e.EndID
+        WHERE e.ScoreID = %s
+        ORDER BY e.RangeSequence, e.EndSequence, a.ArrowSequence
+        """,
+        (score_id,),
+    )
+    rows = cursor.fetchall()
+    cursor.execute("SELECT Date FROM Score WHERE ScoreID = %s", (score_id,))
+    score = cursor.fetchone()
+    cursor.close()
+    conn.close()
+
+    columns = ["RangeSequence", "EndSequence", "ArrowSequence", "ArrowScore"]
+    if rows or score is None:
+        return pd.DataFrame(rows, columns=columns)
+
+    label = season_label(season_of(score["Date"]))
+    if not os.path.exists(archive_path(label)):
+        return pd.DataFrame(columns=columns)
+    season = load_season(label)
+    ends = season.ends_for_score(score_id)
+    arrows = season.arrows_for_score(score_id)
+    # Position of each arrow's end among the score's ends
+    order = np.argsort(ends["end_id"])
+    end_index = order[np.searchsorted(ends["end_id"][order], arrows["arrow_end_id"])]
+    return pd.DataFrame({
+        "RangeSequence": ends["end_range_sequence"][end_index],
+        "EndSequence": ends["end_sequence"][end_index],
+        "ArrowSequence": arrows["arrow_sequence"],
+        "ArrowScore": arrows["arrow_score"],
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move completed seasons' End/Arrow rows to cold storage.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List archived seasons")
+    archive_parser = subparsers.add_parser("archive", help="Archive completed seasons")
+    archive_parser.add_argument("--season", type=int, help="Starting year of one season to archive")
+    archive_parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for row in list_archived_seasons():
+            size = f"{row['Bytes'] / 1024 / 1024:.1f} MB" if row["Bytes"] is not None else "file missing"
+            print(f"  {row['Season']:<8} {row['Scores']:>8,} scores {row['Ends']:>10,} ends "
+                  f"{row['Arrows']:>12,} arrows  {size}  archived {row['ArchivedAt']}")
+        return 0
+
+    years = [args.season] if args.season else archivable_seasons()
+    if not years:
+        print("No completed seasons to archive.")
+    for year in years:
+        archive_season(year, dry_run=args.dry_run)
+    if years and not args.dry_run:
+        print("On MySQL, OPTIMIZE TABLE End, Arrow returns the freed space to the file system.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
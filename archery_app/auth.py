@@ -1,7 +1,18 @@
 import streamlit as st
-import hashlib
 from archery_app.database import get_connection
-import secrets  # For generating secure random salts
+from archery_app.password_hashing import (
+    PasswordVerifierBusy,
+    hash_new_password,
+    needs_rehash,
+    run_in_verifier_pool,
+    verify_password_pooled,
+)
+from archery_app.principal_cache import (
+    apply_principal_to_session,
+    cache_principal,
+    principal_from_row,
+)
+from archery_app.rate_limiter import check_login_allowed, get_client_ip, record_login_success
 from archery_app.security_logging import log_security_event, SecurityEventType
 from archery_app.validators import sanitize_input, validate_string, ValidationError
 
@@ -18,18 +29,15 @@ def initialize_auth_state():
         st.session_state.is_recorder = False
     if "is_admin" not in st.session_state:
         st.session_state.is_admin = False
-def generate_salt():
-    """Generate a cryptographically secure random salt"""
-    return secrets.token_hex(32)  # 64 character hex string (32 bytes)
-
-def hash_password(password, salt):
-    """Create a salted hash of the password"""
-    return hashlib.sha256((salt + password).encode()).hexdigest()
 
 def login_user(username, password):
     try:
         # Sanitize inputs to prevent SQL injection
         username = sanitize_input(username)
+
+        # Throttle by username and client IP before any database or hashing work
+        if not check_login_allowed(username, get_client_ip()):
+            return False, "Too many login attempts. Please wait a minute and try again."
         
         # Validate
         try:
@@ -64,37 +72,33 @@ def login_user(username, password):
                 description=f"Login failed for username '{username}' - user not found"
             )
             return False, "Invalid credentials. Please try again."
-        # Determine how to verify the password based on HashType
-        is_valid = False
-        
-        if user['HashType'] == 'salted_sha256' and user['Salt']:
-            # Verify using the stored salt
-            calculated_hash = hash_password(password, user['Salt'])
-            is_valid = (calculated_hash == user['PasswordHash'])
-        else:
-            # Legacy verification without salt
-            legacy_hash = hashlib.sha256(password.encode()).hexdigest()
-            is_valid = (legacy_hash == user['PasswordHash'])
-            
-            # If that fails, try with the default pattern
-            if not is_valid:
-                default_pattern = f"aAa{username}$%"
-                default_hash = hashlib.sha256(default_pattern.encode()).hexdigest()
-                is_valid = (default_hash == user['PasswordHash'])
-                
-                # If valid with default pattern, upgrade to salted hash
-                if is_valid:
-                    new_salt = generate_salt()
-                    new_hash = hash_password(default_pattern, new_salt)
-                    
-                    # Update the user's password hash and salt
-                    update_query = """
-                    UPDATE AppUser 
-                    SET PasswordHash = %s, Salt = %s, HashType = 'salted_sha256'
-                    WHERE UserID = %s
-                    """
-                    cursor.execute(update_query, (new_hash, new_salt, user['UserID']))
-                    conn.commit()
+        # Verify with the algorithm and cost stored in HashType, off the
+        # script thread in the bounded verifier pool
+        try:
+            is_valid = verify_password_pooled(
+                password, user['PasswordHash'], user['Salt'], user['HashType']
+            )
+        except PasswordVerifierBusy as busy:
+            cursor.close()
+            conn.close()
+            return False, str(busy)
+
+        # Transparently upgrade old or weaker hashes to the current settings
+        if is_valid and needs_rehash(user['HashType']):
+            try:
+                new_hash, new_salt, new_hash_type = run_in_verifier_pool(
+                    hash_new_password, password
+                )
+                update_query = """
+                UPDATE AppUser 
+                SET PasswordHash = %s, Salt = %s, HashType = %s
+                WHERE UserID = %s
+                """
+                cursor.execute(update_query, (new_hash, new_salt, new_hash_type, user['UserID']))
+                conn.commit()
+            except PasswordVerifierBusy:
+                # Keep the old hash for now; it is upgraded on a later login
+                pass
 
         cursor.close()
         conn.close()
@@ -107,13 +111,12 @@ def login_user(username, password):
                 user_id=user["UserID"],
                 archer_id=user["ArcherID"]
             )
-            # Set session state variables
+            record_login_success(username)
+            # Cache the principal and set session state variables from it
+            principal = principal_from_row(dict(user, Username=username))
+            cache_principal(principal)
             st.session_state.logged_in = True
-            st.session_state.user_id = user["UserID"]
-            st.session_state.archer_id = user["ArcherID"]
-            st.session_state.archer_name = user["ArcherName"]
-            st.session_state.is_recorder = user["IsRecorder"]
-            st.session_state.is_admin = user["IsAdmin"]
+            apply_principal_to_session(principal)
             st.session_state.current_page = "Home"
             return True, "Login successful"
         else:
@@ -0,0 +1,245 @@
+# archery_app/chat_store.py
+
+"""
+Compact, persistent conversation store for the SQL Assistant.
+
+A conversation is kept as a list of small turn dicts (question, answer, SQL
+and a truncated copy of the result) instead of model chat objects and
+DataFrames. Only the last SQL_ASSISTANT_MAX_TURNS turns are kept verbatim;
+older turns are folded into a short text summary, so memory per session is
+bounded however long the conversation runs.
+
+Sessions are saved as gzip-compressed JSON, one file per user, under
+SQL_ASSISTANT_CHAT_DIR so conversations survive server restarts. Query
+results stay in memory only: a saved turn keeps its question, answer, SQL and
+row count, but not the rows themselves, which may hold anything the admin
+queried (AppUser password hashes included).
+"""
+
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+
+import pandas as pd
+
+from .llm_backends import SYSTEM_ACK
+from .settings import get_setting
+
+DEFAULT_CHAT_DIR = ".chat_sessions"
+
+# Characters kept from each answer / result text and in the rolling summary
+MAX_ANSWER_CHARS = 4000
+MAX_RESULT_CHARS = 2000
+MAX_SUMMARY_CHARS = 3000
+
+# Rows of each query result kept for display
+MAX_RESULT_ROWS = 200
+
+_SAFE_FILENAME = re.compile(r"[^A-Za-z0-9_-]")
+_write_lock = threading.Lock()
+
+
+def _truncate(text, limit):
+    if text is None or len(text) <= limit:
+        return text
+    return text[: limit - 15] + " ...[truncated]"
+
+
+def _first_line(text, limit=120):
+    line = (text or "").strip().split("\n", 1)[0]
+    return _truncate(line, limit)
+
+
+def _without_results(turn):
+    # Warning and error turns keep their message; data turns only the row count
+    if "table" not in turn and turn.get("kind") != "data":
+        return turn
+    return {key: value for key, value in turn.items() if key not in ("table", "text")}
+
+
+class ChatSession:
+    """Bounded SQL Assistant conversation for one user."""
+
+    __slots__ = ("user_id", "max_turns", "turns", "summary", "summarised_turns")
+
+    def __init__(self, user_id, max_turns=None, turns=None, summary="", summarised_turns=0):
+        self.user_id = user_id
+        if max_turns is None:
+            max_turns = get_setting("SQL_ASSISTANT_MAX_TURNS", 10, cast=int)
+        self.max_turns = max_turns
+        self.turns = list(turns or [])
+        self.summary = summary
+        self.summarised_turns = summarised_turns
+
+    def add_turn(self, question, answer, sql=None, result=None, result_text=None, kind="info"):
+        """
+        Append a turn, folding the oldest turns into the summary if needed.
+
+        Args:
+            question (str): The user's question
+            answer (str): The assistant's displayed answer
+            sql (str, optional): The SQL that was (or would have been) run
+            result (pd.DataFrame, optional): Query result to keep for display
+            result_text (str, optional): Result text given to the model as context
+            kind (str): "data", "warning", "error" or "info"
+        """
+        turn = {
+            "q": question,
+            "a": _truncate(answer, MAX_ANSWER_CHARS),
+            "sql": sql,
+            "text": _truncate(result_text, MAX_RESULT_CHARS),
+            "kind": kind,
+        }
+        if isinstance(result, pd.DataFrame):
+            turn["rows"] = len(result)
+            turn["table"] = json.loads(
+                result.head(MAX_RESULT_ROWS).to_json(orient="split", index=False, date_format="iso")
+            )
+            notice = result.attrs.get("notice")
+            if notice:
+                turn["notice"] = notice
+        self.turns.append(turn)
+
+        while len(self.turns) > self.max_turns:
+            self._summarise(self.turns.pop(0))
+
+    def _summarise(self, turn):
+        line = f"- Q: {_first_line(turn['q'])}"
+        if turn.get("sql"):
+            line += f" | SQL: {_first_line(' '.join(turn['sql'].split()), 200)}"
+        if turn.get("rows") is not None:
+            line += f" | Result: {turn['rows']} row(s)"
+        elif turn.get("text"):
+            line += f" | Result: {_first_line(turn['text'])}"
+        summary = f"{self.summary}\n{line}" if self.summary else line
+        # Drop the oldest summary lines once over the limit
+        while len(summary) > MAX_SUMMARY_CHARS and "\n" in summary:
+            summary = summary.split("\n", 1)[1]
+        self.summary = summary
+        self.summarised_turns += 1
+
+    @property
+    def last_result(self):
+        return self.turns[-1].get("text") if self.turns else None
+
+    def recent_results(self):
+        """Result texts of the turns still in the window, oldest first."""
+        return [turn["text"] for turn in self.turns if turn.get("text")]
+
+    def model_history(self, system_prompt):
+        """
+        Build chat history for the model from the compact turns.
+
+        The system prompt and its acknowledgement are seeded directly, so a
+        new conversation no longer needs a separate round trip for them.
+        """
+        history = [
+            {"role": "user", "parts": [system_prompt]},
+            {"role": "model", "parts": [SYSTEM_ACK]},
+        ]
+        if self.summary:
+            history.append(
+                {
+                    "role": "user",
+                    "parts": [f"Summary of earlier questions in this conversation:\n{self.summary}"],
+                }
+            )
+            history.append({"role": "model", "parts": ["Noted."]})
+        for turn in self.turns:
+            history.append({"role": "user", "parts": [f"User Question: {turn['q']}"]})
+            history.append({"role": "model", "parts": [turn["a"]]})
+        return history
+
+    @staticmethod
+    def result_frame(turn):
+        """Rebuild the stored (possibly truncated) result DataFrame for a turn."""
+        table = turn.get("table")
+        if not table:
+            return None
+        return pd.DataFrame(table["data"], columns=table["columns"])
+
+    def clear(self):
+        self.turns = []
+        self.summary = ""
+        self.summarised_turns = 0
+
+    def to_dict(self):
+        """The session as saved to disk, without query result rows."""
+        return {
+            "user_id": self.user_id,
+            "turns": [_without_results(turn) for turn in self.turns],
+            "summary": self.summary,
+            "summarised_turns": self.summarised_turns,
+        }
+
+    @classmethod
+    def from_dict(cls, data, max_turns=None):
+        session = cls(
+            data.get("user_id"),
+            max_turns=max_turns,
+            summary=data.get("summary", ""),
+            summarised_turns=data.get("summarised_turns", 0),
+        )
+        for turn in data.get("turns", []):
+            session.turns.append(turn)
+            # Apply a smaller window if the setting changed since it was saved
+            if len(session.turns) > session.max_turns:
+                session._summarise(session.turns.pop(0))
+        return session
+
+
+def get_chat_dir():
+    return get_setting("SQL_ASSISTANT_CHAT_DIR", DEFAULT_CHAT_DIR)
+
+
+def _session_path(user_id):
+    return os.path.join(get_chat_dir(), f"{_SAFE_FILENAME.sub('_', str(user_id))}.json.gz")
+
+
+def load_chat_session(user_id):
+    """
+    Load a user's saved conversation, or start a new one.
+
+    Returns:
+        ChatSession: The saved session, or an empty one if none exists or it
+        cannot be read
+    """
+    path = _session_path(user_id)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return ChatSession.from_dict(json.load(f))
+    except FileNotFoundError:
+        return ChatSession(user_id)
+    except (OSError, ValueError) as e:
+        print(f"Error loading chat session for user {user_id}: {e}")
+        return ChatSession(user_id)
+
+
+def save_chat_session(session):
+    """Write a session to disk atomically."""
+    directory = get_chat_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        payload = json.dumps(session.to_dict(), separators=(",", ":"), default=str)
+        with _write_lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(payload.encode("utf-8"))
+            os.replace(tmp_path, _session_path(session.user_id))
+        return True
+    except OSError as e:
+        print(f"Error saving chat session for user {session.user_id}: {e}")
+        return False
+
+
+def delete_chat_session(user_id):
+    """Remove a user's saved conversation."""
+    try:
+        os.remove(_session_path(user_id))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Error deleting chat session for user {user_id}: {e}")
@@ -1,18 +1,49 @@
 import streamlit as st
 import mysql.connector
 import pandas as pd
-from .database import get_connection, verify_connection
+from .database import get_connection, get_database_backend, verify_connection
 import sqlalchemy
 import re
-import google.generativeai as genai
-
-MODEL_NAME = "gemini-2.0-flash"
-
-# Configure Google Generative AI with Gemini 2.0 Flash
-genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-
-
-# Load SQL schema from create_tables.sql
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from .chat_store import (
+    MAX_RESULT_ROWS,
+    ChatSession,
+    delete_chat_session,
+    load_chat_session,
+    save_chat_session,
+)
+from .llm_backends import get_model_backend
+from .query_guard import (
+    QueryRefused,
+    apply_execution_time_limit,
+    get_guard_settings,
+    guard_query,
+)
+from .sql_safety import (
+    analyse_sql,
+    check_sql_safety,
+    find_danger_marker,
+    find_final_sql,
+    has_danger_marker,
+)
+
+# Lines stripped from the assistant's reply before display
+PERMISSION_LINE_PATTERN = re.compile(
+    r"^.*?(?:permission check|requires SQL execution):.*?\n",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Worker threads that run read-only queries while the reply is still streaming
+_query_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sql-assistant")
+
+# Number of per-response timing records kept in the session
+MAX_ASSISTANT_METRICS = 50
+
+
+# Load SQL schema from create_tables.sql (read once per process)
+@lru_cache(maxsize=1)
 def get_schema():
     try:
         with open("create_tables.sql", "r") as f:
@@ -85,6 +116,10 @@ def get_system_prompt(user_info):
     Security Monitoring:
     - SecurityLog - Tracks all security events including login attempts, permission changes, data modifications, and suspicious activities
     
+    Records (kept up to date by the score procedures; use them instead of MAX() over Score):
+    - PersonalBest - Best approved score per archer, round and equipment type (ScoreID, TotalScore, Date)
+    - ClubRecord - Best competition score per class, round and equipment type (ScoreID, ArcherID, TotalScore, Date)
+    
     # Role-Based Data Access Permissions (STRICTLY ENFORCED):
     
     ## Normal Archer
@@ -188,9 +223,7 @@ def get_system_prompt(user_info):
 
 # Create a SQLAlchemy engine for database connections
 def get_sqlalchemy_engine():
-    return sqlalchemy.create_engine(
-        f"mysql+pymysql://{st.secrets['DB_USER']}:{st.secrets['DB_PASSWORD']}@{st.secrets['DB_HOST']}/{st.secrets['DB_NAME']}"
-    )
+    return get_database_backend().sqlalchemy_engine()
 
 
 # Execute SQL query with proper error handling
@@ -206,23 +239,88 @@ def execute_sql_query(sql_query, archer_id=None):
                 ]
             )
 
+        return run_assistant_query(sql_query)
+    except Exception as e:
+        return pd.DataFrame([{"error": f"Error: {str(e)}"}])
+
+
+# Run a query for the assistant; safe to call from a worker thread as it
+# does not touch st.session_state
+def run_assistant_query(sql_query):
+    try:
         engine = get_sqlalchemy_engine()
-        # For SELECT queries, return a DataFrame
-        if sql_query.strip().upper().startswith("SELECT"):
-            return pd.read_sql(sql_query, engine)
-        # For other queries, execute and return affected rows
-        else:
-            with engine.connect() as connection:
+        settings = get_guard_settings()
+        with engine.connect() as connection:
+            # EXPLAIN first: refuse or add a LIMIT to queries that would
+            # examine too many rows
+            sql_query, notice = guard_query(connection, sql_query, settings)
+
+            # Time limit for this statement so one query cannot hold up
+            # the shared database
+            apply_execution_time_limit(connection, settings["max_execution_ms"])
+
+            # For SELECT queries, return a DataFrame
+            if sql_query.strip().upper().startswith("SELECT"):
+                df = pd.read_sql(sql_query, connection)
+                if notice and len(df) >= settings["result_limit"]:
+                    df.attrs["notice"] = notice
+                return df
+            # For other queries, execute and return affected rows
+            else:
                 result = connection.execute(sqlalchemy.text(sql_query))
                 connection.commit()
+                invalidate_cached_tables(sql_query)
                 affected_rows = result.rowcount
                 return pd.DataFrame([{"result": f"{affected_rows} row(s) affected"}])
+    except QueryRefused as err:
+        return pd.DataFrame([{"warning": f"⚠️ QUERY REFUSED: {err}"}])
     except sqlalchemy.exc.SQLAlchemyError as err:
+        orig = getattr(err, "orig", None)
+        if orig is not None and get_database_backend().is_statement_timeout(orig):
+            return pd.DataFrame(
+                [
+                    {
+                        "warning": "⚠️ QUERY STOPPED: the query ran longer than the allowed "
+                        f"{get_guard_settings()['max_execution_ms']} ms. Add filters or a LIMIT and try again."
+                    }
+                ]
+            )
         return pd.DataFrame([{"error": f"MySQL Error: {err}"}])
     except Exception as e:
         return pd.DataFrame([{"error": f"Error: {str(e)}"}])
 
 
+# Tables behind the process-wide caches and dashboard digests that a write should refresh
+_EQUIVALENT_ROUND_TABLES = {"equivalentround", "round", "class", "equipmenttype"}
+_ROUND_CATALOGUE_TABLES = {"round", "roundrange", "targetface"}
+_DIGEST_TABLES = {"score", "stagedscore", "competition", "competitionscore", "personalbest", "archer"}
+_PRINCIPAL_TABLES = {"appuser", "archer"}
+
+
+def invalidate_cached_tables(sql_query):
+    """Drop caches and digests built from tables a write statement touched."""
+    from .equivalent_rounds import invalidate_equivalent_rounds
+    from .round_catalogue import invalidate_round_catalogue
+    from .digests import expire_digests
+    from .principal_cache import invalidate_principal
+
+    words = set(re.findall(r"[a-z]+", sql_query.lower()))
+    if words & _EQUIVALENT_ROUND_TABLES:
+        invalidate_equivalent_rounds()
+    if words & _ROUND_CATALOGUE_TABLES:
+        # Also rebuilds the handicap tables, which follow the catalogue
+        invalidate_round_catalogue()
+    if words & _DIGEST_TABLES:
+        # Dashboards are rebuilt on their next view
+        try:
+            expire_digests()
+        except Exception as e:
+            print(f"Error expiring dashboard digests: {e}")
+    if words & _PRINCIPAL_TABLES:
+        # Role flags and names of every signed-in user are reloaded on their next rerun
+        invalidate_principal()
+
+
 # Function to detect dangerous SQL queries
 def is_dangerous_query(sql_query, ai_response=""):
     """
@@ -238,58 +336,14 @@ def is_dangerous_query(sql_query, ai_response=""):
     if not sql_query:
         return False, ""
 
-    # Normalize the SQL by replacing newlines with spaces
-    # This handles multi-line SQL statements properly
-    sql_normalized = re.sub(r"\s+", " ", sql_query.upper()).strip()
-
     # First check if the AI itself flagged the query as dangerous
-    ai_danger_markers = [
-        "⚠️ DANGEROUS QUERY WARNING",
-        "DANGEROUS QUERY",
-        "⚠️",
-    ]
-
-    # Look for danger markers in the AI response
-    for marker in ai_danger_markers:
-        if marker.lower() in ai_response.lower():
-            # Extract the context around the danger marker
-            pattern = r"(?i).*?(" + re.escape(marker) + r".*?)(?:\n\n|\Z)"
-            match = re.search(pattern, ai_response, re.DOTALL)
-            reason = (
-                match.group(1).strip()
-                if match
-                else f"AI identified as dangerous: {marker}"
-            )
-            return True, reason
-
-    # First handle always-dangerous patterns regardless of WHERE clause
-    always_dangerous_patterns = [
-        (r"DROP\s+DATABASE", "Attempting to drop a database"),
-        (r"DROP\s+TABLE", "Attempting to drop a table"),
-        (r"TRUNCATE\s+TABLE", "Attempting to truncate a table"),
-        (r"ALTER\s+TABLE\s+\w+\s+DROP", "Attempting to drop a column"),
-        (r"CREATE\s+USER", "Attempting to create a database user"),
-        (r"GRANT\s+", "Attempting to grant permissions"),
-        (r"REVOKE\s+", "Attempting to revoke permissions"),
-    ]
-
-    # Check always-dangerous patterns first (using the normalized SQL)
-    for pattern, reason in always_dangerous_patterns:
-        if re.search(pattern, sql_normalized):
-            return True, reason
-
-    # Check for DELETE without WHERE
-    if "DELETE FROM" in sql_normalized:
-        if not re.search(r"DELETE FROM\s+\w+.*WHERE", sql_normalized):
-            return True, "DELETE statement without WHERE clause"
-
-    # Check for UPDATE without WHERE
-    if "UPDATE" in sql_normalized and "SET" in sql_normalized:
-        if not re.search(r"UPDATE\s+\w+.*SET.*WHERE", sql_normalized):
-            return True, "UPDATE statement without WHERE clause"
-
-    # If we reach here, the query is safe
-    return False, ""
+    reason = find_danger_marker(ai_response)
+    if reason:
+        return True, reason
+
+    # Then analyse the statement itself: statement type, target tables,
+    # WHERE/LIMIT presence and multi-statement batches in a single pass
+    return check_sql_safety(sql_query)
 
 
 # Extract the final executable SQL code from the response
@@ -302,106 +356,123 @@ def extract_final_sql(text):
     - SQL string if safe executable code is found
     - None if no explicit executable code is found or if danger markers are present
     """
-    # Check if there are any danger warnings in the text first
-    danger_markers = [
-        "⚠️ DANGEROUS QUERY WARNING",
-        "DANGEROUS QUERY",
-        "query is potentially dangerous",
-        "without proper safeguards",
-        "without a WHERE clause",
-    ]
-
-    for marker in danger_markers:
-        if marker.lower() in text.lower():
-            # If danger markers are found, don't extract any SQL
-            # regardless of whether there's a "Final code to execute" section
-            return None
-
-    # Define multiple patterns to match variations of "Final code to execute"
-    # Added support for newlines between heading and code block
-    final_code_patterns = [
-        # Standard format with different heading levels (1-6 #s), allowing newlines
-        r"#{1,6}\s*Final code to execute:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
-        # Variations with "execute this", allowing newlines
-        r"#{1,6}\s*Execute this(?:\s+SQL)? code:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
-        # Variations with "SQL to execute", allowing newlines
-        r"#{1,6}\s*SQL to execute:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
-        # Variations with "Code to run", allowing newlines
-        r"#{1,6}\s*Code to run:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
-        # Variations with "Safe SQL code", allowing newlines
-        r"#{1,6}\s*Safe SQL code:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
-        # Original format (maintain backward compatibility)
-        r"###Final code to execute:###(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
-        # H3 format specified in prompt, allowing newlines
-        r"###\s*Final code to execute:\s*###?(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
-    ]
-
-    # Try each pattern until we find a match
-    for pattern in final_code_patterns:
-        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
+    # If danger markers are found, don't extract any SQL
+    # regardless of whether there's a "Final code to execute" section
+    if has_danger_marker(text):
+        return None
 
     # No fallback - if there's no explicit executable code section, return None
-    return None
+    found = find_final_sql(text)
+    return found[0] if found else None
+
+
+# Build the per-turn prompt sent to the model
+def build_enhanced_prompt(prompt, last_query_result=None, all_query_results=None):
+    enhanced_prompt = f"User Question: {prompt}"
+
+    # Include the last query result if available
+    if last_query_result is not None and last_query_result != "":
+        enhanced_prompt += (
+            f"\n\nThe last SQL query returned the following result:\n{last_query_result}"
+        )
+
+    # Include all previous query results if available
+    if all_query_results is not None and len(all_query_results) > 0:
+        enhanced_prompt += "\n\nHere are all previous query results for context:"
+        for i, result in enumerate(all_query_results):
+            enhanced_prompt += f"\n\nQuery {i+1} result:\n{result}"
+
+    return enhanced_prompt
+
+
+# Start running the final SQL while the rest of the reply streams in
+def start_early_query(partial_response):
+    """
+    Submit the final SQL block for execution as soon as it is complete.
+
+    Only read-only statements that pass the safety checks are started early;
+    anything else waits for the full response as before. The result is
+    discarded if the finished response turns out to flag the query.
+
+    Returns:
+        dict or None: {"sql", "future"} if a query was started
+    """
+    if has_danger_marker(partial_response) or find_danger_marker(partial_response):
+        return None
+
+    found = find_final_sql(partial_response)
+    if not found:
+        return None
+
+    sql = found[0]
+    if not analyse_sql(sql).is_read_only or check_sql_safety(sql)[0]:
+        return None
+
+    return {"sql": sql, "future": _query_executor.submit(run_assistant_query, sql)}
 
 
 # Generate SQL from user prompt
 def generate_sql(
-    prompt, user_info, chat_history=None, last_query_result=None, all_query_results=None
+    prompt,
+    user_info,
+    chat_history=None,
+    last_query_result=None,
+    all_query_results=None,
+    on_text=None,
 ):
-    system_prompt = get_system_prompt(user_info)
+    """
+    Ask the model for SQL and an explanation.
 
+    If on_text is given the reply is streamed: on_text(text_so_far) is called
+    for every chunk, and a read-only final query is started as soon as its
+    code block closes (returned as "early_query"). "metrics" holds the
+    time-to-first-token and generation times in milliseconds.
+    """
+    metrics = {"started": time.perf_counter()}
+    early_query = None
     try:
-        # Set up the model
-        model = genai.GenerativeModel(MODEL_NAME)
+        # Get the configured model backend (Gemini or the local stand-in)
+        backend = get_model_backend()
 
         # Create the prompt with system instructions and user query
         if chat_history is None:
             # New conversation
-            chat = model.start_chat(history=[])
+            chat = backend.start_chat(history=[])
             # Send system prompt first to ensure it's followed
-            chat.send_message(system_prompt)
-
-            # Add information about query results if available
-            enhanced_prompt = f"User Question: {prompt}"
-
-            # Include the last query result if available
-            if last_query_result is not None and last_query_result != "":
-                enhanced_prompt += f"\n\nThe last SQL query returned the following result:\n{last_query_result}"
-
-            # Include all previous query results if available
-            if all_query_results is not None and len(all_query_results) > 0:
-                enhanced_prompt += (
-                    "\n\nHere are all previous query results for context:"
-                )
-                for i, result in enumerate(all_query_results):
-                    enhanced_prompt += f"\n\nQuery {i+1} result:\n{result}"
-
-            response = chat.send_message(enhanced_prompt)
+            chat.send_message(get_system_prompt(user_info))
         else:
             # Continue existing conversation
-            chat = model.start_chat(history=chat_history)
-
-            # Add information about query results if available
-            enhanced_prompt = f"User Question: {prompt}"
-
-            # Include the last query result if available
-            if last_query_result is not None and last_query_result != "":
-                enhanced_prompt += f"\n\nThe last SQL query returned the following result:\n{last_query_result}"
+            chat = backend.start_chat(history=chat_history)
 
-            # Include all previous query results if available
-            if all_query_results is not None and len(all_query_results) > 0:
-                enhanced_prompt += (
-                    "\n\nHere are all previous query results for context:"
-                )
-                for i, result in enumerate(all_query_results):
-                    enhanced_prompt += f"\n\nQuery {i+1} result:\n{result}"
+        enhanced_prompt = build_enhanced_prompt(
+            prompt, last_query_result, all_query_results
+        )
 
+        sent_at = time.perf_counter()
+        if on_text is None:
             response = chat.send_message(enhanced_prompt)
 
-        # Extract the response
-        assistant_response = response.text
+            # Extract the response
+            assistant_response = response.text
+        else:
+            chunks = []
+            for chunk in chat.send_message(enhanced_prompt, stream=True):
+                if not chunks:
+                    metrics["time_to_first_token_ms"] = (
+                        time.perf_counter() - sent_at
+                    ) * 1000
+                chunks.append(chunk.text)
+                assistant_response = "".join(chunks)
+                on_text(assistant_response)
+
+                if early_query is None:
+                    early_query = start_early_query(assistant_response)
+                    if early_query is not None:
+                        metrics["time_to_sql_ms"] = (
+                            time.perf_counter() - sent_at
+                        ) * 1000
+            assistant_response = "".join(chunks)
+        metrics["generation_ms"] = (time.perf_counter() - sent_at) * 1000
 
         # Check if permission denied
         if (
@@ -413,20 +484,11 @@ def generate_sql(
                 "sql": "",
                 "explanation": assistant_response,
                 "chat": chat,
+                "metrics": metrics,
             }
 
         # Check if the AI flagged the query as dangerous
-        danger_markers = [
-            "⚠️ DANGEROUS QUERY WARNING",
-            "DANGEROUS QUERY",
-            "query is potentially dangerous",
-            "without proper safeguards",
-            "without a WHERE clause",
-        ]
-
-        is_dangerous = any(
-            marker.lower() in assistant_response.lower() for marker in danger_markers
-        )
+        is_dangerous = has_danger_marker(assistant_response)
 
         # Extract the final SQL query to execute (last code block)
         final_sql = extract_final_sql(assistant_response)
@@ -440,6 +502,7 @@ def generate_sql(
                 "explanation": assistant_response,
                 "chat": chat,
                 "is_dangerous": True,  # Add flag to indicate it was marked dangerous
+                "metrics": metrics,
             }
 
         return {
@@ -447,6 +510,8 @@ def generate_sql(
             "sql": final_sql,
             "explanation": assistant_response,
             "chat": chat,
+            "early_query": early_query,
+            "metrics": metrics,
         }
 
     except Exception as e:
@@ -456,31 +521,55 @@ def generate_sql(
             "sql": "",
             "explanation": f"Error: {str(e)}",
             "chat": None,
+            "metrics": metrics,
         }
 
 
-# Main chatbot interface
-def sql_chatbot():  # Initialize session state variables if not present
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = None
-
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+# Keep per-response timings for the session
+def record_assistant_metrics(metrics):
+    record = {
+        key: round(value, 1)
+        for key, value in metrics.items()
+        if key != "started" and value is not None
+    }
+    st.session_state.sql_assistant_metrics.append(record)
+    del st.session_state.sql_assistant_metrics[:-MAX_ASSISTANT_METRICS]
+    return record
 
-    if "last_query_result" not in st.session_state:
-        st.session_state.last_query_result = None
 
-    if "all_query_results" not in st.session_state:
-        st.session_state.all_query_results = []
+# Show the stored SQL and result for a past turn
+def display_turn_result(turn):
+    if not turn.get("sql"):
+        return
+    with st.expander("SQL Query Results"):
+        st.code(turn["sql"], language="sql")
+        kind = turn.get("kind")
+        if kind == "warning":
+            st.warning(turn.get("text"))
+        elif kind == "error":
+            st.error(turn.get("text"))
+        else:
+            df = ChatSession.result_frame(turn)
+            if df is not None and not df.empty:
+                if turn.get("notice"):
+                    st.info(turn["notice"])
+                st.dataframe(df, use_container_width=True)
+                if turn.get("rows", 0) > len(df):
+                    st.caption(f"Showing the first {len(df)} of {turn['rows']} rows.")
+            elif df is None and turn.get("rows"):
+                # Results are not saved with the conversation
+                st.info(f"The query returned {turn['rows']} row(s). Run it again to see them.")
+            else:
+                st.info("The query returned no results.")
 
-    if "query_results" not in st.session_state:
-        st.session_state.query_results = []  # Store query results for each message
 
+# Main chatbot interface
+def sql_chatbot():  # Initialize session state variables if not present
     if "last_executed_query" not in st.session_state:
         st.session_state.last_executed_query = None
 
-    if "last_query_dataframe" not in st.session_state:
-        st.session_state.last_query_dataframe = pd.DataFrame()
+    if "sql_assistant_metrics" not in st.session_state:
+        st.session_state.sql_assistant_metrics = []  # Timings for recent responses
 
     # Only allow admins to access this feature
     if not st.session_state.is_admin:
@@ -518,34 +607,28 @@ def sql_chatbot():  # Initialize session state variables if not present
         "role": "Admin",  # Since we already verified they're an admin
     }
 
+    # Conversation for this user: compact turns, reloaded from disk after a restart
+    if (
+        "sql_chat_session" not in st.session_state
+        or st.session_state.sql_chat_session.user_id != user_info["user_id"]
+    ):
+        st.session_state.sql_chat_session = load_chat_session(user_info["user_id"])
+    chat_session = st.session_state.sql_chat_session
+
     # Display chat history
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
-
-            # Display query results if applicable
-            if (
-                message["role"] == "assistant"
-                and len(st.session_state.query_results) > 0
-            ):
-                message_index = st.session_state.messages.index(message)
-                query_index = message_index // 2
-
-                if query_index < len(st.session_state.query_results):
-                    query_data = st.session_state.query_results[query_index]
-                    if query_data.get("sql") and query_data.get("df") is not None:
-                        with st.expander("SQL Query Results"):
-                            st.code(query_data["sql"], language="sql")
-                            if not query_data["df"].empty:
-                                st.dataframe(query_data["df"], use_container_width=True)
-                            else:
-                                st.info("The query returned no results.")
+    if chat_session.summarised_turns:
+        st.caption(
+            f"{chat_session.summarised_turns} earlier question(s) in this conversation have been summarised."
+        )
+    for turn in chat_session.turns:
+        with st.chat_message("user"):
+            st.markdown(turn["q"])
+        with st.chat_message("assistant"):
+            st.markdown(turn["a"])
+            display_turn_result(turn)
 
     # Chat input - uses chat_input() which floats at the bottom of the page
     if prompt := st.chat_input("Ask a question about the database..."):
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
-
         # Display user message
         with st.chat_message("user"):
             st.markdown(prompt)
@@ -556,43 +639,30 @@ def sql_chatbot():  # Initialize session state variables if not present
 
             with st.spinner("Generating Answer..."):
                 # Generate SQL from prompt with chat history and query results
+                # Stream the reply into the message as it arrives
                 result = generate_sql(
                     prompt,
                     user_info,
-                    st.session_state.chat_history,
-                    st.session_state.last_query_result,
-                    st.session_state.all_query_results,
+                    chat_session.model_history(get_system_prompt(user_info)),
+                    chat_session.last_result,
+                    chat_session.recent_results(),
+                    on_text=lambda text: message_placeholder.markdown(
+                        PERMISSION_LINE_PATTERN.sub("", text) + "▌"
+                    ),
                 )
 
-                # Save chat history for next turn
-                st.session_state.chat_history = result["chat"].history
-
                 # Clean up the response to remove permission check information and sql determination
                 explanation = result["explanation"]
                 # Remove permission check and SQL determination sections if present
-                explanation = re.sub(
-                    r"(?i).*?permission check:.*?\n",
-                    "",
-                    explanation,
-                    flags=re.MULTILINE,
-                )
-                explanation = re.sub(
-                    r"(?i).*?requires SQL execution:.*?\n",
-                    "",
-                    explanation,
-                    flags=re.MULTILINE,
-                )
-
-                # Update assistant message in session state
-                st.session_state.messages.append(
-                    {"role": "assistant", "content": explanation}
-                )
+                explanation = PERMISSION_LINE_PATTERN.sub("", explanation)
 
                 # Show the response in the message placeholder
                 message_placeholder.markdown(explanation)
 
                 # Store query result with this message
                 query_data = {"sql": None, "df": pd.DataFrame()}
+                result_text = None
+                result_kind = "info"
 
                 # Handle the case when the AI detected a dangerous query
                 if result.get("is_dangerous", False) and result.get("sql"):
@@ -615,8 +685,7 @@ def sql_chatbot():  # Initialize session state variables if not present
 
                     # Save for next conversation context
                     warning_message = f"⚠️ DANGEROUS QUERY DETECTED: {danger_reason}. Query not executed for safety."
-                    st.session_state.last_query_result = warning_message
-                    st.session_state.all_query_results.append(warning_message)
+                    result_text, result_kind = warning_message, "warning"
                     st.session_state.last_executed_query = result["sql"]
 
                     # Display query results
@@ -653,8 +722,16 @@ def sql_chatbot():  # Initialize session state variables if not present
                                 + f"\n\n⚠️ **DANGEROUS QUERY DETECTED**: {danger_reason}. Query not executed for safety."
                             )
                         else:
-                            # Execute safe query
-                            query_result = execute_sql_query(result["sql"])
+                            early_query = result.get("early_query")
+                            if early_query is not None and early_query["sql"] == result["sql"]:
+                                # Already started while the explanation was streaming
+                                query_result = early_query["future"].result()
+                            else:
+                                # Execute safe query
+                                query_result = execute_sql_query(result["sql"])
+                            result["metrics"]["time_to_result_ms"] = (
+                                time.perf_counter() - result["metrics"]["started"]
+                            ) * 1000
 
                         # Save the result in query_data
                         query_data["df"] = query_result
@@ -667,30 +744,25 @@ def sql_chatbot():  # Initialize session state variables if not present
                             if "warning" in query_result.columns:
                                 # It's a dangerous query result
                                 warning_message = query_result["warning"].iloc[0]
-                                st.session_state.last_query_result = warning_message
-                                st.session_state.all_query_results.append(
-                                    warning_message
-                                )
+                                result_text, result_kind = warning_message, "warning"
                             elif "error" in query_result.columns:
                                 # It's an error result
                                 error_message = query_result["error"].iloc[0]
-                                st.session_state.last_query_result = error_message
-                                st.session_state.all_query_results.append(error_message)
+                                result_text, result_kind = error_message, "error"
                             elif not query_result.empty:
                                 # It's a normal result with data
-                                result_string = query_result.to_string(index=False)
-                                st.session_state.last_query_result = result_string
-                                st.session_state.all_query_results.append(result_string)
+                                result_string = query_result.head(
+                                    MAX_RESULT_ROWS
+                                ).to_string(index=False)
+                                result_text, result_kind = result_string, "data"
                             else:
                                 # Empty result
                                 message = "The query returned no results."
-                                st.session_state.last_query_result = message
-                                st.session_state.all_query_results.append(message)
+                                result_text, result_kind = message, "info"
                         else:
                             # Handle unexpected result type
                             message = "Unexpected result format."
-                            st.session_state.last_query_result = message
-                            st.session_state.all_query_results.append(message)
+                            result_text, result_kind = message, "error"
 
                         # Display query results
                         with st.expander("SQL Query Results"):
@@ -701,6 +773,8 @@ def sql_chatbot():  # Initialize session state variables if not present
                                 elif "error" in query_data["df"].columns:
                                     st.error(query_data["df"]["error"].iloc[0])
                                 elif not query_data["df"].empty:
+                                    if query_data["df"].attrs.get("notice"):
+                                        st.info(query_data["df"].attrs["notice"])
                                     st.dataframe(
                                         query_data["df"], use_container_width=True
                                     )
@@ -709,20 +783,32 @@ def sql_chatbot():  # Initialize session state variables if not present
                             else:
                                 st.error("Unexpected result format.")
 
-                # Add query data to query_results list
-                st.session_state.query_results.append(query_data)
+                # Record time to first token / result for this response
+                metrics = record_assistant_metrics(result["metrics"])
+                if "time_to_first_token_ms" in metrics:
+                    timing = f"First token {metrics['time_to_first_token_ms'] / 1000:.2f}s"
+                    if "time_to_result_ms" in metrics:
+                        timing += f" · result {metrics['time_to_result_ms'] / 1000:.2f}s"
+                    st.caption(timing)
+
+                # Add the turn to the conversation and persist it
+                chat_session.add_turn(
+                    prompt,
+                    explanation,
+                    sql=query_data["sql"],
+                    result=query_data["df"] if result_kind == "data" else None,
+                    result_text=result_text,
+                    kind=result_kind,
+                )
+                save_chat_session(chat_session)
 
     st.markdown("<br>", unsafe_allow_html=True)
     # Clear conversation button centered below chat input
-    if st.session_state.messages:
+    if chat_session.turns:
         cols = st.columns([0.5, 1, 0.5])
         with cols[1]:
             if st.button("🗑️ Clear Conversation", use_container_width=True):
-                st.session_state.chat_history = None
-                st.session_state.messages = []
-                st.session_state.last_query_result = None
-                st.session_state.all_query_results = []
-                st.session_state.query_results = []
+                chat_session.clear()
+                delete_chat_session(chat_session.user_id)
                 st.session_state.last_executed_query = None
-                st.session_state.last_query_dataframe = pd.DataFrame()
                 st.rerun()
@@ -0,0 +1,490 @@
+# archery_app/data_export.py
+
+"""
+Columnar snapshots of the club's data for offline analysis.
+
+export_snapshot() streams the Archer, Round (with its ranges), Score,
+Competition and CompetitionScore tables out of the database and writes each one as a
+Parquet or Arrow IPC file under EXPORT_DIR/snapshot_<timestamp>/, with a
+manifest.json describing the snapshot. Rows are read with an unbuffered
+(server-side) cursor EXPORT_CHUNK_ROWS at a time and every chunk is written
+straight out as one record batch, so memory stays flat however large the
+tables grow. All tables are read in one transaction (a consistent snapshot
+on MySQL), so scores always match their competitions.
+
+Repetitive text columns - round name, equipment type, class and gender - are
+dictionary encoded: each value is stored once and rows hold small integer
+codes. The dictionaries only grow between chunks, so they are written as
+deltas and load back as pandas categoricals.
+
+load_snapshot() reads a snapshot back; Arrow IPC files are memory-mapped.
+Its Snapshot has the same get_archers() and get_archer_statistics() as
+archery_app.database, and the analytics pages use it instead of the live
+database when ANALYTICS_SNAPSHOT is set ("latest" or a snapshot folder).
+
+pyarrow is only needed to write or read snapshots (pip install pyarrow).
+
+Usage:
+    python -m archery_app.data_export export [--format parquet|arrow] [--output DIR]
+    python -m archery_app.data_export list
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import date, datetime
+
+from .settings import get_setting
+
+# Class at the time of the score, worked out as the competition procedures do
+_SCORES_QUERY = """
+    SELECT s.ScoreID, s.ArcherID, s.RoundID, r.RoundName, et.Name AS EquipmentType,
+           cls.ClassName, s.Date, s.TotalScore, r.PossibleScore, s.IsApproved, s.IsCompetition
+    FROM Score s
+    JOIN Round r ON s.RoundID = r.RoundID
+    JOIN EquipmentType et ON s.EquipmentTypeID = et.EquipmentTypeID
+    JOIN Archer a ON s.ArcherID = a.ArcherID
+    LEFT JOIN Class cls ON cls.Gender = a.Gender AND cls.AgeGroupID = (
+        SELECT ag.AgeGroupID
+        FROM AgeGroup ag
+        WHERE (YEAR(s.Date) - YEAR(a.DateOfBirth)) BETWEEN IFNULL(ag.MinAge, 0) AND IFNULL(ag.MaxAge, 999)
+        LIMIT 1
+    )
+    ORDER BY s.ScoreID
+"""
+
+# Table name: (query, [(column, kind)]). Kinds are int, bool, date, str and
+# cat (dictionary encoded).
+EXPORT_TABLES = {
+    "archers": (
+        """
+        SELECT a.ArcherID, a.FirstName, a.LastName, a.DateOfBirth, a.Gender,
+               et.Name AS DefaultEquipmentType, a.IsActive
+        FROM Archer a
+        LEFT JOIN EquipmentType et ON a.DefaultEquipmentTypeID = et.EquipmentTypeID
+        ORDER BY a.ArcherID
+        """,
+        [("ArcherID", "int"), ("FirstName", "str"), ("LastName", "str"), ("DateOfBirth", "date"),
+         ("Gender", "cat"), ("DefaultEquipmentType", "cat"), ("IsActive", "bool")],
+    ),
+    "rounds": (
+        "SELECT RoundID, RoundName, TotalArrows, PossibleScore, Description FROM Round ORDER BY RoundID",
+        [("RoundID", "int"), ("RoundName", "str"), ("TotalArrows", "int"), ("PossibleScore", "int"),
+         ("Description", "str")],
+    ),
+    "round_ranges": (
+        """
+        SELECT rr.RoundID, rr.RangeSequence, rr.Distance, tf.Size AS FaceSize, rr.NumberOfEnds, rr.ArrowsPerEnd
+        FROM RoundRange rr
+        JOIN TargetFace tf ON rr.TargetFaceID = tf.TargetFaceID
+        ORDER BY rr.RoundID, rr.RangeSequence
+        """,
+        [("RoundID", "int"), ("RangeSequence", "int"), ("Distance", "int"), ("FaceSize", "int"),
+         ("NumberOfEnds", "int"), ("ArrowsPerEnd", "int")],
+    ),
+    "scores": (
+        _SCORES_QUERY,
+        [("ScoreID", "int"), ("ArcherID", "int"), ("RoundID", "int"), ("RoundName", "cat"),
+         ("EquipmentType", "cat"), ("ClassName", "cat"), ("Date", "date"), ("TotalScore", "int"),
+         ("PossibleScore", "int"), ("IsApproved", "bool"), ("IsCompetition", "bool")],
+    ),
+    "competitions": (
+        """
+        SELECT CompetitionID, CompetitionName, Date, IsChampionship, Description
+        FROM Competition
+        ORDER BY CompetitionID
+        """,
+        [("CompetitionID", "int"), ("CompetitionName", "str"), ("Date", "date"),
+         ("IsChampionship", "bool"), ("Description", "str")],
+    ),
+    "competition_scores": (
+        "SELECT CompetitionID, ScoreID FROM CompetitionScore ORDER BY CompetitionID, ScoreID",
+        [("CompetitionID", "int"), ("ScoreID", "int")],
+    ),
+}
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Data exports need pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def get_export_dir():
+    return get_setting("EXPORT_DIR", "exports")
+
+
+def _arrow_type(pa, kind):
+    return {
+        "int": pa.int32(),
+        "bool": pa.bool_(),
+        "date": pa.date32(),
+        "str": pa.string(),
+        "cat": pa.dictionary(pa.int32(), pa.string()),
+    }[kind]
+
+
+def _as_date(value):
+    if value is None or type(value) is date:
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+class _DictionaryEncoder:
+    """Codes for one categorical column; the dictionary only ever grows."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, pa, column):
+        indices = []
+        for value in column:
+            if value is None:
+                indices.append(None)
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            indices.append(code)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()), pa.array(self.values, type=pa.string())
+        )
+
+
+def _record_batch(pa, schema, columns, rows, encoders):
+    arrays = []
+    for (name, kind), values in zip(columns, zip(*rows)):
+        if kind == "cat":
+            arrays.append(encoders[name].encode(pa, values))
+        elif kind == "bool":
+            arrays.append(pa.array([None if v is None else bool(v) for v in values], type=pa.bool_()))
+        elif kind == "date":
+            arrays.append(pa.array([_as_date(v) for v in values], type=pa.date32()))
+        else:
+            arrays.append(pa.array(values, type=_arrow_type(pa, kind)))
+    return pa.record_batch(arrays, schema=schema)
+
+
+def _open_writer(path, schema, file_format):
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    import pyarrow.ipc as ipc
+
+    # Uncompressed so that load_snapshot() can memory-map the file
+    return ipc.new_file(path, schema, options=ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+
+def _export_table(conn, name, path, file_format, chunk_rows):
+    """Stream one table into path; returns the number of rows written."""
+    pa = _require_pyarrow()
+    sql, columns = EXPORT_TABLES[name]
+    schema = pa.schema([(column, _arrow_type(pa, kind)) for column, kind in columns])
+    encoders = {column: _DictionaryEncoder() for column, kind in columns if kind == "cat"}
+
+    rows_written = 0
+    cursor = conn.cursor(buffered=False)
+    writer = _open_writer(path, schema, file_format)
+    try:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            writer.write_batch(_record_batch(pa, schema, columns, rows, encoders))
+            rows_written += len(rows)
+    finally:
+        writer.close()
+        cursor.close()
+    return rows_written
+
+
+def export_snapshot(output_dir=None, file_format=None, tables=None, chunk_rows=None, log=print):
+    """
+    Write a columnar snapshot of the club's data.
+
+    Args:
+        output_dir (str, optional): Snapshot folder; defaults to
+            EXPORT_DIR/snapshot_<timestamp>
+        file_format (str, optional): "parquet" or "arrow" (EXPORT_FORMAT)
+        tables (list, optional): Names from EXPORT_TABLES; all by default
+        chunk_rows (int, optional): Rows per record batch (EXPORT_CHUNK_ROWS)
+        log (callable, optional): Progress output, None for silence
+
+    Returns:
+        str: Path of the snapshot folder
+    """
+    from .database import get_connection, get_database_backend
+
+    _require_pyarrow()
+    log = log or (lambda message: None)
+    file_format = (file_format or get_setting("EXPORT_FORMAT", "parquet")).lower()
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    chunk_rows = chunk_rows or get_setting("EXPORT_CHUNK_ROWS", 50000, cast=int)
+    tables = tables or list(EXPORT_TABLES)
+    created_at = datetime.now()
+    output_dir = output_dir or os.path.join(
+        get_export_dir(), f"snapshot_{created_at.strftime('%Y%m%d-%H%M%S')}"
+    )
+    if os.path.exists(output_dir):
+        raise FileExistsError(f"{output_dir} already exists")
+
+    # Written beside the target and renamed once complete
+    work_dir = output_dir + ".tmp"
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+
+    manifest = {
+        "format": file_format,
+        "created_at": created_at.isoformat(timespec="seconds"),
+        "database": get_database_backend().describe(),
+        "tables": {},
+    }
+    conn = get_connection()
+    try:
+        if get_database_backend().name == "mysql":
+            conn.start_transaction(consistent_snapshot=True, readonly=True)
+        else:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            cursor.close()
+
+        for name in tables:
+            if name not in EXPORT_TABLES:
+                raise ValueError(f"Unknown export table: {name}")
+            filename = name + FORMATS[file_format]
+            started = time.perf_counter()
+            rows = _export_table(conn, name, os.path.join(work_dir, filename), file_format, chunk_rows)
+            size = os.path.getsize(os.path.join(work_dir, filename))
+            manifest["tables"][name] = {"file": filename, "rows": rows, "bytes": size}
+            log(f"{name}: {rows:,} rows, {size / 1024:,.0f} KB in {time.perf_counter() - started:.1f} s")
+        conn.rollback()
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    finally:
+        conn.close()
+
+    with open(os.path.join(work_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(work_dir, output_dir)
+    return output_dir
+
+
+def list_snapshots():
+    """Snapshot folders in EXPORT_DIR with their manifests, newest first."""
+    export_dir = get_export_dir()
+    if not os.path.isdir(export_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(export_dir):
+        manifest_path = os.path.join(export_dir, name, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                snapshots.append({"path": os.path.join(export_dir, name), "manifest": json.load(f)})
+    snapshots.sort(key=lambda snapshot: snapshot["manifest"]["created_at"], reverse=True)
+    return snapshots
+
+
+class Snapshot:
+    """
+    A snapshot loaded back for analysis. Indexing by table name returns a
+    DataFrame (dictionary columns become categoricals); each table is read
+    on first use.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.created_at = datetime.fromisoformat(self.manifest["created_at"])
+        self._tables = {}
+        self._handicap_tables = None
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        if name not in self._tables:
+            with self._lock:
+                if name not in self._tables:
+                    self._tables[name] = self.read_table(name).to_pandas()
+        return self._tables[name]
+
+    def read_table(self, name):
+        """The table as a pyarrow Table."""
+        pa = _require_pyarrow()
+        if name not in self.manifest["tables"]:
+            raise KeyError(f"Table {name} is not in snapshot {self.path}")
+        path = os.path.join(self.path, self.manifest["tables"][name]["file"])
+        if self.manifest["format"] == "parquet":
+            import pyarrow.parquet as pq
+
+            return pq.read_table(path, memory_map=True)
+        import pyarrow.ipc as ipc
+
+        return ipc.open_file(pa.memory_map(path)).read_all()
+
+    def handicap_tables(self):
+        """HandicapTables for the snapshot's rounds, or None if it has no ranges."""
+        from .handicaps import HandicapTables
+
+        if "round_ranges" not in self.manifest["tables"]:
+            return None
+        if self._handicap_tables is None:
+            rounds = self["rounds"]
+            ranges = self["round_ranges"]
+            self._handicap_tables = HandicapTables([
+                (int(row.RoundID), row.RoundName, int(row.PossibleScore),
+                 [(r.Distance, r.FaceSize, r.NumberOfEnds, r.ArrowsPerEnd)
+                  for r in ranges[ranges["RoundID"] == row.RoundID].itertuples(index=False)])
+                for row in rounds.itertuples(index=False)
+                if (ranges["RoundID"] == row.RoundID).any()
+            ])
+        return self._handicap_tables
+
+    def get_archers(self):
+        """Same rows as database.get_archers()."""
+        archers = self["archers"].sort_values("ArcherID")
+        return [
+            {"ArcherID": int(row.ArcherID), "ArcherName": f"{row.FirstName} {row.LastName}"}
+            for row in archers.itertuples(index=False)
+        ]
+
+    def get_archer_statistics(self, archer_id):
+        """Same dictionary as database.get_archer_statistics(), from the snapshot."""
+        archers = self["archers"]
+        match = archers[archers["ArcherID"] == archer_id]
+        if match.empty:
+            return None
+        archer = match.iloc[0]
+        born = _as_date(archer["DateOfBirth"])
+        today = date.today()
+        info = {
+            "ArcherID": int(archer["ArcherID"]),
+            "ArcherName": f"{archer['FirstName']} {archer['LastName']}",
+            "Gender": archer["Gender"],
+            "DateOfBirth": born,
+            "Age": today.year - born.year - ((today.month, today.day) < (born.month, born.day)),
+            "IsActive": bool(archer["IsActive"]),
+        }
+
+        scores = self["scores"]
+        scores = scores[(scores["ArcherID"] == archer_id) & scores["IsApproved"].fillna(False)]
+        if scores.empty:
+            return {
+                **info,
+                "ScoreStats": {"TotalScores": 0, "AverageScore": None, "HighestScore": None, "LowestScore": None},
+                "RecentScores": [],
+                "PreferredEquipment": None,
+                "FavoriteRound": None,
+            }
+
+        recent = scores.sort_values("Date", ascending=False, kind="stable").head(5)
+        equipment = scores["EquipmentType"].value_counts()
+        rounds = scores["RoundName"].value_counts()
+        return {
+            **info,
+            "ScoreStats": {
+                "TotalScores": len(scores),
+                "AverageScore": float(scores["TotalScore"].mean()),
+                "HighestScore": int(scores["TotalScore"].max()),
+                "LowestScore": int(scores["TotalScore"].min()),
+            },
+            "RecentScores": [
+                {
+                    "TotalScore": int(row.TotalScore),
+                    "Date": _as_date(row.Date),
+                    "RoundName": row.RoundName,
+                    "PossibleScore": int(row.PossibleScore),
+                    "EquipmentType": row.EquipmentType,
+                }
+                for row in recent.itertuples(index=False)
+            ],
+            "PreferredEquipment": {"EquipmentType": equipment.index[0], "UsageCount": int(equipment.iloc[0])},
+            "FavoriteRound": {"RoundName": rounds.index[0], "UsageCount": int(rounds.iloc[0])},
+        }
+
+
+def load_snapshot(path=None):
+    """
+    Open a snapshot (cached per process).
+
+    Args:
+        path (str, optional): Snapshot folder, or "latest" / None for the
+            newest snapshot in EXPORT_DIR
+
+    Returns:
+        Snapshot: The snapshot's tables, read lazily
+    """
+    if not path or path == "latest":
+        snapshots = list_snapshots()
+        if not snapshots:
+            raise FileNotFoundError(f"No snapshots in {get_export_dir()}")
+        path = snapshots[0]["path"]
+    path = os.path.abspath(path)
+    with _snapshots_lock:
+        if path not in _snapshots:
+            _snapshots[path] = Snapshot(path)
+        return _snapshots[path]
+
+
+def get_analytics_snapshot():
+    """
+    The snapshot named by ANALYTICS_SNAPSHOT, or None to use the live database.
+
+    A snapshot that cannot be opened is reported and the live database used.
+    """
+    setting = get_setting("ANALYTICS_SNAPSHOT", "")
+    if not setting:
+        return None
+    try:
+        return load_snapshot(setting)
+    except Exception as e:
+        print(f"Error loading analytics snapshot {setting}: {e}")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the club's data to columnar files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write a new snapshot")
+    export_parser.add_argument("--format", choices=sorted(FORMATS), help="Defaults to EXPORT_FORMAT")
+    export_parser.add_argument("--output", help="Snapshot folder (default EXPORT_DIR/snapshot_<timestamp>)")
+    export_parser.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES))
+    export_parser.add_argument("--chunk-rows", type=int, help="Defaults to EXPORT_CHUNK_ROWS")
+    subparsers.add_parser("list", help="List snapshots in EXPORT_DIR")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for snapshot in list_snapshots():
+            manifest = snapshot["manifest"]
+            rows = sum(table["rows"] for table in manifest["tables"].values())
+            size = sum(table["bytes"] for table in manifest["tables"].values())
+            print(f"  {snapshot['path']}  {manifest['created_at']}  {manifest['format']:<8} "
+                  f"{rows:>10,} rows  {size / 1024 / 1024:.1f} MB")
+        return 0
+
+    started = time.perf_counter()
+    path = export_snapshot(args.output, args.format, args.tables, args.chunk_rows)
+    print(f"Snapshot written to {path} in {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
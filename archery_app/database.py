@@ -1,17 +1,179 @@
+import threading
+
 import streamlit as st
 import mysql.connector
 import pandas as pd
 
+from .query_stats import instrument_connection
+from .settings import get_setting
+
 # No need to load .env - Streamlit will automatically load secrets.toml
 
+# Server error codes for a statement stopped by the execution time limit
+# (3024 = MySQL MAX_EXECUTION_TIME, 1969 = MariaDB max_statement_time)
+EXECUTION_TIMEOUT_ERRORS = {3024, 1969}
+
+
+class DatabaseBackend:
+    """
+    Interface for the database behind get_connection().
+
+    connect() must return a mysql-connector style connection: cursor(
+    dictionary=...), callproc()/stored_results(), commit(), close(),
+    is_connected() and ping(), raising mysql.connector errors.
+    """
+
+    name = "base"
+
+    def connect(self):
+        raise NotImplementedError
+
+    def sqlalchemy_engine(self):
+        """SQLAlchemy engine for the SQL Assistant's queries."""
+        raise NotImplementedError
+
+    def explain_query(self, connection, sql_query):
+        """
+        Query plan for the SQL Assistant's cost guard.
+
+        Args:
+            connection: An open connection from sqlalchemy_engine()
+            sql_query (str): The statement to plan
+
+        Returns:
+            list: Plan rows as dicts in the shape of MySQL's EXPLAIN, with
+            "id" (tables sharing an id are nested-loop joined), "rows" and
+            optionally "filtered" keys
+        """
+        raise NotImplementedError
+
+    def set_statement_timeout(self, connection, max_execution_ms):
+        """
+        Limit how long statements on a connection from sqlalchemy_engine()
+        may run.
+
+        Returns:
+            bool: True if a limit was applied
+        """
+        return False
+
+    def is_statement_timeout(self, error):
+        """True if a DB-API error means the statement hit the time limit."""
+        return False
+
+    def describe(self):
+        return self.name
+
+
+class MySQLBackend(DatabaseBackend):
+    """The club's MySQL server, using the DB_* credentials in secrets.toml."""
+
+    name = "mysql"
+
+    # Session variable that worked on this server, detected on first use
+    _timeout_variable = None
+
+    def connect(self):
+        return mysql.connector.connect(
+            host=st.secrets["DB_HOST"],
+            user=st.secrets["DB_USER"],
+            password=st.secrets["DB_PASSWORD"],
+            database=st.secrets["DB_NAME"],
+        )
+
+    def sqlalchemy_engine(self):
+        import sqlalchemy
+
+        return sqlalchemy.create_engine(
+            f"mysql+pymysql://{st.secrets['DB_USER']}:{st.secrets['DB_PASSWORD']}@{st.secrets['DB_HOST']}/{st.secrets['DB_NAME']}"
+        )
+
+    def explain_query(self, connection, sql_query):
+        result = connection.exec_driver_sql(f"EXPLAIN {sql_query.strip().rstrip(';')}")
+        return [
+            {key.lower(): value for key, value in row.items()}
+            for row in result.mappings().all()
+        ]
+
+    def set_statement_timeout(self, connection, max_execution_ms):
+        """
+        Uses MariaDB's max_statement_time (seconds), falling back to MySQL's
+        MAX_EXECUTION_TIME (milliseconds, SELECT only). The connection is used
+        for a single assistant query, so the session setting is per statement.
+        """
+        if not max_execution_ms or max_execution_ms <= 0:
+            return False
+
+        candidates = [
+            ("max_statement_time", max_execution_ms / 1000.0),
+            ("MAX_EXECUTION_TIME", int(max_execution_ms)),
+        ]
+        if self._timeout_variable is not None:
+            candidates = [c for c in candidates if c[0] == self._timeout_variable]
+
+        for variable, value in candidates:
+            try:
+                connection.exec_driver_sql(f"SET SESSION {variable} = {value}")
+                self._timeout_variable = variable
+                return True
+            except Exception:
+                continue
+        return False
+
+    def is_statement_timeout(self, error):
+        return bool(error.args) and error.args[0] in EXECUTION_TIMEOUT_ERRORS
+
+    def describe(self):
+        return f"MySQL database {st.secrets['DB_NAME']} on {st.secrets['DB_HOST']}"
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_database_backend(backend_name=None):
+    """
+    Build the backend named by DB_BACKEND ("mysql" or "sqlite").
+
+    Args:
+        backend_name (str, optional): Override for the configured backend
+
+    Returns:
+        DatabaseBackend: A new backend instance
+    """
+    backend_name = (backend_name or get_setting("DB_BACKEND", "mysql")).lower()
+
+    if backend_name == "mysql":
+        return MySQLBackend()
+    if backend_name == "sqlite":
+        from .sqlite_backend import DEFAULT_DB_PATH, SQLiteBackend
+
+        return SQLiteBackend(
+            get_setting("DB_SQLITE_PATH", DEFAULT_DB_PATH),
+            busy_timeout_ms=get_setting("DB_SQLITE_BUSY_TIMEOUT_MS", 5000, cast=int),
+        )
+    raise ValueError(f"Unknown database backend: {backend_name}")
+
+
+def get_database_backend():
+    """Return the shared database backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_database_backend()
+    return _backend
+
+
+def set_database_backend(backend):
+    """Replace the shared database backend (used by benchmarks and offline runs)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
 
 def get_connection():
-    return mysql.connector.connect(
-        host=st.secrets["DB_HOST"],
-        user=st.secrets["DB_USER"],
-        password=st.secrets["DB_PASSWORD"],
-        database=st.secrets["DB_NAME"],
-    )
+    return instrument_connection(get_database_backend().connect())
 
 
 def initialize_connection():
@@ -36,6 +198,24 @@ def display_connection_error():
     """Display a formatted error message with VPN information."""
     st.error("⚠️ Database Connection Error")
 
+    if get_database_backend().name != "mysql":
+        st.markdown(
+            f"""
+    ### Unable to open the {get_database_backend().describe()}
+
+    Check DB_SQLITE_PATH in secrets.toml and that the file's folder is writable.
+    """
+        )
+        if st.session_state.connection_error:
+            with st.expander("Technical error details"):
+                st.code(st.session_state.connection_error)
+        if st.button("Retry Connection"):
+            st.session_state.pop("connection_established", None)
+            st.session_state.pop("connection_error", None)
+            initialize_connection()
+            st.rerun()
+        return
+
     st.markdown(
         """
     ### Unable to connect to the Swinburne database
@@ -81,13 +261,13 @@ def get_archers():
 
 
 def get_rounds():
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT RoundID, RoundName FROM Round ORDER BY RoundID")
-    rounds = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rounds
+    # Served from the round catalogue, which holds every round definition
+    from .round_catalogue import get_round_catalogue
+
+    return [
+        {"RoundID": definition.round_id, "RoundName": definition.name}
+        for definition in get_round_catalogue()
+    ]
 
 
 def get_equipment_types():
@@ -0,0 +1,352 @@
+# archery_app/digests.py
+
+"""
+Precomputed home dashboard data.
+
+The home page shows each archer's recent scores, scores waiting for
+approval, personal best progress and the club's upcoming competitions.
+Working that out on every login means a handful of queries over Score,
+StagedScore, PersonalBest and Competition; instead each archer's digest is
+built ahead of time and stored as one UserDigest row, with ArcherID 0
+holding the club-wide part. load_home_digests() reads both with one keyed
+lookup.
+
+Digests are compact JSON: rows are stored as arrays in the column order of
+the *_FIELDS tuples, so a digest is a few hundred bytes.
+
+They are rebuilt on a single background thread after the writes that change
+them (score submission and approval, linking scores to competitions, new
+competitions): schedule_digest_refresh() queues the affected archers and
+returns at once, and refreshes queued while a build runs are merged into the
+next one. A missing digest is built on first view; one older than
+DIGEST_MAX_AGE seconds is shown and refreshed in the background.
+
+    python -m archery_app.digests rebuild [--archer ID ...]
+
+rebuilds them all (after bulk loads or restores).
+"""
+
+import argparse
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from .database import get_connection
+from .settings import get_setting
+
+DIGEST_VERSION = 1
+CLUB_DIGEST_ID = 0
+RECENT_LIMIT = 5
+PROGRESS_LIMIT = 5
+NEW_BEST_DAYS = 30
+
+RECENT_FIELDS = ("Date", "RoundName", "EquipmentType", "TotalScore", "PossibleScore", "Handicap", "IsCompetition")
+PENDING_FIELDS = ("Date", "RoundName", "EquipmentType", "TotalScore")
+PROGRESS_FIELDS = ("RoundName", "EquipmentType", "BestScore", "BestDate", "LatestScore", "LatestDate")
+UPCOMING_FIELDS = ("CompetitionID", "CompetitionName", "Date", "IsChampionship")
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="digest")
+_pending_archers = set()
+_pending_scores = set()
+_pending_lock = threading.Lock()
+_draining = False
+
+
+def _day(value):
+    return value.isoformat() if value else None
+
+
+def build_archer_digest(cursor, archer_id):
+    """
+    Dashboard data for one archer.
+
+    Args:
+        cursor: Cursor opened with dictionary=True
+        archer_id (int): ArcherID
+
+    Returns:
+        dict: recent, pending and progress rows and the number of personal
+        bests set in the last NEW_BEST_DAYS days
+    """
+    from .handicaps import get_handicap_tables
+
+    cursor.execute(
+        """
+        SELECT s.Date, r.RoundName, et.Name AS EquipmentType, s.TotalScore,
+               r.PossibleScore, s.IsCompetition
+        FROM Score s
+        JOIN Round r ON s.RoundID = r.RoundID
+        JOIN EquipmentType et ON s.EquipmentTypeID = et.EquipmentTypeID
+        WHERE s.ArcherID = %s AND s.IsApproved = 1
+        ORDER BY s.Date DESC, s.ScoreID DESC
+        LIMIT %s
+        """,
+        (archer_id, RECENT_LIMIT),
+    )
+    recent = cursor.fetchall()
+    try:
+        handicaps = get_handicap_tables().handicaps_for_names(
+            [row["RoundName"] for row in recent], [row["TotalScore"] for row in recent]
+        )
+    except Exception as e:
+        print(f"Error loading handicap tables: {e}")
+        handicaps = [float("nan")] * len(recent)
+
+    cursor.execute(
+        """
+        SELECT ss.Date, r.RoundName, et.Name AS EquipmentType, ss.TotalScore
+        FROM StagedScore ss
+        JOIN Round r ON ss.RoundID = r.RoundID
+        JOIN EquipmentType et ON ss.EquipmentTypeID = et.EquipmentTypeID
+        WHERE ss.ArcherID = %s
+        ORDER BY ss.Date DESC, ss.StagedScoreID DESC
+        """,
+        (archer_id,),
+    )
+    pending = cursor.fetchall()
+
+    # Personal bests of the rounds shot most recently, against the latest score
+    cursor.execute(
+        """
+        SELECT r.RoundName, et.Name AS EquipmentType, pb.TotalScore AS BestScore, pb.Date AS BestDate,
+               s.TotalScore AS LatestScore, s.Date AS LatestDate
+        FROM PersonalBest pb
+        JOIN Round r ON pb.RoundID = r.RoundID
+        JOIN EquipmentType et ON pb.EquipmentTypeID = et.EquipmentTypeID
+        JOIN Score s ON s.ScoreID = (
+            SELECT latest.ScoreID
+            FROM Score latest
+            WHERE latest.ArcherID = pb.ArcherID AND latest.RoundID = pb.RoundID
+              AND latest.EquipmentTypeID = pb.EquipmentTypeID AND latest.IsApproved = 1
+            ORDER BY latest.Date DESC, latest.ScoreID DESC
+            LIMIT 1
+        )
+        WHERE pb.ArcherID = %s
+        ORDER BY s.Date DESC, r.RoundName
+        """,
+        (archer_id,),
+    )
+    progress = cursor.fetchall()
+    new_best_since = date.today() - timedelta(days=NEW_BEST_DAYS)
+
+    return {
+        "recent": [
+            [_day(row["Date"]), row["RoundName"], row["EquipmentType"], row["TotalScore"],
+             row["PossibleScore"], None if handicap != handicap else int(handicap), bool(row["IsCompetition"])]
+            for row, handicap in zip(recent, handicaps)
+        ],
+        "pending": [
+            [_day(row["Date"]), row["RoundName"], row["EquipmentType"], row["TotalScore"]]
+            for row in pending[:RECENT_LIMIT]
+        ],
+        "pending_count": len(pending),
+        "progress": [
+            [row["RoundName"], row["EquipmentType"], row["BestScore"], _day(row["BestDate"]),
+             row["LatestScore"], _day(row["LatestDate"])]
+            for row in progress[:PROGRESS_LIMIT]
+        ],
+        "new_bests": sum(1 for row in progress if row["BestDate"] >= new_best_since),
+    }
+
+
+def build_club_digest(cursor):
+    """
+    Club-wide dashboard data: scores waiting for approval and upcoming
+    competitions.
+
+    Args:
+        cursor: Cursor opened with dictionary=True
+
+    Returns:
+        dict
+    """
+    cursor.execute("SELECT COUNT(*) AS Pending FROM StagedScore")
+    pending_count = cursor.fetchone()["Pending"]
+    cursor.execute(
+        """
+        SELECT CompetitionID, CompetitionName, Date, IsChampionship
+        FROM Competition
+        WHERE Date >= %s
+        ORDER BY Date, CompetitionID
+        LIMIT %s
+        """,
+        (date.today(), RECENT_LIMIT),
+    )
+    upcoming = [
+        [row["CompetitionID"], row["CompetitionName"], _day(row["Date"]), bool(row["IsChampionship"])]
+        for row in cursor.fetchall()
+    ]
+    return {"pending_count": pending_count, "upcoming": upcoming}
+
+
+def _store(cursor, archer_id, digest):
+    digest["v"] = DIGEST_VERSION
+    cursor.execute(
+        "REPLACE INTO UserDigest (ArcherID, Digest, BuiltAt) VALUES (%s, %s, %s)",
+        (archer_id, json.dumps(digest, separators=(",", ":")), datetime.now()),
+    )
+    return digest
+
+
+def refresh_digests(archer_ids=(), score_ids=(), conn=None):
+    """
+    Rebuild and store digests.
+
+    Args:
+        archer_ids: ArcherIDs to rebuild (CLUB_DIGEST_ID for the club digest)
+        score_ids: ScoreIDs whose archers' digests should be rebuilt
+        conn: Database connection (default a new one, closed afterwards)
+
+    Returns:
+        dict: ArcherID -> digest
+    """
+    own_connection = conn is None
+    conn = conn or get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        archer_ids = set(archer_ids)
+        score_ids = list(score_ids)
+        if score_ids:
+            placeholders = ", ".join(["%s"] * len(score_ids))
+            cursor.execute(f"SELECT DISTINCT ArcherID FROM Score WHERE ScoreID IN ({placeholders})", score_ids)
+            archer_ids.update(row["ArcherID"] for row in cursor.fetchall())
+
+        digests = {}
+        for archer_id in sorted(archer_ids):
+            if archer_id == CLUB_DIGEST_ID:
+                digest = build_club_digest(cursor)
+            else:
+                digest = build_archer_digest(cursor, archer_id)
+            digests[archer_id] = _store(cursor, archer_id, digest)
+            conn.commit()
+        return digests
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+
+def _drain():
+    global _draining
+    while True:
+        with _pending_lock:
+            if not _pending_archers and not _pending_scores:
+                _draining = False
+                return
+            archer_ids = set(_pending_archers)
+            score_ids = set(_pending_scores)
+            _pending_archers.clear()
+            _pending_scores.clear()
+        try:
+            refresh_digests(archer_ids, score_ids)
+        except Exception as e:
+            print(f"Error refreshing dashboard digests: {e}")
+
+
+def schedule_digest_refresh(archer_ids=(), score_ids=(), club=True):
+    """
+    Queue digests for a background rebuild after a write has committed.
+
+    Args:
+        archer_ids: Archers whose digests changed
+        score_ids: Scores whose archers' digests changed
+        club (bool): Also rebuild the club digest
+    """
+    global _draining
+    with _pending_lock:
+        _pending_archers.update(archer_ids)
+        _pending_scores.update(score_ids)
+        if club:
+            _pending_archers.add(CLUB_DIGEST_ID)
+        if _draining:
+            return
+        _draining = True
+    _executor.submit(_drain)
+
+
+def expire_digests():
+    """Drop every stored digest; each is rebuilt when next viewed."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM UserDigest")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def load_home_digests(archer_id):
+    """
+    The archer's digest and the club digest, in one keyed lookup.
+
+    Missing (or outdated format) digests are built now; ones older than
+    DIGEST_MAX_AGE seconds are returned and refreshed in the background.
+
+    Returns:
+        tuple: (archer digest, club digest)
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        "SELECT ArcherID, Digest, BuiltAt FROM UserDigest WHERE ArcherID IN (%s, %s)",
+        (archer_id, CLUB_DIGEST_ID),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+
+    max_age = timedelta(seconds=get_setting("DIGEST_MAX_AGE", 3600, cast=float))
+    digests, missing, stale = {}, [], []
+    for row in rows:
+        digest = json.loads(row["Digest"])
+        if digest.get("v") != DIGEST_VERSION:
+            continue
+        digests[row["ArcherID"]] = digest
+        if datetime.now() - row["BuiltAt"] > max_age:
+            stale.append(row["ArcherID"])
+    for wanted in (archer_id, CLUB_DIGEST_ID):
+        if wanted not in digests:
+            missing.append(wanted)
+
+    try:
+        if missing:
+            digests.update(refresh_digests(missing, conn=conn))
+    finally:
+        conn.close()
+    if stale:
+        schedule_digest_refresh(stale, club=False)
+    return digests[archer_id], digests[CLUB_DIGEST_ID]
+
+
+def as_records(rows, fields):
+    """Digest rows as dicts keyed by field name."""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m archery_app.digests",
+        description="Home dashboard digest maintenance",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="Rebuild digests")
+    rebuild.add_argument("--archer", type=int, action="append",
+                         help="Only this archer (repeatable); default every archer with an account")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        archer_ids = args.archer
+        if not archer_ids:
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT ArcherID FROM AppUser WHERE ArcherID IS NOT NULL")
+            archer_ids = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            conn.close()
+        digests = refresh_digests(list(archer_ids) + [CLUB_DIGEST_ID])
+        print(f"Rebuilt {len(digests):,} digests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
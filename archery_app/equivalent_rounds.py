@@ -0,0 +1,311 @@
+# archery_app/equivalent_rounds.py
+
+"""
+In-memory index of EquivalentRound.
+
+An EquivalentRound row says that, for one class and equipment type, a round
+counts the same as a base round between EffectiveDate and ExpiryDate
+(inclusive; no ExpiryDate means it has not expired). Taken together the rows
+form a graph per (ClassID, EquipmentTypeID) whose edges are only valid on
+some dates, and equivalence is transitive: if A is equivalent to B and B to
+C on a date, so are A and C.
+
+EquivalentRoundIndex loads the whole table in one query. For every
+(class, equipment) it splits time at the dates where a link starts or
+expires, and works out the groups of mutually equivalent rounds for each
+interval up front. "Which rounds are equivalent to R for class X with
+equipment Y on date D" is then a bisect over the interval starts and a
+dictionary lookup - a few microseconds, with no database round trip.
+
+The shared index is reloaded after EQUIVALENT_ROUND_CACHE_TTL seconds, or on
+next use after invalidate_equivalent_rounds() (called when the SQL Assistant
+changes EquivalentRound, Round, Class or EquipmentType).
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+from .settings import get_setting
+
+BASE_FOR = "This round is base for:"
+EQUIVALENT_TO = "This round is equivalent to:"
+
+
+class EquivalenceLink(NamedTuple):
+    base_round_id: int
+    equivalent_round_id: int
+    class_id: int
+    equipment_type_id: int
+    effective_date: date
+    expiry_date: Optional[date]
+
+
+_index = None
+_index_loaded_at = 0.0
+_index_lock = threading.Lock()
+
+
+def _as_date(value):
+    if value is None or type(value) is date:
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def _components(links):
+    """Round ID -> frozenset of its connected rounds, for the given links."""
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for link in links:
+        parent[find(link.base_round_id)] = find(link.equivalent_round_id)
+
+    groups = defaultdict(set)
+    for node in parent:
+        groups[find(node)].add(node)
+    return {node: frozenset(groups[find(node)]) for node in parent}
+
+
+class EquivalentRoundIndex:
+    """Date-aware equivalence groups per (ClassID, EquipmentTypeID)."""
+
+    def __init__(self, links, round_names, class_names, equipment_names):
+        """
+        Args:
+            links (list): EquivalenceLink for every EquivalentRound row
+            round_names (dict): RoundID -> RoundName
+            class_names (dict): ClassID -> ClassName
+            equipment_names (dict): EquipmentTypeID -> Name
+        """
+        self.links = links
+        self.round_names = round_names
+        self.class_names = class_names
+        self.equipment_names = equipment_names
+        self._class_ids = {name: class_id for class_id, name in class_names.items()}
+        self._equipment_ids = {name: equipment_id for equipment_id, name in equipment_names.items()}
+
+        self._links_by_round = defaultdict(list)
+        by_key = defaultdict(list)
+        for link in links:
+            self._links_by_round[link.base_round_id].append(link)
+            self._links_by_round[link.equivalent_round_id].append(link)
+            by_key[(link.class_id, link.equipment_type_id)].append(link)
+
+        # (class, equipment) -> (interval start dates, groups in each interval)
+        self._intervals = {}
+        for key, key_links in by_key.items():
+            starts = sorted(
+                {link.effective_date for link in key_links}
+                | {link.expiry_date + timedelta(days=1) for link in key_links if link.expiry_date}
+            )
+            groups = [
+                _components([link for link in key_links if self._active(link, start)])
+                for start in starts
+            ]
+            self._intervals[key] = (starts, groups)
+
+    @staticmethod
+    def _active(link, on_date):
+        return link.effective_date <= on_date and (link.expiry_date is None or link.expiry_date >= on_date)
+
+    def _group(self, round_id, class_id, equipment_type_id, on_date):
+        intervals = self._intervals.get((class_id, equipment_type_id))
+        if intervals is None:
+            return None
+        starts, groups = intervals
+        position = bisect.bisect_right(starts, _as_date(on_date) or date.today()) - 1
+        if position < 0:
+            return None
+        return groups[position].get(round_id)
+
+    def equivalent_rounds(self, round_id, class_id, equipment_type_id, on_date=None):
+        """
+        Rounds equivalent to a round, directly or through a chain of links.
+
+        Args:
+            round_id (int): RoundID
+            class_id (int): ClassID of the archer
+            equipment_type_id (int): EquipmentTypeID used
+            on_date (date, optional): Date the round is shot (default today)
+
+        Returns:
+            frozenset: Equivalent RoundIDs, not including round_id
+        """
+        group = self._group(round_id, class_id, equipment_type_id, on_date)
+        return group - {round_id} if group else frozenset()
+
+    def are_equivalent(self, round_a, round_b, class_id, equipment_type_id, on_date=None):
+        if round_a == round_b:
+            return True
+        group = self._group(round_a, class_id, equipment_type_id, on_date)
+        return bool(group) and round_b in group
+
+    def canonical_round(self, round_id, class_id, equipment_type_id, on_date=None):
+        """Lowest RoundID of the round's equivalence group (round_id if it has none)."""
+        group = self._group(round_id, class_id, equipment_type_id, on_date)
+        return min(group) if group else round_id
+
+    def class_id(self, class_name):
+        return self._class_ids.get(class_name)
+
+    def equipment_type_id(self, equipment_name):
+        return self._equipment_ids.get(equipment_name)
+
+    def split_category(self, category):
+        """(ClassID, EquipmentTypeID) of a "<ClassName> <Equipment>" category."""
+        for name, equipment_id in self._equipment_ids.items():
+            if category.endswith(" " + name):
+                return self._class_ids.get(category[: -len(name) - 1]), equipment_id
+        return None, None
+
+    def round_equivalences(self, round_id, on_date=None):
+        """
+        Links of a round that have not expired by on_date, in the shape of
+        uspGetRoundDetails' second result set.
+
+        Args:
+            round_id (int): RoundID
+            on_date (date, optional): Default today
+
+        Returns:
+            list: Dicts with EquivalentType, ClassName, EquipmentType,
+            EquivalentRoundName, EffectiveDate and ExpiryDate
+        """
+        on_date = _as_date(on_date) or date.today()
+        rows = []
+        for link in self._links_by_round.get(round_id, ()):
+            if link.expiry_date is not None and link.expiry_date < on_date:
+                continue
+            is_base = link.base_round_id == round_id
+            other = link.equivalent_round_id if is_base else link.base_round_id
+            rows.append({
+                "EquivalentType": BASE_FOR if is_base else EQUIVALENT_TO,
+                "ClassName": self.class_names.get(link.class_id),
+                "EquipmentType": self.equipment_names.get(link.equipment_type_id),
+                "EquivalentRoundName": self.round_names.get(other),
+                "EffectiveDate": link.effective_date,
+                "ExpiryDate": link.expiry_date,
+            })
+        rows.sort(key=lambda row: (row["EquivalentType"], row["ClassName"] or "", row["EquipmentType"] or ""))
+        return rows
+
+    def chained_equivalences(self, round_id, on_date=None):
+        """
+        Rounds equivalent on on_date only through a chain of links.
+
+        Returns:
+            list: Dicts with ClassName, EquipmentType and EquivalentRoundName
+        """
+        on_date = _as_date(on_date) or date.today()
+        rows = []
+        for (class_id, equipment_type_id) in sorted(self._intervals):
+            direct = {
+                link.equivalent_round_id if link.base_round_id == round_id else link.base_round_id
+                for link in self._links_by_round.get(round_id, ())
+                if (link.class_id, link.equipment_type_id) == (class_id, equipment_type_id)
+                and self._active(link, on_date)
+            }
+            for other in sorted(self.equivalent_rounds(round_id, class_id, equipment_type_id, on_date) - direct):
+                rows.append({
+                    "ClassName": self.class_names.get(class_id),
+                    "EquipmentType": self.equipment_names.get(equipment_type_id),
+                    "EquivalentRoundName": self.round_names.get(other),
+                })
+        return rows
+
+
+def load_equivalent_round_index():
+    """Build an EquivalentRoundIndex from the database."""
+    from .database import get_connection
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT BaseRoundID, EquivalentRoundRefID, ClassID, EquipmentTypeID, EffectiveDate, ExpiryDate "
+        "FROM EquivalentRound"
+    )
+    links = [
+        EquivalenceLink(base, equivalent, class_id, equipment_id, _as_date(effective), _as_date(expiry))
+        for base, equivalent, class_id, equipment_id, effective, expiry in cursor.fetchall()
+    ]
+    cursor.execute("SELECT RoundID, RoundName FROM Round")
+    round_names = dict(cursor.fetchall())
+    cursor.execute("SELECT ClassID, ClassName FROM Class")
+    class_names = dict(cursor.fetchall())
+    cursor.execute("SELECT EquipmentTypeID, Name FROM EquipmentType")
+    equipment_names = dict(cursor.fetchall())
+    cursor.close()
+    conn.close()
+    return EquivalentRoundIndex(links, round_names, class_names, equipment_names)
+
+
+def get_equivalent_round_index():
+    """The shared index, reloaded after EQUIVALENT_ROUND_CACHE_TTL seconds."""
+    global _index, _index_loaded_at
+    ttl = get_setting("EQUIVALENT_ROUND_CACHE_TTL", 300, cast=float)
+    if _index is None or time.monotonic() - _index_loaded_at > ttl:
+        with _index_lock:
+            if _index is None or time.monotonic() - _index_loaded_at > ttl:
+                _index = load_equivalent_round_index()
+                _index_loaded_at = time.monotonic()
+    return _index
+
+
+def invalidate_equivalent_rounds():
+    """Reload the index on next use (after EquivalentRound changes)."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def add_round_group_column(df, date_column="Date"):
+    """
+    Add a "Round Group" column to competition results: the name of the
+    lowest-numbered round each entry's round is equivalent to for its class
+    and equipment on the competition date. Entries in the same category and
+    round group shot equivalent rounds.
+
+    Args:
+        df (DataFrame): Results with RoundName and either ClassName and
+            EquipmentType or Category columns
+        date_column (str): Column holding the competition date
+
+    Returns:
+        DataFrame: df with the column after RoundName, or unchanged if the
+        index cannot be loaded
+    """
+    if df.empty or "RoundName" not in df:
+        return df
+    try:
+        index = get_equivalent_round_index()
+    except Exception as e:
+        print(f"Error loading equivalent rounds: {e}")
+        return df
+
+    round_ids = {name: round_id for round_id, name in index.round_names.items()}
+    groups = []
+    for row in df.to_dict("records"):
+        if "ClassName" in row and "EquipmentType" in row:
+            class_id, equipment_id = index.class_id(row["ClassName"]), index.equipment_type_id(row["EquipmentType"])
+        else:
+            class_id, equipment_id = index.split_category(row.get("Category", ""))
+        round_id = round_ids.get(row["RoundName"])
+        if round_id is None:
+            groups.append(row["RoundName"])
+            continue
+        canonical = index.canonical_round(round_id, class_id, equipment_id, row.get(date_column))
+        groups.append(index.round_names.get(canonical, row["RoundName"]))
+    df = df.copy()
+    df.insert(df.columns.get_loc("RoundName") + 1, "Round Group", groups)
+    return df
@@ -0,0 +1,256 @@
+# archery_app/handicaps.py
+
+"""
+Archery handicaps: one number that compares scores across different rounds.
+
+A handicap describes how tightly an archer groups; the lower it is, the
+better. This module uses the Archery GB 2023 handicap model: at handicap h
+and distance d (metres) arrows land around the centre with radial spread
+
+    sigma_r = d * ANG_0 * (1 + STEP / 100) ** (h + DATUM) * exp(KD * d)
+
+and the expected score of an arrow on a 10-zone face of diameter D is
+
+    10 - sum(exp(-((n * D / 20 + arrow radius) / sigma_r) ** 2) for n in 1..10)
+
+A round's expected score is the sum over its ranges (RoundRange distance,
+TargetFace size, ends and arrows per end). Arrows are taken as 5.5 mm across
+outdoors and 9.3 mm for indoor ranges (INDOOR_MAX_DISTANCE or closer), as the
+AGB tables do.
+
+get_handicap_tables() computes, for every round in the round catalogue, the
+table score of each whole handicap from HANDICAP_MIN to HANDICAP_MAX and
+keeps the tables as NumPy arrays until the catalogue is reloaded. Table
+scores are the expected scores rounded up, and a score earns the best
+(lowest) handicap whose table score it reaches; near-perfect scores earn negative handicaps.
+Converting any number of scores is a single searchsorted over all rounds'
+tables, so handicaps for every historical score cost about as much as
+reading the scores.
+
+classify() maps handicaps to classification bands, for whichever thresholds
+the governing body publishes.
+"""
+
+import threading
+
+import numpy as np
+
+from .round_catalogue import get_round_catalogue
+
+# Archery GB 2023 model constants
+ANG_0 = 5.0e-4
+STEP = 3.5
+DATUM = 6.0
+KD = 0.00365
+
+HANDICAP_MIN = -75
+HANDICAP_MAX = 150
+OUTDOOR_ARROW_DIAMETER = 5.5e-3
+INDOOR_ARROW_DIAMETER = 9.3e-3
+INDOOR_MAX_DISTANCE = 20
+
+_tables = None
+_tables_catalogue = None
+_tables_lock = threading.Lock()
+
+
+def sigma_r(handicap, distance):
+    """Radial spread of arrows (metres) at a handicap and distance (metres)."""
+    handicap = np.asarray(handicap, dtype=np.float64)
+    distance = np.asarray(distance, dtype=np.float64)
+    return distance * ANG_0 * (1.0 + STEP / 100.0) ** (handicap + DATUM) * np.exp(KD * distance)
+
+
+def expected_arrow_score(handicap, distance, face_size_cm):
+    """
+    Expected score of one arrow on a 10-zone face.
+
+    Args:
+        handicap: Handicap(s), broadcast against distance
+        distance: Distance(s) in metres
+        face_size_cm: Target face diameter(s) in centimetres
+
+    Returns:
+        ndarray: Expected arrow scores between 0 and 10
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    arrow_radius = np.where(distance <= INDOOR_MAX_DISTANCE, INDOOR_ARROW_DIAMETER, OUTDOOR_ARROW_DIAMETER) / 2
+    face = np.asarray(face_size_cm, dtype=np.float64) / 100.0
+    spread = sigma_r(handicap, distance)[..., np.newaxis]
+    rings = np.arange(1, 11)
+    edges = (rings * face[..., np.newaxis] / 20.0 + arrow_radius[..., np.newaxis]) / spread
+    return 10.0 - np.exp(-edges ** 2).sum(axis=-1)
+
+
+def expected_round_score(handicaps, ranges):
+    """
+    Expected total score of a round at each handicap.
+
+    Args:
+        handicaps: 1-D array of handicaps
+        ranges (list): (distance, face size cm, number of ends, arrows per end)
+            for each range of the round
+
+    Returns:
+        ndarray: Expected score for each handicap
+    """
+    handicaps = np.asarray(handicaps, dtype=np.float64)
+    total = np.zeros(len(handicaps))
+    for distance, face_size, ends, arrows_per_end in ranges:
+        distances = np.full(len(handicaps), distance)
+        total += ends * arrows_per_end * expected_arrow_score(handicaps, distances, face_size)
+    return total
+
+
+class HandicapTables:
+    """
+    Score/handicap tables for every round.
+
+    handicaps[i] goes with table_scores[r, i] for the round in row r of
+    round_ids; table scores fall as the handicap rises.
+    """
+
+    def __init__(self, rounds):
+        """
+        Args:
+            rounds (list): (RoundID, RoundName, PossibleScore, ranges) per round,
+                ranges as for expected_round_score()
+        """
+        self.handicaps = np.arange(HANDICAP_MIN, HANDICAP_MAX + 1, dtype=np.int16)
+        self.round_ids = np.array([r[0] for r in rounds], dtype=np.int32)
+        self.round_names = [r[1] for r in rounds]
+        self.possible_scores = np.array([r[2] for r in rounds], dtype=np.int32)
+        self.table_scores = np.empty((len(rounds), len(self.handicaps)), dtype=np.int32)
+        for row, (_, _, possible, ranges) in enumerate(rounds):
+            # Table scores are rounded up, as in the published tables
+            scores = np.ceil(expected_round_score(self.handicaps, ranges))
+            self.table_scores[row] = np.clip(scores, 0, possible)
+
+        self._row_by_id = {int(round_id): row for row, round_id in enumerate(self.round_ids)}
+        self._row_by_name = {name: row for row, name in enumerate(self.round_names)}
+
+        # Every round's table in ascending score order, each shifted past the
+        # one before, so one sorted array (and one searchsorted) serves all
+        self._offsets = np.concatenate(([0], np.cumsum(self.possible_scores[:-1] + 1))).astype(np.int64)
+        self._ascending = (self.table_scores[:, ::-1] + self._offsets[:, np.newaxis]).ravel()
+        self._starts = np.arange(len(rounds), dtype=np.int64) * len(self.handicaps)
+
+    def rows_for_ids(self, round_ids):
+        """Table row of each RoundID (-1 for unknown rounds)."""
+        return np.array([self._row_by_id.get(int(r), -1) if r is not None else -1 for r in round_ids],
+                        dtype=np.int64)
+
+    def rows_for_names(self, round_names):
+        """Table row of each round name (-1 for unknown rounds)."""
+        return np.array([self._row_by_name.get(name, -1) for name in round_names], dtype=np.int64)
+
+    def handicaps_for_rows(self, rows, scores):
+        """
+        Handicap earned by each score.
+
+        Args:
+            rows: Table row of each score's round (see rows_for_ids)
+            scores: Total scores
+
+        Returns:
+            ndarray: float handicaps, NaN where the round is unknown
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = np.asarray(scores, dtype=np.float64)
+        if len(self.round_ids) == 0:
+            # No rounds (an empty database): every round is unknown
+            return np.full(len(rows), np.nan)
+        known = (rows >= 0) & ~np.isnan(scores)
+        safe_rows = np.where(known, rows, 0)
+        keys = self._offsets[safe_rows] + np.clip(np.nan_to_num(scores), 0, self.possible_scores[safe_rows])
+        # Number of handicaps whose table score the score reaches
+        reached = np.searchsorted(self._ascending, keys, side="right") - self._starts[safe_rows]
+        result = np.where(reached > 0, HANDICAP_MAX + 1 - reached, HANDICAP_MAX).astype(np.float64)
+        result[~known] = np.nan
+        return result
+
+    def handicaps_for(self, round_ids, scores):
+        """Handicap earned by each score, by RoundID; see handicaps_for_rows()."""
+        return self.handicaps_for_rows(self.rows_for_ids(round_ids), scores)
+
+    def handicaps_for_names(self, round_names, scores):
+        """Handicap earned by each score, by round name; see handicaps_for_rows()."""
+        return self.handicaps_for_rows(self.rows_for_names(round_names), scores)
+
+    def score_for(self, round_id, handicap):
+        """Table score of a round at a whole handicap."""
+        row = self._row_by_id[int(round_id)]
+        index = int(np.clip(round(handicap), HANDICAP_MIN, HANDICAP_MAX)) - HANDICAP_MIN
+        return int(self.table_scores[row, index])
+
+
+def load_round_definitions(catalogue=None):
+    """(RoundID, RoundName, PossibleScore, ranges) for every round with ranges."""
+    catalogue = catalogue or get_round_catalogue()
+    return [
+        (definition.round_id, definition.name, definition.possible_score,
+         [(r.distance, r.face_size, r.number_of_ends, r.arrows_per_end) for r in definition.ranges])
+        for definition in catalogue
+        if definition.ranges
+    ]
+
+
+def get_handicap_tables():
+    """The shared HandicapTables, rebuilt whenever the round catalogue is reloaded."""
+    global _tables, _tables_catalogue
+    catalogue = get_round_catalogue()
+    if _tables is None or _tables_catalogue is not catalogue:
+        with _tables_lock:
+            if _tables is None or _tables_catalogue is not catalogue:
+                _tables = HandicapTables(load_round_definitions(catalogue))
+                _tables_catalogue = catalogue
+    return _tables
+
+
+def add_handicap_column(df, round_column="RoundName", score_column="TotalScore", tables=None):
+    """
+    Add a Handicap column to a DataFrame of scores.
+
+    Args:
+        df (DataFrame): Scores with round name and total score columns
+        round_column (str): Column holding the round name
+        score_column (str): Column holding the total score
+        tables (HandicapTables, optional): Tables to use instead of the
+            shared ones (e.g. a data snapshot's)
+
+    Returns:
+        DataFrame: df with a nullable integer Handicap column after the score,
+        or df unchanged if the tables cannot be loaded
+    """
+    if df.empty or round_column not in df or score_column not in df:
+        return df
+    try:
+        tables = tables or get_handicap_tables()
+    except Exception as e:
+        print(f"Error loading handicap tables: {e}")
+        return df
+    handicaps = tables.handicaps_for_names(df[round_column].tolist(), df[score_column].astype(float).to_numpy())
+    df = df.copy()
+    df.insert(df.columns.get_loc(score_column) + 1, "Handicap", handicaps)
+    df["Handicap"] = df["Handicap"].astype("Int16")
+    return df
+
+
+def classify(handicaps, thresholds, labels):
+    """
+    Classification band of each handicap.
+
+    Args:
+        handicaps: Handicaps (NaN for none)
+        thresholds: Highest handicap that earns each band, best band first
+            (ascending)
+        labels (list): Band names, best first, same length as thresholds
+
+    Returns:
+        ndarray: Band label per handicap, None where no band is reached
+    """
+    handicaps = np.asarray(handicaps, dtype=np.float64)
+    index = np.searchsorted(np.asarray(thresholds, dtype=np.float64), handicaps, side="left")
+    bands = np.array(list(labels) + [None], dtype=object)
+    index[np.isnan(handicaps)] = len(labels)
+    return bands[index]
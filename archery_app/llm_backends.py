@@ -0,0 +1,199 @@
+# archery_app/llm_backends.py
+
+import json
+import re
+import threading
+import time
+from string import Template
+
+from archery_app.settings import get_setting
+
+MODEL_NAME = "gemini-2.0-flash"
+
+# Default fixture used by the local stand-in backend
+DEFAULT_FIXTURE_PATH = "benchmarks/fixtures/sql_assistant_responses.json"
+
+# Reply the local backend gives to the system prompt (mirrors the model acknowledging it)
+SYSTEM_ACK = "Understood. I will follow these instructions for the rest of the conversation."
+
+_QUESTION_PATTERN = re.compile(r"^User Question:\s*(.*)$", re.MULTILINE)
+
+
+class ModelBackend:
+    """
+    Interface for the model that powers the SQL Assistant.
+
+    A backend hands out chat sessions. A chat session must provide
+    send_message(text) returning an object with a .text attribute, and a
+    .history attribute that can be passed back into start_chat() to
+    continue the conversation on the next turn. send_message(text,
+    stream=True) must return an iterable of chunks, each with a .text
+    attribute, as the reply is generated.
+    """
+
+    name = "base"
+
+    def start_chat(self, history=None):
+        raise NotImplementedError
+
+
+class GeminiBackend(ModelBackend):
+    """Google Gemini backend. The SDK is imported and configured on first use."""
+
+    name = "gemini"
+
+    def __init__(self, api_key, model_name=MODEL_NAME):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def start_chat(self, history=None):
+        return self._get_model().start_chat(history=history or [])
+
+
+class LocalResponse:
+    """Minimal stand-in for a Gemini response object."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class LocalStreamingResponse:
+    """Streams a canned reply in fixed-size chunks, like a streamed Gemini response."""
+
+    def __init__(self, text, chunk_size=40, delay=0.0):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.delay = delay
+
+    def __iter__(self):
+        for start in range(0, len(self.text), self.chunk_size):
+            if self.delay:
+                time.sleep(self.delay)
+            yield LocalResponse(self.text[start : start + self.chunk_size])
+
+
+class LocalChat:
+    """Chat session for LocalReplayBackend, storing history as plain dicts."""
+
+    def __init__(self, backend, history=None):
+        self.backend = backend
+        self.history = list(history or [])
+
+    def send_message(self, text, stream=False):
+        reply = self.backend.reply_to(text)
+        self.history.append({"role": "user", "parts": [text]})
+        self.history.append({"role": "model", "parts": [reply]})
+        if stream:
+            return LocalStreamingResponse(reply, delay=self.backend.stream_delay)
+        return LocalResponse(reply)
+
+
+class LocalReplayBackend(ModelBackend):
+    """
+    Deterministic offline backend that replays canned responses from a fixture.
+
+    The fixture is a JSON file of the form:
+        {
+          "default": "response used when nothing matches",
+          "responses": [
+            {"match": "regex on the user question", "response": "markdown reply"}
+          ]
+        }
+
+    Responses are string.Template templates, so "$question" is replaced with
+    the user's question. Rules are tried in order and the first match wins.
+    When streaming, stream_delay seconds are slept before each chunk to
+    mimic generation time.
+    """
+
+    name = "local"
+
+    def __init__(self, fixture_path=DEFAULT_FIXTURE_PATH, fixture=None, stream_delay=0.0):
+        self.stream_delay = stream_delay
+        if fixture is None:
+            with open(fixture_path, "r", encoding="utf-8") as f:
+                fixture = json.load(f)
+
+        self.default = fixture.get(
+            "default", "I'm running in offline mode and have no answer for that."
+        )
+        self.rules = [
+            (re.compile(rule["match"], re.IGNORECASE), Template(rule["response"]))
+            for rule in fixture.get("responses", [])
+        ]
+
+    def reply_to(self, text):
+        match = _QUESTION_PATTERN.search(text)
+        if not match:
+            # Anything that isn't a user question is the system prompt
+            return SYSTEM_ACK
+
+        question = match.group(1).strip()
+        for pattern, template in self.rules:
+            if pattern.search(question):
+                return template.safe_substitute(question=question)
+        return Template(self.default).safe_substitute(question=question)
+
+    def start_chat(self, history=None):
+        return LocalChat(self, history)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_model_backend(backend_name=None):
+    """
+    Build the backend named by SQL_ASSISTANT_BACKEND ("gemini" or "local").
+
+    Args:
+        backend_name (str, optional): Override for the configured backend
+
+    Returns:
+        ModelBackend: A new backend instance
+    """
+    backend_name = (
+        backend_name or get_setting("SQL_ASSISTANT_BACKEND", "gemini")
+    ).lower()
+
+    if backend_name == "local":
+        return LocalReplayBackend(
+            get_setting("SQL_ASSISTANT_FIXTURE", DEFAULT_FIXTURE_PATH),
+            stream_delay=get_setting("SQL_ASSISTANT_STREAM_DELAY_MS", 0, cast=float)
+            / 1000.0,
+        )
+    if backend_name == "gemini":
+        return GeminiBackend(
+            api_key=get_setting("GEMINI_API_KEY"),
+            model_name=get_setting("SQL_ASSISTANT_MODEL", MODEL_NAME),
+        )
+    raise ValueError(f"Unknown SQL Assistant backend: {backend_name}")
+
+
+def get_model_backend():
+    """Return the shared model backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_model_backend()
+    return _backend
+
+
+def set_model_backend(backend):
+    """Replace the shared model backend (used by benchmarks and offline runs)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
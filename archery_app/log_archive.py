@@ -0,0 +1,465 @@
+# archery_app/log_archive.py
+
+"""
+SecurityLog retention: monthly partitions, compressed archives and archive reads.
+
+On MySQL, SecurityLog is range-partitioned by month on EventTime (migration
+0002), one partition pYYYYMM per month plus a catch-all pmax. Each run of
+run_retention():
+
+1. adds the partitions for the next SECURITY_LOG_PARTITIONS_AHEAD months by
+   splitting the (empty) pmax, so inserts never land in pmax,
+2. writes every month older than SECURITY_LOG_RETENTION_MONTHS to
+   SECURITY_LOG_ARCHIVE_DIR/security_log_YYYY-MM.jsonl.gz, one JSON object per
+   row with the user and archer names resolved, plus a small
+   security_log_YYYY-MM.json manifest of counts for the dashboard,
+3. drops that month's partition, which is a metadata change rather than a
+   row-by-row DELETE. Without partitions (the SQLite backend, or MySQL before
+   the migration) the month is deleted in LogID-range chunks instead.
+
+Archives are read-only. read_archived_logs() and get_archived_summary() let
+the log viewer and dashboard include them: a query only opens the files of the
+months it covers, and whole archived months are counted from their manifests.
+
+Run it from cron (or the Security Logs page's Retention tab):
+    python -m archery_app.log_archive [--dry-run]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from datetime import date, datetime
+
+from .settings import get_setting
+
+ARCHIVE_PREFIX = "security_log_"
+CHUNK_ROWS = 5000
+
+_ARCHIVE_FILE = re.compile(r"^security_log_(\d{4})-(\d{2})\.jsonl\.gz$")
+_PARTITION_NAME = re.compile(r"^p(\d{4})(\d{2})$")
+
+# The archive keeps the viewer's columns so it can be read without joins
+_ARCHIVE_QUERY = """
+    SELECT l.LogID, l.EventTime, l.UserID, l.ArcherID, l.IPAddress, l.EventType,
+           l.Description, l.Severity, l.ActionURL, l.RequestDetails, l.IsReviewed,
+           l.ReviewedBy, l.ReviewedAt,
+           u1.Username as UserName,
+           CONCAT(a.FirstName, ' ', a.LastName) as ArcherName,
+           u2.Username as ReviewedByName
+    FROM SecurityLog l
+    LEFT JOIN AppUser u1 ON l.UserID = u1.UserID
+    LEFT JOIN Archer a ON l.ArcherID = a.ArcherID
+    LEFT JOIN AppUser u2 ON l.ReviewedBy = u2.UserID
+    WHERE l.EventTime >= %s AND l.EventTime < %s
+    ORDER BY l.LogID
+"""
+
+
+def get_archive_dir():
+    return get_setting("SECURITY_LOG_ARCHIVE_DIR", "security_log_archive")
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _as_datetime(value):
+    # SQLite returns aggregates such as MIN(EventTime) as text
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def partition_name(month):
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def partition_definitions(first_month, last_month):
+    """
+    PARTITION clauses for each month from first_month to last_month, plus pmax.
+
+    Args:
+        first_month (date): First day of the earliest month
+        last_month (date): First day of the latest month
+
+    Returns:
+        list: Partition definitions for PARTITION BY RANGE COLUMNS(EventTime)
+    """
+    definitions = []
+    month = first_month
+    while month <= last_month:
+        definitions.append(
+            f"PARTITION {partition_name(month)} VALUES LESS THAN ('{add_months(month, 1)} 00:00:00')"
+        )
+        month = add_months(month, 1)
+    definitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return definitions
+
+
+def _archive_paths(month):
+    base = os.path.join(get_archive_dir(), f"{ARCHIVE_PREFIX}{month:%Y-%m}")
+    return base + ".jsonl.gz", base + ".json"
+
+
+def list_archives():
+    """Archived months, newest first, with their manifests."""
+    directory = get_archive_dir()
+    if not os.path.isdir(directory):
+        return []
+    archives = []
+    for filename in os.listdir(directory):
+        match = _ARCHIVE_FILE.match(filename)
+        if not match:
+            continue
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        data_path, manifest_path = _archive_paths(month)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        archives.append({
+            "month": month,
+            "path": data_path,
+            "bytes": os.path.getsize(data_path),
+            "manifest": manifest,
+        })
+    archives.sort(key=lambda archive: archive["month"], reverse=True)
+    return archives
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(" ", timespec="seconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def _read_archive(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            for key in ("EventTime", "ReviewedAt"):
+                if row.get(key):
+                    row[key] = datetime.fromisoformat(row[key])
+            yield row
+
+
+def archive_month(conn, month):
+    """
+    Write one month of SecurityLog rows to its archive file and manifest.
+
+    Rows already in an existing archive for the month (from an earlier,
+    interrupted run) are kept, so the file always holds the whole month.
+
+    Returns:
+        int: Rows written for the month
+    """
+    os.makedirs(get_archive_dir(), exist_ok=True)
+    data_path, manifest_path = _archive_paths(month)
+
+    rows = {}
+    if os.path.exists(data_path):
+        rows = {row["LogID"]: {k: _json_value(v) for k, v in row.items()} for row in _read_archive(data_path)}
+
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(_ARCHIVE_QUERY, (month, add_months(month, 1)))
+    while True:
+        batch = cursor.fetchmany(CHUNK_ROWS)
+        if not batch:
+            break
+        for row in batch:
+            row["IsReviewed"] = bool(row["IsReviewed"])
+            rows[row["LogID"]] = {key: _json_value(value) for key, value in row.items()}
+    cursor.close()
+
+    manifest = {
+        "month": f"{month:%Y-%m}",
+        "rows": len(rows),
+        "unreviewed": 0,
+        "by_severity": {},
+        "by_event_type": {},
+        "archived_at": datetime.now().isoformat(" ", timespec="seconds"),
+    }
+    # Write to temporary files and rename, so a reader never sees half a file
+    with gzip.open(data_path + ".tmp", "wt", encoding="utf-8") as f:
+        for log_id in sorted(rows):
+            row = rows[log_id]
+            f.write(json.dumps(row) + "\n")
+            manifest["unreviewed"] += not row["IsReviewed"]
+            manifest["by_severity"][row["Severity"]] = manifest["by_severity"].get(row["Severity"], 0) + 1
+            manifest["by_event_type"][row["EventType"]] = manifest["by_event_type"].get(row["EventType"], 0) + 1
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(data_path + ".tmp", data_path)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return len(rows)
+
+
+def get_partitions(conn):
+    """Month partitions of SecurityLog as {name: first day}, empty if it is not partitioned."""
+    from .database import get_database_backend
+
+    if get_database_backend().name != "mysql":
+        return {}
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'SecurityLog' "
+        "AND PARTITION_NAME IS NOT NULL"
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions[name] = date(int(match.group(1)), int(match.group(2)), 1)
+        elif name == "pmax":
+            partitions[name] = None
+    cursor.close()
+    return partitions
+
+
+def ensure_partitions(conn, months_ahead=None, today=None):
+    """
+    Split pmax so the current month and the next months_ahead have partitions.
+
+    Returns:
+        list: Names of the partitions added
+    """
+    if months_ahead is None:
+        months_ahead = get_setting("SECURITY_LOG_PARTITIONS_AHEAD", 3, cast=int)
+    partitions = get_partitions(conn)
+    if "pmax" not in partitions:
+        return []
+
+    existing = [month for month in partitions.values() if month]
+    month = add_months(max(existing), 1) if existing else month_start(today or date.today())
+    last = add_months(month_start(today or date.today()), months_ahead)
+    if month > last:
+        return []
+
+    definitions = partition_definitions(month, last)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"ALTER TABLE SecurityLog REORGANIZE PARTITION pmax INTO ({', '.join(definitions)})"
+    )
+    cursor.close()
+    conn.commit()
+    return [definition.split()[1] for definition in definitions[:-1]]
+
+
+def _delete_month(conn, month):
+    """Delete a month of rows in LogID-range chunks (tables without partitions)."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT MIN(LogID), MAX(LogID) FROM SecurityLog WHERE EventTime >= %s AND EventTime < %s",
+        (month, add_months(month, 1)),
+    )
+    low, high = cursor.fetchone()
+    deleted = 0
+    while low is not None and low <= high:
+        cursor.execute(
+            "DELETE FROM SecurityLog WHERE LogID >= %s AND LogID < %s "
+            "AND EventTime >= %s AND EventTime < %s",
+            (low, low + CHUNK_ROWS, month, add_months(month, 1)),
+        )
+        deleted += max(cursor.rowcount, 0)
+        conn.commit()
+        low += CHUNK_ROWS
+    cursor.close()
+    return deleted
+
+
+def run_retention(retention_months=None, today=None, dry_run=False, log=print):
+    """
+    Add future partitions, then archive and drop months past the retention period.
+
+    Args:
+        retention_months (int, optional): Whole months kept in the database
+            before the current one (SECURITY_LOG_RETENTION_MONTHS)
+        today (date, optional): Reference date, for testing
+        dry_run (bool): Only report what would be archived
+        log (callable, optional): Progress output, None for silence
+
+    Returns:
+        list: (month, rows) for each month archived
+    """
+    from .database import get_connection
+
+    if retention_months is None:
+        retention_months = get_setting("SECURITY_LOG_RETENTION_MONTHS", 12, cast=int)
+    log = log or (lambda message: None)
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+
+    conn = get_connection()
+    archived = []
+    try:
+        if not dry_run:
+            added = ensure_partitions(conn, today=today)
+            if added:
+                log(f"Added partitions {', '.join(added)}")
+        partitions = get_partitions(conn)
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(EventTime) FROM SecurityLog WHERE EventTime < %s", (cutoff,))
+        oldest = _as_datetime(cursor.fetchone()[0])
+        cursor.close()
+
+        month = month_start(oldest) if oldest else cutoff
+        while month < cutoff:
+            if dry_run:
+                log(f"Would archive {month:%Y-%m}")
+                month = add_months(month, 1)
+                continue
+            started = time.perf_counter()
+            rows = archive_month(conn, month)
+            name = partition_name(month)
+            if name in partitions:
+                cursor = conn.cursor()
+                cursor.execute(f"ALTER TABLE SecurityLog DROP PARTITION {name}")
+                cursor.close()
+            else:
+                _delete_month(conn, month)
+            conn.commit()
+            log(f"Archived {month:%Y-%m}: {rows:,} rows in {time.perf_counter() - started:.1f} s")
+            archived.append((month, rows))
+            month = add_months(month, 1)
+    finally:
+        conn.close()
+    return archived
+
+
+def get_log_storage():
+    """
+    Where the security log lives: database date range, partitions and archives.
+
+    Uses only cheap lookups (the EventTime index and partition statistics),
+    as it is shown on every render of the Security Logs page.
+
+    Returns:
+        dict: oldest, newest, partitions ([{"Partition", "Rows"}], estimates)
+        and archives (as list_archives())
+    """
+    from .database import get_connection, get_database_backend
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(EventTime), MAX(EventTime) FROM SecurityLog")
+    oldest, newest = (_as_datetime(value) for value in cursor.fetchone())
+    partitions = []
+    if get_database_backend().name == "mysql":
+        cursor.execute(
+            "SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'SecurityLog' "
+            "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+        )
+        partitions = [{"Partition": name, "Rows": rows} for name, rows in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return {"oldest": oldest, "newest": newest, "partitions": partitions, "archives": list_archives()}
+
+
+def _matches(row, start_date, end_date, user_id, event_type, severity, is_reviewed):
+    if start_date and row["EventTime"] < start_date:
+        return False
+    if end_date and row["EventTime"] > end_date:
+        return False
+    if user_id and row["UserID"] != user_id:
+        return False
+    if event_type and row["EventType"] != event_type:
+        return False
+    if severity and row["Severity"] != severity:
+        return False
+    if is_reviewed is not None and bool(row["IsReviewed"]) != is_reviewed:
+        return False
+    return True
+
+
+def read_archived_logs(start_date=None, end_date=None, user_id=None, event_type=None,
+                       severity=None, is_reviewed=None, limit=100):
+    """
+    Archived log rows matching the viewer's filters, newest first.
+
+    Only the archives of months between start_date and end_date are opened,
+    newest first, stopping once limit rows have been found.
+
+    Returns:
+        list: Rows shaped like get_security_logs(), with Archived = True
+    """
+    rows = []
+    end_month = month_start(end_date) if end_date else None
+    for archive in list_archives():
+        month = archive["month"]
+        if start_date and add_months(month, 1) <= month_start(start_date):
+            break
+        if end_month and month > end_month:
+            continue
+        for row in _read_archive(archive["path"]):
+            if _matches(row, start_date, end_date, user_id, event_type, severity, is_reviewed):
+                row["Archived"] = True
+                rows.append(row)
+        if len(rows) >= limit:
+            break
+    rows.sort(key=lambda row: (row["EventTime"], row["LogID"]), reverse=True)
+    return rows[:limit]
+
+
+def get_archived_summary(start_time):
+    """
+    Dashboard counts for archived events at or after start_time.
+
+    Months entirely after start_time are counted from their manifests; only
+    the month containing start_time is read.
+
+    Returns:
+        dict: total, unreviewed, by_severity and by_event_type ({name: count})
+    """
+    summary = {"total": 0, "unreviewed": 0, "by_severity": {}, "by_event_type": {}}
+    for archive in list_archives():
+        month = archive["month"]
+        if add_months(month, 1) <= month_start(start_time):
+            break
+        if month >= start_time.date() and archive["manifest"]:
+            manifest = archive["manifest"]
+            summary["total"] += manifest["rows"]
+            summary["unreviewed"] += manifest["unreviewed"]
+            counts = [(manifest["by_severity"], summary["by_severity"]),
+                      (manifest["by_event_type"], summary["by_event_type"])]
+        else:
+            counts = []
+            for row in _read_archive(archive["path"]):
+                if row["EventTime"] < start_time:
+                    continue
+                summary["total"] += 1
+                summary["unreviewed"] += not row["IsReviewed"]
+                for key, target in (("Severity", "by_severity"), ("EventType", "by_event_type")):
+                    summary[target][row[key]] = summary[target].get(row[key], 0) + 1
+        for source, target in counts:
+            for name, count in source.items():
+                target[name] = target.get(name, 0) + count
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive and drop SecurityLog months past retention.")
+    parser.add_argument("--retention-months", type=int, help="Override SECURITY_LOG_RETENTION_MONTHS")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    archived = run_retention(args.retention_months, dry_run=args.dry_run)
+    if not archived and not args.dry_run:
+        print("Nothing to archive.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,542 @@
+# archery_app/migrations.py
+
+"""
+Versioned schema migrations.
+
+create_tables.sql and create_procedures.sql are the baseline schema; every
+later change is a numbered file in migrations/:
+
+- NNNN_name.sql - statements ending in ";" at the end of a line, run on every
+  backend; NNNN_name.mysql.sql / NNNN_name.sqlite.sql run on that backend only,
+- NNNN_name.py - defines upgrade(migration) for data changes; anything that
+  touches many rows should go through migration.backfill().
+
+Applied versions are recorded in SchemaMigration together with the file's
+checksum, so each one runs once and `status` shows files edited after they
+were applied.
+
+The runner is meant for a busy production database:
+
+- CREATE INDEX / DROP INDEX run with ALGORITHM=INPLACE LOCK=NONE on MySQL,
+  and ALTER TABLE gets the same options unless it names its own, so a change
+  that cannot be made online fails instead of blocking writes,
+- index statements are skipped when the index already exists (or is already
+  gone), so a migration interrupted part-way can simply be run again,
+- DDL waits at most MIGRATION_LOCK_WAIT_TIMEOUT seconds for a table's
+  metadata lock and is retried, instead of queuing every other query on the
+  table behind a long-running one,
+- backfills run in key-range chunks of MIGRATION_BATCH_SIZE rows, each
+  committed on its own, pausing MIGRATION_THROTTLE times the chunk's run time
+  between chunks,
+- only one runner works at a time (GET_LOCK on MySQL).
+
+Stored procedures are redeployed from create_procedures.sql with the
+`procedures` command: only procedures whose text changed since their last
+deploy (recorded in SchemaProcedure) are dropped and re-created. On the SQLite
+backend the procedures are Python, and pending migrations are applied when the
+database is opened.
+
+Usage:
+    python -m archery_app.migrations status
+    python -m archery_app.migrations migrate [--to N] [--dry-run]
+    python -m archery_app.migrations procedures [--force] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+import time
+
+from mysql.connector import errors
+
+from .settings import get_setting
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+PROCEDURES_FILE = os.path.join(os.path.dirname(MIGRATIONS_DIR), "create_procedures.sql")
+LOCK_NAME = "archery_migrations"
+
+_MIGRATION_FILE = re.compile(r"^(\d+)_(\w+?)(?:\.(mysql|sqlite))?\.(sql|py)$")
+_STATEMENT_END = re.compile(r";[ \t]*$", re.M)
+_CREATE_INDEX = re.compile(r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?", re.I)
+_DROP_INDEX = re.compile(r"^\s*DROP\s+INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?\s*$", re.I)
+_ALTER_TABLE = re.compile(r"^\s*ALTER\s+TABLE\b", re.I)
+_ONLINE_OPTIONS = re.compile(r"\b(ALGORITHM|LOCK)\s*=", re.I)
+_PROCEDURE_BLOCK = re.compile(r"DELIMITER //\s*(CREATE\s+PROCEDURE\s+(\w+).*?)\s*//\s*DELIMITER ;", re.I | re.S)
+
+_TRACKING_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS SchemaMigration (
+        Version INT PRIMARY KEY,
+        Name VARCHAR(100) NOT NULL,
+        Checksum CHAR(64) NOT NULL,
+        AppliedAt DATETIME NOT NULL,
+        DurationMs INT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SchemaProcedure (
+        Name VARCHAR(64) PRIMARY KEY,
+        Checksum CHAR(64) NOT NULL,
+        DeployedAt DATETIME NOT NULL
+    )
+    """,
+]
+
+
+def _default_backend():
+    from .database import get_database_backend
+
+    return get_database_backend()
+
+
+def _checksum(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def discover_migrations(backend_name, directory=MIGRATIONS_DIR):
+    """
+    List the migration files that apply to a backend.
+
+    Args:
+        backend_name (str): "mysql" or "sqlite"
+        directory (str): Folder holding the numbered migration files
+
+    Returns:
+        list: Dicts with version, name, path and checksum, in version order
+    """
+    migrations = {}
+    if not os.path.isdir(directory):
+        return []
+    for filename in sorted(os.listdir(directory)):
+        match = _MIGRATION_FILE.match(filename)
+        if not match or match.group(3) not in (None, backend_name):
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(
+                f"Migration {version} has more than one file for {backend_name}: "
+                f"{migrations[version]['path']} and {filename}"
+            )
+        path = os.path.join(directory, filename)
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        migrations[version] = {
+            "version": version,
+            "name": match.group(2),
+            "path": path,
+            "kind": match.group(4),
+            "text": text,
+            "checksum": _checksum(text),
+        }
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def split_statements(text):
+    """Split a migration script into statements, dropping comment lines."""
+    lines = [line for line in text.splitlines() if not line.strip().startswith("--")]
+    return [s.strip() for s in _STATEMENT_END.split("\n".join(lines)) if s.strip()]
+
+
+def ensure_tracking_tables(conn):
+    cursor = conn.cursor()
+    for ddl in _TRACKING_TABLES:
+        cursor.execute(ddl)
+    cursor.close()
+    conn.commit()
+
+
+def get_applied_migrations(conn):
+    """Return {version: row} from SchemaMigration."""
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT Version, Name, Checksum, AppliedAt, DurationMs FROM SchemaMigration")
+    applied = {row["Version"]: row for row in cursor.fetchall()}
+    cursor.close()
+    return applied
+
+
+def index_exists(conn, backend_name, table, index_name):
+    cursor = conn.cursor()
+    if backend_name == "sqlite":
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = %s", (index_name,)
+        )
+    else:
+        cursor.execute(
+            "SELECT 1 FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1",
+            (table, index_name),
+        )
+    found = cursor.fetchone() is not None
+    cursor.close()
+    return found
+
+
+def online_statement(conn, backend_name, sql):
+    """
+    Rewrite one migration statement for the backend, or None to skip it.
+
+    Index statements that are already satisfied are skipped; on MySQL index
+    and ALTER TABLE statements are made online-only.
+    """
+    create = _CREATE_INDEX.match(sql)
+    drop = _DROP_INDEX.match(sql)
+    if create and index_exists(conn, backend_name, create.group(2), create.group(1)):
+        return None
+    if drop and not index_exists(conn, backend_name, drop.group(2), drop.group(1)):
+        return None
+
+    if backend_name == "sqlite":
+        # SQLite's DROP INDEX has no ON clause
+        return f"DROP INDEX IF EXISTS {drop.group(1)}" if drop else sql
+    if _ONLINE_OPTIONS.search(sql):
+        return sql
+    if create or drop:
+        return f"{sql} ALGORITHM=INPLACE LOCK=NONE"
+    if _ALTER_TABLE.match(sql):
+        return f"{sql}, ALGORITHM=INPLACE, LOCK=NONE"
+    return sql
+
+
+def execute_ddl(conn, sql):
+    """Run a statement, retrying when it times out waiting for a metadata lock."""
+    retries = get_setting("MIGRATION_DDL_RETRIES", 3, cast=int)
+    for attempt in range(retries + 1):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            if cursor.description:
+                cursor.fetchall()
+            conn.commit()
+            return
+        except errors.DatabaseError as err:
+            # 1205: lock wait timeout, which is also how a metadata lock wait
+            # ends. The driver raises it (SQLSTATE HY000) as a plain DatabaseError.
+            if err.errno != 1205 or attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+        finally:
+            cursor.close()
+
+
+def backfill(conn, table, key_column, sql, batch_size=None, throttle=None, log=print):
+    """
+    Run an UPDATE or INSERT ... SELECT over a large table in key-range chunks.
+
+    Each chunk is its own transaction, so locks are held briefly, and the
+    runner pauses for throttle x the chunk's run time between chunks so other
+    sessions (and replicas) keep up.
+
+    Args:
+        conn: Database connection
+        table (str): Table whose key range is walked
+        key_column (str): Integer key of that table, usually the primary key
+        sql (str): Statement limited to key_column >= %(start)s AND key_column < %(end)s
+        batch_size (int, optional): Keys per chunk (MIGRATION_BATCH_SIZE)
+        throttle (float, optional): Pause as a multiple of chunk time (MIGRATION_THROTTLE)
+        log (callable, optional): Progress output
+
+    Returns:
+        int: Rows affected
+    """
+    batch_size = batch_size or get_setting("MIGRATION_BATCH_SIZE", 5000, cast=int)
+    if throttle is None:
+        throttle = get_setting("MIGRATION_THROTTLE", 1.0, cast=float)
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MIN({key_column}), MAX({key_column}) FROM {table}")
+    low, high = cursor.fetchone()
+    if low is None:
+        cursor.close()
+        return 0
+
+    total = 0
+    chunks = 0
+    reported = time.perf_counter()
+    start = low
+    while start <= high:
+        began = time.perf_counter()
+        cursor.execute(sql, {"start": start, "end": start + batch_size})
+        total += max(cursor.rowcount, 0)
+        conn.commit()
+        elapsed = time.perf_counter() - began
+        chunks += 1
+        start += batch_size
+
+        if log and time.perf_counter() - reported >= 10:
+            done = min(1.0, (start - low) / max(high - low + 1, 1))
+            log(f"    {table}: {done:.0%} ({total:,} rows, {chunks:,} chunks)")
+            reported = time.perf_counter()
+        if throttle and start <= high:
+            time.sleep(elapsed * throttle)
+    cursor.close()
+    return total
+
+
+class MigrationContext:
+    """What a Python migration's upgrade(migration) gets to work with."""
+
+    def __init__(self, conn, backend_name, log):
+        self.conn = conn
+        self.backend_name = backend_name
+        self.log = log
+
+    def execute(self, sql):
+        """Run a DDL or single statement the way .sql migrations are run."""
+        sql = online_statement(self.conn, self.backend_name, sql)
+        if sql is not None:
+            execute_ddl(self.conn, sql)
+
+    def query(self, sql, params=None):
+        cursor = self.conn.cursor(dictionary=True)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def backfill(self, table, key_column, sql, batch_size=None, throttle=None):
+        return backfill(self.conn, table, key_column, sql, batch_size, throttle, self.log)
+
+
+def _load_upgrade(migration):
+    spec = importlib.util.spec_from_file_location(
+        f"archery_migration_{migration['version']}", migration["path"]
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.upgrade
+
+
+class _RunnerLock:
+    """GET_LOCK on MySQL so two deploys cannot migrate at once."""
+
+    def __init__(self, conn, backend_name):
+        self.conn = conn
+        self.enabled = backend_name == "mysql"
+
+    def __enter__(self):
+        if self.enabled:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SET SESSION lock_wait_timeout = %s",
+                (get_setting("MIGRATION_LOCK_WAIT_TIMEOUT", 5, cast=int),),
+            )
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+            locked = cursor.fetchone()[0]
+            cursor.close()
+            if locked != 1:
+                raise RuntimeError("Another migration run is in progress")
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.enabled:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchall()
+            cursor.close()
+
+
+def migration_status(connect=None, backend_name=None):
+    """
+    Applied and pending migrations.
+
+    Returns:
+        list: Dicts with Version, Name, Status (applied, pending, modified or
+        missing file), AppliedAt and DurationMs
+    """
+    backend = None if connect and backend_name else _default_backend()
+    connect = connect or backend.connect
+    backend_name = backend_name or backend.name
+
+    conn = connect()
+    try:
+        ensure_tracking_tables(conn)
+        applied = get_applied_migrations(conn)
+    finally:
+        conn.close()
+
+    rows = []
+    files = {m["version"]: m for m in discover_migrations(backend_name)}
+    for version in sorted(set(files) | set(applied)):
+        migration, record = files.get(version), applied.get(version)
+        if record is None:
+            status = "pending"
+        elif migration is None:
+            status = "missing file"
+        elif migration["checksum"] != record["Checksum"]:
+            status = "modified"
+        else:
+            status = "applied"
+        rows.append({
+            "Version": version,
+            "Name": migration["name"] if migration else record["Name"],
+            "Status": status,
+            "AppliedAt": record["AppliedAt"] if record else None,
+            "DurationMs": record["DurationMs"] if record else None,
+        })
+    return rows
+
+
+def apply_migrations(connect=None, backend_name=None, target=None, dry_run=False, log=print):
+    """
+    Apply pending migrations in version order.
+
+    Args:
+        connect (callable, optional): Returns a new connection (default: the configured backend)
+        backend_name (str, optional): "mysql" or "sqlite" (default: the configured backend)
+        target (int, optional): Stop after this version
+        dry_run (bool): Only print what would run
+        log (callable, optional): Progress output, None for silence
+
+    Returns:
+        list: Versions applied
+    """
+    backend = None if connect and backend_name else _default_backend()
+    connect = connect or backend.connect
+    backend_name = backend_name or backend.name
+    log = log or (lambda message: None)
+
+    conn = connect()
+    done = []
+    try:
+        ensure_tracking_tables(conn)
+        with _RunnerLock(conn, backend_name):
+            applied = get_applied_migrations(conn)
+            for migration in discover_migrations(backend_name):
+                version = migration["version"]
+                if version in applied or (target is not None and version > target):
+                    continue
+                log(f"Migration {version:04d} {migration['name']}")
+                started = time.perf_counter()
+
+                if migration["kind"] == "py":
+                    if dry_run:
+                        log("  upgrade() (Python migration)")
+                        continue
+                    _load_upgrade(migration)(MigrationContext(conn, backend_name, log))
+                else:
+                    for sql in split_statements(migration["text"]):
+                        statement = online_statement(conn, backend_name, sql)
+                        if statement is None:
+                            log(f"  skipped (already done): {sql.splitlines()[0]}")
+                        elif dry_run:
+                            log(f"  {statement}")
+                        else:
+                            execute_ddl(conn, statement)
+                if dry_run:
+                    continue
+
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO SchemaMigration (Version, Name, Checksum, AppliedAt, DurationMs) "
+                    "VALUES (%s, %s, %s, NOW(), %s)",
+                    (version, migration["name"], migration["checksum"], duration_ms),
+                )
+                cursor.close()
+                conn.commit()
+                log(f"  applied in {duration_ms / 1000:.1f} s")
+                done.append(version)
+    finally:
+        conn.close()
+    return done
+
+
+def load_procedure_definitions(path=PROCEDURES_FILE):
+    """Return {name: CREATE PROCEDURE statement} from create_procedures.sql."""
+    with open(path, "r", encoding="utf-8") as f:
+        return {name: body for body, name in _PROCEDURE_BLOCK.findall(f.read())}
+
+
+def deploy_procedures(connect=None, backend_name=None, force=False, dry_run=False, log=print):
+    """
+    Re-create the stored procedures whose definition changed since their last deploy.
+
+    Args:
+        connect (callable, optional): Returns a new connection (default: the configured backend)
+        backend_name (str, optional): "mysql" or "sqlite" (default: the configured backend)
+        force (bool): Redeploy every procedure
+        dry_run (bool): Only list what would be redeployed
+        log (callable, optional): Progress output, None for silence
+
+    Returns:
+        list: Names of the procedures redeployed
+    """
+    backend = None if connect and backend_name else _default_backend()
+    connect = connect or backend.connect
+    backend_name = backend_name or backend.name
+    log = log or (lambda message: None)
+
+    if backend_name == "sqlite":
+        log("The SQLite backend's procedures are built in; nothing to deploy.")
+        return []
+
+    conn = connect()
+    deployed = []
+    try:
+        ensure_tracking_tables(conn)
+        with _RunnerLock(conn, backend_name):
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT ROUTINE_NAME FROM information_schema.ROUTINES "
+                "WHERE ROUTINE_SCHEMA = DATABASE() AND ROUTINE_TYPE = 'PROCEDURE'"
+            )
+            existing = {row[0].lower() for row in cursor.fetchall()}
+            cursor.execute("SELECT Name, Checksum FROM SchemaProcedure")
+            recorded = {name: checksum for name, checksum in cursor.fetchall()}
+
+            for name, definition in load_procedure_definitions().items():
+                checksum = _checksum(" ".join(definition.split()))
+                if not force and name.lower() in existing and recorded.get(name) == checksum:
+                    continue
+                log(f"Procedure {name}")
+                if dry_run:
+                    continue
+                # MySQL has no CREATE OR REPLACE PROCEDURE; the drop and create
+                # are back to back so callers only miss it for milliseconds
+                cursor.execute(f"DROP PROCEDURE IF EXISTS {name}")
+                cursor.execute(definition)
+                cursor.execute(
+                    "REPLACE INTO SchemaProcedure (Name, Checksum, DeployedAt) VALUES (%s, %s, NOW())",
+                    (name, checksum),
+                )
+                conn.commit()
+                deployed.append(name)
+            cursor.close()
+    finally:
+        conn.close()
+    return deployed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply schema migrations and redeploy stored procedures.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="List applied and pending migrations")
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending migrations")
+    migrate_parser.add_argument("--to", type=int, help="Stop after this version")
+    migrate_parser.add_argument("--dry-run", action="store_true")
+    procedures_parser = subparsers.add_parser("procedures", help="Redeploy changed stored procedures")
+    procedures_parser.add_argument("--force", action="store_true", help="Redeploy all of them")
+    procedures_parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(f"Database: {_default_backend().describe()}")
+    if args.command == "status":
+        for row in migration_status():
+            applied = f"  {row['AppliedAt']} ({row['DurationMs']} ms)" if row["AppliedAt"] else ""
+            print(f"  {row['Version']:04d} {row['Name']:<40} {row['Status']}{applied}")
+    elif args.command == "migrate":
+        applied = apply_migrations(target=args.to, dry_run=args.dry_run)
+        if not applied and not args.dry_run:
+            print("No pending migrations.")
+    else:
+        deployed = deploy_procedures(force=args.force, dry_run=args.dry_run)
+        if not deployed and not args.dry_run:
+            print("All procedures are up to date.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
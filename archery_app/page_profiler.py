@@ -0,0 +1,252 @@
+# archery_app/page_profiler.py
+
+"""
+Per-page render timing for the main menu.
+
+render_page() runs every page inside profile_page(), which records for that
+rerun:
+
+- wall time of the page function (including its first-use import),
+- DB time: the sum of the queries it ran, reported by query_stats. Without
+  QUERY_STATS_ENABLED it is unknown (None) and counted in the other time,
+- chart time: time spent in st.pyplot / st.*_chart calls, which is where
+  matplotlib figures are drawn and serialised.
+
+Whatever is left is page code: building DataFrames, figures and widgets.
+Samples go to a bounded in-memory history shared by all sessions (shown on
+the admin Performance page) and the session's last sample is kept for the
+sidebar diagnostics panel.
+
+An admin can ask for the next rerun to be run under cProfile; the report and
+the raw .prof file are kept in their session for viewing and download. Only
+one cProfile capture runs at a time in the process.
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+
+from .query_stats import add_query_listener, get_stats_settings
+from .settings import get_setting
+
+CHART_FUNCTIONS = (
+    "pyplot", "altair_chart", "plotly_chart", "vega_lite_chart",
+    "bar_chart", "line_chart", "area_chart", "scatter_chart",
+)
+CPROFILE_REPORT_LINES = 40
+
+_local = threading.local()
+_lock = threading.Lock()
+_cprofile_lock = threading.Lock()
+_history = None
+_settings = None
+
+
+def get_profiler_settings():
+    global _settings, _history
+    if _settings is None:
+        _settings = {
+            "enabled": get_setting("PAGE_PROFILE_ENABLED", True, cast=bool),
+            "history": get_setting("PAGE_PROFILE_HISTORY", 1000, cast=int),
+        }
+        _history = deque(maxlen=_settings["history"])
+    return _settings
+
+
+def _on_query(elapsed_ms):
+    sample = getattr(_local, "sample", None)
+    if sample is not None:
+        sample["DB ms"] += elapsed_ms
+        sample["Queries"] += 1
+
+
+def _timed_chart(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        sample = getattr(_local, "sample", None)
+        if sample is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sample["Chart ms"] += (time.perf_counter() - start) * 1000
+            sample["Charts"] += 1
+
+    wrapper._page_profiler = True
+    return wrapper
+
+
+def install_hooks():
+    """Hook query timing and wrap Streamlit's chart functions (once per process)."""
+    add_query_listener(_on_query)
+    for name in CHART_FUNCTIONS:
+        func = getattr(st, name, None)
+        if func is not None and not getattr(func, "_page_profiler", False):
+            setattr(st, name, _timed_chart(func))
+
+
+def request_cprofile():
+    """Run the current session's next page render under cProfile."""
+    st.session_state.cprofile_next_rerun = True
+
+
+def _start_cprofile():
+    if not st.session_state.get("cprofile_next_rerun") or not st.session_state.get("is_admin"):
+        return None
+    st.session_state.cprofile_next_rerun = False
+    if not _cprofile_lock.acquire(blocking=False):
+        st.session_state.cprofile_result = {"error": "Another profile is running; try again."}
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _finish_cprofile(profiler, sample):
+    try:
+        profiler.disable()
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        stats.sort_stats("cumulative").print_stats(CPROFILE_REPORT_LINES)
+
+        fd, path = tempfile.mkstemp(suffix=".prof")
+        os.close(fd)
+        try:
+            stats.dump_stats(path)
+            with open(path, "rb") as f:
+                raw = f.read()
+        finally:
+            os.remove(path)
+
+        st.session_state.cprofile_result = {
+            "page": sample["Page"],
+            "time": sample["Time"],
+            "wall_ms": sample["Wall ms"],
+            "report": report.getvalue(),
+            "prof": raw,
+        }
+    except Exception as e:
+        print(f"Error capturing page profile: {e}")
+    finally:
+        _cprofile_lock.release()
+
+
+@contextmanager
+def profile_page(page):
+    """
+    Time one page render and record it.
+
+    Args:
+        page (str): Registered page name
+    """
+    if not get_profiler_settings()["enabled"] or getattr(_local, "sample", None) is not None:
+        yield
+        return
+
+    sample = {
+        "Time": datetime.now(),
+        "Page": page,
+        "Wall ms": 0.0,
+        "DB ms": 0.0,
+        "Queries": 0,
+        "Chart ms": 0.0,
+        "Charts": 0,
+        "Other ms": 0.0,
+        "Outcome": "ok",
+    }
+    if not get_stats_settings()["enabled"]:
+        # No query timing: DB time is unknown rather than zero
+        sample["DB ms"] = sample["Queries"] = None
+    profiler = _start_cprofile()
+    _local.sample = sample
+    start = time.perf_counter()
+    try:
+        yield sample
+    except BaseException as err:
+        # st.rerun()/st.stop() end a page with a control exception
+        sample["Outcome"] = type(err).__name__
+        raise
+    finally:
+        sample["Wall ms"] = (time.perf_counter() - start) * 1000
+        _local.sample = None
+        sample["Other ms"] = max(0.0, sample["Wall ms"] - (sample["DB ms"] or 0.0) - sample["Chart ms"])
+        for key in ("Wall ms", "DB ms", "Chart ms", "Other ms"):
+            if sample[key] is not None:
+                sample[key] = round(sample[key], 2)
+        if profiler is not None:
+            _finish_cprofile(profiler, sample)
+        with _lock:
+            _history.append(sample)
+        try:
+            st.session_state.last_page_timing = sample
+        except Exception:
+            pass
+
+
+def get_page_timings():
+    """Return the recorded samples (all sessions), oldest first."""
+    get_profiler_settings()
+    with _lock:
+        return list(_history)
+
+
+def reset_page_timings():
+    get_profiler_settings()
+    with _lock:
+        _history.clear()
+
+
+def display_diagnostics_panel():
+    """Sidebar panel for admins: this rerun's timing breakdown and cProfile capture."""
+    with st.sidebar.expander("⏱️ Diagnostics"):
+        sample = st.session_state.get("last_page_timing")
+        if sample:
+            st.write(f"**{sample['Page']}**: {sample['Wall ms']:.0f} ms")
+            if sample["DB ms"] is None:
+                st.caption(
+                    f"DB time unavailable (QUERY_STATS_ENABLED is off) · "
+                    f"charts {sample['Chart ms']:.0f} ms ({sample['Charts']}) · "
+                    f"other {sample['Other ms']:.0f} ms, DB included"
+                )
+            else:
+                st.caption(
+                    f"DB {sample['DB ms']:.0f} ms ({sample['Queries']} queries) · "
+                    f"charts {sample['Chart ms']:.0f} ms ({sample['Charts']}) · "
+                    f"other {sample['Other ms']:.0f} ms"
+                )
+
+        if st.button("Profile next rerun", key="cprofile_button", use_container_width=True):
+            request_cprofile()
+            st.rerun()
+
+        result = st.session_state.get("cprofile_result")
+        if result and result.get("error"):
+            st.warning(result["error"])
+        elif result:
+            st.caption(
+                f"cProfile of {result['page']} at {result['time'].strftime('%H:%M:%S')} "
+                f"({result['wall_ms']:.0f} ms, profiler overhead included)"
+            )
+            st.download_button(
+                "Download .prof",
+                result["prof"],
+                file_name=f"{result['page'].lower().replace(' ', '_')}.prof",
+                mime="application/octet-stream",
+                use_container_width=True,
+            )
+            if st.checkbox("Show report", key="cprofile_show_report"):
+                st.code(result["report"], language=None)
+
+
+install_hooks()
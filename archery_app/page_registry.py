@@ -0,0 +1,105 @@
+# archery_app/page_registry.py
+
+"""
+Page registry for the main menu.
+
+Each page is registered with the module and function that render it and the
+role needed to open it. Page modules are imported the first time someone
+navigates to them and the render function is cached, so an archer who only
+opens their scores never pays for importing the SQL Assistant (sqlalchemy,
+the model SDK) or the analytics pages (matplotlib).
+"""
+
+import importlib
+import threading
+from typing import Callable, NamedTuple, Union
+
+from .page_profiler import profile_page
+
+# Roles, lowest first
+ACCESS_ALL = "all"
+ACCESS_RECORDER = "recorder"
+ACCESS_ADMIN = "admin"
+
+
+class Page(NamedTuple):
+    name: str
+    target: Union[str, Callable]  # "package.module:function" or a callable
+    access: str = ACCESS_ALL
+
+
+PAGES = {}
+_resolved = {}
+_lock = threading.Lock()
+
+
+def register_page(name, target, access=ACCESS_ALL):
+    """Add a page to the registry (later registrations replace earlier ones)."""
+    PAGES[name] = Page(name, target, access)
+    _resolved.pop(name, None)
+
+
+def can_access(page, is_recorder, is_admin):
+    if page.access == ACCESS_ADMIN:
+        return bool(is_admin)
+    if page.access == ACCESS_RECORDER:
+        return bool(is_recorder or is_admin)
+    return True
+
+
+def get_page_function(name):
+    """
+    Return the render function for a page, importing its module on first use.
+
+    Raises:
+        KeyError: If no page with that name is registered
+    """
+    func = _resolved.get(name)
+    if func is None:
+        page = PAGES[name]
+        if callable(page.target):
+            func = page.target
+        else:
+            module_name, _, function_name = page.target.partition(":")
+            func = getattr(importlib.import_module(module_name), function_name)
+        with _lock:
+            _resolved[name] = func
+    return func
+
+
+def render_page(name, is_recorder=False, is_admin=False):
+    """
+    Render a registered page if the user's role allows it.
+
+    Returns:
+        bool: False if the page is unknown or not permitted
+    """
+    page = PAGES.get(name)
+    if page is None or not can_access(page, is_recorder, is_admin):
+        return False
+    with profile_page(name):
+        get_page_function(name)()
+    return True
+
+
+# Pages provided by the archery_app package
+for _name, _target, _access in [
+    ("View Personal Scores", "archery_app.archer_pages:view_personal_scores", ACCESS_ALL),
+    ("Record Practice Score", "archery_app.archer_pages:record_practice_score", ACCESS_ALL),
+    ("View Round Definitions", "archery_app.archer_pages:view_round_definitions", ACCESS_ALL),
+    ("View Competition Results", "archery_app.archer_pages:view_competition_results", ACCESS_ALL),
+    ("Personal Bests & Records", "archery_app.archer_pages:view_records", ACCESS_ALL),
+    ("SQL Assistant", "archery_app.chatbot:sql_chatbot", ACCESS_ALL),
+    ("Manage Archers", "archery_app.recorder_pages:manage_archers", ACCESS_RECORDER),
+    ("Approve Practice Scores", "archery_app.recorder_pages:approve_practice_scores", ACCESS_RECORDER),
+    ("Manage Competitions", "archery_app.recorder_pages:manage_competitions", ACCESS_RECORDER),
+    ("Generate Competition Results", "archery_app.recorder_pages:generate_competition_results", ACCESS_RECORDER),
+    ("User Management", "archery_app.admin_pages:manage_users", ACCESS_ADMIN),
+    ("Permission Management", "archery_app.admin_pages:manage_permissions", ACCESS_ADMIN),
+    ("Security Logs", "archery_app.security_admin:security_logs_admin", ACCESS_ADMIN),
+    ("Performance", "archery_app.performance_admin:performance_admin", ACCESS_ADMIN),
+    ("Manage Account", "archery_app.admin_pages:manage_account", ACCESS_ALL),
+    ("Live Competition View", "archery_app.live_competition_view:display_live_competition_view", ACCESS_ALL),
+    ("Performance Analytics", "archery_app.performance_analytics:show_performance_analytics", ACCESS_ALL),
+]:
+    register_page(_name, _target, _access)
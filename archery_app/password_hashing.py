@@ -0,0 +1,266 @@
+# archery_app/password_hashing.py
+
+"""
+Password hashing for AppUser accounts.
+
+Each account stores its hash in PasswordHash, a random salt in Salt and the
+algorithm with its cost parameters in HashType, for example:
+
+    scrypt:n=16384,r=8,p=1
+    pbkdf2_sha256:i=600000
+    salted_sha256            (previous scheme, verify only)
+    NULL / sha256            (original unsalted scheme, verify only)
+
+Because the parameters live with each hash, the cost can be raised at any
+time: accounts are rehashed with the current settings on their next
+successful login. Tune the cost with benchmarks/bench_password_hashing.py.
+
+scrypt and PBKDF2 release the GIL, so verification runs in a small bounded
+thread pool; a burst of logins uses at most PASSWORD_VERIFY_WORKERS cores and
+the Streamlit server stays responsive.
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .settings import get_setting
+
+DEFAULT_SCHEME = "scrypt"
+DEFAULT_SCRYPT_N = 2**14
+DEFAULT_SCRYPT_R = 8
+DEFAULT_SCRYPT_P = 1
+DEFAULT_PBKDF2_ITERATIONS = 600_000
+
+
+class PasswordVerifierBusy(Exception):
+    """Raised when too many password checks are already queued."""
+
+    pass
+
+
+def generate_salt():
+    """Generate a cryptographically secure random salt"""
+    return secrets.token_hex(32)  # 64 character hex string (32 bytes)
+
+
+class PasswordHasher:
+    """Base class: a hashing algorithm with fixed cost parameters."""
+
+    scheme = None
+    # Cost parameter names accepted in HashType
+    parameters = ()
+
+    def hash(self, password, salt):
+        raise NotImplementedError
+
+    @property
+    def hash_type(self):
+        return self.scheme
+
+    def verify(self, password, salt, stored_hash):
+        calculated = self.hash(password, salt or "")
+        return hmac.compare_digest(calculated, stored_hash or "")
+
+
+class ScryptHasher(PasswordHasher):
+    scheme = "scrypt"
+    parameters = ("n", "r", "p")
+
+    def __init__(self, n=DEFAULT_SCRYPT_N, r=DEFAULT_SCRYPT_R, p=DEFAULT_SCRYPT_P):
+        self.n, self.r, self.p = int(n), int(r), int(p)
+
+    def hash(self, password, salt):
+        return hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=self.n,
+            r=self.r,
+            p=self.p,
+            # scrypt needs 128 * r * n bytes; leave headroom over OpenSSL's 32 MiB default
+            maxmem=128 * self.r * (self.n + self.p + 2) + 1024 * 1024,
+            dklen=32,
+        ).hex()
+
+    @property
+    def hash_type(self):
+        return f"scrypt:n={self.n},r={self.r},p={self.p}"
+
+
+class Pbkdf2Hasher(PasswordHasher):
+    scheme = "pbkdf2_sha256"
+    parameters = ("i",)
+
+    def __init__(self, i=DEFAULT_PBKDF2_ITERATIONS):
+        self.iterations = int(i)
+
+    def hash(self, password, salt):
+        return hashlib.pbkdf2_hmac(
+            "sha256", password.encode(), salt.encode(), self.iterations
+        ).hex()
+
+    @property
+    def hash_type(self):
+        return f"pbkdf2_sha256:i={self.iterations}"
+
+
+class SaltedSha256Hasher(PasswordHasher):
+    """Previous scheme: one SHA-256 over salt + password. Verify only."""
+
+    scheme = "salted_sha256"
+
+    def hash(self, password, salt):
+        return hashlib.sha256((salt + password).encode()).hexdigest()
+
+
+class LegacySha256Hasher(PasswordHasher):
+    """Original scheme: unsalted SHA-256. Verify only."""
+
+    scheme = "sha256"
+
+    def hash(self, password, salt=None):
+        return hashlib.sha256(password.encode()).hexdigest()
+
+
+_HASHERS = {
+    ScryptHasher.scheme: ScryptHasher,
+    Pbkdf2Hasher.scheme: Pbkdf2Hasher,
+    SaltedSha256Hasher.scheme: SaltedSha256Hasher,
+    LegacySha256Hasher.scheme: LegacySha256Hasher,
+}
+
+
+def get_hasher(hash_type):
+    """
+    Build the hasher described by a HashType value.
+
+    Args:
+        hash_type (str or None): e.g. "scrypt:n=16384,r=8,p=1"; None or an
+            empty value means the original unsalted SHA-256 scheme
+
+    Returns:
+        PasswordHasher: The matching hasher
+
+    Raises:
+        ValueError: If the scheme or its parameters are not recognised
+    """
+    if not hash_type:
+        return LegacySha256Hasher()
+
+    scheme, _, raw_params = hash_type.partition(":")
+    if scheme not in _HASHERS:
+        raise ValueError(f"Unknown password hash type: {hash_type}")
+
+    hasher_class = _HASHERS[scheme]
+    params = {}
+    for item in filter(None, raw_params.split(",")):
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if key not in hasher_class.parameters:
+            raise ValueError(f"Unknown parameter {key!r} in password hash type: {hash_type}")
+        params[key] = int(value)
+    return hasher_class(**params)
+
+
+def get_default_hasher():
+    """Return the hasher configured for new and rehashed passwords."""
+    scheme = get_setting("PASSWORD_HASH_SCHEME", DEFAULT_SCHEME)
+    if scheme == Pbkdf2Hasher.scheme:
+        return Pbkdf2Hasher(
+            get_setting("PASSWORD_PBKDF2_ITERATIONS", DEFAULT_PBKDF2_ITERATIONS, cast=int)
+        )
+    return ScryptHasher(
+        n=get_setting("PASSWORD_SCRYPT_N", DEFAULT_SCRYPT_N, cast=int),
+        r=get_setting("PASSWORD_SCRYPT_R", DEFAULT_SCRYPT_R, cast=int),
+        p=get_setting("PASSWORD_SCRYPT_P", DEFAULT_SCRYPT_P, cast=int),
+    )
+
+
+def hash_new_password(password):
+    """
+    Hash a password with the current default settings.
+
+    Returns:
+        tuple: (password_hash, salt, hash_type) for the AppUser columns
+    """
+    hasher = get_default_hasher()
+    salt = generate_salt()
+    return hasher.hash(password, salt), salt, hasher.hash_type
+
+
+def verify_password(password, stored_hash, salt, hash_type):
+    """
+    Check a password against the stored AppUser values.
+
+    Returns:
+        bool: True if the password matches
+    """
+    try:
+        hasher = get_hasher(hash_type)
+    except ValueError as e:
+        print(f"Error verifying password: {e}")
+        return False
+    if hasher.scheme == SaltedSha256Hasher.scheme and not salt:
+        # Accounts marked salted but never given a salt used the unsalted scheme
+        hasher = LegacySha256Hasher()
+    try:
+        return hasher.verify(password, salt, stored_hash)
+    except ValueError as e:
+        # Parameters the algorithm rejects, e.g. a scrypt n that is not a power of 2
+        print(f"Error verifying password: {e}")
+        return False
+
+
+def needs_rehash(hash_type):
+    """True if a stored hash does not use the current default settings."""
+    return hash_type != get_default_hasher().hash_type
+
+
+# Bounded pool for password checks, created on first use
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = get_setting(
+                    "PASSWORD_VERIFY_WORKERS", min(4, os.cpu_count() or 1), cast=int
+                )
+                # At most this many checks running or waiting at once
+                _pool_slots = threading.BoundedSemaphore(
+                    get_setting("PASSWORD_VERIFY_QUEUE", workers * 8, cast=int)
+                )
+                _pool = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="password-verify"
+                )
+    return _pool, _pool_slots
+
+
+def run_in_verifier_pool(func, *args, timeout=10.0):
+    """
+    Run a hashing call in the bounded verifier pool and wait for its result.
+
+    Raises:
+        PasswordVerifierBusy: If no queue slot frees up within timeout seconds
+    """
+    pool, slots = _get_pool()
+    if not slots.acquire(timeout=timeout):
+        raise PasswordVerifierBusy("Too many logins in progress. Please try again.")
+    try:
+        return pool.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def verify_password_pooled(password, stored_hash, salt, hash_type, timeout=10.0):
+    """verify_password() run in the bounded verifier pool."""
+    return run_in_verifier_pool(
+        verify_password, password, stored_hash, salt, hash_type, timeout=timeout
+    )
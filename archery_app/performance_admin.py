@@ -0,0 +1,182 @@
+# archery_app/performance_admin.py
+
+import json
+
+import streamlit as st
+import pandas as pd
+from archery_app.page_profiler import get_page_timings, reset_page_timings
+from archery_app.query_stats import (
+    get_callers,
+    get_histogram,
+    get_query_samples,
+    get_query_stats,
+    get_slow_queries,
+    get_stats_settings,
+    get_stats_started,
+    reset_query_stats,
+)
+
+
+def performance_admin():
+    st.title("Query Performance")
+
+    # Check if user has admin privileges
+    if not st.session_state.is_admin:
+        st.error("You do not have permission to access this page.")
+        return
+
+    settings = get_stats_settings()
+    if not settings["enabled"]:
+        st.info("Query statistics are disabled (QUERY_STATS_ENABLED = false); only page timings are shown.")
+        st.subheader("Page Timings")
+        display_page_timings()
+        if st.button("Reset Page Timings"):
+            reset_page_timings()
+            st.rerun()
+        return
+
+    st.caption(
+        f"Collected by this server process since "
+        f"{get_stats_started().strftime('%Y-%m-%d %H:%M:%S')}, across all sessions."
+    )
+
+    tab1, tab2, tab3 = st.tabs(["Top Queries", "Slow Query Log", "Page Timings"])
+
+    with tab1:
+        display_top_queries()
+
+    with tab2:
+        display_slow_queries(settings["slow_ms"])
+
+    with tab3:
+        display_page_timings()
+
+    st.markdown("---")
+    if st.button("Reset Statistics"):
+        reset_query_stats()
+        reset_page_timings()
+        st.success("Query statistics cleared.")
+        st.rerun()
+
+
+def display_top_queries():
+    stats = get_query_stats()
+    if not stats:
+        st.info("No queries recorded yet.")
+        return
+
+    # Display key metrics
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Queries", sum(row["Calls"] for row in stats))
+    with col2:
+        st.metric("Distinct Queries", len(stats))
+    with col3:
+        st.metric("Total Time", f"{sum(row['Total ms'] for row in stats) / 1000:.1f} s")
+    with col4:
+        st.metric("Errors", sum(row["Errors"] for row in stats))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        order_by = st.radio(
+            "Sort by", ["Total ms", "p95 ms", "Calls", "Max ms", "Rows"], horizontal=True
+        )
+    with col2:
+        limit = st.slider("Show top", min_value=5, max_value=100, value=20, step=5)
+
+    df = pd.DataFrame(get_query_stats(order_by=order_by, limit=limit))
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "Download as CSV",
+            pd.DataFrame(stats).to_csv(index=False),
+            file_name="query_stats.csv",
+            mime="text/csv",
+        )
+    with col2:
+        st.download_button(
+            "Download query samples (JSON)",
+            json.dumps(get_query_samples(), indent=2),
+            file_name="query_samples.json",
+            mime="application/json",
+            help="One example call per query, for benchmarks/index_advisor.py --capture",
+        )
+
+    # Drill into one query
+    st.subheader("Query Details")
+    selected = st.selectbox(
+        "Query", df["Fingerprint"].tolist(), format_func=lambda text: text[:120]
+    )
+    if selected:
+        st.code(selected, language="sql")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("**Latency histogram**")
+            histogram = pd.DataFrame(get_histogram(selected), columns=["Bucket", "Calls"])
+            st.bar_chart(histogram.set_index("Bucket"), use_container_width=True)
+        with col2:
+            st.write("**Callers**")
+            callers = pd.DataFrame(get_callers(selected), columns=["Caller", "Calls"])
+            st.dataframe(callers, use_container_width=True, hide_index=True)
+
+
+def display_slow_queries(slow_ms):
+    st.write(f"Queries that took at least **{slow_ms:.0f} ms** (QUERY_SLOW_MS), newest first.")
+    slow_queries = get_slow_queries()
+    if not slow_queries:
+        st.info("No slow queries recorded.")
+        return
+    st.dataframe(pd.DataFrame(slow_queries), use_container_width=True, hide_index=True)
+
+
+def display_page_timings():
+    timings = get_page_timings()
+    if not timings:
+        st.info("No page renders recorded yet.")
+        return
+
+    df = pd.DataFrame(timings)
+    # None (DB time unknown) as NaN, so the means skip those renders
+    df[["DB ms", "Queries"]] = df[["DB ms", "Queries"]].apply(pd.to_numeric)
+    st.write(
+        "Time per page render, split into database queries, chart drawing and "
+        "everything else (pandas, figure building, widgets)."
+    )
+
+    grouped = df.groupby("Page")
+    summary = pd.DataFrame(
+        {
+            "Renders": grouped.size(),
+            "Median ms": grouped["Wall ms"].median(),
+            "p95 ms": grouped["Wall ms"].quantile(0.95),
+            "Max ms": grouped["Wall ms"].max(),
+            "Mean DB ms": grouped["DB ms"].mean(),
+            "Mean chart ms": grouped["Chart ms"].mean(),
+            "Mean other ms": grouped["Other ms"].mean(),
+            "Mean queries": grouped["Queries"].mean(),
+        }
+    ).round(1).sort_values("p95 ms", ascending=False)
+    st.dataframe(summary, use_container_width=True)
+
+    st.subheader("Where the time goes")
+    if df["DB ms"].isna().any():
+        st.caption(
+            "DB time is unavailable for renders made while QUERY_STATS_ENABLED was off; "
+            "their query time is counted as other."
+        )
+    st.bar_chart(
+        summary[["Mean DB ms", "Mean chart ms", "Mean other ms"]].fillna(0),
+        use_container_width=True,
+    )
+
+    with st.expander("Recent renders"):
+        st.dataframe(df.iloc[::-1], use_container_width=True, hide_index=True)
+
+    st.download_button(
+        "Download page timings as CSV",
+        df.to_csv(index=False),
+        file_name="page_timings.csv",
+        mime="text/csv",
+    )
@@ -13,6 +13,9 @@ from datetime import datetime, timedelta
 
 # Import from your existing database module
 from archery_app.database import get_connection, get_archers, get_archer_statistics, verify_connection, display_connection_error, initialize_connection
+from archery_app.data_export import get_analytics_snapshot
+from archery_app.handicaps import add_handicap_column
+from archery_app.records import get_personal_bests
 
 def calculate_statistics_from_scores(recent_scores):
     """Calculate statistics from the recent scores data"""
@@ -195,23 +198,34 @@ def get_performance_insights(archer_stats):
 
 def show_performance_analytics():
     """Main function to display the performance analytics page"""
-    # Initialize connection check
-    initialize_connection()
-    
-    # Check database connection
-    if not verify_connection():
-        display_connection_error()
-        return
+    # Work off a data snapshot when one is configured (ANALYTICS_SNAPSHOT)
+    snapshot = get_analytics_snapshot()
+    if snapshot is not None:
+        load_archers = snapshot.get_archers
+        load_archer_statistics = snapshot.get_archer_statistics
+    else:
+        load_archers = get_archers
+        load_archer_statistics = get_archer_statistics
+        
+        # Initialize connection check
+        initialize_connection()
+        
+        # Check database connection
+        if not verify_connection():
+            display_connection_error()
+            return
     
     # Page header
     st.title("📊 Archer Performance Analytics")
+    if snapshot is not None:
+        st.caption(f"Using the data snapshot taken {snapshot.created_at:%Y-%m-%d %H:%M}.")
     st.markdown("---")
     
     # Archer selection
     st.subheader("Select Archer for Analysis")
     
     try:
-        archers = get_archers()
+        archers = load_archers()
     except Exception as e:
         st.error(f"Failed to load archers: {e}")
         return
@@ -233,7 +247,7 @@ def show_performance_analytics():
     
     # Get comprehensive archer statistics
     try:
-        archer_stats = get_archer_statistics(selected_archer_id)
+        archer_stats = load_archer_statistics(selected_archer_id)
     except Exception as e:
         st.error(f"Failed to load archer statistics: {e}")
         return
@@ -293,6 +307,22 @@ def show_performance_analytics():
             st.write(f"**Average Score:** {score_stats.get('AverageScore', 0):.2f}")
             st.write(f"**Score Consistency:** {range_score:.0f} point range")
     
+    # Personal bests per round, kept in PersonalBest (live database only)
+    if snapshot is None:
+        try:
+            personal_bests = get_personal_bests(selected_archer_id)
+        except Exception as e:
+            st.error(f"Failed to load personal bests: {e}")
+            personal_bests = []
+        if personal_bests:
+            st.subheader("🏅 Personal Bests")
+            df_bests = add_handicap_column(pd.DataFrame(personal_bests))
+            st.dataframe(
+                df_bests.drop(columns=["RoundID", "ScoreID"]),
+                use_container_width=True,
+                hide_index=True,
+            )
+    
     st.markdown("---")
     
     # Create and display visualizations
@@ -328,7 +358,8 @@ def show_performance_analytics():
                 })
             
             if df_data:
-                st.table(df_data)
+                handicap_tables = snapshot.handicap_tables() if snapshot is not None else None
+                st.table(add_handicap_column(pd.DataFrame(df_data), "Round", "Score", handicap_tables))
 
 # Entry point for the page
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+# archery_app/principal_cache.py
+
+"""
+Process-wide cache of who each user is and what they may do.
+
+A Principal (archer, name and role flags) is cached per UserID together with
+a version stamp. Admin write paths call invalidate_principal() after changing
+an account, which bumps that user's version. Every rerun,
+refresh_session_principal() compares the session's stamp with the current
+one - a dictionary lookup - and only reloads from AppUser when they differ,
+so a revoked privilege applies on the user's next interaction.
+
+The user list shown on the admin pages is cached the same way under a single
+list version bumped by any account change.
+
+The cache lives in this Streamlit server process. Writes to AppUser from the
+SQL Assistant invalidate every user (chatbot.invalidate_cached_tables());
+writes made directly in the database, outside the app, are picked up after a
+restart or the next invalidation of that user.
+"""
+
+import threading
+from typing import NamedTuple
+
+import streamlit as st
+
+from .database import get_connection
+
+
+class Principal(NamedTuple):
+    user_id: int
+    archer_id: int
+    username: str
+    archer_name: str
+    is_recorder: bool
+    is_admin: bool
+    exists: bool = True
+
+
+_lock = threading.Lock()
+_principals = {}  # UserID -> Principal
+_versions = {}  # UserID -> version stamp
+_generation = 0  # bumped when every user is invalidated
+_user_list = None
+_user_list_version = 0
+_list_version = 1
+
+
+def get_principal_version(user_id):
+    """Current version stamp for a user (0 until first invalidated)."""
+    # Both parts only grow, so any invalidation changes the sum
+    return _generation + _versions.get(user_id, 0)
+
+
+def _load_principal(user_id):
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        """
+        SELECT u.UserID, u.ArcherID, u.Username, u.IsRecorder, u.IsAdmin,
+               CONCAT(a.FirstName, ' ', a.LastName) AS ArcherName
+        FROM AppUser u
+        JOIN Archer a ON u.ArcherID = a.ArcherID
+        WHERE u.UserID = %s
+        """,
+        (user_id,),
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+
+    if not row:
+        return Principal(user_id, None, None, None, False, False, exists=False)
+    return principal_from_row(row)
+
+
+def principal_from_row(row):
+    """Build a Principal from an AppUser row joined to Archer."""
+    return Principal(
+        user_id=row["UserID"],
+        archer_id=row["ArcherID"],
+        username=row.get("Username"),
+        archer_name=row.get("ArcherName"),
+        is_recorder=bool(row["IsRecorder"]),
+        is_admin=bool(row["IsAdmin"]),
+    )
+
+
+def cache_principal(principal):
+    """Store a freshly loaded principal (e.g. from the login query)."""
+    with _lock:
+        _principals[principal.user_id] = principal
+
+
+def get_principal(user_id):
+    """
+    Return the cached principal for a user, loading it on a miss.
+
+    Returns:
+        Principal: exists=False if the account no longer exists
+    """
+    principal = _principals.get(user_id)
+    if principal is None:
+        version = get_principal_version(user_id)
+        principal = _load_principal(user_id)
+        with _lock:
+            # An invalidation during the load may mean the row read is stale;
+            # return it, but leave the next call to load again
+            if get_principal_version(user_id) == version:
+                _principals[user_id] = principal
+    return principal
+
+
+def invalidate_principal(user_id=None):
+    """
+    Mark a user's cached principal (or all, if user_id is None) as stale.
+
+    Call after any write to AppUser: privilege changes, account deletes,
+    account creation.
+    """
+    global _generation, _list_version
+    with _lock:
+        if user_id is None:
+            _generation += 1
+            _principals.clear()
+        else:
+            _versions[user_id] = _versions.get(user_id, 0) + 1
+            _principals.pop(user_id, None)
+        _list_version += 1
+
+
+def get_cached_user_list(loader):
+    """
+    Return the admin user list, calling loader() only when it has changed.
+
+    Returns:
+        list: A copy of each user dict, so callers may modify them freely
+    """
+    global _user_list, _user_list_version
+    if _user_list is None or _user_list_version != _list_version:
+        version = _list_version
+        users = loader()
+        with _lock:
+            _user_list, _user_list_version = users, version
+    return [dict(user) for user in _user_list]
+
+
+def apply_principal_to_session(principal):
+    """Copy a principal's identity and role flags into session state."""
+    st.session_state.user_id = principal.user_id
+    st.session_state.archer_id = principal.archer_id
+    st.session_state.archer_name = principal.archer_name
+    st.session_state.is_recorder = principal.is_recorder
+    st.session_state.is_admin = principal.is_admin
+    st.session_state.principal_version = get_principal_version(principal.user_id)
+
+
+def refresh_session_principal():
+    """
+    Bring the session's role flags up to date with the principal cache.
+
+    Returns:
+        bool: False if the account has been deleted and the session should
+        be logged out
+    """
+    user_id = st.session_state.get("user_id")
+    if not st.session_state.get("logged_in") or user_id is None:
+        return True
+    if st.session_state.get("principal_version") == get_principal_version(user_id):
+        return True
+
+    principal = get_principal(user_id)
+    if not principal.exists:
+        return False
+    apply_principal_to_session(principal)
+    return True
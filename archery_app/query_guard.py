@@ -0,0 +1,220 @@
+# archery_app/query_guard.py
+
+"""
+Pre-execution guard for SQL generated by the SQL Assistant.
+
+Before an assistant query runs it is EXPLAINed, through the database
+backend, to estimate how many rows the database will examine. Queries over
+SQL_ASSISTANT_MAX_ROWS_EXAMINED are refused, or - for a plain row-returning
+SELECT without a LIMIT when SQL_ASSISTANT_COST_ACTION is "limit" - rewritten
+with a LIMIT. A LIMIT only saves work when the database can stop after the
+first rows, so aggregates, GROUP BY, ORDER BY, DISTINCT, set operations and
+subqueries are refused.
+Every statement also runs with a time limit (SQL_ASSISTANT_MAX_EXECUTION_MS)
+so one heavy query cannot hold up the shared database for the rest of the
+club.
+"""
+
+from .database import get_database_backend
+from .settings import get_setting
+from .sql_safety import analyse_sql, significant_tokens
+
+# Statement types the backends can EXPLAIN
+EXPLAINABLE_STATEMENT_TYPES = {"SELECT", "INSERT", "REPLACE", "UPDATE", "DELETE"}
+
+# Words after which a LIMIT no longer bounds the rows examined
+_UNLIMITABLE_WORDS = {
+    "GROUP", "ORDER", "DISTINCT", "DISTINCTROW", "HAVING", "UNION", "INTERSECT",
+    "EXCEPT", "WINDOW", "OVER",
+}
+_AGGREGATE_FUNCTIONS = {
+    "COUNT", "SUM", "AVG", "MIN", "MAX", "GROUP_CONCAT", "STD", "STDDEV",
+    "STDDEV_POP", "STDDEV_SAMP", "VARIANCE", "VAR_POP", "VAR_SAMP",
+    "BIT_AND", "BIT_OR", "BIT_XOR", "JSON_ARRAYAGG", "JSON_OBJECTAGG",
+}
+
+
+class QueryRefused(Exception):
+    """Raised when an assistant query is refused by the cost guard."""
+
+    pass
+
+
+def get_guard_settings():
+    """Return the cost guard settings as a dict."""
+    action = str(get_setting("SQL_ASSISTANT_COST_ACTION", "limit")).strip().lower()
+    return {
+        "max_rows_examined": get_setting(
+            "SQL_ASSISTANT_MAX_ROWS_EXAMINED", 1_000_000, cast=int
+        ),
+        "result_limit": get_setting("SQL_ASSISTANT_RESULT_LIMIT", 1000, cast=int),
+        "max_execution_ms": get_setting(
+            "SQL_ASSISTANT_MAX_EXECUTION_MS", 5000, cast=int
+        ),
+        "action": action if action in ("limit", "refuse") else "limit",
+    }
+
+
+def add_limit(sql_query, limit):
+    """
+    Add a LIMIT clause to a single SELECT statement that has none.
+
+    Trailing comments and semicolons are dropped, and the clause goes before
+    a FOR UPDATE / FOR SHARE / LOCK IN SHARE MODE locking clause, where
+    MySQL requires it.
+
+    Args:
+        sql_query (str): The SQL statement
+        limit (int): Maximum number of rows to return
+
+    Returns:
+        str: The rewritten statement, or the original if it cannot be limited
+    """
+    analysis = analyse_sql(sql_query)
+    if analysis.is_multi_statement or analysis.statement_type != "SELECT":
+        return sql_query
+    if analysis.statements[0].has_limit:
+        return sql_query
+
+    tokens = significant_tokens(sql_query)
+    while tokens and tokens[-1][1] == ";":
+        tokens.pop()
+    if not tokens:
+        return sql_query
+    end = tokens[-1][3]
+
+    # Start of a top-level locking clause, if there is one
+    lock_start = None
+    depth = 0
+    for index, (kind, text, start, _) in enumerate(tokens):
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif depth == 0 and kind == "word" and index + 1 < len(tokens):
+            word, following = text.upper(), tokens[index + 1][1].upper()
+            if (word == "FOR" and following in ("UPDATE", "SHARE")) or (word == "LOCK" and following == "IN"):
+                lock_start = start
+                break
+
+    # Newlines around the clause so a "-- comment" before it cannot swallow it
+    if lock_start is None:
+        return f"{sql_query[:end].lstrip()}\nLIMIT {int(limit)}"
+    return f"{sql_query[:lock_start].strip()}\nLIMIT {int(limit)}\n{sql_query[lock_start:end]}"
+
+
+def is_limitable_select(sql_query):
+    """
+    True if a LIMIT would let the server stop reading early: one SELECT with
+    no aggregate, GROUP BY, ORDER BY, DISTINCT, set operation or subquery.
+    """
+    tokens = significant_tokens(sql_query)
+    selects = 0
+    for index, (kind, text, _, _) in enumerate(tokens):
+        if kind != "word":
+            continue
+        word = text.upper()
+        if word == "SELECT":
+            selects += 1
+        following = tokens[index + 1][1] if index + 1 < len(tokens) else ""
+        if selects > 1 or word in _UNLIMITABLE_WORDS or (word in _AGGREGATE_FUNCTIONS and following == "("):
+            return False
+    return selects == 1
+
+
+def estimate_rows_examined(plan_rows):
+    """
+    Estimate rows examined from EXPLAIN output.
+
+    Tables within one SELECT (same id) are joined as nested loops, so each
+    table is read once per row surviving the tables before it; separate
+    SELECTs (subqueries, UNION parts) are added together.
+
+    Args:
+        plan_rows (list): EXPLAIN rows as dicts with "id", "rows" and
+            optionally "filtered" keys
+
+    Returns:
+        int: Estimated number of rows examined
+    """
+    total = 0
+    prefix_rows = {}
+    for row in plan_rows:
+        rows = row.get("rows")
+        if rows is None:
+            continue
+        select_id = row.get("id")
+        filtered = row.get("filtered")
+        filtered = 100.0 if filtered is None else float(filtered)
+
+        prefix = prefix_rows.get(select_id, 1.0)
+        total += prefix * float(rows)
+        prefix_rows[select_id] = prefix * float(rows) * filtered / 100.0
+    return int(total)
+
+
+def explain_query(connection, sql_query):
+    """
+    Plan a statement through the active database backend.
+
+    Returns:
+        list: Plan rows as dicts with "id", "rows" and "filtered" keys
+    """
+    return get_database_backend().explain_query(connection, sql_query)
+
+
+def apply_execution_time_limit(connection, max_execution_ms):
+    """
+    Limit how long statements on this connection may run, using the active
+    database backend's statement timeout.
+
+    Returns:
+        bool: True if a limit was applied
+    """
+    return get_database_backend().set_statement_timeout(connection, max_execution_ms)
+
+
+def guard_query(connection, sql_query, settings=None):
+    """
+    Check the cost of an assistant query and decide what to run.
+
+    Args:
+        connection: An open SQLAlchemy connection
+        sql_query (str): The SQL generated by the assistant
+        settings (dict, optional): Overrides for get_guard_settings()
+
+    Returns:
+        tuple: (sql_to_run, notice) where notice is a message for the user
+        when the query was rewritten, to show if the cap was reached;
+        otherwise None
+
+    Raises:
+        QueryRefused: If the estimated cost is over the threshold and the
+            query cannot be safely limited
+    """
+    settings = settings or get_guard_settings()
+    analysis = analyse_sql(sql_query)
+    if analysis.is_multi_statement:
+        raise QueryRefused("Only one statement can be executed at a time")
+
+    if analysis.statement_type not in EXPLAINABLE_STATEMENT_TYPES:
+        return sql_query, None
+
+    estimate = estimate_rows_examined(explain_query(connection, sql_query))
+    threshold = settings["max_rows_examined"]
+    if threshold <= 0 or estimate <= threshold:
+        return sql_query, None
+
+    if (settings["action"] == "limit" and analysis.statement_type == "SELECT"
+            and is_limitable_select(sql_query)):
+        limited = add_limit(sql_query, settings["result_limit"])
+        if limited != sql_query:
+            return limited, (
+                f"Estimated {estimate:,} rows examined (limit {threshold:,}); "
+                f"results were capped at {settings['result_limit']:,} rows."
+            )
+
+    raise QueryRefused(
+        f"Query would examine an estimated {estimate:,} rows, over the limit of "
+        f"{threshold:,}. Add filters or a LIMIT and try again."
+    )
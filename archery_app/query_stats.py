@@ -0,0 +1,409 @@
+# archery_app/query_stats.py
+
+"""
+Per-query latency instrumentation for the data layer.
+
+get_connection() wraps every MySQL connection in an InstrumentedConnection.
+Its cursors time each execute()/callproc() together with the fetches that
+follow it, count the rows returned and record the sample under the query's
+fingerprint (the SQL with literals replaced by ?), along with the archery_app
+function that issued it.
+
+Samples are aggregated in memory per fingerprint: call count, total and max
+time, rows, errors, the busiest callers and a fixed-bucket latency histogram
+from which p95 is estimated. Queries slower than QUERY_SLOW_MS also go to a
+bounded slow-query log. Everything lives in the Streamlit server process and
+covers all sessions; the admin Performance page (performance_admin.py) reads
+it and can reset it.
+
+Instrumentation is off unless QUERY_STATS_ENABLED is set. Bound parameters
+are never kept, and the example statements offered for download have their
+comments dropped and string literals blanked, so no credentials or personal
+data leave the process.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from .settings import get_setting
+
+# Upper bounds (ms) of the latency histogram buckets; the last is open-ended
+HISTOGRAM_BOUNDS_MS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf")
+)
+MAX_CALLERS_PER_QUERY = 10
+OTHER_FINGERPRINT = "(other queries)"
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_APP_DIR = os.path.dirname(_PACKAGE_DIR)
+_THIS_FILE = os.path.abspath(__file__)
+
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.S)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    Normalise a statement so that calls differing only in values group together.
+
+    Comments are dropped, string/number literals and driver placeholders
+    become ?, IN lists collapse to (...) and whitespace is squeezed.
+    """
+    text = _STRING.sub("?", sql)
+    text = _COMMENT.sub(" ", text)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("(...)", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def redact(sql):
+    """Statement text with comments dropped and string literals blanked to ''."""
+    text = _STRING.sub("''", sql)
+    text = _COMMENT.sub(" ", text)
+    return text.strip()
+
+
+def find_caller():
+    """Return "module.function:line" for the nearest app frame outside this file."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename != _THIS_FILE and filename.startswith(_APP_DIR) and (
+            filename.startswith(_PACKAGE_DIR) or os.path.dirname(filename) == _APP_DIR
+        ):
+            module = os.path.splitext(os.path.relpath(filename, _APP_DIR))[0]
+            return f"{module.replace(os.sep, '.')}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "(unknown)"
+
+
+class QueryStats:
+    """Aggregated timings for one fingerprint."""
+
+    __slots__ = (
+        "fingerprint", "count", "total_ms", "max_ms", "rows", "errors",
+        "last_error", "histogram", "callers", "last_seen", "example",
+    )
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.errors = 0
+        self.last_error = None
+        self.histogram = [0] * len(HISTOGRAM_BOUNDS_MS)
+        self.callers = Counter()
+        self.last_seen = None
+        self.example = None  # SQL text of the latest successful call
+
+    def add(self, elapsed_ms, rows, caller, error, sql=None):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        self.last_seen = datetime.now()
+        if error is not None:
+            self.errors += 1
+            self.last_error = error
+        elif sql is not None:
+            self.example = sql
+        for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if elapsed_ms <= bound:
+                self.histogram[index] += 1
+                break
+        if caller in self.callers or len(self.callers) < MAX_CALLERS_PER_QUERY:
+            self.callers[caller] += 1
+
+    def percentile_ms(self, pct):
+        """Upper bound of the histogram bucket holding the pct-th percentile."""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for bound, bucket in zip(HISTOGRAM_BOUNDS_MS, self.histogram):
+            seen += bucket
+            if seen >= target:
+                # The open-ended bucket is reported as the slowest call seen
+                return self.max_ms if bound == float("inf") else min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "Fingerprint": self.fingerprint,
+            "Calls": self.count,
+            "Total ms": round(self.total_ms, 1),
+            "Mean ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p95 ms": round(self.percentile_ms(95), 1),
+            "Max ms": round(self.max_ms, 1),
+            "Rows": self.rows,
+            "Errors": self.errors,
+            "Top caller": self.callers.most_common(1)[0][0] if self.callers else None,
+            "Last seen": self.last_seen,
+        }
+
+
+_lock = threading.Lock()
+_stats = {}  # fingerprint -> QueryStats
+_listeners = []  # callables(elapsed_ms) told about every recorded query
+_slow_log = None
+_started = datetime.now()
+_settings = None
+
+
+def get_stats_settings():
+    global _settings, _slow_log
+    if _settings is None:
+        _settings = {
+            "enabled": get_setting("QUERY_STATS_ENABLED", False, cast=bool),
+            "slow_ms": get_setting("QUERY_SLOW_MS", 500.0, cast=float),
+            "slow_log_size": get_setting("QUERY_SLOW_LOG_SIZE", 200, cast=int),
+            "max_fingerprints": get_setting("QUERY_STATS_MAX_FINGERPRINTS", 500, cast=int),
+        }
+        _slow_log = deque(maxlen=_settings["slow_log_size"])
+    return _settings
+
+
+def record_query(sql, elapsed_ms, rows=0, caller=None, error=None):
+    """
+    Add one query sample to the histograms and, if slow, the slow-query log.
+
+    Only the statement text is kept as the fingerprint's example, never its
+    parameters; the index advisor (benchmarks/index_advisor.py) fills in
+    sample values.
+    """
+    settings = get_stats_settings()
+    key = fingerprint(sql)
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            if len(_stats) >= settings["max_fingerprints"]:
+                key = OTHER_FINGERPRINT
+                stats = _stats.get(key)
+            if stats is None:
+                stats = _stats[key] = QueryStats(key)
+        stats.add(elapsed_ms, rows, caller, error, sql)
+        slow = elapsed_ms >= settings["slow_ms"]
+        if slow:
+            _slow_log.append(
+                {
+                    "Time": datetime.now(),
+                    "ms": round(elapsed_ms, 1),
+                    "Rows": rows,
+                    "Caller": caller,
+                    "Fingerprint": key,
+                    "Error": error,
+                }
+            )
+    for listener in _listeners:
+        listener(elapsed_ms)
+    if slow:
+        print(f"Slow query ({elapsed_ms:.0f} ms, {rows} rows) from {caller}: {key[:200]}")
+
+
+def add_query_listener(listener):
+    """Call listener(elapsed_ms) after each query is recorded (in its thread)."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def get_query_stats(order_by="Total ms", limit=None):
+    """
+    Return aggregated stats as a list of dicts, slowest first.
+
+    Args:
+        order_by (str): Any numeric key of QueryStats.to_dict(), e.g. "p95 ms"
+        limit (int, optional): Maximum number of rows
+    """
+    with _lock:
+        rows = [stats.to_dict() for stats in _stats.values()]
+    rows.sort(key=lambda row: row[order_by], reverse=True)
+    return rows[:limit] if limit else rows
+
+
+def get_query_samples():
+    """
+    Return one example statement per fingerprint, busiest first.
+
+    Each entry has the fingerprint, its call count and total time, and the
+    redacted SQL of its latest successful call, still with its driver
+    placeholders (CALL statements name only the procedure). No parameter
+    values are included; benchmarks/index_advisor.py picks its own.
+    """
+    with _lock:
+        samples = [
+            {
+                "Fingerprint": stats.fingerprint,
+                "Calls": stats.count,
+                "Total ms": round(stats.total_ms, 1),
+                "SQL": redact(stats.example),
+            }
+            for stats in _stats.values()
+            if stats.example is not None and stats.fingerprint != OTHER_FINGERPRINT
+        ]
+    samples.sort(key=lambda sample: sample["Total ms"], reverse=True)
+    return samples
+
+
+def get_histogram(fingerprint_text):
+    """Return [(bucket label, count)] for one fingerprint, or [] if unknown."""
+    with _lock:
+        stats = _stats.get(fingerprint_text)
+        counts = list(stats.histogram) if stats else []
+    labels, lower = [], 0
+    for bound in HISTOGRAM_BOUNDS_MS:
+        labels.append(f"> {lower} ms" if bound == float("inf") else f"≤ {bound} ms")
+        lower = bound
+    return list(zip(labels, counts))
+
+
+def get_callers(fingerprint_text):
+    with _lock:
+        stats = _stats.get(fingerprint_text)
+        return stats.callers.most_common() if stats else []
+
+
+def get_slow_queries():
+    get_stats_settings()
+    with _lock:
+        return list(reversed(_slow_log))
+
+
+def get_stats_started():
+    return _started
+
+
+def reset_query_stats():
+    global _started
+    get_stats_settings()
+    with _lock:
+        _stats.clear()
+        _slow_log.clear()
+        _started = datetime.now()
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that times each statement and the fetches that follow it.
+
+    A sample is recorded when the next statement starts or the cursor is
+    closed, so its latency includes reading the rows.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._pending = None  # [sql, elapsed_ms, rows, caller, error]
+        self._stored_results = []
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def _flush(self):
+        if self._pending is not None:
+            sql, elapsed_ms, rows, caller, error = self._pending
+            self._pending = None
+            record_query(sql, elapsed_ms, rows, caller, error)
+
+    def _run(self, sql, func):
+        self._flush()
+        caller = find_caller()
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as err:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            record_query(sql, elapsed_ms, 0, caller, str(err))
+            raise
+        self._pending = [sql, (time.perf_counter() - start) * 1000, 0, caller, None]
+        return result
+
+    def _fetch(self, func, *args):
+        start = time.perf_counter()
+        rows = func(*args)
+        if self._pending is not None:
+            self._pending[1] += (time.perf_counter() - start) * 1000
+            if isinstance(rows, list):
+                self._pending[2] += len(rows)
+            elif rows is not None:
+                self._pending[2] += 1
+        return rows
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._run(operation, lambda: self._cursor.execute(operation, params, *args, **kwargs))
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        return self._run(operation, lambda: self._cursor.executemany(operation, seq_params, *args, **kwargs))
+
+    def callproc(self, procname, args=()):
+        result = self._run(f"CALL {procname}", lambda: self._cursor.callproc(procname, args))
+        # Procedure result sets are buffered by callproc, so their rows are
+        # known now. The driver's stored_results() can only be read once, so
+        # keep them for the caller.
+        self._stored_results = list(self._cursor.stored_results())
+        self._pending[2] = sum(max(res.rowcount, 0) for res in self._stored_results)
+        return result
+
+    def stored_results(self):
+        results, self._stored_results = self._stored_results, []
+        return iter(results)
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, size=1):
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def close(self):
+        self._flush()
+        return self._cursor.close()
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are InstrumentedCursors."""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = InstrumentedCursor(self._connection.cursor(*args, **kwargs))
+        self._cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        # Record statements whose cursor was never closed explicitly
+        for cursor in self._cursors:
+            cursor._flush()
+        self._cursors = []
+        return self._connection.close()
+
+
+def instrument_connection(connection):
+    """Wrap a DB-API connection if query stats are enabled."""
+    if not get_stats_settings()["enabled"]:
+        return connection
+    return InstrumentedConnection(connection)
@@ -0,0 +1,246 @@
+# archery_app/rate_limiter.py
+
+"""
+In-memory login throttling.
+
+Every login attempt takes a token from two buckets: one for the username and
+one for the client IP. An empty bucket means the attempt is rejected before
+any database query or password hashing happens. Buckets refill steadily, so
+this behaves like a sliding window of recent attempts.
+
+Memory is bounded: each limiter keeps at most LOGIN_RATE_MAX_KEYS buckets
+(least recently used are evicted) and a periodic compaction drops buckets
+that have refilled. Rejections are not logged one by one; each burst of
+rejected attempts for a key is written to SecurityLog as a single
+AUTH_RATE_LIMITED event once it ends.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+from .security_logging import SecurityEventType, log_security_event
+from .settings import get_setting
+
+
+class _Bucket:
+    """Token bucket plus a counter for the current burst of rejections."""
+
+    __slots__ = ("tokens", "updated", "rejected", "burst_started", "last_rejected")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.rejected = 0
+        self.burst_started = 0.0
+        self.last_rejected = 0.0
+
+
+class LoginRateLimiter:
+    """
+    Token-bucket limiter keyed on an arbitrary string.
+
+    Args:
+        name (str): "username" or "ip", used in log messages
+        capacity (int): Attempts allowed in a burst
+        refill_seconds (float): Seconds for one attempt to be refunded
+        max_keys (int): Maximum number of buckets kept in memory
+        compact_interval (float): Seconds between compaction passes
+        burst_gap (float): Quiet seconds after which a burst is reported
+        clock (callable): Time source, time.monotonic by default
+    """
+
+    def __init__(
+        self,
+        name,
+        capacity,
+        refill_seconds,
+        max_keys=10000,
+        compact_interval=30.0,
+        burst_gap=60.0,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.capacity = float(capacity)
+        self.rate = 1.0 / float(refill_seconds)
+        self.max_keys = max_keys
+        self.compact_interval = compact_interval
+        self.burst_gap = burst_gap
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_compacted = clock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _refill(self, bucket, now):
+        bucket.tokens = min(
+            self.capacity, bucket.tokens + (now - bucket.updated) * self.rate
+        )
+        bucket.updated = now
+
+    def _finish_burst(self, key, bucket):
+        burst = {
+            "limiter": self.name,
+            "key": key,
+            "rejected": bucket.rejected,
+            "duration_seconds": round(bucket.last_rejected - bucket.burst_started, 1),
+        }
+        bucket.rejected = 0
+        return burst
+
+    def allow(self, key):
+        """
+        Take a token for key.
+
+        Returns:
+            tuple: (allowed, finished_bursts) where finished_bursts lists
+            bursts that ended and should be logged
+        """
+        bursts = []
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = _Bucket(self.capacity, now)
+                self._buckets[key] = bucket
+                # Evict least recently used keys beyond the memory bound
+                while len(self._buckets) > self.max_keys:
+                    old_key, old_bucket = self._buckets.popitem(last=False)
+                    if old_bucket.rejected:
+                        bursts.append(self._finish_burst(old_key, old_bucket))
+            else:
+                self._buckets.move_to_end(key)
+                self._refill(bucket, now)
+
+            if bucket.tokens >= 1.0:
+                bucket.tokens -= 1.0
+                allowed = True
+                if bucket.rejected and now - bucket.last_rejected >= self.burst_gap:
+                    bursts.append(self._finish_burst(key, bucket))
+            else:
+                allowed = False
+                if not bucket.rejected:
+                    bucket.burst_started = now
+                bucket.rejected += 1
+                bucket.last_rejected = now
+
+            if now - self._last_compacted >= self.compact_interval:
+                bursts.extend(self._compact(now))
+        return allowed, bursts
+
+    def reset(self, key):
+        """Forget a key (e.g. after a successful login)."""
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+        if bucket is not None and bucket.rejected:
+            return [self._finish_burst(key, bucket)]
+        return []
+
+    def _compact(self, now):
+        """Drop refilled buckets and report bursts that have gone quiet."""
+        bursts = []
+        for key in list(self._buckets):
+            bucket = self._buckets[key]
+            self._refill(bucket, now)
+            if bucket.rejected and now - bucket.last_rejected >= self.burst_gap:
+                bursts.append(self._finish_burst(key, bucket))
+            if not bucket.rejected and bucket.tokens >= self.capacity:
+                del self._buckets[key]
+        self._last_compacted = now
+        return bursts
+
+    def compact(self):
+        with self._lock:
+            return self._compact(self.clock())
+
+
+_limiters = None
+_limiters_lock = threading.Lock()
+
+
+def get_login_limiters():
+    """Return the shared (username, ip) limiters, creating them on first use."""
+    global _limiters
+    if _limiters is None:
+        with _limiters_lock:
+            if _limiters is None:
+                max_keys = get_setting("LOGIN_RATE_MAX_KEYS", 10000, cast=int)
+                _limiters = (
+                    LoginRateLimiter(
+                        "username",
+                        capacity=get_setting("LOGIN_RATE_USER_BURST", 5, cast=int),
+                        refill_seconds=get_setting("LOGIN_RATE_USER_REFILL_SECONDS", 60, cast=float),
+                        max_keys=max_keys,
+                    ),
+                    LoginRateLimiter(
+                        "ip",
+                        capacity=get_setting("LOGIN_RATE_IP_BURST", 20, cast=int),
+                        refill_seconds=get_setting("LOGIN_RATE_IP_REFILL_SECONDS", 6, cast=float),
+                        max_keys=max_keys,
+                    ),
+                )
+    return _limiters
+
+
+def get_client_ip():
+    """
+    Best-effort client IP for the current Streamlit session.
+
+    The peer address of the connection is used unless TRUSTED_PROXY_HOPS
+    says the app runs behind that many reverse proxies. In that case the
+    address comes from X-Forwarded-For: the entry the outermost trusted proxy
+    appended, counted from the right. Entries to the left of it are supplied
+    by the client and cannot be trusted.
+    """
+    try:
+        hops = get_setting("TRUSTED_PROXY_HOPS", 0, cast=int)
+        if hops > 0:
+            forwarded = st.context.headers.get("X-Forwarded-For")
+            entries = [entry.strip() for entry in (forwarded or "").split(",") if entry.strip()]
+            if len(entries) >= hops:
+                return entries[-hops]
+        return st.context.ip_address
+    except Exception:
+        return None
+
+
+def _log_bursts(bursts):
+    for burst in bursts:
+        log_security_event(
+            event_type=SecurityEventType.AUTH_RATE_LIMITED,
+            description=(
+                f"{burst['rejected']} login attempt(s) blocked for {burst['limiter']} "
+                f"'{burst['key']}' over {burst['duration_seconds']}s"
+            ),
+            user_id=None,
+            archer_id=None,
+            ip_address=burst["key"] if burst["limiter"] == "ip" else None,
+            request_details=burst,
+        )
+
+
+def check_login_allowed(username, ip_address=None):
+    """
+    Take a login attempt token for the username and client IP.
+
+    Returns:
+        bool: True if the attempt may proceed
+    """
+    user_limiter, ip_limiter = get_login_limiters()
+    allowed, bursts = user_limiter.allow(str(username).lower())
+    if ip_address:
+        ip_allowed, ip_bursts = ip_limiter.allow(ip_address)
+        allowed = allowed and ip_allowed
+        bursts += ip_bursts
+    _log_bursts(bursts)
+    return allowed
+
+
+def record_login_success(username):
+    """Clear the username's bucket after a successful login."""
+    user_limiter, _ = get_login_limiters()
+    _log_bursts(user_limiter.reset(str(username).lower()))
@@ -8,6 +8,8 @@ from archery_app.validators import (
     display_validation_errors, ValidationError
 )
 from archery_app.security_logging import log_security_event, SecurityEventType
+from archery_app.equivalent_rounds import add_round_group_column
+from archery_app.digests import schedule_digest_refresh
 def manage_archers():
     st.header("Add New Archer")
 
@@ -202,6 +204,8 @@ def approve_practice_scores():
 
             if score_id > 0:
                 st.success(f"Score approved successfully! Score ID: {score_id}")
+                # The archer's dashboard and the club's pending count changed
+                schedule_digest_refresh(score_ids=[score_id])
                 # Add logging
                 from archery_app.security_logging import log_security_event, SecurityEventType
                 log_security_event(
@@ -303,6 +307,8 @@ def manage_competitions():
                     st.success(
                         f"Competition created successfully! Competition ID: {competition_id}"
                     )
+                    # Upcoming competitions on the dashboard
+                    schedule_digest_refresh()
                     # Add logging
                     from archery_app.security_logging import log_security_event, SecurityEventType
                     log_security_event(
@@ -408,6 +414,7 @@ def manage_competitions():
                 conn.close()
 
                 st.success(f"Score linked to competition successfully!")
+                schedule_digest_refresh(score_ids=[score_id], club=False)
                 # Add logging
                 from archery_app.security_logging import log_security_event, SecurityEventType
                 log_security_event(
@@ -474,10 +481,11 @@ def generate_competition_results():
                             categories[category] = []
                         categories[category].append(row)
 
-                    # Display results by category
+                    # Display results by category; rows with the same round
+                    # group shot rounds equivalent for that category
                     for category, rows in categories.items():
                         st.subheader(f"Category: {category}")
-                        df = pd.DataFrame(rows)
+                        df = add_round_group_column(pd.DataFrame(rows))
                         st.dataframe(df)
                 else:
                     st.info("No results found for the selected competition.")
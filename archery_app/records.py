@@ -0,0 +1,252 @@
+# archery_app/records.py
+
+"""
+Personal bests and club records.
+
+PersonalBest holds each archer's best approved score per round and equipment
+type; ClubRecord holds the best competition score per class, round and
+equipment type (the archer's class in the year the score was shot, as the
+competition results work it out). Pages read them directly instead of
+scanning Score for MAX(TotalScore).
+
+Both tables are kept up to date in the same transaction as the score:
+uspApproveScore updates the personal best and uspLinkScoreToCompetition the
+club record, through uspUpdateScoreRecords. A new score only replaces a
+record it beats, so on a tie the earlier score keeps it.
+
+Scores changed any other way (the SQL Assistant, bulk loads) are picked up
+by a rebuild, which recomputes both tables from Score in archer and round
+key-range chunks, each chunk replaced in its own transaction:
+
+    python -m archery_app.records rebuild
+"""
+
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+
+from .database import get_connection
+from .settings import get_setting
+
+# Position 1 of each (archer, round, equipment): highest total, then earliest
+_PERSONAL_BESTS_SQL = """
+    INSERT INTO PersonalBest (ArcherID, RoundID, EquipmentTypeID, ScoreID, TotalScore, Date)
+    SELECT ArcherID, RoundID, EquipmentTypeID, ScoreID, TotalScore, Date
+    FROM (
+        SELECT s.ArcherID, s.RoundID, s.EquipmentTypeID, s.ScoreID, s.TotalScore, s.Date,
+               ROW_NUMBER() OVER (
+                   PARTITION BY s.ArcherID, s.RoundID, s.EquipmentTypeID
+                   ORDER BY s.TotalScore DESC, s.Date, s.ScoreID
+               ) AS Position
+        FROM Score s
+        WHERE s.IsApproved = TRUE
+          AND s.ArcherID >= %(start)s AND s.ArcherID < %(end)s
+    ) ranked
+    WHERE Position = 1
+"""
+
+_CLUB_RECORDS_SQL = """
+    INSERT INTO ClubRecord (ClassID, RoundID, EquipmentTypeID, ScoreID, ArcherID, TotalScore, Date)
+    SELECT ClassID, RoundID, EquipmentTypeID, ScoreID, ArcherID, TotalScore, Date
+    FROM (
+        SELECT cls.ClassID, s.RoundID, s.EquipmentTypeID, s.ScoreID, s.ArcherID, s.TotalScore, s.Date,
+               ROW_NUMBER() OVER (
+                   PARTITION BY cls.ClassID, s.RoundID, s.EquipmentTypeID
+                   ORDER BY s.TotalScore DESC, s.Date, s.ScoreID
+               ) AS Position
+        FROM Score s
+        JOIN Archer a ON s.ArcherID = a.ArcherID
+        JOIN Class cls ON a.Gender = cls.Gender
+            AND cls.AgeGroupID = (
+                SELECT ag.AgeGroupID
+                FROM AgeGroup ag
+                WHERE (YEAR(s.Date) - YEAR(a.DateOfBirth)) BETWEEN IFNULL(ag.MinAge, 0) AND IFNULL(ag.MaxAge, 999)
+                LIMIT 1
+            )
+        WHERE s.IsApproved = TRUE AND s.IsCompetition = TRUE
+          AND s.RoundID >= %(start)s AND s.RoundID < %(end)s
+    ) ranked
+    WHERE Position = 1
+"""
+
+ARCHERS_PER_CHUNK = 500
+ROUNDS_PER_CHUNK = 5
+
+
+def _rebuild_table(conn, table, key_table, key_column, insert_sql, batch_size, throttle, log):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MIN({key_column}), MAX({key_column}) FROM {key_table}")
+    low, high = cursor.fetchone()
+    # Rows for keys outside the current range (deleted archers or rounds)
+    if low is None:
+        cursor.execute(f"DELETE FROM {table}")
+    else:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {key_column} < %(low)s OR {key_column} > %(high)s",
+            {"low": low, "high": high},
+        )
+    conn.commit()
+    total = 0
+    start = low
+    while low is not None and start <= high:
+        began = time.perf_counter()
+        params = {"start": start, "end": start + batch_size}
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {key_column} >= %(start)s AND {key_column} < %(end)s", params
+        )
+        cursor.execute(insert_sql, params)
+        total += max(cursor.rowcount, 0)
+        conn.commit()
+        start += batch_size
+        if throttle and start <= high:
+            time.sleep((time.perf_counter() - began) * throttle)
+    cursor.close()
+    if log:
+        log(f"{table}: {total:,} rows")
+    return total
+
+
+def rebuild_records(conn=None, throttle=None, log=print):
+    """
+    Recompute PersonalBest and ClubRecord from Score.
+
+    Args:
+        conn: Database connection (default a new one, closed afterwards)
+        throttle (float, optional): Pause between chunks as a multiple of the
+            chunk's run time (MIGRATION_THROTTLE)
+        log (callable, optional): Progress output
+
+    Returns:
+        tuple: (personal best rows, club record rows)
+    """
+    own_connection = conn is None
+    conn = conn or get_connection()
+    if throttle is None:
+        throttle = get_setting("MIGRATION_THROTTLE", 1.0, cast=float)
+    try:
+        personal_bests = _rebuild_table(
+            conn, "PersonalBest", "Archer", "ArcherID", _PERSONAL_BESTS_SQL,
+            ARCHERS_PER_CHUNK, throttle, log,
+        )
+        club_records = _rebuild_table(
+            conn, "ClubRecord", "Round", "RoundID", _CLUB_RECORDS_SQL,
+            ROUNDS_PER_CHUNK, throttle, log,
+        )
+    finally:
+        if own_connection:
+            conn.close()
+    return personal_bests, club_records
+
+
+def get_personal_bests(archer_id):
+    """
+    An archer's personal best for every round and equipment type shot.
+
+    Returns:
+        list: Dicts with RoundID, RoundName, EquipmentType, TotalScore,
+        PossibleScore, Date and ScoreID, by round name
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        """
+        SELECT pb.RoundID, r.RoundName, et.Name AS EquipmentType, pb.TotalScore,
+               r.PossibleScore, pb.Date, pb.ScoreID
+        FROM PersonalBest pb
+        JOIN Round r ON pb.RoundID = r.RoundID
+        JOIN EquipmentType et ON pb.EquipmentTypeID = et.EquipmentTypeID
+        WHERE pb.ArcherID = %s
+        ORDER BY r.RoundName, et.Name
+        """,
+        (archer_id,),
+    )
+    personal_bests = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return personal_bests
+
+
+def get_recent_personal_bests(archer_id=None, days=30, limit=20):
+    """
+    Personal bests set in the last few days ("new PB" moments).
+
+    Args:
+        archer_id (int, optional): One archer, or everyone when None
+        days (int): How far back to look
+        limit (int): Most rows returned
+
+    Returns:
+        list: Dicts with ArcherID, ArcherName, RoundName, EquipmentType,
+        TotalScore and Date, newest first
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        """
+        SELECT pb.ArcherID, CONCAT(a.FirstName, ' ', a.LastName) AS ArcherName,
+               r.RoundName, et.Name AS EquipmentType, pb.TotalScore, pb.Date
+        FROM PersonalBest pb
+        JOIN Archer a ON pb.ArcherID = a.ArcherID
+        JOIN Round r ON pb.RoundID = r.RoundID
+        JOIN EquipmentType et ON pb.EquipmentTypeID = et.EquipmentTypeID
+        WHERE pb.Date >= %(since)s AND (%(archer)s IS NULL OR pb.ArcherID = %(archer)s)
+        ORDER BY pb.Date DESC, pb.TotalScore DESC
+        LIMIT %(limit)s
+        """,
+        {"since": date.today() - timedelta(days=days), "archer": archer_id, "limit": limit},
+    )
+    personal_bests = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return personal_bests
+
+
+def get_club_records(round_id=None):
+    """
+    Club records, for one round or all of them.
+
+    Returns:
+        list: Dicts with ClassName, RoundName, EquipmentType, ArcherName,
+        TotalScore, PossibleScore and Date, by round, class and equipment
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        """
+        SELECT c.ClassName, r.RoundName, et.Name AS EquipmentType,
+               CONCAT(a.FirstName, ' ', a.LastName) AS ArcherName,
+               cr.TotalScore, r.PossibleScore, cr.Date
+        FROM ClubRecord cr
+        JOIN Class c ON cr.ClassID = c.ClassID
+        JOIN Round r ON cr.RoundID = r.RoundID
+        JOIN EquipmentType et ON cr.EquipmentTypeID = et.EquipmentTypeID
+        JOIN Archer a ON cr.ArcherID = a.ArcherID
+        WHERE %(round)s IS NULL OR cr.RoundID = %(round)s
+        ORDER BY r.RoundName, c.ClassName, et.Name
+        """,
+        {"round": round_id},
+    )
+    records = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m archery_app.records",
+        description="Personal best and club record maintenance",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="Recompute both tables from Score")
+    rebuild.add_argument("--throttle", type=float, help="Pause between chunks as a multiple of chunk time")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        rebuild_records(throttle=args.throttle)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# archery_app/round_catalogue.py
+
+"""
+Process-wide catalogue of round definitions.
+
+Rounds, their RoundRanges and TargetFaces change only when the club adds or
+edits a round, yet the round viewer, score entry and score validation all
+need them. get_round_catalogue() loads them in one query into immutable
+RoundDefinition / RangeDefinition tuples (NamedTuples keep no per-instance
+__dict__) with the derived fields worked out once:
+
+    arrows             ends x arrows per end
+    max_score          arrows x MAX_ARROW_SCORE (all faces are 10-zone)
+    first_end_index    ends shot before the range (0-based, across the round)
+    first_arrow_index  arrows shot before the range
+
+and, per round, total_ends and max_score (the sum of its ranges' maximums).
+
+Readers then look rounds up by ID or name without touching the database.
+The catalogue is reloaded after ROUND_CATALOGUE_TTL seconds, or on next use
+after invalidate_round_catalogue() (called when the SQL Assistant changes
+Round, RoundRange or TargetFace). Caches derived from round definitions,
+such as the handicap tables, follow the catalogue they were built from.
+"""
+
+import bisect
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
+
+from .settings import get_setting
+
+MAX_ARROW_SCORE = 10
+
+
+class RangeDefinition(NamedTuple):
+    range_sequence: int
+    distance: int
+    number_of_ends: int
+    arrows_per_end: int
+    target_face_id: int
+    face_size: int
+    face_description: Optional[str]
+    arrows: int
+    max_score: int
+    first_end_index: int
+    first_arrow_index: int
+
+    @property
+    def max_end_score(self):
+        return self.arrows_per_end * MAX_ARROW_SCORE
+
+
+class RoundDefinition(NamedTuple):
+    round_id: int
+    name: str
+    total_arrows: int
+    possible_score: int
+    description: Optional[str]
+    ranges: Tuple[RangeDefinition, ...]
+    total_ends: int
+    max_score: int
+
+    def range(self, range_sequence):
+        """The range with a RangeSequence, or None."""
+        for round_range in self.ranges:
+            if round_range.range_sequence == range_sequence:
+                return round_range
+        return None
+
+    def range_for_end(self, end_index):
+        """The range containing the end at a 0-based index across the whole round."""
+        if not 0 <= end_index < self.total_ends:
+            raise IndexError(f"{self.name} has {self.total_ends} ends")
+        starts = [round_range.first_end_index for round_range in self.ranges]
+        return self.ranges[bisect.bisect_right(starts, end_index) - 1]
+
+    def end_index(self, range_sequence, end_sequence):
+        """0-based index across the round of an end (EndSequence counts from 1)."""
+        round_range = self.range(range_sequence)
+        if round_range is None or not 1 <= end_sequence <= round_range.number_of_ends:
+            raise IndexError(f"{self.name} has no end {range_sequence}/{end_sequence}")
+        return round_range.first_end_index + end_sequence - 1
+
+
+class RoundCatalogue:
+    """All round definitions, by RoundID and by name."""
+
+    def __init__(self, rounds):
+        self.rounds = tuple(sorted(rounds, key=lambda definition: definition.round_id))
+        self._by_id = {definition.round_id: definition for definition in self.rounds}
+        self._by_name = {definition.name: definition for definition in self.rounds}
+
+    def get(self, round_id):
+        return self._by_id.get(round_id)
+
+    def by_name(self, name):
+        return self._by_name.get(name)
+
+    def __iter__(self):
+        return iter(self.rounds)
+
+    def __len__(self):
+        return len(self.rounds)
+
+
+def build_round_definition(round_id, name, total_arrows, possible_score, description, ranges):
+    """
+    Build a RoundDefinition, deriving the per-range fields.
+
+    Args:
+        ranges (list): (RangeSequence, Distance, NumberOfEnds, ArrowsPerEnd,
+            TargetFaceID, face size, face description) in shooting order
+
+    Returns:
+        RoundDefinition
+    """
+    definitions = []
+    ends_before = arrows_before = 0
+    for range_sequence, distance, ends, per_end, face_id, face_size, face_description in ranges:
+        arrows = ends * per_end
+        definitions.append(RangeDefinition(
+            range_sequence, distance, ends, per_end, face_id, face_size, face_description,
+            arrows, arrows * MAX_ARROW_SCORE, ends_before, arrows_before,
+        ))
+        ends_before += ends
+        arrows_before += arrows
+    return RoundDefinition(round_id, name, total_arrows, possible_score, description,
+                           tuple(definitions), ends_before,
+                           sum(definition.max_score for definition in definitions))
+
+
+def load_round_catalogue():
+    """Build a RoundCatalogue from the database."""
+    from .database import get_connection
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT r.RoundID, r.RoundName, r.TotalArrows, r.PossibleScore, r.Description,
+               rr.RangeSequence, rr.Distance, rr.NumberOfEnds, rr.ArrowsPerEnd,
+               tf.TargetFaceID, tf.Size, tf.Description
+        FROM Round r
+        LEFT JOIN RoundRange rr ON r.RoundID = rr.RoundID
+        LEFT JOIN TargetFace tf ON rr.TargetFaceID = tf.TargetFaceID
+        ORDER BY r.RoundID, rr.RangeSequence
+        """
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    rounds = {}
+    for row in rows:
+        entry = rounds.setdefault(row[0], (row[:5], []))
+        if row[5] is not None:
+            entry[1].append(row[5:])
+    return RoundCatalogue(
+        build_round_definition(*header, ranges) for header, ranges in rounds.values()
+    )
+
+
+_catalogue = None
+_catalogue_loaded_at = 0.0
+_catalogue_lock = threading.Lock()
+
+
+def get_round_catalogue():
+    """The shared RoundCatalogue, reloaded after ROUND_CATALOGUE_TTL seconds."""
+    global _catalogue, _catalogue_loaded_at
+    ttl = get_setting("ROUND_CATALOGUE_TTL", 600, cast=float)
+    if _catalogue is None or time.monotonic() - _catalogue_loaded_at > ttl:
+        with _catalogue_lock:
+            if _catalogue is None or time.monotonic() - _catalogue_loaded_at > ttl:
+                _catalogue = load_round_catalogue()
+                _catalogue_loaded_at = time.monotonic()
+    return _catalogue
+
+
+def invalidate_round_catalogue():
+    """Reload round definitions on next use (after a round changes)."""
+    global _catalogue
+    with _catalogue_lock:
+        _catalogue = None
@@ -0,0 +1,142 @@
+# archery_app/score_validation.py
+
+"""
+Plausibility checks for submitted scores.
+
+A total is plausible for a round when it lies between 0 and the round's
+PossibleScore (and the maximum its ranges allow). When end or arrow detail
+comes with the score, each end must belong to the round, total no more than
+its range allows (arrows per end x 10), match its arrows if they are given,
+and the ends must add up to the total - exactly once every end of the round
+is present.
+
+The checks read round definitions from the round catalogue, so they cost a
+dictionary lookup and a few comparisons: about a microsecond per total-only
+row. check_scores() runs them over a batch (bulk imports, generated data)
+and reports only the rows that fail; validate_score() raises ValidationError
+for a single submission, for the pages.
+
+uspAddStagedScore repeats the total check in the database, so scores sent
+straight to the procedure cannot skip it.
+"""
+
+from .round_catalogue import MAX_ARROW_SCORE, get_round_catalogue
+from .validators import ValidationError
+
+
+def _end_problems(definition, total_score, ends):
+    problems = []
+    seen = set()
+    end_sum = 0
+    unseen_max = definition.max_score
+    for end in ends:
+        range_sequence, end_sequence, end_total = end[:3]
+        round_range = definition.range(range_sequence)
+        if round_range is None or not 1 <= end_sequence <= round_range.number_of_ends:
+            problems.append(f"{definition.name} has no end {range_sequence}/{end_sequence}.")
+            continue
+        if (range_sequence, end_sequence) in seen:
+            problems.append(f"End {range_sequence}/{end_sequence} is given more than once.")
+            continue
+        seen.add((range_sequence, end_sequence))
+        end_sum += end_total
+        unseen_max -= round_range.max_end_score
+
+        if not 0 <= end_total <= round_range.max_end_score:
+            problems.append(
+                f"End {range_sequence}/{end_sequence} total {end_total} is outside "
+                f"0-{round_range.max_end_score}."
+            )
+        arrows = end[3] if len(end) > 3 else None
+        if arrows is not None:
+            if len(arrows) != round_range.arrows_per_end:
+                problems.append(
+                    f"End {range_sequence}/{end_sequence} has {len(arrows)} arrows, "
+                    f"not {round_range.arrows_per_end}."
+                )
+            if any(not 0 <= arrow <= MAX_ARROW_SCORE for arrow in arrows):
+                problems.append(f"End {range_sequence}/{end_sequence} has an arrow outside 0-{MAX_ARROW_SCORE}.")
+            elif sum(arrows) != end_total:
+                problems.append(
+                    f"End {range_sequence}/{end_sequence} arrows add up to {sum(arrows)}, not {end_total}."
+                )
+
+    if len(seen) == definition.total_ends:
+        if end_sum != total_score:
+            problems.append(f"Ends add up to {end_sum}, not the total of {total_score}.")
+    elif not end_sum <= total_score <= end_sum + unseen_max:
+        problems.append(
+            f"Total {total_score} cannot be reached from ends adding up to {end_sum} "
+            f"with {definition.total_ends - len(seen)} ends missing."
+        )
+    return problems
+
+
+def score_problems(definition, total_score, ends=None):
+    """
+    Why a score is implausible for a round.
+
+    Args:
+        definition (RoundDefinition): The round, or None if it does not exist
+        total_score (int): Submitted total
+        ends (list, optional): (RangeSequence, EndSequence, TotalEndScore) per
+            end shot, optionally followed by the end's arrow scores
+
+    Returns:
+        list: Problem descriptions; empty when the score is plausible
+    """
+    if definition is None:
+        return ["Unknown round."]
+    limit = min(definition.possible_score, definition.max_score) if definition.ranges else definition.possible_score
+    if not 0 <= total_score <= limit:
+        return [f"Total score {total_score} is outside 0-{limit} for {definition.name}."]
+    if ends and definition.ranges:
+        return _end_problems(definition, total_score, ends)
+    return []
+
+
+def check_score(round_id, total_score, ends=None, catalogue=None):
+    """Problems with one score; see score_problems()."""
+    catalogue = catalogue or get_round_catalogue()
+    return score_problems(catalogue.get(round_id), total_score, ends)
+
+
+def validate_score(round_id, total_score, ends=None, catalogue=None):
+    """
+    Check one submitted score.
+
+    Raises:
+        ValidationError: Listing every problem found
+    """
+    problems = check_score(round_id, total_score, ends, catalogue)
+    if problems:
+        raise ValidationError(" ".join(problems))
+
+
+def check_scores(rows, catalogue=None):
+    """
+    Check a batch of scores against one catalogue.
+
+    Args:
+        rows: (RoundID, TotalScore) or (RoundID, TotalScore, ends) per score
+        catalogue (RoundCatalogue, optional): Default the shared catalogue
+
+    Returns:
+        list: (row index, problems) for each implausible row
+    """
+    catalogue = catalogue or get_round_catalogue()
+    get = catalogue.get
+    rejected = []
+    for index, row in enumerate(rows):
+        definition = get(row[0])
+        total_score = row[1]
+        ends = row[2] if len(row) > 2 else None
+        # Fast path for the common case: a known round and a total in range
+        if (definition is not None and not ends
+                and 0 <= total_score <= definition.possible_score
+                and (not definition.ranges or total_score <= definition.max_score)):
+            continue
+        problems = score_problems(definition, total_score, ends)
+        if problems:
+            rejected.append((index, problems))
+    return rejected
@@ -8,9 +8,13 @@ from archery_app.security_logging import (
     mark_log_as_reviewed,
     mark_multiple_logs_as_reviewed,
     get_security_summary,
+    log_security_event,
     SecurityEventType,
     SecuritySeverity
 )
+from archery_app.database import get_database_backend
+from archery_app.log_archive import get_archive_dir, get_log_storage, run_retention
+from archery_app.settings import get_setting
 
 def security_logs_admin():
     st.title("Security Audit Logs")
@@ -20,14 +24,17 @@ def security_logs_admin():
         st.error("You do not have permission to access this page.")
         return
     
-    # Create tabs for Summary and Log Details
-    tab1, tab2 = st.tabs(["Security Dashboard", "Log Details"])
+    # Create tabs for Summary, Log Details and Retention
+    tab1, tab2, tab3 = st.tabs(["Security Dashboard", "Log Details", "Retention"])
     
     with tab1:
         display_security_dashboard()
         
     with tab2:
         display_log_details()
+    
+    with tab3:
+        display_log_retention()
 
 def display_security_dashboard():
     st.header("Security Dashboard")
@@ -123,6 +130,7 @@ def display_log_details():
             SecurityEventType.AUTH_LOGIN_SUCCESS,
             SecurityEventType.AUTH_LOGIN_FAILURE,
             SecurityEventType.AUTH_LOGOUT,
+            SecurityEventType.AUTH_RATE_LIMITED,
             SecurityEventType.AUTH_PASSWORD_CHANGE,
             SecurityEventType.USER_PRIVILEGE_CHANGE,
             SecurityEventType.USER_ACCOUNT_CREATE,
@@ -224,7 +232,8 @@ def display_log_details():
         
         with review_tab2:
             # Filter unreviewed logs for multi-select
-            unreviewed_logs = [log for log in logs if not log["IsReviewed"]]
+            # Archived logs are read-only
+            unreviewed_logs = [log for log in logs if not log["IsReviewed"] and not log.get("Archived")]
             
             if unreviewed_logs:
                 st.write(f"There are {len(unreviewed_logs)} unreviewed logs matching your filters.")
@@ -278,4 +287,74 @@ def display_log_details():
             else:
                 st.info("No unreviewed logs found matching your filters.")
     else:
-        st.info("No logs found matching the selected filters.")
\ No newline at end of file
+        st.info("No logs found matching the selected filters.")
+
+def display_log_retention():
+    st.header("Log Retention")
+    
+    retention_months = get_setting("SECURITY_LOG_RETENTION_MONTHS", 12, cast=int)
+    st.write(
+        f"The current month and the previous **{retention_months}** months stay in the "
+        f"database. Older months are archived to compressed files in `{get_archive_dir()}` "
+        "and removed from the database; archived events still appear on the dashboard "
+        "and in the log details."
+    )
+    
+    try:
+        storage = get_log_storage()
+    except Exception as e:
+        st.error(f"Error reading log storage: {e}")
+        return
+    
+    archives = storage["archives"]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        oldest = storage["oldest"]
+        st.metric("Oldest Event in Database", oldest.strftime("%Y-%m-%d") if oldest else "-")
+    with col2:
+        st.metric("Archived Months", len(archives))
+    with col3:
+        st.metric("Archive Size", f"{sum(a['bytes'] for a in archives) / 1024 / 1024:.1f} MB")
+    
+    if storage["partitions"]:
+        st.subheader("Monthly Partitions")
+        st.dataframe(pd.DataFrame(storage["partitions"]), use_container_width=True, hide_index=True)
+        st.caption("Row counts are MySQL's estimates.")
+    elif get_database_backend().name == "mysql":
+        st.info(
+            "SecurityLog is not partitioned yet (run `python -m archery_app.migrations migrate`); "
+            "until then archived months are deleted row by row."
+        )
+    
+    if archives:
+        st.subheader("Archives")
+        archive_df = pd.DataFrame([
+            {
+                "Month": a["month"].strftime("%Y-%m"),
+                "Events": a["manifest"].get("rows"),
+                "Unreviewed": a["manifest"].get("unreviewed"),
+                "Size (KB)": round(a["bytes"] / 1024, 1),
+                "Archived At": a["manifest"].get("archived_at"),
+            }
+            for a in archives
+        ])
+        st.dataframe(archive_df, use_container_width=True, hide_index=True)
+    
+    if st.button("Archive Now"):
+        with st.spinner("Archiving old months..."):
+            try:
+                archived = run_retention(log=None)
+            except Exception as e:
+                st.error(f"Error archiving security logs: {e}")
+                return
+        if archived:
+            months = ", ".join(month.strftime("%Y-%m") for month, _ in archived)
+            log_security_event(
+                SecurityEventType.DATA_DELETE,
+                f"Archived security log months {months}",
+                request_details={"rows": sum(rows for _, rows in archived)}
+            )
+            st.success(f"Archived {months}.")
+            st.rerun()
+        else:
+            st.info("No months past the retention period.")
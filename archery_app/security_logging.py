@@ -2,15 +2,17 @@
 
 import streamlit as st
 import mysql.connector
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 from archery_app.database import get_connection
+from archery_app.log_archive import get_archived_summary, read_archived_logs
 
 # Define security event types
 class SecurityEventType:
     AUTH_LOGIN_SUCCESS = "AUTH_LOGIN_SUCCESS"
     AUTH_LOGIN_FAILURE = "AUTH_LOGIN_FAILURE"
     AUTH_LOGOUT = "AUTH_LOGOUT"
+    AUTH_RATE_LIMITED = "AUTH_RATE_LIMITED"
     AUTH_PASSWORD_CHANGE = "AUTH_PASSWORD_CHANGE"
     USER_PRIVILEGE_CHANGE = "USER_PRIVILEGE_CHANGE"
     USER_ACCOUNT_CREATE = "USER_ACCOUNT_CREATE"
@@ -48,6 +50,7 @@ def get_event_severity(event_type):
     ]
     
     warning_events = [
+        SecurityEventType.AUTH_RATE_LIMITED,
         SecurityEventType.USER_PRIVILEGE_CHANGE,
         SecurityEventType.USER_ACCOUNT_DELETE,
         SecurityEventType.DATA_DELETE
@@ -156,7 +159,7 @@ def get_security_logs(
         offset (int, optional): Offset for pagination
         
     Returns:
-        list: List of security log entries
+        list: List of security log entries, including archived months
     """
     try:
         conn = get_connection()
@@ -204,14 +207,33 @@ def get_security_logs(
         
         # Add ordering and limits
         query += " ORDER BY l.EventTime DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
+        cursor.execute(query, params + [limit, offset])
         logs = cursor.fetchall()
         
+        # Archived months are older than every row still in the database, so
+        # they are only read when the database cannot fill the page and the
+        # filter reaches back before its oldest row
+        read_archives = len(logs) < limit
+        if read_archives and start_date:
+            cursor.execute("SELECT LogID FROM SecurityLog WHERE EventTime <= %s LIMIT 1", (start_date,))
+            read_archives = cursor.fetchone() is None
+        if read_archives and offset:
+            # Archive rows follow every database row, including earlier pages
+            cursor.execute(query, params + [limit + offset, 0])
+            logs = cursor.fetchall()
+        
         cursor.close()
         conn.close()
         
+        if read_archives:
+            archived = read_archived_logs(
+                start_date, end_date, user_id, event_type, severity, is_reviewed, limit + offset
+            )
+            in_database = {log["LogID"] for log in logs}
+            logs.extend(log for log in archived if log["LogID"] not in in_database)
+            logs.sort(key=lambda log: log["EventTime"], reverse=True)
+            logs = logs[offset:offset + limit]
+        
         return logs
         
     except Exception as e:
@@ -293,6 +315,13 @@ def mark_multiple_logs_as_reviewed(log_ids, reviewed_by):
         print(f"Error marking multiple logs as reviewed: {e}")
         return 0, len(log_ids)
 
+def _merge_counts(rows, key, counts):
+    """Add {name: count} to [{key: name, "Count": count}] rows."""
+    merged = {row[key]: row["Count"] for row in rows}
+    for name, count in counts.items():
+        merged[name] = merged.get(name, 0) + count
+    return [{key: name, "Count": count} for name, count in merged.items()]
+
 # Get summary of security events (for dashboard)
 def get_security_summary(days=7):
     """
@@ -354,6 +383,14 @@ def get_security_summary(days=7):
         cursor.close()
         conn.close()
         
+        # Add archived months that fall inside the window
+        archived = get_archived_summary(datetime.now() - timedelta(days=days))
+        if archived["total"]:
+            total_count += archived["total"]
+            unreviewed_count += archived["unreviewed"]
+            severity_counts = _merge_counts(severity_counts, "Severity", archived["by_severity"])
+            event_type_counts = _merge_counts(event_type_counts, "EventType", archived["by_event_type"])
+        
         return {
             "total": total_count,
             "unreviewed": unreviewed_count,
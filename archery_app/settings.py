@@ -0,0 +1,44 @@
+# archery_app/settings.py
+
+import os
+import streamlit as st
+
+
+def get_setting(name, default=None, cast=None):
+    """
+    Read an optional setting from secrets.toml, falling back to the environment.
+
+    Required settings such as DB_HOST are still read straight from st.secrets;
+    this helper is for tuning knobs that have a sensible default.
+
+    Args:
+        name (str): Setting name, e.g. "SQL_ASSISTANT_BACKEND"
+        default: Value returned when the setting is not defined anywhere
+        cast (callable, optional): Conversion applied to the raw value
+
+    Returns:
+        The setting value, or default if it is not set or cannot be cast
+    """
+    value = None
+    try:
+        if name in st.secrets:
+            value = st.secrets[name]
+    except Exception:
+        # No secrets.toml (e.g. benchmarks or CI) - fall back to the environment
+        value = None
+
+    if value is None:
+        value = os.environ.get(name)
+
+    if value is None:
+        return default
+
+    if cast is not None:
+        try:
+            if cast is bool and isinstance(value, str):
+                return value.strip().lower() in ("1", "true", "yes", "on")
+            return cast(value)
+        except (TypeError, ValueError):
+            return default
+
+    return value
@@ -0,0 +1,474 @@
+# archery_app/sql_safety.py
+
+import re
+
+# Single master pattern: one left-to-right pass splits SQL into tokens.
+# Whitespace is consumed in front of each token rather than matched as a
+# token of its own, which halves the matches to loop over; only trailing
+# whitespace comes back as a "ws" token. Words, the most common token, are
+# tried first. MySQL "-- " comments need whitespace after the dashes,
+# "/*! */" comments are executed by the server and "/*+ */" comments are
+# optimizer hints.
+_TOKEN_PATTERN = re.compile(
+    r"""
+    \s*
+    (?:
+      (?P<word>[A-Za-z_$][\w$]*)
+    | (?P<ws>$)
+    | (?P<exec>/\*!.*?\*/)
+    | (?P<hint>/\*\+.*?\*/)
+    | (?P<comment>--(?=\s|$)[^\n]*|\#[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+    | (?P<ident>`(?:[^`]|``)*`)
+    | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+)
+    | (?P<var>@@?[\w.$]+)
+    | (?P<punct>.)
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Statement types the SQL Assistant is allowed to run
+SAFE_STATEMENT_TYPES = {
+    "SELECT", "INSERT", "REPLACE", "UPDATE", "DELETE", "CREATE", "ALTER",
+    "SHOW", "DESCRIBE", "DESC", "EXPLAIN", "CALL",
+}
+
+# Statement types that are always refused, with the reason shown to the user
+DANGEROUS_STATEMENT_REASONS = {
+    "TRUNCATE": "Attempting to truncate a table",
+    "GRANT": "Attempting to grant permissions",
+    "REVOKE": "Attempting to revoke permissions",
+    "RENAME": "Attempting to rename a table",
+    "LOAD": "Attempting to bulk load data",
+    "SHUTDOWN": "Attempting to shut down the server",
+    "KILL": "Attempting to kill a database connection",
+}
+
+# Words that start a new clause and therefore end a FROM list or WHERE clause
+_CLAUSE_KEYWORDS = {
+    "WHERE", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "SET", "ON", "USING",
+    "JOIN", "INNER", "LEFT", "RIGHT", "CROSS", "STRAIGHT_JOIN", "NATURAL",
+    "WINDOW", "FOR", "INTO", "VALUES", "SELECT", "LOCK", "EXCEPT", "INTERSECT",
+}
+
+# Words that may appear between a table keyword and the table name
+_TABLE_PREFIX_WORDS = {"IF", "NOT", "EXISTS", "TABLE", "IGNORE", "LOW_PRIORITY", "QUICK"}
+
+# Words in a WHERE clause that are not column references
+_NON_COLUMN_WORDS = {
+    "AND", "OR", "XOR", "NOT", "NULL", "IS", "TRUE", "FALSE", "IN", "BETWEEN",
+    "LIKE", "REGEXP", "RLIKE", "ESCAPE", "DIV", "MOD", "BINARY", "COLLATE",
+    "UNKNOWN", "SOUNDS",
+}
+
+# Markers in the AI response meaning the model itself flagged the query
+# (lower case; matched against the lower-cased response with plain
+# substring searches, which is much faster than an IGNORECASE alternation)
+AI_DANGER_MARKERS = ("dangerous query", "⚠️")
+
+# Markers that stop any SQL from being extracted from the AI response
+RESPONSE_DANGER_MARKERS = (
+    "dangerous query",
+    "query is potentially dangerous",
+    "without proper safeguards",
+    "without a where clause",
+)
+
+# Headings the model uses to mark the SQL that is safe to execute
+_FINAL_CODE_HEADING = re.compile(
+    r"#{1,6}\s*(?:Final code to execute|Execute this(?:\s+SQL)? code|SQL to execute"
+    r"|Code to run|Safe SQL code):?[ \t]*#{0,6}",
+    re.IGNORECASE,
+)
+_CODE_FENCE_OPEN = re.compile(r"\s*```(?:sql)?", re.IGNORECASE)
+
+# Single-quoted strings without escapes, and anything else that could hide a
+# second statement, a comment or an INTO OUTFILE in a SELECT; once the strings
+# are blanked, a SELECT with none of the rest needs no tokenising
+_SIMPLE_STRING = re.compile(r"'[^'\\]*'")
+_NOT_PLAIN_SELECT = re.compile(r"[;'\"`#\\]|--|/\*|INTO", re.IGNORECASE)
+
+
+class StatementInfo:
+    """Facts about one SQL statement gathered by analyse_sql()."""
+
+    __slots__ = (
+        "statement_type",
+        "object_type",
+        "tables",
+        "has_where",
+        "has_limit",
+        "has_join",
+        "flags",
+    )
+
+    def __init__(self):
+        self.statement_type = None
+        self.object_type = None
+        self.tables = []
+        self.has_where = False
+        self.has_limit = False
+        self.has_join = False
+        self.flags = set()
+
+    def __repr__(self):
+        return (
+            f"StatementInfo(type={self.statement_type!r}, object={self.object_type!r}, "
+            f"tables={self.tables!r}, where={self.has_where}, limit={self.has_limit}, "
+            f"join={self.has_join}, flags={sorted(self.flags)!r})"
+        )
+
+
+class SQLAnalysis:
+    """Result of analysing a (possibly multi-statement) SQL string."""
+
+    __slots__ = ("statements",)
+
+    def __init__(self, statements):
+        self.statements = statements
+
+    @property
+    def is_multi_statement(self):
+        return len(self.statements) > 1
+
+    @property
+    def statement_type(self):
+        return self.statements[0].statement_type if self.statements else None
+
+    @property
+    def tables(self):
+        seen = []
+        for statement in self.statements:
+            for table in statement.tables:
+                if table.lower() not in (t.lower() for t in seen):
+                    seen.append(table)
+        return seen
+
+    @property
+    def is_read_only(self):
+        return bool(self.statements) and all(
+            s.statement_type in ("SELECT", "SHOW", "DESCRIBE", "DESC", "EXPLAIN")
+            and "into_file" not in s.flags
+            and "executable_comment" not in s.flags
+            for s in self.statements
+        )
+
+
+def _unquote(value):
+    return value[1:-1].replace("``", "`")
+
+
+def significant_tokens(sql):
+    """
+    Split SQL into the tokens that carry meaning.
+
+    Whitespace and plain comments are dropped; executable comments and
+    optimizer hints are kept, as the server acts on them.
+
+    Args:
+        sql (str): The SQL text
+
+    Returns:
+        list: (kind, text, start, end) per token, kind being a group name of
+        the token pattern such as "word", "string" or "punct"
+    """
+    return [
+        (match.lastgroup, match.group(match.lastgroup), match.start(match.lastgroup), match.end())
+        for match in _TOKEN_PATTERN.finditer(sql or "")
+        if match.lastgroup not in ("ws", "comment")
+    ]
+
+
+def analyse_sql(sql):
+    """
+    Analyse SQL in a single pass over its tokens.
+
+    Classifies each statement's type, target tables and whether it has a
+    WHERE (that references at least one column) and a LIMIT at the top level.
+    Strings and comments are skipped, so keywords hidden inside them are
+    ignored, while MySQL executable comments are flagged.
+
+    Args:
+        sql (str): The SQL text
+
+    Returns:
+        SQLAnalysis: One StatementInfo per non-empty statement
+    """
+    statements = []
+    current = StatementInfo()
+    has_tokens = False
+
+    depth = 0
+    expect_table = False      # next identifier is a table name
+    after_table = False       # previous token was a table name
+    table_dot = False         # last table was followed by "." (schema.table)
+    in_from_list = False      # inside FROM a, b, c at top level
+    from_depth = 0
+    in_where = False          # inside the top-level WHERE clause
+    where_word = False        # a bare word in WHERE that may be a column or function
+    expect_object = False     # next word is the object type for CREATE/DROP/ALTER
+    with_pending = False      # WITH seen, main statement verb not yet found
+
+    for match in _TOKEN_PATTERN.finditer(sql or ""):
+        kind = match.lastgroup
+        if kind in ("ws", "comment", "hint"):
+            continue
+        value = match.group(kind)
+        was_table = after_table
+        after_table = False
+
+        if kind == "exec":
+            current.flags.add("executable_comment")
+            has_tokens = True
+            continue
+
+        # A word followed by anything but "(" in a WHERE clause is a column
+        if where_word:
+            where_word = False
+            if value != "(":
+                current.flags.add("where_column")
+
+        if kind == "punct":
+            if value == ";" and depth == 0:
+                if has_tokens:
+                    statements.append(current)
+                current = StatementInfo()
+                has_tokens = False
+                depth = 0
+                expect_table = table_dot = in_from_list = in_where = False
+                expect_object = with_pending = False
+                from_depth = 0
+                continue
+
+            has_tokens = True
+            if value == "(":
+                depth += 1
+                expect_table = False
+            elif value == ")":
+                depth = max(depth - 1, 0)
+                if depth < from_depth:
+                    in_from_list = False
+            elif value == "." and was_table:
+                table_dot = True
+                continue
+            elif value == "," and in_from_list and depth == from_depth:
+                expect_table = True
+                current.has_join = True
+            table_dot = False
+            continue
+
+        has_tokens = True
+
+        if kind == "ident":
+            name = _unquote(value)
+            if expect_table or table_dot:
+                if table_dot:
+                    current.tables[-1] = name
+                else:
+                    current.tables.append(name)
+                expect_table = False
+                after_table = True
+            elif in_where:
+                current.flags.add("where_column")
+            table_dot = False
+            continue
+
+        if kind != "word":
+            table_dot = False
+            continue
+
+        upper = value.upper()
+
+        # Table names (possibly schema-qualified)
+        if table_dot:
+            current.tables[-1] = value
+            table_dot = False
+            after_table = True
+            continue
+        if expect_table:
+            if upper in _TABLE_PREFIX_WORDS:
+                continue
+            if upper in ("OUTFILE", "DUMPFILE"):
+                current.flags.add("into_file")
+                expect_table = False
+                continue
+            expect_table = False
+            if upper not in _CLAUSE_KEYWORDS:
+                current.tables.append(value)
+                after_table = True
+                continue
+
+        # Object type for CREATE / DROP / ALTER (e.g. TABLE, USER, DATABASE)
+        if expect_object:
+            if upper in ("OR", "REPLACE", "TEMPORARY", "UNIQUE", "FULLTEXT", "SPATIAL"):
+                continue
+            current.object_type = upper
+            expect_object = False
+            if upper in ("TABLE", "VIEW"):
+                expect_table = True
+            continue
+
+        # Statement type
+        if current.statement_type is None or with_pending:
+            if current.statement_type is None and upper == "WITH":
+                current.statement_type = "WITH"
+                with_pending = True
+                continue
+            if with_pending:
+                if depth == 0 and upper in ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE"):
+                    current.statement_type = upper
+                    with_pending = False
+                else:
+                    continue
+            else:
+                current.statement_type = upper
+            if upper in ("CREATE", "DROP", "ALTER"):
+                expect_object = True
+            elif upper in ("UPDATE", "TRUNCATE"):
+                expect_table = True
+            continue
+
+        if depth == 0:
+            if upper == "WHERE":
+                current.has_where = True
+                in_where = True
+                in_from_list = False
+                continue
+            if upper == "LIMIT":
+                current.has_limit = True
+                in_where = in_from_list = False
+                continue
+            if upper in ("ORDER", "GROUP", "HAVING", "UNION", "WINDOW"):
+                in_where = in_from_list = False
+            if upper == "DROP" and current.statement_type == "ALTER":
+                current.flags.add("drop_clause")
+
+        if upper in ("FROM", "INTO", "JOIN", "STRAIGHT_JOIN"):
+            expect_table = True
+            if upper == "FROM":
+                in_from_list = True
+                from_depth = depth
+            elif upper != "INTO":
+                current.has_join = True
+            continue
+
+        if upper in _CLAUSE_KEYWORDS and depth == from_depth:
+            in_from_list = False
+
+        if in_where and upper not in _NON_COLUMN_WORDS:
+            where_word = True
+
+    if where_word:
+        current.flags.add("where_column")
+    if has_tokens:
+        statements.append(current)
+
+    return SQLAnalysis(statements)
+
+
+def check_sql_safety(sql):
+    """
+    Decide whether SQL is too dangerous for the assistant to execute.
+
+    Args:
+        sql (str): The SQL text
+
+    Returns:
+        tuple: (is_dangerous, reason)
+    """
+    # Fast path for the common case: one SELECT with nothing but plain strings,
+    # and no comments, semicolons or INTO, which the analyser always passes
+    text = sql.strip().rstrip(";") if sql else ""
+    if (text[:6].upper() == "SELECT" and not text[6:7].isalnum() and text[6:7] not in ("_", "$")
+            and not _NOT_PLAIN_SELECT.search(_SIMPLE_STRING.sub(" ", text))):
+        return False, ""
+
+    analysis = analyse_sql(sql)
+
+    if analysis.is_multi_statement:
+        return True, "Multiple SQL statements in one query"
+
+    for statement in analysis.statements:
+        statement_type = statement.statement_type or ""
+        object_type = statement.object_type or ""
+
+        if "executable_comment" in statement.flags:
+            return True, "Executable comment (/*! ... */) in query"
+        if "into_file" in statement.flags:
+            return True, "Attempting to write query results to a file"
+
+        if statement_type == "DROP":
+            if object_type in ("DATABASE", "SCHEMA"):
+                return True, "Attempting to drop a database"
+            if object_type == "TABLE":
+                return True, "Attempting to drop a table"
+            return True, f"Attempting to drop a {object_type.lower() or 'database object'}"
+        if statement_type in DANGEROUS_STATEMENT_REASONS:
+            return True, DANGEROUS_STATEMENT_REASONS[statement_type]
+        if statement_type in ("CREATE", "ALTER") and object_type in ("USER", "ROLE"):
+            return True, "Attempting to create a database user"
+        if statement_type == "ALTER" and "drop_clause" in statement.flags:
+            return True, "Attempting to drop a column"
+        if statement_type not in SAFE_STATEMENT_TYPES:
+            return True, f"Unsupported statement type: {statement_type or 'unknown'}"
+
+        effective_where = statement.has_where and "where_column" in statement.flags
+        if statement_type == "DELETE" and not effective_where:
+            return True, "DELETE statement without WHERE clause"
+        if statement_type == "UPDATE" and not effective_where:
+            return True, "UPDATE statement without WHERE clause"
+
+    return False, ""
+
+
+def has_danger_marker(text, markers=RESPONSE_DANGER_MARKERS):
+    """Return True if any of the (lower-case) markers appears in text."""
+    if not text:
+        return False
+    lowered = text.lower()
+    return any(marker in lowered for marker in markers)
+
+
+def find_danger_marker(text, markers=AI_DANGER_MARKERS):
+    """
+    Find the first danger marker in an AI response.
+
+    Returns:
+        str or None: The paragraph starting at the marker, or None if absent
+    """
+    if not text:
+        return None
+    lowered = text.lower()
+    positions = [pos for pos in (lowered.find(marker) for marker in markers) if pos != -1]
+    if not positions:
+        return None
+    start = min(positions)
+    end = text.find("\n\n", start)
+    return text[start : end if end != -1 else len(text)].strip()
+
+
+def find_final_sql(text, start=0):
+    """
+    Locate the SQL block under a "Final code to execute" style heading.
+
+    Only the heading is matched with a regex; the closing fence is found with
+    a plain string search, so the cost is linear in the response length.
+
+    Args:
+        text (str): The AI response (may be partial while streaming)
+        start (int): Offset to start searching from
+
+    Returns:
+        tuple or None: (sql, end_offset) once a complete block is found
+    """
+    for heading in _FINAL_CODE_HEADING.finditer(text, start):
+        fence = _CODE_FENCE_OPEN.match(text, heading.end())
+        if not fence:
+            continue
+        close = text.find("```", fence.end())
+        if close == -1:
+            # Block opened but not closed yet
+            return None
+        return text[fence.end() : close].strip(), close + 3
+    return None
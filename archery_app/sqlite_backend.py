@@ -0,0 +1,1046 @@
+# archery_app/sqlite_backend.py
+
+"""
+Embedded SQLite stand-in for the campus MySQL database.
+
+SQLiteBackend builds the schema from create_tables.sql (plus the indexes at
+the top of create_procedures.sql) in a local file, brings it up to date with
+the numbered files in migrations/ and hands out connections that behave like
+mysql-connector's:
+
+- cursor(dictionary=True), %s / %(name)s parameters, fetchone/fetchall,
+  rowcount, lastrowid and column_names,
+- callproc() runs a Python version of each uspXxx procedure, returns the
+  arguments with the OUT values filled in and exposes its result sets
+  through stored_results(),
+- DATE and DATETIME columns come back as date/datetime objects,
+- errors are raised as mysql.connector errors (duplicate keys as errno
+  1062, missing foreign keys as 1452) so the pages' error handling is
+  unchanged.
+
+The MySQL functions the app's SQL uses (CONCAT, IF, NOW, CURDATE, YEAR,
+DATE_SUB(... INTERVAL n DAY), TIMESTAMPDIFF, LAST_INSERT_ID, ...) are
+provided as SQLite functions or rewritten when a statement is prepared.
+Statements using anything else fail with a ProgrammingError, as they would
+on a MySQL server that lacked the feature.
+
+Select it with DB_BACKEND = "sqlite"; no server or network is needed.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from mysql.connector import errors
+
+from .database import DatabaseBackend
+from .sql_safety import significant_tokens
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILE = os.path.join(_APP_DIR, "create_tables.sql")
+PROCEDURES_FILE = os.path.join(_APP_DIR, "create_procedures.sql")
+
+DEFAULT_DB_PATH = "archery_local.db"
+MEMORY_PATH = ":memory:"
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_PARAMETER = re.compile(r"%\((\w+)\)s|%s|%%")
+_INTERVAL = re.compile(
+    r"\bINTERVAL\s+(\?|:\w+|-?\d+)\s+(MICROSECOND|SECOND|MINUTE|HOUR|DAY|WEEK|MONTH|QUARTER|YEAR)\b",
+    re.I,
+)
+_TIMESTAMPDIFF = re.compile(r"\bTIMESTAMPDIFF\s*\(\s*(\w+)\s*,", re.I)
+_LAST_INSERT_ID = re.compile(r"\bLAST_INSERT_ID\s*\(\s*\)", re.I)
+_AUTO_INCREMENT = re.compile(r"\bINT\s+PRIMARY\s+KEY\s+AUTO_INCREMENT\b", re.I)
+_CREATE_INDEX = re.compile(r"^\s*CREATE\s+INDEX\b[^;]*;", re.I | re.M)
+
+# EXPLAIN QUERY PLAN steps that read a table, e.g. "SCAN s" or "SEARCH Score
+# USING INDEX idx_score_archer (ArcherID=?)"; before SQLite 3.36 they read
+# "SCAN TABLE Score AS s"
+_PLAN_STEP = re.compile(r"^(SCAN|SEARCH)(?: TABLE)? (\S+)(?: AS (\S+))?(?: (.*))?$")
+
+# Virtual machine instructions between checks of a statement's deadline
+PROGRESS_STEPS = 10000
+
+
+# ---------------------------------------------------------------------------
+# Types
+# ---------------------------------------------------------------------------
+
+
+def _adapt_datetime(value):
+    # DATETIME columns hold whole seconds, as in MySQL
+    return value.isoformat(sep=" ", timespec="seconds")
+
+
+def _convert_date(raw):
+    return date.fromisoformat(raw.decode()[:10])
+
+
+def _convert_datetime(raw):
+    return datetime.fromisoformat(raw.decode())
+
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter("DATE", _convert_date)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+
+
+def _to_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value))
+
+
+# ---------------------------------------------------------------------------
+# MySQL functions
+# ---------------------------------------------------------------------------
+
+
+def _concat(*parts):
+    if any(part is None for part in parts):
+        return None
+    return "".join(str(part) for part in parts)
+
+
+def _add_interval(value, amount, unit, sign):
+    moment = _to_datetime(value)
+    if moment is None or amount is None:
+        return None
+    amount = int(amount) * sign
+    unit = unit.upper()
+    if unit in ("MONTH", "QUARTER", "YEAR"):
+        months = amount * {"MONTH": 1, "QUARTER": 3, "YEAR": 12}[unit]
+        index = moment.year * 12 + moment.month - 1 + months
+        year, month = divmod(index, 12)
+        day = min(moment.day, _days_in_month(year, month + 1))
+        moment = moment.replace(year=year, month=month + 1, day=day)
+    else:
+        moment = moment + timedelta(**{f"{unit.lower()}s": amount})
+    # Date in, date out - as MySQL does for DAY and larger units
+    if isinstance(value, str) and len(value) == 10 and unit not in ("HOUR", "MINUTE", "SECOND", "MICROSECOND"):
+        return moment.date().isoformat()
+    return _adapt_datetime(moment)
+
+
+def _days_in_month(year, month):
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return (following - timedelta(days=1)).day
+
+
+def _timestampdiff(unit, start, end):
+    start, end = _to_datetime(start), _to_datetime(end)
+    if start is None or end is None:
+        return None
+    unit = unit.upper()
+    if unit in ("MONTH", "QUARTER", "YEAR"):
+        months = (end.year - start.year) * 12 + end.month - start.month
+        # Only count a month once it has fully elapsed
+        if months > 0 and (end.day, end.time()) < (start.day, start.time()):
+            months -= 1
+        elif months < 0 and (end.day, end.time()) > (start.day, start.time()):
+            months += 1
+        return int(months / {"MONTH": 1, "QUARTER": 3, "YEAR": 12}[unit])
+    seconds = (end - start).total_seconds()
+    per_unit = {"SECOND": 1, "MINUTE": 60, "HOUR": 3600, "DAY": 86400, "WEEK": 604800}
+    return int(seconds / per_unit[unit])
+
+
+def _datediff(end, start):
+    end, start = _to_datetime(end), _to_datetime(start)
+    if end is None or start is None:
+        return None
+    return (end.date() - start.date()).days
+
+
+def _date_part(attribute):
+    def part(value):
+        moment = _to_datetime(value)
+        return None if moment is None else getattr(moment, attribute)
+
+    return part
+
+
+def register_functions(conn):
+    """Add the MySQL functions used by the app's SQL to a sqlite3 connection."""
+    conn.create_function("CONCAT", -1, _concat, deterministic=True)
+    conn.create_function(
+        "IF", 3, lambda condition, then, otherwise: then if condition else otherwise,
+        deterministic=True,
+    )
+    conn.create_function("NOW", 0, lambda: _adapt_datetime(datetime.now()))
+    conn.create_function("CURDATE", 0, lambda: date.today().isoformat())
+    conn.create_function("YEAR", 1, _date_part("year"), deterministic=True)
+    conn.create_function("MONTH", 1, _date_part("month"), deterministic=True)
+    conn.create_function("DAY", 1, _date_part("day"), deterministic=True)
+    conn.create_function(
+        "DATE_ADD", 3, lambda value, amount, unit: _add_interval(value, amount, unit, 1),
+        deterministic=True,
+    )
+    conn.create_function(
+        "DATE_SUB", 3, lambda value, amount, unit: _add_interval(value, amount, unit, -1),
+        deterministic=True,
+    )
+    conn.create_function("TIMESTAMPDIFF", 3, _timestampdiff, deterministic=True)
+    conn.create_function("DATEDIFF", 2, _datediff, deterministic=True)
+
+
+@lru_cache(maxsize=512)
+def translate_sql(sql, has_params=True):
+    """
+    Rewrite a MySQL statement into SQLite syntax.
+
+    Driver placeholders become ? / :name (and %% becomes % when parameters
+    are given, as mysql-connector does), INTERVAL n UNIT becomes an extra
+    function argument and LAST_INSERT_ID() maps to last_insert_rowid().
+    String literals are left alone.
+    """
+    pieces = []
+    position = 0
+    for match in _STRING.finditer(sql):
+        pieces.append(_translate_code(sql[position:match.start()], has_params))
+        pieces.append(match.group(0))
+        position = match.end()
+    pieces.append(_translate_code(sql[position:], has_params))
+    return "".join(pieces)
+
+
+def _translate_code(text, has_params):
+    if has_params:
+        text = _PARAMETER.sub(
+            lambda m: f":{m.group(1)}" if m.group(1) else ("?" if m.group(0) == "%s" else "%"),
+            text,
+        )
+    text = _INTERVAL.sub(lambda m: f"{m.group(1)}, '{m.group(2).upper()}'", text)
+    text = _TIMESTAMPDIFF.sub(lambda m: f"TIMESTAMPDIFF('{m.group(1).upper()}',", text)
+    return _LAST_INSERT_ID.sub("last_insert_rowid()", text)
+
+
+def translate_error(err):
+    """Map a sqlite3 error onto the mysql.connector error the pages expect."""
+    message = str(err)
+    if isinstance(err, sqlite3.IntegrityError):
+        if "UNIQUE" in message or "PRIMARY KEY" in message:
+            return errors.IntegrityError(msg=f"Duplicate entry: {message}", errno=1062)
+        if "FOREIGN KEY" in message:
+            return errors.IntegrityError(msg=f"Foreign key constraint fails: {message}", errno=1452)
+        if "NOT NULL" in message:
+            return errors.IntegrityError(msg=message, errno=1048)
+        return errors.IntegrityError(msg=message)
+    if isinstance(err, sqlite3.OperationalError):
+        if "locked" in message or "busy" in message:
+            # As MySQL's lock wait timeout, which the driver raises as DatabaseError
+            return errors.DatabaseError(msg=message, errno=1205)
+        if "no such table" in message:
+            return errors.ProgrammingError(msg=message, errno=1146)
+        if "no such column" in message:
+            return errors.ProgrammingError(msg=message, errno=1054)
+        if "no such function" in message:
+            return errors.ProgrammingError(msg=message, errno=1305)
+        return errors.ProgrammingError(msg=message, errno=1064)
+    if isinstance(err, sqlite3.ProgrammingError):
+        return errors.ProgrammingError(msg=message)
+    return errors.DatabaseError(msg=message)
+
+
+# ---------------------------------------------------------------------------
+# Connections and cursors
+# ---------------------------------------------------------------------------
+
+
+class StoredResult:
+    """One buffered result set of a procedure call, as from stored_results()."""
+
+    def __init__(self, description, rows, dictionary=False):
+        self.description = description
+        self.column_names = tuple(column[0] for column in description or ())
+        self._rows = rows
+        self._position = 0
+        self._dictionary = dictionary
+
+    @property
+    def rowcount(self):
+        return len(self._rows)
+
+    def _row(self, row):
+        return dict(zip(self.column_names, row)) if self._dictionary else row
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._row(self._rows[self._position - 1])
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return [self._row(row) for row in rows]
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows) - self._position)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._rows = []
+
+
+class SQLiteCursor:
+    """A mysql-connector style cursor over a sqlite3 cursor."""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection._conn.cursor()
+        self._dictionary = dictionary
+        self._stored_results = []
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, operation, params=None, multi=False):
+        sql = translate_sql(operation, params is not None)
+        if params is not None and not isinstance(params, dict):
+            params = tuple(params)
+        try:
+            self._cursor.execute(sql, () if params is None else params)
+        except sqlite3.Error as err:
+            raise translate_error(err) from err
+
+    def executemany(self, operation, seq_params):
+        seq_params = [params if isinstance(params, dict) else tuple(params) for params in seq_params]
+        try:
+            self._cursor.executemany(translate_sql(operation, True), seq_params)
+        except sqlite3.Error as err:
+            raise translate_error(err) from err
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def callproc(self, procname, args=()):
+        """
+        Run a procedure from PROCEDURES.
+
+        Returns:
+            The arguments with OUT values filled in: a tuple, or a dict keyed
+            "<procname>_arg<n>" for dictionary cursors (as mysql-connector
+            returns them), and () when there are no arguments
+        """
+        procedure = PROCEDURES.get(procname)
+        if procedure is None:
+            raise errors.ProgrammingError(
+                msg=f"PROCEDURE {procname} does not exist", errno=1305
+            )
+        values = list(args)
+        try:
+            result_sets = procedure(self._connection._conn, values)
+        except sqlite3.Error as err:
+            raise translate_error(err) from err
+        self._stored_results = [
+            StoredResult(description, rows, self._dictionary) for description, rows in result_sets
+        ]
+        if not values:
+            return ()
+        if self._dictionary:
+            return {f"{procname}_arg{index + 1}": value for index, value in enumerate(values)}
+        return tuple(values)
+
+    def stored_results(self):
+        # Like mysql-connector, the result sets can be read once
+        results, self._stored_results = self._stored_results, []
+        return iter(results)
+
+    def close(self):
+        self._cursor.close()
+        return True
+
+
+class SQLiteConnection:
+    """A mysql-connector style connection over a sqlite3 connection."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._open = True
+
+    def cursor(self, buffered=None, dictionary=False, **kwargs):
+        return SQLiteCursor(self, dictionary=dictionary)
+
+    def commit(self):
+        try:
+            self._conn.commit()
+        except sqlite3.Error as err:
+            raise translate_error(err) from err
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self):
+        return self._open
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        if not self._open:
+            raise errors.InterfaceError(msg="Connection is closed", errno=2013)
+
+    def close(self):
+        if self._open:
+            self._open = False
+            # Like MySQL, uncommitted work is discarded. Rolling back first
+            # releases the locks even if a cursor still holds a statement.
+            self._conn.rollback()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SQLiteBackend(DatabaseBackend):
+    """Local database file (or shared in-memory database) with the app's schema."""
+
+    name = "sqlite"
+
+    def __init__(self, path=DEFAULT_DB_PATH, busy_timeout_ms=5000):
+        self.path = path or MEMORY_PATH
+        self.busy_timeout_ms = busy_timeout_ms
+        self._memory = self.path == MEMORY_PATH
+        # In-memory databases are shared between connections through a named
+        # shared cache, kept alive by one connection held by the backend
+        self._target = f"file:archery_{id(self)}?mode=memory&cache=shared" if self._memory else self.path
+        self._keeper = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def raw_connection(self):
+        """Open a plain sqlite3 connection with the MySQL functions registered."""
+        self._ensure_schema()
+        return self._open()
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self._target,
+            uri=self._memory,
+            timeout=self.busy_timeout_ms / 1000.0,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        register_functions(conn)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _ensure_schema(self):
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            conn = self._open()
+            if not self._memory:
+                conn.execute("PRAGMA journal_mode = WAL")
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Archer'"
+            ).fetchone():
+                create_schema(conn)
+            # Later schema changes, as they are rolled out to MySQL
+            from .migrations import apply_migrations
+
+            apply_migrations(
+                connect=lambda: SQLiteConnection(self._open()), backend_name="sqlite", log=None
+            )
+            if self._memory:
+                self._keeper = conn
+            else:
+                conn.close()
+            self._ready = True
+
+    def connect(self):
+        return SQLiteConnection(self.raw_connection())
+
+    def sqlalchemy_engine(self):
+        import sqlalchemy
+
+        engine = sqlalchemy.create_engine("sqlite://", creator=self.raw_connection)
+
+        # SQLAlchemy has already applied SQLite's parameter style; only the
+        # MySQL syntax needs rewriting
+        @sqlalchemy.event.listens_for(engine, "before_cursor_execute", retval=True)
+        def _translate(conn, cursor, statement, parameters, context, executemany):
+            return translate_sql(statement, False), parameters
+
+        # Drop any statement deadline left by set_statement_timeout()
+        @sqlalchemy.event.listens_for(engine, "checkin")
+        def _clear_timeout(dbapi_connection, connection_record):
+            if dbapi_connection is not None:
+                dbapi_connection.set_progress_handler(None, 0)
+
+        return engine
+
+    def explain_query(self, connection, sql_query):
+        """
+        EXPLAIN QUERY PLAN gives no row estimates, so each step is costed
+        from the table it reads: a SCAN reads every row, a SEARCH on the
+        rowid one row, an equality SEARCH on an index 10 rows (SQLite's own
+        guess) and a range SEARCH a quarter of the table. Steps with the same
+        parent are joined as nested loops, as MySQL's EXPLAIN ids are.
+        """
+        plan = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {sql_query.strip().rstrip(';')}"
+        ).all()
+        tables = {
+            name.lower(): name
+            for (name,) in connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).all()
+        }
+        aliases = _table_aliases(sql_query, tables)
+
+        sizes = {}
+        plan_rows = []
+        for _, parent, _, detail in plan:
+            match = _PLAN_STEP.match(detail)
+            if not match:
+                continue
+            kind, name, _, how = match.groups()
+            table = aliases.get(name.lower()) or tables.get(name.lower())
+            if table is None:
+                # A CTE or materialised subquery, costed by its own steps
+                continue
+            if table not in sizes:
+                # Highest rowid: an upper bound on the row count, found
+                # without reading the table
+                sizes[table] = connection.exec_driver_sql(
+                    f'SELECT MAX(rowid) FROM "{table}"'
+                ).scalar() or 0
+            size = sizes[table]
+            how = how or ""
+
+            if kind == "SCAN":
+                rows = size
+            elif "(rowid=?)" in how:
+                rows = 1
+            elif "<" in how or ">" in how:
+                rows = size // 4
+            else:
+                rows = min(size, 10)
+            plan_rows.append({"id": parent, "rows": rows, "filtered": 100.0})
+        return plan_rows
+
+    def set_statement_timeout(self, connection, max_execution_ms):
+        """
+        Uses a progress handler that interrupts the statement once the
+        deadline has passed. The engine removes it when the connection goes
+        back to the pool.
+        """
+        if not max_execution_ms or max_execution_ms <= 0:
+            return False
+        deadline = time.monotonic() + max_execution_ms / 1000.0
+        connection.connection.driver_connection.set_progress_handler(
+            lambda: time.monotonic() > deadline, PROGRESS_STEPS
+        )
+        return True
+
+    def is_statement_timeout(self, error):
+        return isinstance(error, sqlite3.OperationalError) and str(error) == "interrupted"
+
+    def describe(self):
+        return f"local SQLite database {self.path}"
+
+
+def _table_aliases(sql_query, tables):
+    """
+    Map the aliases in a statement ("Score s", "Score AS s") to table names.
+
+    Words after a table name that are not aliases (WHERE, JOIN, ...) are
+    never named in a query plan, so mapping them does no harm.
+    """
+    tokens = significant_tokens(sql_query)
+    aliases = {}
+    for index, (kind, text, _, _) in enumerate(tokens[:-1]):
+        table = tables.get(text.strip("`").lower()) if kind in ("word", "ident") else None
+        if table is None:
+            continue
+        following = tokens[index + 1]
+        if following[1].upper() == "AS" and index + 2 < len(tokens):
+            following = tokens[index + 2]
+        if following[0] in ("word", "ident"):
+            aliases[following[1].strip("`").lower()] = table
+    return aliases
+
+
+def create_schema(conn):
+    """Create the tables and indexes of create_tables.sql / create_procedures.sql."""
+    with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
+        ddl = _AUTO_INCREMENT.sub("INTEGER PRIMARY KEY AUTOINCREMENT", f.read())
+    with open(PROCEDURES_FILE, "r", encoding="utf-8") as f:
+        # The indexes come before the first procedure definition
+        indexes = _CREATE_INDEX.findall(f.read().split("DELIMITER", 1)[0])
+    conn.executescript(ddl + "\n" + "\n".join(indexes))
+    conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# Stored procedures
+#
+# Each takes the sqlite3 connection and the argument list, fills in OUT
+# arguments in place and returns its result sets as [(description, rows)].
+# ---------------------------------------------------------------------------
+
+
+def _select(conn, sql, params=()):
+    cursor = conn.execute(sql, params)
+    return cursor.description, cursor.fetchall()
+
+
+# Age group of an archer in a given year, as the MySQL procedures work it out
+_AGE_GROUP_SQL = """
+    (SELECT ag.AgeGroupID
+     FROM AgeGroup ag
+     WHERE ({year} - CAST(strftime('%Y', a.DateOfBirth) AS INTEGER))
+           BETWEEN IFNULL(ag.MinAge, 0) AND IFNULL(ag.MaxAge, 999)
+     LIMIT 1)
+"""
+
+_AGE_GROUP_AT_COMPETITION = _AGE_GROUP_SQL.format(year="CAST(strftime('%Y', c.Date) AS INTEGER)")
+_AGE_GROUP_THIS_YEAR = _AGE_GROUP_SQL.format(year=":year")
+
+_COMPETITION_ENTRIES_SQL = f"""
+    SELECT cs.CompetitionID,
+           a.FirstName || ' ' || a.LastName AS ArcherName,
+           cls.ClassName,
+           et.Name AS EquipmentType,
+           cls.ClassName || ' ' || et.Name AS Category,
+           r.RoundName,
+           s.TotalScore,
+           r.PossibleScore,
+           ROUND(s.TotalScore * 100.0 / r.PossibleScore, 2) AS ScorePercentage
+    FROM CompetitionScore cs
+    JOIN Score s ON cs.ScoreID = s.ScoreID
+    JOIN Archer a ON s.ArcherID = a.ArcherID
+    JOIN Round r ON s.RoundID = r.RoundID
+    JOIN EquipmentType et ON s.EquipmentTypeID = et.EquipmentTypeID
+    JOIN Class cls ON a.Gender = cls.Gender
+        AND {_AGE_GROUP_THIS_YEAR} = cls.AgeGroupID
+    WHERE cs.CompetitionID = :competition
+"""
+
+
+def usp_get_archer_scores(conn, args):
+    archer_id, start_date, end_date, round_id = args[:4]
+    return [
+        _select(
+            conn,
+            """
+            SELECT s.ScoreID, s.Date, r.RoundName, s.TotalScore, e.Name AS Equipment,
+                   s.IsCompetition, s.IsApproved
+            FROM Score s
+            JOIN Round r ON s.RoundID = r.RoundID
+            JOIN EquipmentType e ON s.EquipmentTypeID = e.EquipmentTypeID
+            WHERE s.ArcherID = :archer
+              AND (:start IS NULL OR s.Date >= :start)
+              AND (:end IS NULL OR s.Date <= :end)
+              AND (:round IS NULL OR s.RoundID = :round)
+            ORDER BY s.Date DESC, s.TotalScore DESC
+            """,
+            {"archer": archer_id, "start": start_date, "end": end_date, "round": round_id},
+        )
+    ]
+
+
+def usp_add_staged_score(conn, args):
+    # Reject totals the round cannot produce, raised as MySQL reports SIGNAL
+    round_id, total_score = args[1], args[4]
+    possible = conn.execute("SELECT PossibleScore FROM Round WHERE RoundID = ?", (round_id,)).fetchone()
+    if possible is None:
+        raise errors.DatabaseError(msg="Unknown round.", errno=1644, sqlstate="45000")
+    if total_score is None or not 0 <= total_score <= possible[0]:
+        raise errors.DatabaseError(
+            msg=f"Total score {'NULL' if total_score is None else total_score} is outside 0-{possible[0]}.",
+            errno=1644, sqlstate="45000",
+        )
+    cursor = conn.execute(
+        "INSERT INTO StagedScore (ArcherID, RoundID, EquipmentTypeID, Date, TotalScore, SubmissionDate) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (*args[:5], datetime.now()),
+    )
+    args[5] = cursor.lastrowid
+    return []
+
+
+def usp_get_round_details(conn, args):
+    params = {"round": args[0], "today": date.today()}
+    ranges = _select(
+        conn,
+        """
+        SELECT r.RoundName, r.TotalArrows, r.PossibleScore, r.Description,
+               rr.RangeSequence, rr.Distance, rr.NumberOfEnds, rr.ArrowsPerEnd,
+               tf.Size AS TargetFaceSize, tf.Description AS TargetFaceDescription
+        FROM Round r
+        JOIN RoundRange rr ON r.RoundID = rr.RoundID
+        JOIN TargetFace tf ON rr.TargetFaceID = tf.TargetFaceID
+        WHERE r.RoundID = :round
+        ORDER BY rr.RangeSequence
+        """,
+        params,
+    )
+    equivalents = _select(
+        conn,
+        """
+        SELECT 'This round is base for:' AS EquivalentType,
+               c.ClassName, et.Name AS EquipmentType,
+               equiv_r.RoundName AS EquivalentRoundName,
+               er.EffectiveDate, er.ExpiryDate
+        FROM EquivalentRound er
+        JOIN Class c ON er.ClassID = c.ClassID
+        JOIN EquipmentType et ON er.EquipmentTypeID = et.EquipmentTypeID
+        JOIN Round equiv_r ON er.EquivalentRoundRefID = equiv_r.RoundID
+        WHERE er.BaseRoundID = :round
+          AND (er.ExpiryDate IS NULL OR er.ExpiryDate >= :today)
+        UNION ALL
+        SELECT 'This round is equivalent to:' AS EquivalentType,
+               c.ClassName, et.Name AS EquipmentType,
+               base_r.RoundName AS EquivalentRoundName,
+               er.EffectiveDate, er.ExpiryDate
+        FROM EquivalentRound er
+        JOIN Class c ON er.ClassID = c.ClassID
+        JOIN EquipmentType et ON er.EquipmentTypeID = et.EquipmentTypeID
+        JOIN Round base_r ON er.BaseRoundID = base_r.RoundID
+        WHERE er.EquivalentRoundRefID = :round
+          AND (er.ExpiryDate IS NULL OR er.ExpiryDate >= :today)
+        ORDER BY EquivalentType, ClassName, EquipmentType
+        """,
+        params,
+    )
+    return [ranges, equivalents]
+
+
+def usp_get_competition_results(conn, args):
+    return [
+        _select(
+            conn,
+            f"""
+            SELECT c.CompetitionID, c.CompetitionName, c.Date,
+                   CASE WHEN c.IsChampionship THEN 'Yes' ELSE 'No' END AS IsChampionship,
+                   c.Description,
+                   a.FirstName || ' ' || a.LastName AS ArcherName,
+                   cls.ClassName, et.Name AS EquipmentType,
+                   cls.ClassName || ' ' || et.Name AS Category,
+                   r.RoundName, s.TotalScore,
+                   r.PossibleScore,
+                   ROUND(s.TotalScore * 100.0 / r.PossibleScore, 2) AS ScorePercentage
+            FROM CompetitionScore cs
+            JOIN Competition c ON cs.CompetitionID = c.CompetitionID
+            JOIN Score s ON cs.ScoreID = s.ScoreID
+            JOIN Archer a ON s.ArcherID = a.ArcherID
+            JOIN Round r ON s.RoundID = r.RoundID
+            JOIN EquipmentType et ON s.EquipmentTypeID = et.EquipmentTypeID
+            JOIN Class cls ON a.Gender = cls.Gender
+                AND {_AGE_GROUP_AT_COMPETITION} = cls.AgeGroupID
+            WHERE cs.CompetitionID = ?
+            ORDER BY Category, ScorePercentage DESC
+            """,
+            (args[0],),
+        )
+    ]
+
+
+def usp_add_archer(conn, args):
+    first_name, last_name, date_of_birth, gender, equipment_id = args[:5]
+    cursor = conn.execute(
+        "INSERT INTO Archer (FirstName, LastName, DateOfBirth, Gender, DefaultEquipmentTypeID, IsActive) "
+        "VALUES (?, ?, ?, ?, ?, TRUE)",
+        (first_name, last_name, date_of_birth, gender, equipment_id),
+    )
+    args[5] = cursor.lastrowid
+    birth_year = _to_datetime(date_of_birth).year
+    return [
+        _select(
+            conn,
+            """
+            SELECT c.ClassID, c.ClassName
+            FROM Class c
+            JOIN AgeGroup ag ON c.AgeGroupID = ag.AgeGroupID
+            WHERE c.Gender = ?
+              AND ? BETWEEN IFNULL(ag.MinAge, 0) AND IFNULL(ag.MaxAge, 999)
+            """,
+            (gender, date.today().year - birth_year),
+        )
+    ]
+
+
+def usp_update_score_records(conn, args):
+    # Upserts that only replace a record the score beats, as the MySQL version
+    score_id = args[0]
+    conn.execute(
+        """
+        INSERT INTO PersonalBest (ArcherID, RoundID, EquipmentTypeID, ScoreID, TotalScore, Date)
+        SELECT s.ArcherID, s.RoundID, s.EquipmentTypeID, s.ScoreID, s.TotalScore, s.Date
+        FROM Score s
+        WHERE s.ScoreID = ? AND s.IsApproved
+        ON CONFLICT (ArcherID, RoundID, EquipmentTypeID) DO UPDATE SET
+            ScoreID = excluded.ScoreID, TotalScore = excluded.TotalScore, Date = excluded.Date
+        WHERE excluded.TotalScore > PersonalBest.TotalScore
+        """,
+        (score_id,),
+    )
+    conn.execute(
+        f"""
+        INSERT INTO ClubRecord (ClassID, RoundID, EquipmentTypeID, ScoreID, ArcherID, TotalScore, Date)
+        SELECT cls.ClassID, s.RoundID, s.EquipmentTypeID, s.ScoreID, s.ArcherID, s.TotalScore, s.Date
+        FROM Score s
+        JOIN Archer a ON s.ArcherID = a.ArcherID
+        JOIN Class cls ON a.Gender = cls.Gender
+            AND cls.AgeGroupID = {_AGE_GROUP_SQL.format(year="CAST(strftime('%Y', s.Date) AS INTEGER)")}
+        WHERE s.ScoreID = ? AND s.IsApproved AND s.IsCompetition
+        ON CONFLICT (ClassID, RoundID, EquipmentTypeID) DO UPDATE SET
+            ScoreID = excluded.ScoreID, ArcherID = excluded.ArcherID,
+            TotalScore = excluded.TotalScore, Date = excluded.Date
+        WHERE excluded.TotalScore > ClubRecord.TotalScore
+        """,
+        (score_id,),
+    )
+    return []
+
+
+def usp_approve_score(conn, args):
+    staged_score_id, recorder_archer_id = args[:2]
+    recorder = conn.execute(
+        "SELECT IsRecorder FROM AppUser WHERE ArcherID = ? LIMIT 1", (recorder_archer_id,)
+    ).fetchone()
+    if not (recorder and recorder[0]):
+        # Not a recorder, return 0 to indicate failure
+        args[2] = 0
+        return []
+
+    staged = conn.execute(
+        "SELECT ArcherID, RoundID, EquipmentTypeID, Date, TotalScore "
+        "FROM StagedScore WHERE StagedScoreID = ?",
+        (staged_score_id,),
+    ).fetchone()
+    try:
+        # A missing staged score fails the NOT NULL columns, as in MySQL
+        cursor = conn.execute(
+            "INSERT INTO Score (ArcherID, RoundID, EquipmentTypeID, Date, TotalScore, "
+            "IsApproved, IsCompetition, ApprovedBy) VALUES (?, ?, ?, ?, ?, TRUE, FALSE, ?)",
+            (*(staged or (None,) * 5), recorder_archer_id),
+        )
+        args[2] = cursor.lastrowid
+        usp_update_score_records(conn, [args[2]])
+        conn.execute("DELETE FROM StagedScore WHERE StagedScoreID = ?", (staged_score_id,))
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    conn.commit()
+    return []
+
+
+def usp_create_competition(conn, args):
+    cursor = conn.execute(
+        "INSERT INTO Competition (CompetitionName, Date, IsChampionship, Description) "
+        "VALUES (?, ?, ?, ?)",
+        tuple(args[:4]),
+    )
+    args[4] = cursor.lastrowid
+    return []
+
+
+def usp_link_score_to_competition(conn, args):
+    competition_id, score_id = args[:2]
+    try:
+        conn.execute(
+            "INSERT INTO CompetitionScore (CompetitionID, ScoreID) VALUES (?, ?)",
+            (competition_id, score_id),
+        )
+        conn.execute("UPDATE Score SET IsCompetition = TRUE WHERE ScoreID = ?", (score_id,))
+        usp_update_score_records(conn, [score_id])
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    conn.commit()
+    return []
+
+
+def usp_generate_competition_results(conn, args):
+    # RANK() gives the same ranking as MySQL's "count of better entries + 1"
+    return [
+        _select(
+            conn,
+            f"""
+            WITH base AS ({_COMPETITION_ENTRIES_SQL})
+            SELECT c.CompetitionID,
+                   c.CompetitionName,
+                   c.Date,
+                   CASE WHEN c.IsChampionship THEN 'Yes' ELSE 'No' END AS IsChampionship,
+                   c.Description,
+                   base.Category,
+                   base.ArcherName,
+                   base.RoundName,
+                   base.TotalScore,
+                   base.PossibleScore,
+                   base.ScorePercentage,
+                   RANK() OVER (
+                       PARTITION BY base.Category ORDER BY base.ScorePercentage DESC
+                   ) AS Ranking
+            FROM Competition c
+            JOIN base ON c.CompetitionID = base.CompetitionID
+            WHERE c.CompetitionID = :competition
+            ORDER BY base.Category, base.ScorePercentage DESC
+            """,
+            {"competition": args[0], "year": date.today().year},
+        )
+    ]
+
+
+def usp_get_all_users(conn, args):
+    return [
+        _select(
+            conn,
+            """
+            SELECT u.UserID, u.ArcherID, u.Username,
+                   a.FirstName || ' ' || a.LastName AS ArcherName,
+                   a.DateOfBirth, a.Gender, u.IsRecorder, u.IsAdmin
+            FROM AppUser u
+            JOIN Archer a ON u.ArcherID = a.ArcherID
+            ORDER BY u.UserID
+            """,
+        )
+    ]
+
+
+def usp_get_archers_without_accounts(conn, args):
+    return [
+        _select(
+            conn,
+            """
+            SELECT a.ArcherID, a.FirstName, a.LastName, a.DateOfBirth, a.Gender
+            FROM Archer a
+            LEFT JOIN AppUser u ON a.ArcherID = u.ArcherID
+            WHERE u.UserID IS NULL AND a.IsActive = TRUE
+            ORDER BY a.ArcherID
+            """,
+        )
+    ]
+
+
+def _exists(conn, sql, params):
+    return conn.execute(sql, params).fetchone() is not None
+
+
+def usp_manage_user_account(conn, args):
+    action, user_id, archer_id, username, password_hash, is_recorder = args[:6]
+    args[6], args[7] = 0, ""
+    try:
+        if action == "CREATE":
+            if not _exists(conn, "SELECT 1 FROM Archer WHERE ArcherID = ?", (archer_id,)):
+                args[7] = "Archer does not exist"
+            elif _exists(conn, "SELECT 1 FROM AppUser WHERE ArcherID = ?", (archer_id,)):
+                args[7] = "Archer already has an account"
+            elif _exists(conn, "SELECT 1 FROM AppUser WHERE Username = ?", (username,)):
+                args[7] = "Username already exists"
+            else:
+                cursor = conn.execute(
+                    "INSERT INTO AppUser (ArcherID, Username, PasswordHash, IsRecorder, IsAdmin) "
+                    "VALUES (?, ?, ?, ?, FALSE)",
+                    (archer_id, username, password_hash, is_recorder),
+                )
+                args[6] = cursor.lastrowid
+                args[7] = "User account created successfully"
+        elif action in ("DELETE", "RESET"):
+            if not _exists(conn, "SELECT 1 FROM AppUser WHERE UserID = ?", (user_id,)):
+                args[7] = "User does not exist"
+            elif action == "DELETE":
+                conn.execute("DELETE FROM AppUser WHERE UserID = ?", (user_id,))
+                args[6] = user_id
+                args[7] = "User account deleted successfully"
+            else:
+                conn.execute(
+                    "UPDATE AppUser SET PasswordHash = ? WHERE UserID = ?",
+                    (password_hash, user_id),
+                )
+                args[6] = user_id
+                args[7] = "Password reset successfully"
+        else:
+            args[7] = "Invalid action specified"
+    except sqlite3.Error:
+        conn.rollback()
+        args[6], args[7] = 0, "Database error occurred"
+        return []
+
+    if args[6]:
+        conn.commit()
+    else:
+        conn.rollback()
+    return []
+
+
+def usp_update_recorder_privilege(conn, args):
+    user_id, is_recorder = args[:2]
+    try:
+        if not _exists(conn, "SELECT 1 FROM AppUser WHERE UserID = ?", (user_id,)):
+            args[2], args[3] = 0, "User does not exist"
+            return []
+        conn.execute("UPDATE AppUser SET IsRecorder = ? WHERE UserID = ?", (is_recorder, user_id))
+    except sqlite3.Error:
+        args[2], args[3] = 0, "Database error occurred"
+        return []
+    args[2] = 1
+    args[3] = (
+        "Recorder privilege granted successfully"
+        if is_recorder
+        else "Recorder privilege revoked successfully"
+    )
+    return []
+
+
+PROCEDURES = {
+    "uspGetArcherScores": usp_get_archer_scores,
+    "uspAddStagedScore": usp_add_staged_score,
+    "uspGetRoundDetails": usp_get_round_details,
+    "uspGetCompetitionResults": usp_get_competition_results,
+    "uspAddArcher": usp_add_archer,
+    "uspUpdateScoreRecords": usp_update_score_records,
+    "uspApproveScore": usp_approve_score,
+    "uspCreateCompetition": usp_create_competition,
+    "uspLinkScoreToCompetition": usp_link_score_to_competition,
+    "uspGenerateCompetitionResults": usp_generate_competition_results,
+    "uspGetAllUsers": usp_get_all_users,
+    "uspGetArchersWithoutAccounts": usp_get_archers_without_accounts,
+    "uspManageUserAccount": usp_manage_user_account,
+    "uspUpdateRecorderPrivilege": usp_update_recorder_privilege,
+}
@@ -0,0 +1,74 @@
+"""
+bench_handicaps.py
+Benchmark for the handicap tables in archery_app/handicaps.py.
+
+Times building the score/handicap tables for the rounds in the database, then
+converting a large batch of (round, score) pairs to handicaps with the
+vectorised lookup against a per-score loop over the same tables.
+
+Usage:
+    python benchmarks/bench_handicaps.py [--scores 1000000]
+
+Run it with DB_BACKEND=sqlite to use the local database.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from archery_app.handicaps import HandicapTables, load_round_definitions
+
+
+def per_score_lookup(tables, rows, scores):
+    """Reference: scan each score's table for the best handicap it reaches."""
+    result = np.empty(len(scores))
+    for i, (row, score) in enumerate(zip(rows, scores)):
+        reached = np.nonzero(tables.table_scores[row] <= score)[0]
+        result[i] = tables.handicaps[reached[0]] if len(reached) else tables.handicaps[-1]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--scores", type=int, default=1000000)
+    parser.add_argument("--loop-sample", type=int, default=20000, help="Scores timed with the per-score loop")
+    args = parser.parse_args(argv)
+
+    rounds = load_round_definitions()
+    started = time.perf_counter()
+    tables = HandicapTables(rounds)
+    print(f"Built tables for {len(rounds)} rounds in {(time.perf_counter() - started) * 1000:.1f} ms "
+          f"({tables.table_scores.nbytes / 1024:.1f} KB)")
+
+    rng = np.random.default_rng(1)
+    rows = rng.integers(0, len(rounds), args.scores)
+    scores = rng.integers(0, tables.possible_scores[rows] + 1)
+
+    started = time.perf_counter()
+    handicaps = tables.handicaps_for_rows(rows, scores)
+    vectorised = time.perf_counter() - started
+    print(f"Vectorised: {args.scores:,} scores in {vectorised * 1000:.1f} ms "
+          f"({vectorised / args.scores * 1e9:.0f} ns/score)")
+
+    sample = min(args.loop_sample, args.scores)
+    started = time.perf_counter()
+    expected = per_score_lookup(tables, rows[:sample], scores[:sample])
+    looped = time.perf_counter() - started
+    print(f"Per-score loop: {sample:,} scores in {looped * 1000:.1f} ms "
+          f"({looped / sample * 1e9:.0f} ns/score)")
+
+    if not np.array_equal(handicaps[:sample], expected):
+        print("Mismatch between the vectorised lookup and the per-score loop")
+        return 1
+    print(f"Results match; speed-up {looped / sample / (vectorised / args.scores):.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
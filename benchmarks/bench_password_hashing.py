@@ -0,0 +1,124 @@
+"""
+bench_password_hashing.py
+Cost benchmark for the password hashers in archery_app/password_hashing.py.
+
+For each candidate scrypt / PBKDF2 setting it measures single-login latency
+and logins per second per core (one verifying thread per core, all busy at
+once, as at the start of a club night). It then recommends the most
+expensive setting that still meets both targets and prints the settings to
+put in secrets.toml.
+
+Usage:
+    python benchmarks/bench_password_hashing.py [--target-ms 250] [--min-logins 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from archery_app.password_hashing import (
+    Pbkdf2Hasher,
+    SaltedSha256Hasher,
+    ScryptHasher,
+    generate_salt,
+)
+
+CANDIDATES = [
+    ScryptHasher(n=2**13, r=8, p=1),
+    ScryptHasher(n=2**14, r=8, p=1),
+    ScryptHasher(n=2**15, r=8, p=1),
+    ScryptHasher(n=2**16, r=8, p=1),
+    Pbkdf2Hasher(i=210_000),
+    Pbkdf2Hasher(i=600_000),
+    Pbkdf2Hasher(i=1_200_000),
+]
+
+
+def single_latency_ms(hasher, samples):
+    salt = generate_salt()
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash("aAa123$%", salt)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def logins_per_second(hasher, threads, duration):
+    """Hash continuously on `threads` threads for `duration` seconds."""
+    counts = [0] * threads
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        salt = generate_salt()
+        while time.perf_counter() < deadline:
+            hasher.hash("aAa123$%", salt)
+            counts[index] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return sum(counts) / duration
+
+
+def settings_for(hasher):
+    if isinstance(hasher, ScryptHasher):
+        return (
+            'PASSWORD_HASH_SCHEME = "scrypt"\n'
+            f"PASSWORD_SCRYPT_N = {hasher.n}\n"
+            f"PASSWORD_SCRYPT_R = {hasher.r}\n"
+            f"PASSWORD_SCRYPT_P = {hasher.p}"
+        )
+    return (
+        'PASSWORD_HASH_SCHEME = "pbkdf2_sha256"\n'
+        f"PASSWORD_PBKDF2_ITERATIONS = {hasher.iterations}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Max single-login latency")
+    parser.add_argument("--min-logins", type=float, default=20.0, help="Min logins/sec for the whole server")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Cores used: {args.threads}")
+    print(f"{'hash type':<28}{'latency ms':>12}{'logins/s':>12}{'per core':>12}")
+
+    baseline = SaltedSha256Hasher()
+    print(
+        f"{baseline.hash_type + ' (old)':<28}{single_latency_ms(baseline, 1000):>12.4f}"
+        f"{'-':>12}{'-':>12}"
+    )
+
+    best = None
+    for hasher in CANDIDATES:
+        latency = single_latency_ms(hasher, args.samples)
+        throughput = logins_per_second(hasher, args.threads, args.duration)
+        print(
+            f"{hasher.hash_type:<28}{latency:>12.1f}{throughput:>12.1f}"
+            f"{throughput / args.threads:>12.1f}"
+        )
+        if latency <= args.target_ms and throughput >= args.min_logins:
+            # Candidates are ordered by cost within each scheme; prefer scrypt
+            if best is None or best.scheme == hasher.scheme:
+                best = hasher
+
+    if best is None:
+        print("\nNo candidate meets both targets; relax --target-ms or --min-logins.")
+        return
+    print(f"\nRecommended settings for secrets.toml:\n{settings_for(best)}")
+
+
+if __name__ == "__main__":
+    main()
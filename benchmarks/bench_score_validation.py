@@ -0,0 +1,84 @@
+"""
+bench_score_validation.py
+Benchmark for the score plausibility checks in archery_app/score_validation.py.
+
+Times check_scores() over a large batch of total-only rows (a bulk import of
+scores) and over a smaller batch with full end and arrow detail, using the
+rounds in the database, and checks that planted impossible rows are caught.
+
+Usage:
+    python benchmarks/bench_score_validation.py [--rows 1000000]
+
+Run it with DB_BACKEND=sqlite to use the local database.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from archery_app.round_catalogue import load_round_catalogue
+from archery_app.score_validation import check_scores
+
+
+def shot_ends(rng, definition):
+    """Plausible end and arrow detail for a whole round."""
+    ends = []
+    for round_range in definition.ranges:
+        for end_sequence in range(1, round_range.number_of_ends + 1):
+            arrows = [rng.randint(5, 10) for _ in range(round_range.arrows_per_end)]
+            ends.append((round_range.range_sequence, end_sequence, sum(arrows), arrows))
+    return ends
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--detailed-rows", type=int, default=10000, help="Rows checked with arrow detail")
+    args = parser.parse_args(argv)
+
+    catalogue = load_round_catalogue()
+    rounds = [definition for definition in catalogue if definition.ranges]
+    rng = random.Random(1)
+
+    rows = []
+    for _ in range(args.rows):
+        definition = rng.choice(rounds)
+        rows.append((definition.round_id, rng.randint(0, definition.possible_score)))
+    planted = {0: (rounds[0].round_id, rounds[0].possible_score + 1), 1: (-1, 100)}
+    for index, row in planted.items():
+        rows[index] = row
+
+    started = time.perf_counter()
+    rejected = check_scores(rows, catalogue)
+    elapsed = time.perf_counter() - started
+    print(f"Totals: {args.rows:,} rows in {elapsed * 1000:.1f} ms "
+          f"({elapsed / args.rows * 1e6:.2f} us/row), {len(rejected)} rejected")
+
+    detailed = []
+    for _ in range(args.detailed_rows):
+        definition = rng.choice(rounds)
+        ends = shot_ends(rng, definition)
+        detailed.append((definition.round_id, sum(end[2] for end in ends), ends))
+    round_id, total, ends = detailed[0]
+    detailed[0] = (round_id, total, [ends[0][:2] + (ends[0][2] + 1, ends[0][3])] + ends[1:])
+
+    started = time.perf_counter()
+    detailed_rejected = check_scores(detailed, catalogue)
+    elapsed = time.perf_counter() - started
+    print(f"With arrows: {args.detailed_rows:,} rows in {elapsed * 1000:.1f} ms "
+          f"({elapsed / args.detailed_rows * 1e6:.1f} us/row), {len(detailed_rejected)} rejected")
+
+    if [index for index, _ in rejected] != sorted(planted) or [index for index, _ in detailed_rejected] != [0]:
+        print("Unexpected rejections:", rejected[:5], detailed_rejected[:5])
+        return 1
+    print("Only the planted rows were rejected")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+bench_sql_assistant.py
+End-to-end latency benchmark for the SQL Assistant pipeline, fully offline.
+
+Runs each benchmark question from the local fixture through the same stages
+the app uses - prompt build, model reply, extract_final_sql,
+is_dangerous_query and query execution - using the LocalReplayBackend and an
+in-memory SQLite copy of the schema, and reports per-stage latency.
+
+Usage:
+    python benchmarks/bench_sql_assistant.py [--iterations 200] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import pandas as pd
+
+from archery_app.chatbot import (
+    build_enhanced_prompt,
+    extract_final_sql,
+    get_system_prompt,
+    is_dangerous_query,
+)
+from archery_app.llm_backends import DEFAULT_FIXTURE_PATH, LocalReplayBackend
+from archery_app.sqlite_backend import MEMORY_PATH, SQLiteBackend
+
+STAGES = ["prompt_build", "model", "extract", "safety", "execute", "total"]
+
+
+def build_fixture_database(archers=200, scores=2000, seed=42, backend=None):
+    """
+    Fill an in-memory copy of the schema (the local SQLite backend) with sample rows.
+
+    Returns a sqlite3 connection to it; pass backend to fill a SQLiteBackend
+    that the app's get_connection() will also use.
+    """
+    backend = backend or SQLiteBackend(MEMORY_PATH)
+    conn = backend.raw_connection()
+
+    rng = random.Random(seed)
+    conn.executemany(
+        "INSERT INTO EquipmentType (Name) VALUES (?)",
+        [("Recurve",), ("Compound",), ("Barebow",), ("Longbow",)],
+    )
+    conn.executemany(
+        "INSERT INTO Round (RoundName, TotalArrows, PossibleScore) VALUES (?, ?, ?)",
+        [("WA 720 70m", 72, 720), ("Sydney", 120, 1200), ("Canberra", 90, 900)],
+    )
+    conn.executemany(
+        "INSERT INTO Archer (FirstName, LastName, DateOfBirth, Gender, DefaultEquipmentTypeID) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (f"First{i}", f"Last{i}", f"19{rng.randint(50, 99)}-01-01", rng.choice("MF"), rng.randint(1, 4))
+            for i in range(archers)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO Score (ArcherID, RoundID, EquipmentTypeID, Date, TotalScore, IsApproved) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (
+                rng.randint(1, archers),
+                rng.randint(1, 3),
+                rng.randint(1, 4),
+                f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                rng.randint(300, 700),
+                rng.random() < 0.9,
+            )
+            for _ in range(scores)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO StagedScore (ArcherID, RoundID, EquipmentTypeID, Date, TotalScore, SubmissionDate) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (rng.randint(1, archers), 1, 1, "2024-06-01", rng.randint(300, 700), "2024-06-01 10:00:00")
+            for _ in range(50)
+        ],
+    )
+    conn.execute(
+        "INSERT INTO AppUser (ArcherID, Username, PasswordHash, IsRecorder, IsAdmin) "
+        "VALUES (1, 'admin', 'fixture', TRUE, TRUE)"
+    )
+    conn.execute(
+        "INSERT INTO Competition (CompetitionName, Date, IsChampionship) "
+        "VALUES ('Fixture Open', '2024-06-01', FALSE)"
+    )
+    conn.executemany(
+        "INSERT INTO CompetitionScore (CompetitionID, ScoreID) VALUES (1, ?)",
+        [(score_id,) for score_id in range(1, 41)],
+    )
+    conn.executemany(
+        "INSERT INTO SecurityLog (EventTime, EventType, Severity) VALUES (?, ?, ?)",
+        [
+            ("2024-06-01 10:00:00", "AUTH_LOGIN_SUCCESS", rng.choice(["INFO", "ERROR", "WARNING"]))
+            for _ in range(500)
+        ],
+    )
+    conn.commit()
+    return conn
+
+
+def run_question(question, backend, db, user_info):
+    """Run one question through every stage, returning per-stage timings in ms."""
+    timings = {}
+    start = time.perf_counter()
+
+    t0 = time.perf_counter()
+    system_prompt = get_system_prompt(user_info)
+    enhanced_prompt = build_enhanced_prompt(question)
+    timings["prompt_build"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    chat = backend.start_chat(history=[])
+    chat.send_message(system_prompt)
+    response = chat.send_message(enhanced_prompt).text
+    timings["model"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    sql = extract_final_sql(response)
+    timings["extract"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    dangerous, _ = is_dangerous_query(sql, response)
+    timings["safety"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    if sql and not dangerous:
+        pd.read_sql(sql, db)
+    timings["execute"] = (time.perf_counter() - t0) * 1000
+
+    timings["total"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE_PATH)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.fixture, "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+    backend = LocalReplayBackend(fixture=fixture)
+    questions = fixture.get("benchmark_questions", [])
+    db = build_fixture_database()
+    user_info = {"user_id": 1, "archer_id": 1, "name": "Benchmark Admin", "role": "Admin"}
+
+    samples = {stage: [] for stage in STAGES}
+    for _ in range(args.iterations):
+        for question in questions:
+            for stage, value in run_question(question, backend, db, user_info).items():
+                samples[stage].append(value)
+
+    results = {}
+    print(f"{'stage':<14}{'median ms':>12}{'p95 ms':>12}{'max ms':>12}")
+    for stage in STAGES:
+        values = samples[stage]
+        results[stage] = {
+            "median_ms": statistics.median(values),
+            "p95_ms": percentile(values, 95),
+            "max_ms": max(values),
+            "samples": len(values),
+        }
+        print(
+            f"{stage:<14}{results[stage]['median_ms']:>12.3f}"
+            f"{results[stage]['p95_ms']:>12.3f}{results[stage]['max_ms']:>12.3f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+bench_sql_safety.py
+Fuzz and benchmark corpus for the SQL Assistant safety checks.
+
+Compares the token-based analyser in archery_app/sql_safety.py against the
+previous regex chain (kept below as legacy_* for reference):
+
+* strictness - every dangerous corpus entry, and randomised mutations of it
+  (keyword case, whitespace, inline comments, statement stacking), must be
+  flagged, and no safe entry may be flagged;
+* speed - time per check for SQL classification and for extracting the
+  final SQL block from long AI responses. Classification is timed for the
+  whole corpus, for its safe SELECTs alone and for its dangerous entries
+  alone. The analyser is faster on safe SELECTs, the usual assistant query,
+  because it passes them without tokenising when they hold no strings,
+  comments or semicolons. It is faster on extraction too. Dangerous and
+  multi-statement SQL is tokenised, which costs more than the legacy regexes,
+  so the analyser is slower on those and on the whole corpus. That path is
+  the one that catches the variants the regexes miss.
+
+Usage:
+    python benchmarks/bench_sql_safety.py [--mutations 50] [--iterations 2000]
+
+Exits with status 1 if the new analyser misses a dangerous query or flags a
+safe one.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from archery_app.sql_safety import (
+    check_sql_safety,
+    find_final_sql,
+    has_danger_marker,
+)
+
+CORPUS_PATH = os.path.join(REPO_ROOT, "benchmarks", "fixtures", "sql_safety_corpus.json")
+
+
+# ----------------------------------------------------------------------
+# Previous implementation, kept verbatim for comparison
+# ----------------------------------------------------------------------
+
+
+def legacy_is_dangerous_query(sql_query):
+    sql_normalized = re.sub(r"\s+", " ", sql_query.upper()).strip()
+    always_dangerous_patterns = [
+        (r"DROP\s+DATABASE", "Attempting to drop a database"),
+        (r"DROP\s+TABLE", "Attempting to drop a table"),
+        (r"TRUNCATE\s+TABLE", "Attempting to truncate a table"),
+        (r"ALTER\s+TABLE\s+\w+\s+DROP", "Attempting to drop a column"),
+        (r"CREATE\s+USER", "Attempting to create a database user"),
+        (r"GRANT\s+", "Attempting to grant permissions"),
+        (r"REVOKE\s+", "Attempting to revoke permissions"),
+    ]
+    for pattern, reason in always_dangerous_patterns:
+        if re.search(pattern, sql_normalized):
+            return True, reason
+    if "DELETE FROM" in sql_normalized:
+        if not re.search(r"DELETE FROM\s+\w+.*WHERE", sql_normalized):
+            return True, "DELETE statement without WHERE clause"
+    if "UPDATE" in sql_normalized and "SET" in sql_normalized:
+        if not re.search(r"UPDATE\s+\w+.*SET.*WHERE", sql_normalized):
+            return True, "UPDATE statement without WHERE clause"
+    return False, ""
+
+
+def legacy_extract_final_sql(text):
+    danger_markers = [
+        "⚠️ DANGEROUS QUERY WARNING",
+        "DANGEROUS QUERY",
+        "query is potentially dangerous",
+        "without proper safeguards",
+        "without a WHERE clause",
+    ]
+    for marker in danger_markers:
+        if marker.lower() in text.lower():
+            return None
+    final_code_patterns = [
+        r"#{1,6}\s*Final code to execute:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
+        r"#{1,6}\s*Execute this(?:\s+SQL)? code:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
+        r"#{1,6}\s*SQL to execute:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
+        r"#{1,6}\s*Code to run:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
+        r"#{1,6}\s*Safe SQL code:?\s*#{0,6}(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
+        r"###Final code to execute:###(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
+        r"###\s*Final code to execute:\s*###?(?:\r?\n|\s)*```(?:sql)?\s*(.*?)\s*```",
+    ]
+    for pattern in final_code_patterns:
+        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def new_extract_final_sql(text):
+    if has_danger_marker(text):
+        return None
+    found = find_final_sql(text)
+    return found[0] if found else None
+
+
+# ----------------------------------------------------------------------
+# Fuzzing
+# ----------------------------------------------------------------------
+
+
+def _has_comment(sql):
+    return "--" in sql or "/*" in sql or "#" in sql
+
+
+def mutate(sql, rng, allow_stacking):
+    """Return a semantically equivalent (for MySQL) variant of sql."""
+    mutated = "".join(c.upper() if rng.random() < 0.5 else c.lower() for c in sql)
+
+    if not _has_comment(sql) and "'" not in sql:
+        separators = [" ", "  ", "\n", "\t", " /**/ ", "/**/", "\r\n "]
+        mutated = re.sub(" ", lambda _: rng.choice(separators), mutated)
+
+    if allow_stacking and rng.random() < 0.3:
+        mutated = "SELECT 1; " + mutated
+    if not _has_comment(sql) and rng.random() < 0.3:
+        mutated += " -- trailing comment"
+    return mutated
+
+
+def build_long_response(paragraphs, with_final=True):
+    body = "\n\n".join(
+        f"- Step {i}: joins Score to Archer and explains the relationship in detail."
+        for i in range(paragraphs)
+    )
+    response = f"### Permission Check\nAdmins may read Score.\n\n### Explanation\n{body}\n\n"
+    if with_final:
+        response += "### Final code to execute:\n```sql\nSELECT * FROM Score LIMIT 10;\n```\n"
+    return response
+
+
+def time_per_call(func, inputs, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for value in inputs:
+            func(value)
+    return (time.perf_counter() - start) / (iterations * len(inputs)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--mutations", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=20031)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    rng = random.Random(args.seed)
+
+    cases = [(sql, False) for sql in corpus["safe"]] + [
+        (sql, True) for sql in corpus["dangerous"]
+    ]
+    for sql in corpus["dangerous"]:
+        cases += [(mutate(sql, rng, True), True) for _ in range(args.mutations)]
+    for sql in corpus["safe"]:
+        cases += [(mutate(sql, rng, False), False) for _ in range(args.mutations)]
+
+    failures = []
+    legacy_missed = legacy_false_alarms = 0
+    for sql, expected in cases:
+        new_result, _ = check_sql_safety(sql)
+        legacy_result, _ = legacy_is_dangerous_query(sql)
+        if new_result != expected:
+            failures.append((sql, expected))
+        if expected and not legacy_result:
+            legacy_missed += 1
+        if not expected and legacy_result:
+            legacy_false_alarms += 1
+
+    dangerous_total = sum(1 for _, expected in cases if expected)
+    safe_total = len(cases) - dangerous_total
+    print(f"Cases: {len(cases)} ({dangerous_total} dangerous, {safe_total} safe)")
+    print(f"Legacy regex checks: {legacy_missed} dangerous missed, {legacy_false_alarms} safe flagged")
+    print(f"Token analyser:      {len(failures)} misclassified")
+    for sql, expected in failures[:20]:
+        print(f"  expected dangerous={expected}: {sql!r}")
+
+    plain_sql = [sql for sql, _ in cases[: len(corpus["safe"]) + len(corpus["dangerous"])]]
+    legacy_us = time_per_call(legacy_is_dangerous_query, plain_sql, args.iterations // 10)
+    new_us = time_per_call(check_sql_safety, plain_sql, args.iterations // 10)
+    print(f"\nClassification: legacy {legacy_us:.1f} us/query, analyser {new_us:.1f} us/query")
+    selects = [sql for sql in corpus["safe"] if sql.lstrip()[:6].upper() == "SELECT"]
+    legacy_us = time_per_call(legacy_is_dangerous_query, selects, args.iterations // 10)
+    new_us = time_per_call(check_sql_safety, selects, args.iterations // 10)
+    print(f"  safe SELECTs: legacy {legacy_us:.1f} us/query, analyser {new_us:.1f} us/query")
+    legacy_us = time_per_call(legacy_is_dangerous_query, corpus["dangerous"], args.iterations // 10)
+    new_us = time_per_call(check_sql_safety, corpus["dangerous"], args.iterations // 10)
+    print(f"  dangerous:    legacy {legacy_us:.1f} us/query, analyser {new_us:.1f} us/query")
+
+    responses = [build_long_response(n, with_final) for n in (5, 50, 500) for with_final in (True, False)]
+    for response in responses:
+        assert legacy_extract_final_sql(response) == new_extract_final_sql(response)
+    legacy_us = time_per_call(legacy_extract_final_sql, responses, args.iterations // 100)
+    new_us = time_per_call(new_extract_final_sql, responses, args.iterations // 100)
+    print(f"Extraction:     legacy {legacy_us:.1f} us/response, compiled {new_us:.1f} us/response")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+bench_startup.py
+Import-time and per-rerun render benchmark for app.py, with JSON baselines.
+
+Two measurements are taken:
+
+* import - every archery_app module (and app.py's start-up import set) is
+  imported in a fresh interpreter under ``python -X importtime``. The
+  cumulative time of the module and its heaviest dependencies are recorded.
+  Imports never open a database connection, so nothing needs to be running.
+* render - app.py is run with Streamlit's AppTest, logged in as an admin, on
+  each registered page. The first run (which imports the page module) and the
+  median/p95 of the following reruns are recorded. By default the database is
+  an in-memory copy of the schema on the local SQLite backend
+  (archery_app/sqlite_backend.py), stored procedures included; pages that
+  still fail are timed and reported with their error count. Pass --mysql to
+  run against the database in .streamlit/secrets.toml instead.
+
+Results are compared with the baseline file. A metric is flagged as a
+regression when it is both --tolerance slower (relative) and --min-delta-ms
+slower (absolute) than its baseline, or when it exceeds a budget listed
+under "budgets" in the baseline file, e.g.
+
+    "budgets": {"import:app.py": 900, "render:Home": 150}
+
+The script exits with status 1 if anything is flagged.
+
+Usage:
+    python benchmarks/bench_startup.py                   # compare with baseline
+    python benchmarks/bench_startup.py --save-baseline   # record a new baseline
+    python benchmarks/bench_startup.py --only import --repeat 5
+"""
+
+import argparse
+import ast
+import json
+import logging
+import os
+import pkgutil
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+os.chdir(REPO_ROOT)
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "baselines", "startup.json")
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+# ---------------------------------------------------------------------------
+# Import times
+# ---------------------------------------------------------------------------
+
+
+def app_import_set():
+    """Modules app.py imports at start-up, read from its source."""
+    with open("app.py", "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+        elif isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+    return modules
+
+
+def archery_modules():
+    import archery_app
+
+    return sorted(
+        f"archery_app.{info.name}"
+        for info in pkgutil.iter_modules(archery_app.__path__)
+    )
+
+
+def import_profile(modules):
+    """
+    Import modules in a fresh interpreter and parse the -X importtime report.
+
+    Returns:
+        tuple: (total_ms, {module: (self_ms, cumulative_ms)})
+    """
+    code = "\n".join(f"import {name}" for name in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    entries = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entries[name] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+        if len(indent) == 1:  # top-level import
+            total_us += int(cumulative_us)
+    return total_us / 1000, entries
+
+
+def measure_imports(repeat, top):
+    targets = [("app.py", app_import_set())]
+    targets += [(name, [name]) for name in archery_modules()]
+
+    results = {}
+    for label, modules in targets:
+        runs = []
+        for _ in range(repeat):
+            try:
+                runs.append(import_profile(modules))
+            except RuntimeError as err:
+                print(f"  {label}: import failed ({err})")
+                break
+        if not runs:
+            continue
+        total_ms = statistics.median(total for total, _ in runs)
+        _, entries = runs[-1]
+        heaviest = sorted(entries.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        results[f"import:{label}"] = {
+            "ms": round(total_ms, 2),
+            "heaviest": {name: round(self_ms, 2) for name, (self_ms, _) in heaviest},
+        }
+        print(f"  {label:<40}{total_ms:>10.1f} ms")
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Render times
+# ---------------------------------------------------------------------------
+
+
+def build_sqlite_fixture():
+    """In-memory SQLite backend filled with the SQL Assistant benchmark's sample rows."""
+    from bench_sql_assistant import build_fixture_database
+    from archery_app.sqlite_backend import MEMORY_PATH, SQLiteBackend
+
+    backend = SQLiteBackend(MEMORY_PATH)
+    build_fixture_database(backend=backend)
+    return backend
+
+
+def load_mysql_secrets():
+    import toml
+
+    with open(os.path.join(".streamlit", "secrets.toml"), "r", encoding="utf-8") as f:
+        return toml.load(f)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_page(page, secrets, reruns, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("app.py", default_timeout=timeout)
+    for key, value in secrets.items():
+        at.secrets[key] = value
+    at.session_state.connection_established = True
+    at.session_state.logged_in = True
+    at.session_state.user_id = 1
+    at.session_state.archer_id = 1
+    at.session_state.archer_name = "Benchmark Admin"
+    at.session_state.is_recorder = True
+    at.session_state.is_admin = True
+    at.session_state.principal_version = 0
+    at.session_state.current_page = page
+
+    start = time.perf_counter()
+    at.run()
+    first_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    errors = len(at.exception) + len(at.error)
+    return {
+        "first_ms": round(first_ms, 2),
+        "ms": round(statistics.median(timings), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "errors": errors,
+    }
+
+
+def measure_renders(reruns, use_mysql, timeout):
+    from streamlit.logger import set_log_level
+
+    # Page errors are counted in the report rather than logged with tracebacks,
+    # and session state is seeded outside a script run, which Streamlit warns about
+    set_log_level("critical")
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+    from archery_app.database import set_database_backend
+    from archery_app.page_registry import PAGES
+
+    if use_mysql:
+        secrets = load_mysql_secrets()
+    else:
+        set_database_backend(build_sqlite_fixture())
+        secrets = {"DB_BACKEND": "sqlite"}
+
+    # "Home" is registered by app.py itself
+    pages = ["Home"] + [name for name in PAGES if name != "Home"]
+    results = {}
+    for page in pages:
+        result = time_page(page, secrets, reruns, timeout)
+        results[f"render:{page}"] = result
+        note = f"  ({result['errors']} error(s))" if result["errors"] else ""
+        print(
+            f"  {page:<32}{result['first_ms']:>10.1f}{result['ms']:>10.1f}"
+            f"{result['p95_ms']:>10.1f}{note}"
+        )
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return a list of human-readable regression messages."""
+    regressions = []
+    previous = baseline.get("metrics", {})
+    for key, result in results.items():
+        current = result["ms"]
+        old = previous.get(key, {}).get("ms")
+        if old is not None and current > old * (1 + tolerance) and current - old > min_delta_ms:
+            regressions.append(
+                f"{key}: {current:.1f} ms vs baseline {old:.1f} ms (+{(current / old - 1) * 100:.0f}%)"
+            )
+        budget = baseline.get("budgets", {}).get(key)
+        if budget is not None and current > budget:
+            regressions.append(f"{key}: {current:.1f} ms exceeds budget {budget} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--only", choices=["import", "render"], help="Run one measurement only")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--repeat", type=int, default=3, help="Interpreter starts per import target")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest dependencies kept per module")
+    parser.add_argument("--reruns", type=int, default=10, help="Timed reruns per page")
+    parser.add_argument("--timeout", type=float, default=30.0, help="AppTest timeout per run (s)")
+    parser.add_argument("--mysql", action="store_true", help="Render against .streamlit/secrets.toml")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = {}
+    if args.only in (None, "import"):
+        print(f"Import times (median of {args.repeat} fresh interpreters)")
+        results.update(measure_imports(args.repeat, args.top))
+    if args.only in (None, "render"):
+        print(f"\nRender times ({'MySQL' if args.mysql else 'SQLite fixture'})")
+        print(f"  {'page':<32}{'first ms':>10}{'rerun ms':>10}{'p95 ms':>10}")
+        results.update(measure_renders(args.reruns, args.mysql, args.timeout))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.save_baseline:
+        metrics = dict(baseline.get("metrics", {}))
+        metrics.update(results)
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "recorded": datetime.now().isoformat(timespec="seconds"),
+                    "python": sys.version.split()[0],
+                    "budgets": baseline.get("budgets", {}),
+                    "metrics": metrics,
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (recorded {baseline.get('recorded')}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,680 @@
+"""
+generate_data.py
+Synthetic club/federation data for create_tables.sql, bulk-loaded into MySQL.
+
+Generates reference data (equipment, age groups and classes, target faces,
+Australian/WA rounds with their RoundRanges and some EquivalentRounds) and
+then, at the requested scale, archers, user accounts, practice and
+competition scores with full End/Arrow detail, pending StagedScores and
+SecurityLog events.
+
+Arrow scores come from a simple aiming model: each archer has an angular
+error (mrad) drawn from a log-normal distribution and adjusted for their bow
+type; the radial miss distance for an arrow is Rayleigh distributed and is
+converted to a ring using the distance and target face size. Arrows are
+recorded highest first within each end, as on a score sheet.
+
+Rows are generated in chunks of archers with NumPy and appended to one CSV
+file per table, so memory stays flat up to the federation preset (100k
+archers, ~50M arrows). The files are then loaded with LOAD DATA LOCAL INFILE
+(fastest; needs local_infile enabled on the server) or multi-row INSERTs,
+or with --sqlite into the local database used by DB_BACKEND = "sqlite".
+IDs are assigned here, so the target database must be empty (or use --reset).
+
+Usage:
+    python benchmarks/generate_data.py --scale club
+    python benchmarks/generate_data.py --scale federation --reset
+    python benchmarks/generate_data.py --archers 5000 --arrows 2000000 --no-load
+    python benchmarks/generate_data.py --scale club --sqlite
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+from archery_app.password_hashing import hash_new_password
+from archery_app.security_logging import SecurityEventType, get_event_severity
+
+SCALES = {
+    # archers, arrows, competitions, security log events
+    "club": (200, 250_000, 12, 20_000),
+    "state": (5_000, 5_000_000, 150, 250_000),
+    "federation": (100_000, 50_000_000, 2_000, 2_000_000),
+}
+
+EQUIPMENT_TYPES = [
+    # name, description, share of archers, angular error multiplier
+    ("Recurve", "Olympic recurve bow with sight and stabilisers", 0.45, 1.0),
+    ("Compound", "Compound bow with release aid and magnified sight", 0.25, 0.75),
+    ("Barebow", "Recurve without sight or stabilisers", 0.18, 1.3),
+    ("Longbow", "Traditional longbow", 0.12, 1.6),
+]
+
+AGE_GROUPS = [
+    ("Under 14", 0, 13),
+    ("Under 16", 14, 15),
+    ("Under 18", 16, 17),
+    ("Under 21", 18, 20),
+    ("Open", 21, 49),
+    ("50+", 50, 59),
+    ("60+", 60, 69),
+    ("70+", 70, None),
+]
+
+TARGET_FACES = [(122, "122cm 10-zone face"), (80, "80cm 10-zone face"),
+                (60, "60cm 10-zone face"), (40, "40cm 10-zone face")]
+
+# name, description, [(distance m, ends, face cm)], arrows per end
+ROUNDS = [
+    ("WA 1440 (90m)", "Men's outdoor WA 1440", [(90, 6, 122), (70, 6, 122), (50, 6, 80), (30, 6, 80)], 6),
+    ("WA 1440 (70m)", "Women's outdoor WA 1440", [(70, 6, 122), (60, 6, 122), (50, 6, 80), (30, 6, 80)], 6),
+    ("WA 1440 (60m)", "Junior/veteran WA 1440", [(60, 6, 122), (50, 6, 122), (40, 6, 80), (30, 6, 80)], 6),
+    ("WA 720 (70m)", "WA recurve ranking round", [(70, 12, 122)], 6),
+    ("WA 720 (60m)", "WA 720 for juniors and veterans", [(60, 12, 122)], 6),
+    ("WA 720 (50m)", "WA compound ranking round", [(50, 12, 80)], 6),
+    ("Sydney", "Australian round", [(70, 5, 122), (60, 5, 122), (50, 5, 122), (30, 5, 80)], 6),
+    ("Brisbane", "Australian round", [(70, 5, 122), (60, 5, 122), (50, 5, 80), (40, 5, 80)], 6),
+    ("Adelaide", "Australian round", [(60, 5, 122), (50, 5, 122), (40, 5, 80), (30, 5, 80)], 6),
+    ("Hobart", "Australian round", [(90, 5, 122), (70, 5, 122), (50, 5, 122)], 6),
+    ("Perth", "Australian round", [(70, 5, 122), (60, 5, 122), (50, 5, 122)], 6),
+    ("Canberra", "Australian round", [(60, 5, 122), (50, 5, 122), (40, 5, 122)], 6),
+    ("Short Canberra", "Australian round", [(50, 5, 122), (40, 5, 122), (30, 5, 122)], 6),
+    ("WA 18m", "Indoor WA round", [(18, 20, 40)], 3),
+]
+
+# Base round, equivalent round, age groups the equivalence applies to
+EQUIVALENCES = [
+    ("WA 720 (70m)", "WA 720 (60m)", ["Under 16", "Under 18", "50+", "60+", "70+"]),
+    ("WA 1440 (90m)", "WA 1440 (70m)", ["Under 18", "50+", "60+"]),
+    ("WA 1440 (70m)", "WA 1440 (60m)", ["Under 16", "60+", "70+"]),
+    ("Sydney", "Adelaide", ["Under 16", "60+", "70+"]),
+]
+
+SECURITY_EVENTS = [
+    (SecurityEventType.AUTH_LOGIN_SUCCESS, 0.55, "User logged in successfully"),
+    (SecurityEventType.AUTH_LOGOUT, 0.20, "User logged out"),
+    (SecurityEventType.SCORE_SUBMIT, 0.09, "Practice score submitted"),
+    (SecurityEventType.AUTH_LOGIN_FAILURE, 0.07, "Failed login attempt: invalid password"),
+    (SecurityEventType.SCORE_APPROVE, 0.05, "Score approved"),
+    (SecurityEventType.AUTH_PASSWORD_CHANGE, 0.015, "Password changed"),
+    (SecurityEventType.AUTH_RATE_LIMITED, 0.01, "Login attempts blocked for username"),
+    (SecurityEventType.APPLICATION_ERROR, 0.004, "Application error while loading page"),
+    (SecurityEventType.POTENTIAL_INJECTION, 0.001, "Potential SQL injection in input"),
+]
+
+FIRST_NAMES = [
+    "Olivia", "Noah", "Charlotte", "Jack", "Amelia", "William", "Isla", "Oliver",
+    "Mia", "Henry", "Ava", "Leo", "Grace", "Thomas", "Chloe", "Lucas", "Ruby",
+    "James", "Zoe", "Ethan", "Sophie", "Liam", "Ella", "Mason", "Harper", "Hugo",
+    "Matilda", "Archie", "Sienna", "Samuel", "Evie", "Max", "Lily", "Oscar",
+]
+LAST_NAMES = [
+    "Smith", "Jones", "Williams", "Brown", "Wilson", "Taylor", "Nguyen", "Johnson",
+    "Martin", "White", "Anderson", "Walker", "Thompson", "Thomas", "Lee", "Ryan",
+    "Harris", "Kelly", "King", "Chen", "Davis", "Wright", "Scott", "Baker", "Young",
+    "Hall", "Green", "Clarke", "Mitchell", "Campbell", "Robinson", "Wood", "Tran",
+]
+
+TABLE_COLUMNS = {
+    "EquipmentType": ["EquipmentTypeID", "Name", "Description"],
+    "AgeGroup": ["AgeGroupID", "Name", "MinAge", "MaxAge"],
+    "Class": ["ClassID", "AgeGroupID", "Gender", "ClassName"],
+    "TargetFace": ["TargetFaceID", "Size", "Description"],
+    "Round": ["RoundID", "RoundName", "TotalArrows", "PossibleScore", "Description"],
+    "RoundRange": ["RoundRangeID", "RoundID", "RangeSequence", "Distance", "NumberOfEnds",
+                   "TargetFaceID", "ArrowsPerEnd"],
+    "EquivalentRound": ["EquivalentRoundID", "BaseRoundID", "ClassID", "EquipmentTypeID",
+                        "EquivalentRoundRefID", "EffectiveDate", "ExpiryDate"],
+    "Archer": ["ArcherID", "FirstName", "LastName", "DateOfBirth", "Gender",
+               "DefaultEquipmentTypeID", "IsActive"],
+    "AppUser": ["UserID", "ArcherID", "Username", "PasswordHash", "Salt", "HashType",
+                "IsRecorder", "IsAdmin"],
+    "Competition": ["CompetitionID", "CompetitionName", "Date", "IsChampionship", "Description"],
+    "Score": ["ScoreID", "ArcherID", "RoundID", "EquipmentTypeID", "Date", "TotalScore",
+              "IsApproved", "IsCompetition", "ApprovedBy"],
+    "CompetitionScore": ["CompetitionID", "ScoreID"],
+    "End": ["EndID", "ScoreID", "RangeSequence", "EndSequence", "TotalEndScore"],
+    "Arrow": ["ArrowID", "EndID", "ArrowScore", "ArrowSequence"],
+    "StagedScore": ["StagedScoreID", "ArcherID", "RoundID", "EquipmentTypeID", "Date",
+                    "TotalScore", "SubmissionDate"],
+    "SecurityLog": ["LogID", "EventTime", "UserID", "ArcherID", "IPAddress", "EventType",
+                    "Description", "Severity", "ActionURL", "RequestDetails", "IsReviewed",
+                    "ReviewedBy", "ReviewedAt"],
+}
+LOAD_ORDER = list(TABLE_COLUMNS)
+NULL = "\\N"
+
+
+class CsvWriter:
+    """Appends DataFrames to one CSV file per table in LOAD DATA format."""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.rows = {table: 0 for table in TABLE_COLUMNS}
+        os.makedirs(out_dir, exist_ok=True)
+        for table in TABLE_COLUMNS:
+            open(self.path(table), "w").close()
+
+    def path(self, table):
+        return os.path.join(self.out_dir, f"{table}.csv")
+
+    def write(self, table, frame):
+        if isinstance(frame, list):
+            frame = pd.DataFrame(frame, columns=TABLE_COLUMNS[table])
+        frame[TABLE_COLUMNS[table]].to_csv(
+            self.path(table), mode="a", header=False, index=False, na_rep=NULL,
+            lineterminator="\n",
+        )
+        self.rows[table] += len(frame)
+
+
+def round_plan():
+    """Per round: (total arrows, arrows per end, [(range seq, distance, ends, face)])."""
+    plan = {}
+    for round_id, (_, _, ranges, per_end) in enumerate(ROUNDS, start=1):
+        plan[round_id] = (
+            sum(ends for _, ends, _ in ranges) * per_end,
+            per_end,
+            [(seq, dist, ends, face) for seq, (dist, ends, face) in enumerate(ranges, start=1)],
+        )
+    return plan
+
+
+def write_reference_data(writer):
+    writer.write("EquipmentType", [(i, name, desc) for i, (name, desc, _, _) in enumerate(EQUIPMENT_TYPES, 1)])
+    writer.write("AgeGroup", [(i, name, lo, hi) for i, (name, lo, hi) in enumerate(AGE_GROUPS, 1)])
+
+    classes, class_ids = [], {}
+    for group_id, (group, _, _) in enumerate(AGE_GROUPS, 1):
+        for gender, label in (("F", "Female"), ("M", "Male")):
+            class_id = len(classes) + 1
+            classes.append((class_id, group_id, gender, f"{group} {label}"))
+            class_ids.setdefault(group, []).append(class_id)
+    writer.write("Class", classes)
+
+    face_ids = {size: i for i, (size, _) in enumerate(TARGET_FACES, 1)}
+    writer.write("TargetFace", [(i, size, desc) for i, (size, desc) in enumerate(TARGET_FACES, 1)])
+
+    rounds, ranges = [], []
+    for round_id, (name, desc, round_ranges, per_end) in enumerate(ROUNDS, 1):
+        arrows = sum(ends for _, ends, _ in round_ranges) * per_end
+        rounds.append((round_id, name, arrows, arrows * 10, desc))
+        for seq, (dist, ends, face) in enumerate(round_ranges, 1):
+            ranges.append((len(ranges) + 1, round_id, seq, dist, ends, face_ids[face], per_end))
+    writer.write("Round", rounds)
+    writer.write("RoundRange", ranges)
+
+    round_ids = {name: i for i, (name, _, _, _) in enumerate(ROUNDS, 1)}
+    equivalents = []
+    for base, equivalent, groups in EQUIVALENCES:
+        for group in groups:
+            for class_id in class_ids[group]:
+                for equipment_id in range(1, len(EQUIPMENT_TYPES) + 1):
+                    equivalents.append((
+                        len(equivalents) + 1, round_ids[base], class_id, equipment_id,
+                        round_ids[equivalent], "2020-01-01", None,
+                    ))
+    writer.write("EquivalentRound", equivalents)
+
+
+def make_archers(rng, count, today):
+    equipment_share = np.array([share for _, _, share, _ in EQUIPMENT_TYPES])
+    error_factor = np.array([factor for _, _, _, factor in EQUIPMENT_TYPES])
+
+    ages = np.clip(rng.gamma(4.0, 9.0, count) + 8, 9, 85).astype(int)
+    birth = np.array([np.datetime64(today) - np.timedelta64(int(a * 365.25) + int(d), "D")
+                      for a, d in zip(ages, rng.integers(0, 365, count))])
+    equipment = rng.choice(len(EQUIPMENT_TYPES), count, p=equipment_share) + 1
+    # Angular error in mrad; juniors and older archers a little wider
+    skill = np.exp(rng.normal(np.log(3.0), 0.35, count)) * error_factor[equipment - 1]
+    skill *= np.where((ages < 16) | (ages > 65), 1.25, 1.0)
+
+    archers = pd.DataFrame({
+        "ArcherID": np.arange(1, count + 1),
+        "FirstName": rng.choice(FIRST_NAMES, count),
+        "LastName": rng.choice(LAST_NAMES, count),
+        "DateOfBirth": birth.astype("datetime64[D]").astype(str),
+        "Gender": rng.choice(["F", "M"], count),
+        "DefaultEquipmentTypeID": equipment,
+        "IsActive": (rng.random(count) < 0.92).astype(int),
+    })
+    return archers, skill.clip(0.8, 12.0), ages
+
+
+def preferred_rounds(rng, ages, equipment):
+    """Three favourite rounds per archer, shorter distances for juniors/veterans."""
+    names = [name for name, _, _, _ in ROUNDS]
+    long_rounds = [names.index(n) + 1 for n in ("WA 1440 (90m)", "WA 1440 (70m)", "WA 720 (70m)", "Sydney", "Brisbane", "Hobart", "Perth", "WA 18m")]
+    short_rounds = [names.index(n) + 1 for n in ("WA 1440 (60m)", "WA 720 (60m)", "Adelaide", "Canberra", "Short Canberra", "WA 18m")]
+    compound = names.index("WA 720 (50m)") + 1
+
+    choices = np.empty((len(ages), 3), dtype=int)
+    for i, (age, equip) in enumerate(zip(ages, equipment)):
+        pool = short_rounds if age < 16 or age > 60 else long_rounds
+        if equip == 2:
+            pool = pool + [compound, compound]
+        choices[i] = rng.choice(pool, 3)
+    return choices
+
+
+def generate_ends(rng, plan, round_id, error, score_ids, end_id, arrow_id):
+    """
+    Simulate every arrow for a batch of scores on one round.
+
+    Returns:
+        tuple: (totals, End frame, Arrow frame, next end id, next arrow id)
+    """
+    _, per_end, ranges = plan[round_id]
+    count = len(score_ids)
+    end_totals, range_seq, end_seq, arrows = [], [], [], []
+    for seq, distance, ends, face in ranges:
+        sigma = (2.0 * error * distance / face)[:, None, None]
+        rings = np.floor(rng.rayleigh(1.0, (count, ends, per_end)) * sigma)
+        shot = np.clip(10 - rings, 0, 10).astype(np.int16)
+        shot = -np.sort(-shot, axis=2)  # highest first within each end
+        arrows.append(shot)
+        end_totals.append(shot.sum(axis=2))
+        range_seq += [seq] * ends
+        end_seq += list(range(1, ends + 1))
+
+    arrows = np.concatenate(arrows, axis=1)  # (scores, ends, per_end)
+    end_totals = np.concatenate(end_totals, axis=1)  # (scores, ends)
+    total_ends = end_totals.shape[1]
+
+    end_ids = np.arange(end_id, end_id + count * total_ends)
+    ends_frame = pd.DataFrame({
+        "EndID": end_ids,
+        "ScoreID": np.repeat(score_ids, total_ends),
+        "RangeSequence": np.tile(range_seq, count),
+        "EndSequence": np.tile(end_seq, count),
+        "TotalEndScore": end_totals.ravel(),
+    })
+    arrows_frame = pd.DataFrame({
+        "ArrowID": np.arange(arrow_id, arrow_id + arrows.size),
+        "EndID": np.repeat(end_ids, per_end),
+        "ArrowScore": arrows.ravel(),
+        "ArrowSequence": np.tile(np.arange(1, per_end + 1), count * total_ends),
+    })
+    return end_totals.sum(axis=1), ends_frame, arrows_frame, end_ids[-1] + 1, arrow_id + arrows.size
+
+
+def make_competitions(rng, count, archer_count, start, days):
+    plan = round_plan()
+    dates = np.sort(rng.integers(0, days, count))
+    competitions, entries = [], []
+    for comp_id, offset in enumerate(dates, 1):
+        comp_date = start + timedelta(days=int(offset))
+        round_id = int(rng.choice(list(plan)))
+        championship = rng.random() < 0.1
+        name = f"{ROUNDS[round_id - 1][0]} {'Championship' if championship else 'Tournament'} {comp_date:%b %Y}"
+        competitions.append((comp_id, name, comp_date.isoformat(), int(championship),
+                             f"Synthetic {ROUNDS[round_id - 1][0]} competition"))
+        field = int(min(archer_count, rng.integers(16, 160)))
+        for archer_id in rng.choice(archer_count, field, replace=False) + 1:
+            entries.append((int(archer_id), comp_id, comp_date, round_id))
+    entries.sort()
+    return competitions, entries
+
+
+def make_users(rng, archers, count, password):
+    users, used = [], set()
+    for user_id in range(1, count + 1):
+        archer = archers.iloc[user_id - 1]
+        username = "admin" if user_id == 1 else f"{archer.FirstName}.{archer.LastName}{archer.ArcherID}".lower()
+        if username in used:
+            continue
+        used.add(username)
+        password_hash, salt, hash_type = hash_new_password(password)
+        users.append((user_id, int(archer.ArcherID), username, password_hash, salt, hash_type,
+                      int(user_id <= 6), int(user_id == 1)))
+    return users
+
+
+def make_security_logs(rng, writer, count, users, start, days, chunk=200_000):
+    events = [event for event, _, _ in SECURITY_EVENTS]
+    weights = np.array([weight for _, weight, _ in SECURITY_EVENTS])
+    descriptions = dict((event, desc) for event, _, desc in SECURITY_EVENTS)
+    user_ids = np.array([u[0] for u in users])
+    archer_ids = np.array([u[1] for u in users])
+    start_ts = datetime.combine(start, datetime.min.time())
+    written = 0
+    while written < count:
+        n = min(chunk, count - written)
+        kind = rng.choice(len(events), n, p=weights / weights.sum())
+        who = rng.integers(0, len(user_ids), n)
+        seconds = np.sort(rng.integers(0, days * 86400, n))
+        times = (np.datetime64(start_ts, "s") + seconds.astype("timedelta64[s]")).astype(str)
+        event_types = np.array(events)[kind]
+        severity = np.array([get_event_severity(e) for e in events])[kind]
+        reviewed = (severity != "INFO") & (rng.random(n) < 0.8)
+        frame = pd.DataFrame({
+            "LogID": np.arange(written + 1, written + n + 1),
+            "EventTime": np.char.replace(times, "T", " "),
+            "UserID": user_ids[who],
+            "ArcherID": archer_ids[who],
+            "IPAddress": [f"10.{a}.{b}.{c}" for a, b, c in rng.integers(0, 255, (n, 3))],
+            "EventType": event_types,
+            "Description": [descriptions[e] for e in event_types],
+            "Severity": severity,
+            "ActionURL": None,
+            "RequestDetails": None,
+            "IsReviewed": reviewed.astype(int),
+            "ReviewedBy": np.where(reviewed, 1, None),
+            "ReviewedAt": np.where(reviewed, np.char.replace(times, "T", " "), None),
+        })
+        writer.write("SecurityLog", frame)
+        written += n
+
+
+def generate(args, writer):
+    rng = np.random.default_rng(args.seed)
+    today = date.today()
+    days = int(args.years * 365)
+    start = today - timedelta(days=days)
+    plan = round_plan()
+
+    write_reference_data(writer)
+    archers, errors, ages = make_archers(rng, args.archers, today)
+    favourites = preferred_rounds(rng, ages, archers["DefaultEquipmentTypeID"].to_numpy())
+    writer.write("Archer", archers)
+
+    users = make_users(rng, archers, min(args.users, args.archers), args.password)
+    writer.write("AppUser", users)
+    recorders = np.array([u[1] for u in users if u[6]])
+
+    competitions, entries = make_competitions(rng, args.competitions, args.archers, start, days)
+    writer.write("Competition", competitions)
+
+    # Practice scores per archer so the total lands near the arrow target
+    mean_arrows = np.mean([plan[r][0] for r in range(1, len(ROUNDS) + 1)])
+    practice_arrows = max(0, args.arrows - len(entries) * mean_arrows)
+    scores_per_archer = practice_arrows / mean_arrows / args.archers
+
+    score_id, end_id, arrow_id, entry_index = 1, 1, 1, 0
+    started = time.perf_counter()
+    for first in range(0, args.archers, args.chunk):
+        ids = np.arange(first, min(first + args.chunk, args.archers))
+        counts = rng.poisson(scores_per_archer, len(ids))
+        archer_ids = np.repeat(ids + 1, counts)
+        n = len(archer_ids)
+        rounds = favourites[archer_ids - 1, rng.integers(0, 3, n)]
+        dates = [start + timedelta(days=int(d)) for d in rng.integers(0, days, n)]
+        competition = [0] * n
+
+        # Competition entries for archers in this chunk
+        while entry_index < len(entries) and entries[entry_index][0] <= ids[-1] + 1:
+            archer_id, comp_id, comp_date, round_id = entries[entry_index]
+            archer_ids = np.append(archer_ids, archer_id)
+            rounds = np.append(rounds, round_id)
+            dates.append(comp_date)
+            competition.append(comp_id)
+            entry_index += 1
+
+        n = len(archer_ids)
+        if n == 0:
+            continue
+        score_ids = np.arange(score_id, score_id + n)
+        totals = np.zeros(n, dtype=int)
+        for round_id in np.unique(rounds):
+            mask = rounds == round_id
+            totals[mask], ends, shots, end_id, arrow_id = generate_ends(
+                rng, plan, int(round_id), errors[archer_ids[mask] - 1], score_ids[mask], end_id, arrow_id
+            )
+            writer.write("End", ends)
+            writer.write("Arrow", shots)
+
+        competition = np.array(competition)
+        writer.write("Score", pd.DataFrame({
+            "ScoreID": score_ids,
+            "ArcherID": archer_ids,
+            "RoundID": rounds,
+            "EquipmentTypeID": archers["DefaultEquipmentTypeID"].to_numpy()[archer_ids - 1],
+            "Date": [d.isoformat() for d in dates],
+            "TotalScore": totals,
+            "IsApproved": 1,
+            "IsCompetition": (competition > 0).astype(int),
+            "ApprovedBy": rng.choice(recorders, n),
+        }))
+        mask = competition > 0
+        writer.write("CompetitionScore", pd.DataFrame({
+            "CompetitionID": competition[mask], "ScoreID": score_ids[mask],
+        }))
+        score_id += n
+
+        done = ids[-1] + 1
+        elapsed = time.perf_counter() - started
+        print(f"\r  {done}/{args.archers} archers, {arrow_id - 1:,} arrows "
+              f"({(arrow_id - 1) / max(elapsed, 1e-9):,.0f} arrows/s)", end="", flush=True)
+    print()
+
+    # Pending practice scores awaiting approval (no end detail, as entered)
+    staged = min(args.staged, args.archers)
+    archer_ids = rng.integers(1, args.archers + 1, staged)
+    rounds = favourites[archer_ids - 1, 0]
+    possible = np.array([plan[int(r)][0] * 10 for r in rounds])
+    recent = [today - timedelta(days=int(d)) for d in rng.integers(0, 21, staged)]
+    writer.write("StagedScore", pd.DataFrame({
+        "StagedScoreID": np.arange(1, staged + 1),
+        "ArcherID": archer_ids,
+        "RoundID": rounds,
+        "EquipmentTypeID": archers["DefaultEquipmentTypeID"].to_numpy()[archer_ids - 1],
+        "Date": [d.isoformat() for d in recent],
+        "TotalScore": (possible * rng.uniform(0.45, 0.92, staged)).astype(int),
+        "SubmissionDate": [f"{d.isoformat()} 18:30:00" for d in recent],
+    }))
+
+    make_security_logs(rng, writer, args.security_logs, users, start, days)
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+
+def connect(allow_local_infile):
+    import mysql.connector
+    import toml
+
+    with open(os.path.join(".streamlit", "secrets.toml"), "r", encoding="utf-8") as f:
+        secrets = toml.load(f)
+    return mysql.connector.connect(
+        host=secrets["DB_HOST"],
+        user=secrets["DB_USER"],
+        password=secrets["DB_PASSWORD"],
+        database=secrets["DB_NAME"],
+        allow_local_infile=allow_local_infile,
+    )
+
+
+def load_data_infile(cursor, table, path):
+    columns = ", ".join(f"`{c}`" for c in TABLE_COLUMNS[table])
+    cursor.execute(
+        f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table}` "
+        "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+        f"LINES TERMINATED BY '\\n' ({columns})",
+        (os.path.abspath(path),),
+    )
+
+
+def read_batches(path, batch_size):
+    """Yield lists of up to batch_size CSV rows, with \\N read as None."""
+    batch = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            batch.append([None if value == NULL else value for value in row])
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def insert_rows(cursor, table, path, batch_size, placeholder="%s"):
+    columns = TABLE_COLUMNS[table]
+    sql = (
+        f"INSERT INTO `{table}` ({', '.join(f'`{c}`' for c in columns)}) "
+        f"VALUES ({', '.join([placeholder] * len(columns))})"
+    )
+    for batch in read_batches(path, batch_size):
+        # mysql-connector rewrites executemany INSERTs into multi-row statements
+        cursor.executemany(sql, batch)
+
+
+def rebuild_loaded_records(conn):
+    """Recompute PersonalBest and ClubRecord for the loaded scores and drop
+    dashboard digests of the old data (they are rebuilt when viewed)."""
+    from archery_app.records import rebuild_records
+
+    start = time.perf_counter()
+    personal_bests, club_records = rebuild_records(conn, throttle=0, log=None)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM UserDigest")
+    conn.commit()
+    cursor.close()
+    print(f"  Records rebuilt: {personal_bests:,} personal bests, {club_records:,} club records "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+def load(writer, method, batch_size, reset):
+    import mysql.connector
+
+    conn = connect(allow_local_infile=method != "insert")
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Archer")
+    if cursor.fetchone()[0] and not reset:
+        print("The database already has archers; rerun with --reset to replace all data.")
+        return False
+
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    cursor.execute("SET UNIQUE_CHECKS = 0")
+    if reset:
+        for table in reversed(LOAD_ORDER):
+            cursor.execute(f"TRUNCATE TABLE `{table}`")
+
+    for table in LOAD_ORDER:
+        path = writer.path(table)
+        start = time.perf_counter()
+        used = method
+        if method in ("auto", "load-data"):
+            try:
+                load_data_infile(cursor, table, path)
+                used = "load-data"
+            except mysql.connector.Error as err:
+                if method == "load-data":
+                    raise
+                print(f"  LOAD DATA unavailable ({err.msg}); using multi-row INSERT")
+                method = used = "insert"
+        if used == "insert":
+            insert_rows(cursor, table, path, batch_size)
+        conn.commit()
+        elapsed = time.perf_counter() - start
+        rows = writer.rows[table]
+        print(f"  {table:<18}{rows:>14,} rows {elapsed:>9.1f} s {rows / max(elapsed, 1e-9):>12,.0f} rows/s ({used})")
+
+    cursor.execute("SET UNIQUE_CHECKS = 1")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    cursor.execute(f"ANALYZE TABLE {', '.join(f'`{t}`' for t in LOAD_ORDER)}")
+    cursor.fetchall()
+    cursor.close()
+    rebuild_loaded_records(conn)
+    conn.close()
+    return True
+
+
+def load_sqlite(writer, path, batch_size, reset):
+    """Load the CSV files into the local SQLite database used by DB_BACKEND = "sqlite"."""
+    from archery_app.sqlite_backend import SQLiteBackend
+
+    conn = SQLiteBackend(path).raw_connection()
+    if conn.execute("SELECT COUNT(*) FROM Archer").fetchone()[0] and not reset:
+        print("The database already has archers; rerun with --reset to replace all data.")
+        return False
+
+    conn.execute("PRAGMA foreign_keys = OFF")
+    if reset:
+        for table in reversed(LOAD_ORDER):
+            conn.execute(f"DELETE FROM `{table}`")
+        conn.execute("DELETE FROM sqlite_sequence")
+        conn.commit()
+
+    for table in LOAD_ORDER:
+        start = time.perf_counter()
+        insert_rows(conn, table, writer.path(table), batch_size, placeholder="?")
+        conn.commit()
+        elapsed = time.perf_counter() - start
+        rows = writer.rows[table]
+        print(f"  {table:<18}{rows:>14,} rows {elapsed:>9.1f} s {rows / max(elapsed, 1e-9):>12,.0f} rows/s (sqlite)")
+
+    conn.execute("ANALYZE")
+    conn.close()
+    backend_conn = SQLiteBackend(path).connect()
+    rebuild_loaded_records(backend_conn)
+    backend_conn.close()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scale", choices=list(SCALES), default="club")
+    parser.add_argument("--archers", type=int, help="Override the preset archer count")
+    parser.add_argument("--arrows", type=int, help="Approximate number of arrows to generate")
+    parser.add_argument("--competitions", type=int)
+    parser.add_argument("--security-logs", type=int)
+    parser.add_argument("--users", type=int, default=50, help="Archers given an account (1 = admin)")
+    parser.add_argument("--password", default="Archery2024!", help="Password for generated accounts")
+    parser.add_argument("--staged", type=int, default=200, help="Pending staged scores")
+    parser.add_argument("--years", type=float, default=3.0, help="Years of history")
+    parser.add_argument("--seed", type=int, default=20031)
+    parser.add_argument("--chunk", type=int, default=2000, help="Archers generated per chunk")
+    parser.add_argument("--out-dir", help="CSV directory (default benchmarks/data/<scale>)")
+    parser.add_argument("--no-load", action="store_true", help="Only write the CSV files")
+    parser.add_argument("--method", choices=["auto", "load-data", "insert"], default="auto")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per multi-row INSERT")
+    parser.add_argument("--reset", action="store_true", help="Empty every table before loading")
+    parser.add_argument("--sqlite", nargs="?", const="", metavar="PATH",
+                        help="Load into a local SQLite database instead of MySQL "
+                             "(default archery_local.db)")
+    args = parser.parse_args()
+
+    archers, arrows, competitions, security_logs = SCALES[args.scale]
+    args.archers = args.archers or archers
+    args.arrows = args.arrows if args.arrows is not None else arrows
+    args.competitions = args.competitions if args.competitions is not None else competitions
+    args.security_logs = args.security_logs if args.security_logs is not None else security_logs
+    out_dir = args.out_dir or os.path.join("benchmarks", "data", args.scale)
+
+    print(f"Generating {args.archers:,} archers, ~{args.arrows:,} arrows, "
+          f"{args.competitions:,} competitions into {out_dir}")
+    writer = CsvWriter(out_dir)
+    start = time.perf_counter()
+    generate(args, writer)
+    print(f"Generated in {time.perf_counter() - start:.1f} s:")
+    for table in LOAD_ORDER:
+        print(f"  {table:<18}{writer.rows[table]:>14,} rows")
+    if args.users:
+        print(f"Accounts: 'admin' and archer usernames, password '{args.password}'")
+
+    if args.no_load:
+        return 0
+    if args.sqlite is not None:
+        from archery_app.sqlite_backend import DEFAULT_DB_PATH
+
+        path = args.sqlite or DEFAULT_DB_PATH
+        print(f"\nLoading into SQLite database {path}")
+        return 0 if load_sqlite(writer, path, args.batch_size, args.reset) else 1
+    print("\nLoading into MySQL")
+    return 0 if load(writer, args.method, args.batch_size, args.reset) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
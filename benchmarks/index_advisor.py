@@ -0,0 +1,769 @@
+"""
+index_advisor.py
+Missing-index audit of the queries the app actually runs, with a migration script.
+
+1. Capture - every statement goes through query_stats, which keeps one
+   example statement per fingerprint (its SQL text only, never the values
+   bound to it). Either replay a capture downloaded from the admin
+   Performance page ("Download query samples") with --capture, or let this
+   script run a workload: every page rendered once with AppTest, then the
+   load test's read mix for --duration seconds.
+2. Explain - each captured SELECT/UPDATE/DELETE, and each statement in the
+   body of the stored procedures that were called (create_procedures.sql),
+   is given sample values: a placeholder or procedure parameter takes an
+   existing value of the column it is compared with (LIMIT and OFFSET take
+   10, anything else NULL). It is then EXPLAINed against the configured
+   database (MySQL, or the SQLite backend with DB_BACKEND = "sqlite"). Full
+   scans of tables with at least --min-rows rows, filesorts and temporary
+   tables are reported.
+3. Recommend - for each flagged table an index is built from the
+   statement's predicates on it: equality columns (fewest distinct values
+   first, so the prefix is shared by more queries), then ORDER BY / GROUP BY
+   columns, then one range column, extended to cover the statement's other
+   columns of that table while it stays within --max-columns. Statements
+   already faster than --min-ms are left alone, as are keys that an
+   existing index (a primary key included) already starts with; a candidate
+   that a longer candidate starts with is folded into it.
+4. Measure - flagged SELECTs are timed (median of --repeat runs) before and
+   after the candidate indexes are created; the indexes are dropped again
+   unless --keep is given. This creates indexes in the database, so on MySQL
+   it only runs with --trial; on the SQLite backend it is the default.
+5. A script with one CREATE INDEX per recommendation, ready to become a
+   numbered file in migrations/ (see archery_app/migrations.py), annotated
+   with the statements it serves and the measured timings, is written to
+   --output. Candidates the planner did not use in the trial are left in as
+   comments.
+
+Usage:
+    python benchmarks/index_advisor.py
+    python benchmarks/index_advisor.py --capture query_samples.json --trial
+    python benchmarks/index_advisor.py --duration 30 --output index_migration.sql --json report.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+os.chdir(REPO_ROOT)
+# The workload is captured through query_stats, which is off by default
+os.environ.setdefault("QUERY_STATS_ENABLED", "true")
+
+from archery_app.database import get_connection, get_database_backend
+from archery_app.query_stats import fingerprint, get_query_samples, reset_query_stats
+
+PROCEDURES_FILE = "create_procedures.sql"
+DEFAULT_OUTPUT = os.path.join("benchmarks", "data", "index_migration.sql")
+MAX_INDEX_NAME = 64
+
+_KEYWORDS = {
+    "ON", "WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "CROSS", "STRAIGHT_JOIN",
+    "GROUP", "ORDER", "LIMIT", "UNION", "SET", "USING", "HAVING", "NATURAL", "WINDOW",
+}
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+`?(\w+)`?(?:\s+(?:AS\s+)?`?(\w+)`?)?", re.I)
+_COLUMN_REF = re.compile(r"(?<![\w.])(?:`?(\w+)`?\.)?`?(\w+)`?(?!\s*\()")
+_PREDICATE = re.compile(
+    r"(?<![\w.])(?:`?(\w+)`?\.)?`?(\w+)`?\s*"
+    r"(<=>|>=|<=|!=|<>|=|>|<|\bNOT\s+IN\b|\bIN\b|\bBETWEEN\b|\bLIKE\b|\bIS\s+NULL\b)"
+    r"\s*(?:`?(\w+)`?\.`?(\w+)`?)?",
+    re.I,
+)
+_ORDER_BY = re.compile(r"\bORDER\s+BY\s+(.+?)(?=\bLIMIT\b|\)|$)", re.I | re.S)
+_GROUP_BY = re.compile(r"\bGROUP\s+BY\s+(.+?)(?=\bHAVING\b|\bORDER\b|\bLIMIT\b|\)|$)", re.I | re.S)
+_PROCEDURE = re.compile(r"CREATE\s+PROCEDURE\s+(\w+)\s*\((.*?)\)\s*BEGIN(.*?)\bEND\s*//", re.I | re.S)
+_PROCEDURE_PARAM = re.compile(r"\b(?:IN|OUT|INOUT)\s+(\w+)", re.I)
+_SELECT_INTO = re.compile(r"\bINTO\s+[\w\s,]+?(?=\bFROM\b)", re.I)
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: USING (COVERING )?INDEX (\w+))?")
+_SQLITE_TEMP = re.compile(r"USE TEMP B-TREE FOR (.+)")
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s")
+# The column a placeholder is compared with, from the text before it
+_COMPARED_COLUMN = re.compile(
+    r"(?:`?(\w+)`?\.)?`?(\w+)`?\s*"
+    r"(?:<=>|>=|<=|!=|<>|=|>|<|\b(?:NOT\s+)?IN\s*\((?:\s*%s\s*,)*|\bLIKE\b|\bBETWEEN\b(?:\s*%s\s*AND\b)?)\s*$",
+    re.I,
+)
+_LIMIT_BEFORE = re.compile(r"\b(?:LIMIT|OFFSET)\s*(?:%s\s*,\s*)?$", re.I)
+SAMPLE_LIMIT = 10
+
+
+# ---------------------------------------------------------------------------
+# Capture
+# ---------------------------------------------------------------------------
+
+
+def run_workload(duration, seed, pages, timeout):
+    """Exercise the app and return query_stats' samples."""
+    reset_query_stats()
+    if pages:
+        render_pages(timeout)
+    if duration > 0:
+        from load_test import build_operations, load_id_pools, run_level
+
+        pools = load_id_pools()
+        if not pools["archers"]:
+            print("  No archers in the database; load data with benchmarks/generate_data.py first.")
+        else:
+            run_level(build_operations(pools, writes=False), 1, duration, seed)
+    return get_query_samples()
+
+
+def render_pages(timeout):
+    """Render every registered page once, logged in as an admin."""
+    from bench_startup import load_mysql_secrets, time_page
+    from streamlit.logger import set_log_level
+
+    from archery_app.page_registry import PAGES
+
+    set_log_level("critical")
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+    secrets = {}
+    if get_database_backend().name == "mysql":
+        secrets = load_mysql_secrets()
+    for page in ["Home"] + [name for name in PAGES if name != "Home"]:
+        time_page(page, secrets, reruns=1, timeout=timeout)
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+
+class Schema:
+    """Tables, columns, row counts and existing indexes of the target database."""
+
+    def __init__(self, backend_name):
+        self.backend_name = backend_name
+        self.columns = {}   # table -> [column]
+        self.rows = {}      # table -> row count (estimate on MySQL)
+        self.indexes = {}   # table -> [(name, [column])]
+        self._names = {}    # lower-case name -> table
+        self._distinct = {}
+        self._samples = {}
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            if backend_name == "sqlite":
+                self._load_sqlite(cursor)
+            else:
+                self._load_mysql(cursor)
+        finally:
+            cursor.close()
+            conn.close()
+        self._names = {table.lower(): table for table in self.columns}
+
+    def _load_sqlite(self, cursor):
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )
+        for (table,) in cursor.fetchall():
+            cursor.execute(f"PRAGMA table_info(`{table}`)")
+            info = cursor.fetchall()
+            self.columns[table] = [row[1] for row in info]
+            primary = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+            self.indexes[table] = [("PRIMARY", primary)] if primary else []
+            cursor.execute(f"PRAGMA index_list(`{table}`)")
+            for index_name in [row[1] for row in cursor.fetchall()]:
+                cursor.execute(f"PRAGMA index_info(`{index_name}`)")
+                columns = [row[2] for row in sorted(cursor.fetchall())]
+                self.indexes[table].append((index_name, columns))
+            cursor.execute(f"SELECT COUNT(*) FROM `{table}`")
+            self.rows[table] = cursor.fetchone()[0]
+
+    def _load_mysql(self, cursor):
+        cursor.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION"
+        )
+        for table, column in cursor.fetchall():
+            self.columns.setdefault(table, []).append(column)
+            self.indexes.setdefault(table, [])
+        cursor.execute(
+            "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"
+        )
+        indexes = {}
+        for table, index_name, column in cursor.fetchall():
+            indexes.setdefault((table, index_name), []).append(column)
+        for (table, index_name), columns in indexes.items():
+            self.indexes.setdefault(table, []).append((index_name, columns))
+        cursor.execute(
+            "SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE()"
+        )
+        for table, rows in cursor.fetchall():
+            self.rows[table] = int(rows or 0)
+
+    def table(self, name):
+        return self._names.get((name or "").lower())
+
+    def has_column(self, table, column):
+        return column.lower() in (c.lower() for c in self.columns.get(table, ()))
+
+    def column_name(self, table, column):
+        for name in self.columns.get(table, ()):
+            if name.lower() == column.lower():
+                return name
+        return column
+
+    def is_served(self, table, columns):
+        """True if an existing index starts with these columns."""
+        wanted = [c.lower() for c in columns]
+        for _, index_columns in self.indexes.get(table, ()):
+            if [c.lower() for c in index_columns[:len(wanted)]] == wanted:
+                return True
+        return False
+
+    def distinct_values(self, table, column):
+        key = (table, column)
+        if key not in self._distinct:
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(DISTINCT `{column}`) FROM `{table}`")
+            self._distinct[key] = cursor.fetchone()[0]
+            cursor.close()
+            conn.close()
+        return self._distinct[key]
+
+    def sample_value(self, table, column):
+        """A value from the middle of the column, or None if it is empty."""
+        key = (table, column)
+        if key not in self._samples:
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT `{column}` FROM `{table}` WHERE `{column}` IS NOT NULL "
+                f"ORDER BY `{column}` LIMIT 1 OFFSET %s",
+                (self.rows.get(table, 0) // 2,),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute(f"SELECT `{column}` FROM `{table}` WHERE `{column}` IS NOT NULL LIMIT 1")
+                row = cursor.fetchone()
+            self._samples[key] = row[0] if row else None
+            cursor.close()
+            conn.close()
+        return self._samples[key]
+
+
+# ---------------------------------------------------------------------------
+# Statements
+# ---------------------------------------------------------------------------
+
+
+def load_procedures(path=PROCEDURES_FILE):
+    """Return {name: ([parameter], [statement])} for the EXPLAINable body statements."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    procedures = {}
+    for name, header, body in _PROCEDURE.findall(text):
+        body = re.sub(r"--[^\n]*", "", body)
+        statements = []
+        for chunk in body.split(";"):
+            lines = chunk.strip().splitlines()
+            # Skip control flow (IF ... THEN, ELSE, START TRANSACTION) before the statement
+            while lines and not re.match(r"\s*(SELECT|UPDATE|DELETE)\b", lines[0], re.I):
+                lines.pop(0)
+            if lines:
+                statements.append(_SELECT_INTO.sub("", "\n".join(lines)))
+        procedures[name] = (_PROCEDURE_PARAM.findall(header), statements)
+    return procedures
+
+
+def parameterise_procedure_statement(sql, parameters):
+    """Turn p_xxx parameters into %(p_xxx)s placeholders and v_xxx variables into NULL."""
+    names = {p.lower() for p in parameters}
+
+    def replace(match):
+        name = match.group(0)
+        return f"%({name.lower()})s" if name.lower() in names else "NULL"
+
+    return re.sub(r"\b[pv]_\w+\b", replace, sql)
+
+
+def sample_params(sql, schema):
+    """
+    Sample values for a statement's placeholders.
+
+    Each takes an existing value of the column it is compared with, found
+    in the tables the statement reads; LIMIT and OFFSET take SAMPLE_LIMIT
+    and anything else NULL.
+
+    Returns:
+        dict for %(name)s placeholders, list for %s, or None if there are none
+    """
+    matches = list(_PLACEHOLDER.finditer(sql))
+    if not matches:
+        return None
+    shape = StatementShape(sql, schema)
+    named, positional = {}, []
+    for match in matches:
+        before = sql[:match.start()]
+        value = None
+        if _LIMIT_BEFORE.search(before):
+            value = SAMPLE_LIMIT
+        else:
+            compared = _COMPARED_COLUMN.search(before)
+            resolved = compared and shape.resolve(compared.group(1), compared.group(2))
+            if resolved:
+                value = schema.sample_value(*resolved)
+        if match.group(1) is None:
+            positional.append(value)
+        elif named.get(match.group(1)) is None:
+            named[match.group(1)] = value
+    return named if named else positional
+
+
+def collect_statements(samples, procedures, schema):
+    """Turn query samples into EXPLAINable statements (procedure bodies expanded)."""
+    statements = []
+    for sample in samples:
+        sql = sample["SQL"].strip().rstrip(";")
+        if sql.upper().startswith("CALL "):
+            name = sql.split()[1]
+            if name not in procedures:
+                continue
+            parameters, body = procedures[name]
+            for index, statement in enumerate(body, start=1):
+                statement = parameterise_procedure_statement(statement, parameters)
+                statements.append({
+                    "source": f"{name} #{index}",
+                    "sql": statement,
+                    "params": sample_params(statement, schema),
+                    "calls": sample["Calls"],
+                    "total_ms": sample["Total ms"],
+                })
+        elif re.match(r"\s*(SELECT|UPDATE|DELETE|WITH)\b", sql, re.I):
+            statements.append({
+                "source": sample["Fingerprint"],
+                "sql": sql,
+                "params": sample_params(sql, schema),
+                "calls": sample["Calls"],
+                "total_ms": sample["Total ms"],
+            })
+    return statements
+
+
+class StatementShape:
+    """Tables, predicates and sort columns of one statement, resolved against the schema."""
+
+    def __init__(self, sql, schema):
+        text = fingerprint(sql)
+        self.aliases = {}
+        for name, alias in _TABLE_REF.findall(text):
+            table = schema.table(name)
+            if table is None:
+                continue
+            self.aliases[table.lower()] = table
+            if alias and alias.upper() not in _KEYWORDS:
+                self.aliases[alias.lower()] = table
+        self.tables = sorted(set(self.aliases.values()))
+        self._schema = schema
+
+        self.columns = {table: [] for table in self.tables}
+        for qualifier, column in _COLUMN_REF.findall(text):
+            resolved = self.resolve(qualifier, column)
+            if resolved and resolved[1] not in self.columns[resolved[0]]:
+                self.columns[resolved[0]].append(resolved[1])
+
+        self.equality = {table: [] for table in self.tables}
+        self.join_equality = {table: [] for table in self.tables}
+        self.range = {table: [] for table in self.tables}
+        for qualifier, column, operator, other_qualifier, other_column in _PREDICATE.findall(text):
+            resolved = self.resolve(qualifier, column)
+            if resolved is None:
+                continue
+            table, column = resolved
+            operator = " ".join(operator.upper().split())
+            if operator in ("=", "<=>", "IN", "IS NULL"):
+                joined = other_qualifier and self.resolve(other_qualifier, other_column)
+                if joined and joined[0] != table:
+                    target = self.join_equality[table]
+                else:
+                    target = self.equality[table]
+            elif operator in (">", "<", ">=", "<=", "BETWEEN", "LIKE"):
+                target = self.range[table]
+            else:
+                continue
+            if column not in target:
+                target.append(column)
+
+        self.sort = self._sort_columns(_GROUP_BY.search(text)) or self._sort_columns(
+            _last_match(_ORDER_BY, text)
+        )
+
+    def resolve(self, qualifier, column):
+        """Return (table, column) for a column reference in this statement, or None."""
+        if qualifier:
+            table = self.aliases.get(qualifier.lower())
+            if table and self._schema.has_column(table, column):
+                return table, self._schema.column_name(table, column)
+            return None
+        owners = [t for t in self.tables if self._schema.has_column(t, column)]
+        if len(owners) == 1:
+            return owners[0], self._schema.column_name(owners[0], column)
+        return None
+
+    def _sort_columns(self, match):
+        """(table, [columns]) if every sort key is a column of one table."""
+        if match is None:
+            return None
+        keys = []
+        for item in match.group(1).split(","):
+            words = item.split()
+            if not words:
+                return None
+            ref = words[0].split(".")
+            resolved = self.resolve(ref[0] if len(ref) == 2 else None, ref[-1])
+            if resolved is None:
+                return None
+            keys.append(resolved)
+        tables = {table for table, _ in keys}
+        if len(tables) != 1:
+            return None
+        return tables.pop(), [column for _, column in keys]
+
+
+def _last_match(pattern, text):
+    match = None
+    for match in pattern.finditer(text):
+        pass
+    return match
+
+
+# ---------------------------------------------------------------------------
+# EXPLAIN
+# ---------------------------------------------------------------------------
+
+
+def explain(statement, shape, schema, min_rows):
+    """Return (plan lines, [(issue, table)]) for one statement."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        if schema.backend_name == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement['sql']}", statement["params"])
+            return _sqlite_issues([row[3] for row in cursor.fetchall()], shape, schema, min_rows)
+        cursor.execute(f"EXPLAIN {statement['sql']}", statement["params"])
+        names = cursor.column_names
+        rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        return _mysql_issues(rows, shape, schema, min_rows)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _sqlite_issues(details, shape, schema, min_rows):
+    issues = []
+    for detail in details:
+        scan = _SQLITE_SCAN.match(detail)
+        if scan:
+            table = shape.aliases.get(scan.group(1).lower())
+            if table and not scan.group(3) and schema.rows.get(table, 0) >= min_rows:
+                issues.append(("full scan", table))
+            elif table and scan.group(3) and not scan.group(2) and schema.rows.get(table, 0) >= min_rows:
+                issues.append(("full index scan", table))
+            continue
+        temp = _SQLITE_TEMP.search(detail)
+        if temp:
+            kind = "filesort" if "ORDER BY" in temp.group(1) else "temporary"
+            table = shape.sort[0] if shape.sort else (shape.tables[0] if shape.tables else None)
+            if table and schema.rows.get(table, 0) >= min_rows:
+                issues.append((kind, table))
+    return details, issues
+
+
+def _mysql_issues(rows, shape, schema, min_rows):
+    plan, issues = [], []
+    for row in rows:
+        table = shape.aliases.get(str(row.get("table") or "").lower())
+        extra = row.get("Extra") or ""
+        plan.append(
+            f"{row.get('table')}: type={row.get('type')} key={row.get('key')} "
+            f"rows={row.get('rows')} {extra}".strip()
+        )
+        if table is None:
+            continue
+        if row.get("type") in ("ALL", "index"):
+            issues.append(("full scan" if row.get("type") == "ALL" else "full index scan", table))
+        if schema.rows.get(table, 0) < min_rows:
+            continue
+        if "filesort" in extra:
+            issues.append(("filesort", table))
+        if "temporary" in extra:
+            issues.append(("temporary", table))
+    return plan, issues
+
+
+def time_statement(statement, repeat):
+    """Median ms to run a SELECT and read its rows, or None for writes."""
+    if not re.match(r"\s*(SELECT|WITH)\b", statement["sql"], re.I):
+        return None
+    timings = []
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cursor.execute(statement["sql"], statement["params"])
+            cursor.fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        cursor.close()
+        conn.close()
+    return statistics.median(timings)
+
+
+# ---------------------------------------------------------------------------
+# Recommendations
+# ---------------------------------------------------------------------------
+
+
+def index_name(table, columns):
+    parts = []
+    for column in columns:
+        part = re.sub(r"ID$", "", re.sub(r"^Is(?=[A-Z])", "", column)) or column
+        parts.append(part.lower())
+    name = f"idx_{table.lower()}_{'_'.join(parts)}"
+    if len(name) > MAX_INDEX_NAME:
+        digest = hashlib.sha1(name.encode()).hexdigest()[:8]
+        name = f"{name[:MAX_INDEX_NAME - 9]}_{digest}"
+    return name
+
+
+def candidate_columns(shape, table, schema, max_columns):
+    """Equality, then sort, then range columns of one table, plus covering columns."""
+    constants = sorted(shape.equality[table], key=lambda c: schema.distinct_values(table, c))
+    key = constants + [c for c in shape.join_equality[table] if c not in constants]
+    if shape.sort and shape.sort[0] == table:
+        key += [c for c in shape.sort[1] if c not in key]
+    key += [c for c in shape.range[table][:1] if c not in key]
+    key = key[:max_columns]
+    if not key or schema.is_served(table, key):
+        return None
+    covering = key + [c for c in shape.columns[table] if c not in key]
+    return covering if len(covering) <= max_columns else key
+
+
+def recommend(statements, schema, max_columns, min_ms):
+    """Return the candidate indexes for the flagged statements slower than min_ms."""
+    candidates = {}
+    for statement in statements:
+        if statement.get("ms_before") is not None and statement["ms_before"] < min_ms:
+            continue
+        for table in sorted({table for _, table in statement["issues"]}):
+            columns = candidate_columns(statement["shape"], table, schema, max_columns)
+            if columns is None:
+                continue
+            key = (table, tuple(columns))
+            candidate = candidates.setdefault(key, {
+                "table": table,
+                "columns": list(columns),
+                "name": index_name(table, columns),
+                "statements": [],
+            })
+            candidate["statements"].append(statement)
+
+    # A candidate that another one starts with is served by the longer one
+    for key in list(candidates):
+        table, columns = key
+        for other_table, other_columns in list(candidates):
+            if (other_table, other_columns) != key and other_table == table \
+                    and other_columns[:len(columns)] == columns and key in candidates:
+                candidates[(other_table, other_columns)]["statements"].extend(
+                    candidates.pop(key)["statements"]
+                )
+                break
+    return list(candidates.values())
+
+
+def trial(candidates, statements, schema, min_rows, repeat, keep):
+    """Create the candidates, re-EXPLAIN and re-time their statements, then drop them."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for candidate in candidates:
+            cursor.execute(
+                f"CREATE INDEX `{candidate['name']}` ON `{candidate['table']}` "
+                f"({', '.join(f'`{c}`' for c in candidate['columns'])})"
+            )
+        if schema.backend_name == "sqlite":
+            cursor.execute("ANALYZE")
+        else:
+            tables = sorted({c["table"] for c in candidates})
+            cursor.execute(f"ANALYZE TABLE {', '.join(f'`{t}`' for t in tables)}")
+            cursor.fetchall()
+        conn.commit()
+
+        for statement in statements:
+            statement["plan_after"], statement["issues_after"] = explain(
+                statement, statement["shape"], schema, min_rows
+            )
+            statement["ms_after"] = time_statement(statement, repeat)
+        for candidate in candidates:
+            plans = " ".join(" ".join(s["plan_after"]) for s in candidate["statements"])
+            candidate["used"] = candidate["name"] in plans
+    finally:
+        if not keep:
+            for candidate in candidates:
+                if schema.backend_name == "sqlite":
+                    cursor.execute(f"DROP INDEX `{candidate['name']}`")
+                else:
+                    cursor.execute(f"DROP INDEX `{candidate['name']}` ON `{candidate['table']}`")
+            conn.commit()
+        cursor.close()
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.1f} ms"
+
+
+def write_migration(path, candidates, description, trialled):
+    lines = [
+        "-- Index recommendations from benchmarks/index_advisor.py",
+        f"-- Generated {datetime.now():%Y-%m-%d %H:%M} against the {description}",
+        "-- Timings are the median per statement before -> after the index.",
+        "-- To roll out, copy into migrations/NNNN_name.sql and run",
+        "-- python -m archery_app.migrations migrate (indexes are built online).",
+        "",
+    ]
+    for candidate in candidates:
+        issues = sorted({issue for s in candidate["statements"] for issue, table in s["issues"]
+                         if table == candidate["table"]})
+        lines.append(f"-- {candidate['table']}: {', '.join(issues)}")
+        for statement in candidate["statements"]:
+            timing = ""
+            if statement.get("ms_before") is not None:
+                timing = f" [{_ms(statement['ms_before'])} -> {_ms(statement.get('ms_after'))}]"
+            lines.append(f"--   {statement['source'][:100]}{timing}")
+        create = (
+            f"CREATE INDEX {candidate['name']} ON {candidate['table']} "
+            f"({', '.join(candidate['columns'])});"
+        )
+        if trialled and not candidate.get("used"):
+            lines.append("--   not used by the planner in the trial run")
+            create = f"-- {create}"
+        lines.extend([create, ""])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def print_report(statements, candidates, trialled):
+    flagged = [s for s in statements if s["issues"]]
+    print(f"\n{len(statements)} statements explained, {len(flagged)} with full scans or sorts")
+    for statement in sorted(flagged, key=lambda s: s["total_ms"], reverse=True):
+        issues = ", ".join(sorted({f"{issue} on {table}" for issue, table in statement["issues"]}))
+        print(f"  {statement['calls']:>6} calls {statement['total_ms']:>10.1f} ms  {statement['source'][:80]}")
+        print(f"         {issues}")
+
+    if not candidates:
+        print("\nNo new indexes recommended.")
+        return
+    print("\nRecommended indexes")
+    for candidate in candidates:
+        before = [s["ms_before"] for s in candidate["statements"] if s.get("ms_before") is not None]
+        after = [s["ms_after"] for s in candidate["statements"] if s.get("ms_after") is not None]
+        timing = ""
+        if trialled and before and after:
+            timing = f"  {sum(before):.1f} ms -> {sum(after):.1f} ms"
+            if not candidate.get("used"):
+                timing += " (not used by the planner)"
+        print(f"  {candidate['table']}({', '.join(candidate['columns'])})"
+              f"  for {len(candidate['statements'])} statement(s){timing}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--capture", help="Query samples JSON from the Performance page")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load-test workload")
+    parser.add_argument("--no-pages", action="store_true", help="Skip rendering the pages")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Page render timeout (s)")
+    parser.add_argument("--min-rows", type=int, default=1000, help="Ignore full scans of smaller tables")
+    parser.add_argument("--min-ms", type=float, default=1.0,
+                        help="Skip flagged SELECTs already faster than this")
+    parser.add_argument("--max-columns", type=int, default=5, help="Widest index to recommend")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per statement")
+    parser.add_argument("--trial", action="store_true",
+                        help="Create the candidates to measure them (always on for SQLite)")
+    parser.add_argument("--keep", action="store_true", help="Keep the trial indexes")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Migration script path")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    backend = get_database_backend()
+    print(f"Database: {backend.describe()}")
+    if args.capture:
+        with open(args.capture, "r", encoding="utf-8") as f:
+            samples = json.load(f)
+        print(f"Loaded {len(samples)} query samples from {args.capture}")
+    else:
+        pages = "" if args.no_pages else "every page + "
+        print(f"Capturing queries: {pages}{args.duration:.0f} s of load-test reads")
+        samples = run_workload(args.duration, args.seed, not args.no_pages, args.timeout)
+        print(f"Captured {len(samples)} distinct queries")
+
+    schema = Schema(backend.name)
+    statements = collect_statements(samples, load_procedures(), schema)
+    for statement in statements:
+        statement["shape"] = StatementShape(statement["sql"], schema)
+        try:
+            statement["plan"], statement["issues"] = explain(
+                statement, statement["shape"], schema, args.min_rows
+            )
+        except Exception as e:
+            print(f"  EXPLAIN failed for {statement['source'][:80]}: {e}")
+            statement["plan"], statement["issues"] = [], []
+        if statement["issues"]:
+            statement["ms_before"] = time_statement(statement, args.repeat)
+
+    candidates = recommend(
+        [s for s in statements if s["issues"]], schema, args.max_columns, args.min_ms
+    )
+    trialled = bool(candidates) and (args.trial or backend.name == "sqlite")
+    if trialled:
+        flagged = [s for c in candidates for s in c["statements"]]
+        trial(candidates, list({id(s): s for s in flagged}.values()), schema,
+              args.min_rows, args.repeat, args.keep)
+
+    print_report(statements, candidates, trialled)
+    write_migration(args.output, candidates, backend.describe(), trialled)
+    print(f"\nMigration script written to {args.output}")
+
+    if args.json:
+        report = {
+            "database": backend.describe(),
+            "statements": [
+                {key: s.get(key) for key in ("source", "sql", "calls", "total_ms", "plan", "issues",
+                                             "ms_before", "plan_after", "ms_after")}
+                for s in statements
+            ],
+            "indexes": [
+                {"table": c["table"], "columns": c["columns"], "name": c["name"], "used": c.get("used"),
+                 "statements": [s["source"] for s in c["statements"]]}
+                for c in candidates
+            ],
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
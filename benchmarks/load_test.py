@@ -0,0 +1,247 @@
+"""
+load_test.py
+Concurrent load test of the stored procedures and page data functions.
+
+Worker threads repeatedly pick an operation from a weighted mix - the
+read procedures behind the archer and recorder pages and the database.py
+helpers the pages call - with random but valid IDs taken from the database,
+for a fixed duration at each concurrency level. Every call opens its own
+connection through get_connection(), as the pages do.
+
+With --writes the mix also submits practice scores (uspAddStagedScore) and
+approves them (uspApproveScore); only use that on a disposable database such
+as one filled by generate_data.py.
+
+For each concurrency level it reports throughput and p50/p95/p99/max latency
+per operation, and optionally the slowest query fingerprints recorded by
+query_stats during the run.
+
+Usage:
+    python benchmarks/load_test.py [--concurrency 1,4,16] [--duration 30] [--writes]
+    python benchmarks/load_test.py --json results.json --query-stats
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+from archery_app.database import (
+    get_archer_data_for_competition,
+    get_archer_statistics,
+    get_archers,
+    get_competitions,
+    get_connection,
+    get_rounds,
+    get_staged_scores,
+)
+from archery_app.query_stats import get_query_stats, reset_query_stats
+
+
+def call_procedure(name, args):
+    """Run a stored procedure and read all of its result sets."""
+    conn = get_connection()
+    # A plain cursor so callproc() returns the arguments as a tuple
+    cursor = conn.cursor()
+    try:
+        result = cursor.callproc(name, args)
+        for stored in cursor.stored_results():
+            stored.fetchall()
+        conn.commit()
+        return result
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def load_id_pools():
+    """IDs the operations pick from."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    pools = {}
+    for key, sql in [
+        ("archers", "SELECT ArcherID FROM Archer"),
+        ("rounds", "SELECT RoundID FROM Round"),
+        ("competitions", "SELECT CompetitionID FROM Competition"),
+        ("recorders", "SELECT ArcherID FROM AppUser WHERE IsRecorder = 1"),
+    ]:
+        cursor.execute(sql)
+        pools[key] = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return pools
+
+
+def build_operations(pools, writes):
+    """Return {name: (weight, callable(rng))}."""
+    today = date.today()
+
+    def archer(rng):
+        return rng.choice(pools["archers"])
+
+    def competition(rng):
+        return rng.choice(pools["competitions"])
+
+    def add_and_approve(rng):
+        out = call_procedure(
+            "uspAddStagedScore",
+            (archer(rng), rng.choice(pools["rounds"]), 1,
+             today - timedelta(days=rng.randint(0, 14)), rng.randint(300, 600), 0),
+        )
+        call_procedure("uspApproveScore", (out[5], rng.choice(pools["recorders"]), 0))
+
+    operations = {
+        "uspGetArcherScores": (30, lambda rng: call_procedure(
+            "uspGetArcherScores", (archer(rng), None, None, None))),
+        "uspGetRoundDetails": (10, lambda rng: call_procedure(
+            "uspGetRoundDetails", (rng.choice(pools["rounds"]),))),
+        "get_archer_statistics": (15, lambda rng: get_archer_statistics(archer(rng))),
+        "get_rounds": (10, lambda rng: get_rounds()),
+        "get_competitions": (5, lambda rng: get_competitions()),
+        "get_staged_scores": (5, lambda rng: get_staged_scores()),
+        "get_archers": (3, lambda rng: get_archers()),
+    }
+    if pools["competitions"]:
+        operations.update({
+            "uspGetCompetitionResults": (10, lambda rng: call_procedure(
+                "uspGetCompetitionResults", (competition(rng),))),
+            "uspGenerateCompetitionResults": (2, lambda rng: call_procedure(
+                "uspGenerateCompetitionResults", (competition(rng),))),
+            "get_archer_data_for_competition": (5, lambda rng: get_archer_data_for_competition(
+                competition(rng))),
+        })
+    if writes and pools["recorders"]:
+        operations["add_and_approve_score"] = (5, add_and_approve)
+    return operations
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_level(operations, concurrency, duration, seed):
+    names = list(operations)
+    weights = [operations[name][0] for name in names]
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    reported = []  # first few failures are printed, the rest only counted
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local = []
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                operations[name][1](rng)
+                local.append((name, (time.perf_counter() - start) * 1000, True))
+            except Exception as e:
+                local.append((name, (time.perf_counter() - start) * 1000, False))
+                if len(reported) < 5:
+                    reported.append(name)
+                    print(f"  {name} failed: {e}")
+        with lock:
+            for name, elapsed_ms, ok in local:
+                if ok:
+                    samples[name].append(elapsed_ms)
+                else:
+                    errors[name] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in names:
+        values = samples[name]
+        results[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "ops_per_sec": len(values) / elapsed,
+            "p50_ms": statistics.median(values) if values else None,
+            "p95_ms": percentile(values, 95) if values else None,
+            "p99_ms": percentile(values, 99) if values else None,
+            "max_ms": max(values) if values else None,
+        }
+    all_values = [v for values in samples.values() for v in values]
+    results["total"] = {
+        "count": len(all_values),
+        "errors": sum(errors.values()),
+        "ops_per_sec": len(all_values) / elapsed,
+        "p50_ms": statistics.median(all_values) if all_values else None,
+        "p95_ms": percentile(all_values, 95) if all_values else None,
+        "p99_ms": percentile(all_values, 99) if all_values else None,
+        "max_ms": max(all_values) if all_values else None,
+    }
+    return results
+
+
+def print_level(concurrency, results):
+    print(f"\nConcurrency {concurrency}")
+    print(f"  {'operation':<32}{'ops':>8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'max ms':>9}{'errors':>8}")
+    for name, r in results.items():
+        if not r["count"] and not r["errors"]:
+            continue
+        fmt = lambda v: f"{v:>9.1f}" if v is not None else f"{'-':>9}"
+        print(f"  {name:<32}{r['count']:>8}{r['ops_per_sec']:>9.1f}{fmt(r['p50_ms'])}"
+              f"{fmt(r['p95_ms'])}{fmt(r['p99_ms'])}{fmt(r['max_ms'])}{r['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated thread counts")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per level")
+    parser.add_argument("--writes", action="store_true", help="Include score submit/approve")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--query-stats", action="store_true", help="Print the slowest queries per level")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+    if args.query_stats:
+        # Instrumentation is opt-in; switch it on before the first connection
+        os.environ["QUERY_STATS_ENABLED"] = "true"
+
+    pools = load_id_pools()
+    if not pools["archers"]:
+        print("No archers in the database; load data with benchmarks/generate_data.py first.")
+        return 1
+    operations = build_operations(pools, args.writes)
+    print(f"{len(pools['archers']):,} archers, {len(pools['competitions']):,} competitions; "
+          f"{len(operations)} operations, {args.duration:.0f} s per level")
+
+    report = {}
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        reset_query_stats()
+        results = run_level(operations, concurrency, args.duration, args.seed)
+        print_level(concurrency, results)
+        report[concurrency] = results
+        if args.query_stats:
+            print("  Slowest queries by p95:")
+            for row in get_query_stats(order_by="p95 ms", limit=5):
+                print(f"    {row['p95 ms']:>8.1f} ms p95 {row['Calls']:>7} calls  {row['Fingerprint'][:90]}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -73,6 +73,20 @@ CREATE PROCEDURE uspAddStagedScore(
     OUT p_StagedScoreID INT
 )
 BEGIN
+    DECLARE v_PossibleScore INT DEFAULT NULL;
+    DECLARE v_Message VARCHAR(128);
+
+    -- Reject totals the round cannot produce
+    SELECT PossibleScore INTO v_PossibleScore FROM Round WHERE RoundID = p_RoundID;
+    IF v_PossibleScore IS NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Unknown round.';
+    END IF;
+    IF p_TotalScore IS NULL OR p_TotalScore < 0 OR p_TotalScore > v_PossibleScore THEN
+        SET v_Message = CONCAT('Total score ', IFNULL(p_TotalScore, 'NULL'),
+                               ' is outside 0-', v_PossibleScore, '.');
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_Message;
+    END IF;
+
     -- Add a new score to the staged table
     INSERT INTO StagedScore (ArcherID, RoundID, EquipmentTypeID, Date, TotalScore, SubmissionDate)
     VALUES (p_ArcherID, p_RoundID, p_EquipmentTypeID, p_Date, p_TotalScore, NOW());
@@ -203,6 +217,42 @@ DELIMITER ;
 -- USE CASE 6: Approve Practice Scores
 -- ======================================================
 
+DELIMITER //
+CREATE PROCEDURE uspUpdateScoreRecords(
+    IN p_ScoreID INT
+)
+BEGIN
+    -- Raise the archer's personal best if an approved score beats it
+    INSERT INTO PersonalBest (ArcherID, RoundID, EquipmentTypeID, ScoreID, TotalScore, Date)
+    SELECT s.ArcherID, s.RoundID, s.EquipmentTypeID, s.ScoreID, s.TotalScore, s.Date
+    FROM Score s
+    WHERE s.ScoreID = p_ScoreID AND s.IsApproved = TRUE
+    ON DUPLICATE KEY UPDATE
+        ScoreID = IF(VALUES(TotalScore) > PersonalBest.TotalScore, VALUES(ScoreID), PersonalBest.ScoreID),
+        Date = IF(VALUES(TotalScore) > PersonalBest.TotalScore, VALUES(Date), PersonalBest.Date),
+        TotalScore = GREATEST(PersonalBest.TotalScore, VALUES(TotalScore));
+
+    -- Raise the club record for the archer's class if a competition score beats it
+    INSERT INTO ClubRecord (ClassID, RoundID, EquipmentTypeID, ScoreID, ArcherID, TotalScore, Date)
+    SELECT cls.ClassID, s.RoundID, s.EquipmentTypeID, s.ScoreID, s.ArcherID, s.TotalScore, s.Date
+    FROM Score s
+    JOIN Archer a ON s.ArcherID = a.ArcherID
+    JOIN Class cls ON a.Gender = cls.Gender
+        AND cls.AgeGroupID = (
+            SELECT ag.AgeGroupID
+            FROM AgeGroup ag
+            WHERE (YEAR(s.Date) - YEAR(a.DateOfBirth)) BETWEEN IFNULL(ag.MinAge, 0) AND IFNULL(ag.MaxAge, 999)
+            LIMIT 1
+        )
+    WHERE s.ScoreID = p_ScoreID AND s.IsApproved = TRUE AND s.IsCompetition = TRUE
+    ON DUPLICATE KEY UPDATE
+        ScoreID = IF(VALUES(TotalScore) > ClubRecord.TotalScore, VALUES(ScoreID), ClubRecord.ScoreID),
+        ArcherID = IF(VALUES(TotalScore) > ClubRecord.TotalScore, VALUES(ArcherID), ClubRecord.ArcherID),
+        Date = IF(VALUES(TotalScore) > ClubRecord.TotalScore, VALUES(Date), ClubRecord.Date),
+        TotalScore = GREATEST(ClubRecord.TotalScore, VALUES(TotalScore));
+END //
+DELIMITER ;
+
 DELIMITER //
 CREATE PROCEDURE uspApproveScore(
     IN p_StagedScoreID INT,
@@ -241,6 +291,9 @@ BEGIN
         -- Get the new Score ID
         SET p_ScoreID = LAST_INSERT_ID();
         
+        -- Update the archer's personal best in the same transaction
+        CALL uspUpdateScoreRecords(p_ScoreID);
+        
         -- Delete from StagedScore table
         DELETE FROM StagedScore
         WHERE StagedScoreID = p_StagedScoreID;
@@ -294,6 +347,9 @@ BEGIN
     SET IsCompetition = TRUE
     WHERE ScoreID = p_ScoreID;
     
+    -- Update the club record in the same transaction
+    CALL uspUpdateScoreRecords(p_ScoreID);
+    
     -- Commit transaction
     COMMIT;
 END //
@@ -142,6 +142,8 @@ CREATE TABLE AppUser (
     ArcherID INT NOT NULL,
     Username VARCHAR(50) NOT NULL UNIQUE,
     PasswordHash VARCHAR(255) NOT NULL,
+    Salt VARCHAR(64),
+    HashType VARCHAR(50),
     IsRecorder BOOLEAN DEFAULT FALSE,
     IsAdmin BOOLEAN DEFAULT FALSE,
     FOREIGN KEY (ArcherID) REFERENCES Archer(ArcherID)
@@ -0,0 +1,126 @@
+"""
+Range-partition SecurityLog by month on EventTime.
+
+MySQL cannot partition a table in place without copying it under a lock, so
+the rows are copied into a partitioned SecurityLog_new in throttled LogID
+chunks while the app keeps logging, then the tables are swapped with one
+atomic RENAME; rows logged and reviews made during the swap are carried over.
+
+Partitioned tables cannot have foreign keys and every unique key must include
+EventTime, so the primary key becomes (LogID, EventTime) and the foreign keys
+to AppUser and Archer go; an audit log should outlive the accounts it
+mentions anyway. The IsReviewed index (two values) and the foreign-key
+indexes are not carried over, which makes every insert cheaper.
+"""
+
+from datetime import date
+
+from archery_app.log_archive import add_months, month_start, partition_definitions
+
+CREATE_PARTITIONED = """
+CREATE TABLE SecurityLog_new (
+    LogID INT NOT NULL AUTO_INCREMENT,
+    EventTime DATETIME NOT NULL,
+    UserID INT,
+    ArcherID INT,
+    IPAddress VARCHAR(45),
+    EventType VARCHAR(50) NOT NULL,
+    Description TEXT,
+    Severity VARCHAR(20) NOT NULL,
+    ActionURL VARCHAR(255),
+    RequestDetails TEXT,
+    IsReviewed BOOLEAN DEFAULT FALSE,
+    ReviewedBy INT,
+    ReviewedAt DATETIME,
+    PRIMARY KEY (LogID, EventTime),
+    KEY idx_securitylog_eventtime (EventTime),
+    KEY idx_securitylog_userid (UserID),
+    KEY idx_securitylog_severity_eventtime (Severity, EventTime),
+    KEY idx_securitylog_eventtype_eventtime (EventType, EventTime)
+)
+PARTITION BY RANGE COLUMNS(EventTime) (
+    {partitions}
+)
+"""
+
+COPY_RANGE = (
+    "INSERT INTO SecurityLog_new SELECT * FROM SecurityLog "
+    "WHERE LogID >= %(start)s AND LogID < %(end)s"
+)
+
+
+def _scalar(migration, sql):
+    row = migration.query(sql)[0]
+    return list(row.values())[0]
+
+
+def _copy_new_rows(migration, source, target, after):
+    """Copy the rows of source with a LogID above after."""
+    cursor = migration.conn.cursor()
+    cursor.execute(f"INSERT INTO {target} SELECT * FROM {source} WHERE LogID > %s", (after,))
+    rows = cursor.rowcount
+    cursor.close()
+    migration.conn.commit()
+    return rows
+
+
+def _sync_reviews(migration, source, target, since):
+    """Copy reviews made in source at or after since onto the same rows of target."""
+    cursor = migration.conn.cursor()
+    cursor.execute(
+        f"UPDATE {target} n JOIN {source} o ON n.LogID = o.LogID "
+        "SET n.IsReviewed = o.IsReviewed, n.ReviewedBy = o.ReviewedBy, n.ReviewedAt = o.ReviewedAt "
+        "WHERE o.ReviewedAt >= %s AND (n.ReviewedAt IS NULL OR n.ReviewedAt < o.ReviewedAt)",
+        (since,),
+    )
+    cursor.close()
+    migration.conn.commit()
+
+
+def upgrade(migration):
+    partitioned = _scalar(
+        migration,
+        "SELECT COUNT(*) FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA = DATABASE() "
+        "AND TABLE_NAME = 'SecurityLog' AND PARTITION_NAME IS NOT NULL",
+    )
+    if partitioned:
+        return
+
+    # A run interrupted before the swap starts again from scratch
+    migration.execute("DROP TABLE IF EXISTS SecurityLog_new")
+
+    oldest = _scalar(migration, "SELECT MIN(EventTime) FROM SecurityLog")
+    first = month_start(oldest) if oldest else month_start(date.today())
+    last = add_months(month_start(date.today()), 3)
+    migration.execute(CREATE_PARTITIONED.format(
+        partitions=",\n    ".join(partition_definitions(first, last))
+    ))
+
+    started = _scalar(migration, "SELECT NOW()")
+    rows = migration.backfill("SecurityLog", "LogID", COPY_RANGE)
+    copied = _scalar(migration, "SELECT COALESCE(MAX(LogID), 0) FROM SecurityLog_new")
+    rows += _copy_new_rows(migration, "SecurityLog", "SecurityLog_new", copied)
+    migration.log(f"  copied {rows:,} rows")
+
+    # Reviews made during the copy
+    synced = _scalar(migration, "SELECT NOW()")
+    _sync_reviews(migration, "SecurityLog", "SecurityLog_new", started)
+
+    # Leave a gap above the old table's IDs so rows logged between the last
+    # copy and the rename keep their LogID when they are carried over
+    next_id = _scalar(
+        migration,
+        "SELECT AUTO_INCREMENT FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'SecurityLog'",
+    )
+    migration.execute(f"ALTER TABLE SecurityLog_new AUTO_INCREMENT = {int(next_id or 1) + 10000}")
+    copied = _scalar(migration, "SELECT COALESCE(MAX(LogID), 0) FROM SecurityLog_new")
+    migration.execute(
+        "RENAME TABLE SecurityLog TO SecurityLog_unpartitioned, SecurityLog_new TO SecurityLog"
+    )
+    carried = _copy_new_rows(migration, "SecurityLog_unpartitioned", "SecurityLog", copied)
+    if carried:
+        migration.log(f"  carried over {carried:,} rows logged during the swap")
+    # Reviews made between the first sync and the rename
+    _sync_reviews(migration, "SecurityLog_unpartitioned", "SecurityLog", synced)
+    migration.execute("DROP TABLE SecurityLog_unpartitioned")
@@ -0,0 +1,12 @@
+-- Seasons whose End/Arrow rows have moved to cold storage
+-- (archery_app/arrow_archive.py); their Score rows stay in the database.
+CREATE TABLE IF NOT EXISTS ArchivedSeason (
+    Season VARCHAR(9) PRIMARY KEY,
+    StartDate DATE NOT NULL,
+    EndDate DATE NOT NULL,
+    Scores INT NOT NULL,
+    Ends INT NOT NULL,
+    Arrows INT NOT NULL,
+    ArchiveFile VARCHAR(255) NOT NULL,
+    ArchivedAt DATETIME NOT NULL
+);
@@ -0,0 +1,33 @@
+-- Best approved score per archer, round and equipment, and best competition
+-- score per class, round and equipment (archery_app/records.py).
+-- uspApproveScore and uspLinkScoreToCompetition keep them up to date;
+-- 0005 fills them from existing scores.
+CREATE TABLE IF NOT EXISTS PersonalBest (
+    ArcherID INT NOT NULL,
+    RoundID INT NOT NULL,
+    EquipmentTypeID INT NOT NULL,
+    ScoreID INT NOT NULL,
+    TotalScore INT NOT NULL,
+    Date DATE NOT NULL,
+    PRIMARY KEY (ArcherID, RoundID, EquipmentTypeID),
+    FOREIGN KEY (ArcherID) REFERENCES Archer(ArcherID),
+    FOREIGN KEY (RoundID) REFERENCES Round(RoundID),
+    FOREIGN KEY (EquipmentTypeID) REFERENCES EquipmentType(EquipmentTypeID),
+    FOREIGN KEY (ScoreID) REFERENCES Score(ScoreID)
+);
+
+CREATE TABLE IF NOT EXISTS ClubRecord (
+    ClassID INT NOT NULL,
+    RoundID INT NOT NULL,
+    EquipmentTypeID INT NOT NULL,
+    ScoreID INT NOT NULL,
+    ArcherID INT NOT NULL,
+    TotalScore INT NOT NULL,
+    Date DATE NOT NULL,
+    PRIMARY KEY (ClassID, RoundID, EquipmentTypeID),
+    FOREIGN KEY (ClassID) REFERENCES Class(ClassID),
+    FOREIGN KEY (RoundID) REFERENCES Round(RoundID),
+    FOREIGN KEY (EquipmentTypeID) REFERENCES EquipmentType(EquipmentTypeID),
+    FOREIGN KEY (ScoreID) REFERENCES Score(ScoreID),
+    FOREIGN KEY (ArcherID) REFERENCES Archer(ArcherID)
+);
@@ -0,0 +1,13 @@
+"""
+Fill PersonalBest and ClubRecord from the scores already in the database.
+
+The same rebuild as `python -m archery_app.records rebuild`, in archer and
+round key-range chunks so approvals carry on while it runs.
+"""
+
+from archery_app.records import rebuild_records
+
+
+def upgrade(migration):
+    personal_bests, club_records = rebuild_records(migration.conn, log=migration.log)
+    migration.log(f"    {personal_bests:,} personal bests, {club_records:,} club records")
@@ -0,0 +1,8 @@
+-- Precomputed home dashboard data, one row per archer plus ArcherID 0 for
+-- the club (archery_app/digests.py). Rebuilt in the background after
+-- score submissions, approvals and competition changes.
+CREATE TABLE IF NOT EXISTS UserDigest (
+    ArcherID INT PRIMARY KEY,
+    Digest TEXT NOT NULL,
+    BuiltAt DATETIME NOT NULL
+);